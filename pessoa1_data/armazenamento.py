@@ -1,28 +1,78 @@
 # pessoa1_data/armazenamento.py
-import pandas as pd
+import argparse
+import sys
+import os
 
-def coletar_dados(conn):
+# Adicionar a pasta raiz ao path para importações funcionarem
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pessoa1_data.backends import (
+    BackendPostgres, BackendParquet, obter_backend, gerar_precos_sinteticos, PARQUET_PADRAO
+)
+
+def coletar_dados(conn, coin_ids=None, inicio=None, fim=None, barras=False, features=False):
     """
-    Coleta todos os dados de criptomoedas do banco.
-    
+    Coleta os dados de criptomoedas do armazenamento.
+
     Args:
-        conn: Conexão com o banco de dados
-        
+        conn: Backend de armazenamento (ver pessoa1_data/backends.py) ou
+              conexão com o banco de dados (psycopg2)
+        coin_ids: Lista de moedas (None = todas)
+        inicio: Data/hora inicial, inclusiva (None = desde o início)
+        fim: Data/hora final, exclusiva (None = até o fim)
+        barras: Lê as barras horárias materializadas (pessoa1_data/barras.py)
+                em vez dos ticks brutos
+        features: Lê linhas de features já calculadas no banco
+                  (pessoa1_data/features_sql.py) em vez dos ticks brutos
+
     Returns:
         pd.DataFrame: DataFrame com os dados coletados
     """
-    query = """
-        SELECT coin_id, price_usd, price_brl, fetched_at 
-        FROM public.raw_bitcoin_prices 
-        ORDER BY coin_id, fetched_at
-    """
-    
-    df = pd.read_sql(query, conn)
-    
+    backend = conn if hasattr(conn, 'ler_precos') else BackendPostgres(conn)
+
+    # Filtros são aplicados pelo próprio backend (WHERE / scan do Parquet)
+    if features:
+        ler = backend.ler_features
+    elif barras:
+        ler = backend.ler_barras
+    else:
+        ler = backend.ler_precos
+    df = ler(coin_ids=coin_ids, inicio=inicio, fim=fim)
+
     print(f"📊 Dados coletados: {len(df)} registros")
     print(f"📈 Moedas: {df['coin_id'].nunique()}")
-    
+
     if len(df) > 0:
         print(f"📅 Período: {df['fetched_at'].min()} até {df['fetched_at'].max()}")
-    
-    return df
\ No newline at end of file
+
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Armazenamento local (Parquet) para rodar offline")
+    parser.add_argument("--exportar", action="store_true",
+                        help="copia raw_bitcoin_prices do PostgreSQL para Parquet")
+    parser.add_argument("--sintetico", action="store_true",
+                        help="gera preços sintéticos em Parquet (CI / testes)")
+    parser.add_argument("--destino", default=PARQUET_PADRAO,
+                        help="diretório Parquet de destino")
+    parser.add_argument("--moedas", type=int, default=5,
+                        help="número de moedas nos dados sintéticos")
+    parser.add_argument("--horas", type=int, default=24 * 90,
+                        help="horas de histórico nos dados sintéticos")
+    args = parser.parse_args()
+
+    if args.exportar:
+        origem = obter_backend('postgres')
+        if origem is None:
+            sys.exit(1)
+        df = coletar_dados(origem)
+        origem.fechar()
+    elif args.sintetico:
+        df = gerar_precos_sinteticos(n_moedas=args.moedas, horas=args.horas)
+    else:
+        parser.print_help()
+        sys.exit(0)
+
+    arquivo = BackendParquet(args.destino).escrever_precos(df)
+    print(f"💾 {len(df)} registros salvos em {arquivo}")
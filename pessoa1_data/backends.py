@@ -0,0 +1,415 @@
+# pessoa1_data/backends.py
+import pandas as pd
+import numpy as np
+import io
+import os
+
+# Colunas da tabela raw_bitcoin_prices
+COLUNAS_PRECOS = ['coin_id', 'price_usd', 'price_brl', 'fetched_at']
+
+# Colunas lidas da tabela de barras horárias (ver pessoa1_data/barras.py)
+COLUNAS_BARRAS_LEITURA = ['coin_id', 'price_usd', 'price_brl', 'fetched_at', 'open', 'high', 'low',
+                          'n_ticks', 'preenchido']
+
+# Tabela de barras horárias no PostgreSQL (upsert por coin_id, fetched_at)
+SQL_CRIAR_BARRAS = """
+    CREATE TABLE IF NOT EXISTS {esquema}.barras_horarias (
+        coin_id TEXT NOT NULL,
+        fetched_at TIMESTAMP NOT NULL,
+        open DOUBLE PRECISION, high DOUBLE PRECISION,
+        low DOUBLE PRECISION, close DOUBLE PRECISION,
+        price_usd DOUBLE PRECISION, price_brl DOUBLE PRECISION,
+        n_ticks INTEGER, preenchido BOOLEAN,
+        PRIMARY KEY (coin_id, fetched_at)
+    )
+"""
+
+# Caminho padrão dos dados locais (Parquet) para rodar offline
+PARQUET_PADRAO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dados', 'raw_bitcoin_prices'
+)
+
+
+def _filtros_sql(coin_ids, inicio, fim, placeholder):
+    """
+    Monta a cláusula WHERE (e os parâmetros) dos filtros de moeda e período.
+
+    Args:
+        placeholder: Marcador de parâmetro do driver ('%s' psycopg2, '?' DuckDB)
+
+    Returns:
+        tuple: (str com 'WHERE ...' ou '', lista de parâmetros)
+    """
+    condicoes, params = [], []
+    if coin_ids:
+        coin_ids = list(coin_ids)
+        condicoes.append(f"coin_id IN ({', '.join([placeholder] * len(coin_ids))})")
+        params.extend(coin_ids)
+    if inicio is not None:
+        condicoes.append(f"fetched_at >= {placeholder}")
+        params.append(pd.Timestamp(inicio).to_pydatetime())
+    if fim is not None:
+        condicoes.append(f"fetched_at < {placeholder}")
+        params.append(pd.Timestamp(fim).to_pydatetime())
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return where, params
+
+
+class BackendPostgres:
+    """
+    Leitura da tabela public.raw_bitcoin_prices no PostgreSQL.
+    Os filtros de moeda e período viram WHERE na própria query.
+    """
+
+    nome = 'postgres'
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def ler_precos(self, coin_ids=None, inicio=None, fim=None):
+        where, params = _filtros_sql(coin_ids, inicio, fim, '%s')
+        query = f"""
+            SELECT coin_id, price_usd, price_brl, fetched_at
+            FROM public.raw_bitcoin_prices
+            {where}
+            ORDER BY coin_id, fetched_at
+        """
+        return pd.read_sql(query, self.conn, params=params or None)
+
+    def ler_barras(self, coin_ids=None, inicio=None, fim=None):
+        where, params = _filtros_sql(coin_ids, inicio, fim, '%s')
+        query = f"""
+            SELECT {', '.join(COLUNAS_BARRAS_LEITURA)}
+            FROM public.barras_horarias
+            {where}
+            ORDER BY coin_id, fetched_at
+        """
+        return pd.read_sql(query, self.conn, params=params or None)
+
+    def ler_ultimos(self, n, inicio=None, barras=False, fim=None):
+        """
+        As `n` linhas mais recentes de cada moeda (ticks ou barras) antes de
+        `fim`, em ordem de moeda e tempo. `inicio` limita a busca (poda as
+        partições antigas).
+        """
+        tabela = 'barras_horarias' if barras else 'raw_bitcoin_prices'
+        where, params = _filtros_sql(None, inicio, fim, '%s')
+        query = f"""
+            SELECT coin_id, price_usd, price_brl, fetched_at FROM (
+                SELECT coin_id, price_usd, price_brl, fetched_at,
+                       ROW_NUMBER() OVER (PARTITION BY coin_id ORDER BY fetched_at DESC) AS posicao
+                FROM public.{tabela}
+                {where}
+            ) ultimos
+            WHERE posicao <= %s
+            ORDER BY coin_id, fetched_at
+        """
+        return pd.read_sql(query, self.conn, params=params + [int(n)])
+
+    def listar_moedas(self, barras=False):
+        """coin_ids presentes nos ticks (ou nas barras horárias)."""
+        tabela = 'barras_horarias' if barras else 'raw_bitcoin_prices'
+        return pd.read_sql(
+            f"SELECT DISTINCT coin_id FROM public.{tabela} ORDER BY coin_id", self.conn
+        )['coin_id'].tolist()
+
+    def ler_features(self, coin_ids=None, inicio=None, fim=None):
+        """Linhas de features materializadas (pessoa1_data/features_sql.py)."""
+        where, params = _filtros_sql(coin_ids, inicio, fim, '%s')
+        query = f"""
+            SELECT * FROM public.features_precos
+            {where}
+            ORDER BY coin_id, fetched_at
+        """
+        return pd.read_sql(query, self.conn, params=params or None)
+
+    def escrever_precos(self, df):
+        """
+        Acrescenta ticks: COPY para uma tabela temporária e INSERT só das
+        chaves (coin_id, fetched_at) que ainda não estão na tabela. Repetir
+        o mesmo lote (retry após falha) não duplica linhas.
+
+        Returns:
+            int: Linhas inseridas
+        """
+        buffer = io.StringIO()
+        df[COLUNAS_PRECOS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS precos_lote (
+                        coin_id TEXT, price_usd DOUBLE PRECISION,
+                        price_brl DOUBLE PRECISION, fetched_at TIMESTAMP
+                    ) ON COMMIT DELETE ROWS
+                """)
+                cur.copy_expert(
+                    f"COPY precos_lote ({', '.join(COLUNAS_PRECOS)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+                cur.execute("""
+                    INSERT INTO public.raw_bitcoin_prices (coin_id, price_usd, price_brl, fetched_at)
+                    SELECT DISTINCT ON (coin_id, fetched_at) coin_id, price_usd, price_brl, fetched_at
+                    FROM precos_lote l
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM public.raw_bitcoin_prices r
+                        WHERE r.coin_id = l.coin_id AND r.fetched_at = l.fetched_at
+                    )
+                """)
+                inseridas = cur.rowcount
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return inseridas
+
+    def escrever_barras(self, df):
+        """Grava barras com upsert por (coin_id, fetched_at)."""
+        from psycopg2.extras import execute_values
+
+        colunas = ['coin_id', 'fetched_at', 'open', 'high', 'low', 'close',
+                   'price_usd', 'price_brl', 'n_ticks', 'preenchido']
+        # astype(object): o psycopg2 não adapta tipos NumPy (int64, bool_)
+        linhas = list(df[colunas].astype(object).itertuples(index=False, name=None))
+        with self.conn.cursor() as cur:
+            cur.execute(SQL_CRIAR_BARRAS.format(esquema='public'))
+            execute_values(cur, f"""
+                INSERT INTO public.barras_horarias ({', '.join(colunas)}) VALUES %s
+                ON CONFLICT (coin_id, fetched_at) DO UPDATE SET
+                    {', '.join(f'{c} = EXCLUDED.{c}' for c in colunas[2:])}
+            """, linhas, page_size=5000)
+        self.conn.commit()
+
+    def fechar(self):
+        self.conn.close()
+
+
+class BackendParquet:
+    """
+    Armazenamento local em arquivos Parquet, consultado com DuckDB embutido.
+
+    `caminho` é um diretório com um ou mais arquivos .parquet (cada escrita
+    acrescenta um arquivo). Os filtros de moeda e período são empurrados
+    para o scan do Parquet, que pula row groups pelas estatísticas. Sem
+    DuckDB instalado, cai no `pd.read_parquet` com filtros do pyarrow.
+    As barras horárias ficam em `caminho_barras` (padrão: barras_horarias/
+    ao lado de `caminho`).
+    """
+
+    nome = 'parquet'
+
+    def __init__(self, caminho=PARQUET_PADRAO, caminho_barras=None):
+        self.caminho = caminho
+        self.caminho_barras = caminho_barras or os.path.join(
+            os.path.dirname(os.path.abspath(caminho)), 'barras_horarias'
+        )
+
+    def _arquivos(self, diretorio=None):
+        diretorio = diretorio or self.caminho
+        if not os.path.isdir(diretorio):
+            return []
+        return sorted(
+            os.path.join(diretorio, f) for f in os.listdir(diretorio) if f.endswith('.parquet')
+        )
+
+    def _consultar(self, diretorio, colunas, coin_ids, inicio, fim):
+        arquivos = self._arquivos(diretorio)
+        if not arquivos:
+            print(f"⚠️  Nenhum arquivo Parquet em {diretorio}")
+            return pd.DataFrame(columns=colunas)
+
+        try:
+            import duckdb
+        except ImportError:
+            return self._ler_pyarrow(arquivos, colunas, coin_ids, inicio, fim)
+
+        where, params = _filtros_sql(coin_ids, inicio, fim, '?')
+        query = f"""
+            SELECT {', '.join(colunas)}
+            FROM read_parquet(?)
+            {where}
+            ORDER BY coin_id, fetched_at
+        """
+        with duckdb.connect() as con:
+            return con.execute(query, [arquivos] + params).df()
+
+    def ler_precos(self, coin_ids=None, inicio=None, fim=None):
+        return self._consultar(self.caminho, COLUNAS_PRECOS, coin_ids, inicio, fim)
+
+    def ler_barras(self, coin_ids=None, inicio=None, fim=None):
+        return self._consultar(self.caminho_barras, COLUNAS_BARRAS_LEITURA, coin_ids, inicio, fim)
+
+    def ler_ultimos(self, n, inicio=None, barras=False, fim=None):
+        """
+        As `n` linhas mais recentes de cada moeda (ticks ou barras) antes de
+        `fim`, em ordem de moeda e tempo.
+        """
+        arquivos = self._arquivos(self.caminho_barras if barras else None)
+        if not arquivos:
+            return pd.DataFrame(columns=COLUNAS_PRECOS)
+        try:
+            import duckdb
+        except ImportError:
+            df = self._ler_pyarrow(arquivos, COLUNAS_PRECOS, None, inicio, fim)
+            return df.groupby('coin_id', sort=False).tail(n).reset_index(drop=True)
+
+        where, params = _filtros_sql(None, inicio, fim, '?')
+        query = f"""
+            SELECT {', '.join(COLUNAS_PRECOS)}
+            FROM read_parquet(?)
+            {where}
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY coin_id ORDER BY fetched_at DESC) <= ?
+            ORDER BY coin_id, fetched_at
+        """
+        with duckdb.connect() as con:
+            return con.execute(query, [arquivos] + params + [int(n)]).df()
+
+    def listar_moedas(self, barras=False):
+        """coin_ids presentes nos ticks (ou nas barras horárias); lê só a coluna coin_id."""
+        arquivos = self._arquivos(self.caminho_barras if barras else None)
+        if not arquivos:
+            return []
+        try:
+            import duckdb
+        except ImportError:
+            moedas = set()
+            for arquivo in arquivos:
+                moedas.update(pd.read_parquet(arquivo, columns=['coin_id'])['coin_id'].unique())
+            return sorted(moedas)
+        with duckdb.connect() as con:
+            return [linha[0] for linha in con.execute(
+                "SELECT DISTINCT coin_id FROM read_parquet(?) ORDER BY coin_id", [arquivos]
+            ).fetchall()]
+
+    def ler_features(self, coin_ids=None, inicio=None, fim=None):
+        """
+        Calcula as features no DuckDB com as mesmas window functions do
+        PostgreSQL. O filtro de moeda vai para o scan; o de período é
+        aplicado depois das janelas, para não cortar o histórico delas.
+        """
+        import duckdb
+        from pessoa1_data.features_sql import sql_features, COLUNAS_FEATURES
+
+        arquivos = self._arquivos()
+        if not arquivos:
+            print(f"⚠️  Nenhum arquivo Parquet em {self.caminho}")
+            return pd.DataFrame(columns=COLUNAS_FEATURES)
+
+        where_moedas, params = _filtros_sql(coin_ids, None, None, '?')
+        fonte = f"SELECT coin_id, price_usd, price_brl, fetched_at FROM read_parquet(?) {where_moedas}"
+        where_periodo, params_periodo = _filtros_sql(None, inicio, fim, '?')
+        query = f"""
+            SELECT * FROM ({sql_features(fonte)}) f
+            {where_periodo}
+            ORDER BY coin_id, fetched_at
+        """
+        with duckdb.connect() as con:
+            return con.execute(query, [arquivos] + params + params_periodo).df()
+
+    def _ler_pyarrow(self, arquivos, colunas, coin_ids, inicio, fim):
+        filtros = []
+        if coin_ids:
+            filtros.append(('coin_id', 'in', list(coin_ids)))
+        if inicio is not None:
+            filtros.append(('fetched_at', '>=', pd.Timestamp(inicio)))
+        if fim is not None:
+            filtros.append(('fetched_at', '<', pd.Timestamp(fim)))
+        partes = [pd.read_parquet(a, columns=colunas, filters=filtros or None) for a in arquivos]
+        df = pd.concat(partes, ignore_index=True)
+        return df.sort_values(['coin_id', 'fetched_at']).reset_index(drop=True)
+
+    def escrever_precos(self, df):
+        """
+        Acrescenta registros em um novo arquivo Parquet, ordenado por
+        coin_id e fetched_at (mantém as estatísticas dos row groups úteis).
+        O arquivo é escrito com outro nome e renomeado no fim: uma falha no
+        meio não deixa arquivo parcial para o próximo scan.
+
+        Returns:
+            str: Caminho do arquivo escrito
+        """
+        os.makedirs(self.caminho, exist_ok=True)
+        df = df[COLUNAS_PRECOS].sort_values(['coin_id', 'fetched_at'])
+        df = df.assign(fetched_at=pd.to_datetime(df['fetched_at']))
+        arquivo = os.path.join(self.caminho, f"parte_{len(self._arquivos()):05d}.parquet")
+        temporario = arquivo + '.tmp'
+        df.to_parquet(temporario, index=False, row_group_size=100_000)
+        os.replace(temporario, arquivo)
+        return arquivo
+
+    def escrever_barras(self, df):
+        """
+        Grava barras substituindo as horas já existentes de cada moeda
+        (a partir da primeira hora recebida). A tabela de barras é pequena,
+        então é reescrita num único arquivo, trocado de forma atômica.
+        """
+        os.makedirs(self.caminho_barras, exist_ok=True)
+        arquivos = self._arquivos(self.caminho_barras)
+        if arquivos and len(df) > 0:
+            existentes = pd.concat([pd.read_parquet(a) for a in arquivos], ignore_index=True)
+            primeira_hora = df.groupby('coin_id')['fetched_at'].min()
+            corte = existentes['coin_id'].map(primeira_hora)
+            manter = corte.isna() | (existentes['fetched_at'] < corte)
+            df = pd.concat([existentes[manter], df], ignore_index=True)
+
+        df = df.sort_values(['coin_id', 'fetched_at'])
+        destino = os.path.join(self.caminho_barras, 'barras.parquet')
+        temporario = destino + '.tmp'
+        df.to_parquet(temporario, index=False, row_group_size=100_000)
+        os.replace(temporario, destino)
+        for arquivo in arquivos:
+            if arquivo != destino:
+                os.remove(arquivo)
+        return destino
+
+    def fechar(self):
+        pass
+
+
+def obter_backend(nome=None, caminho=None):
+    """
+    Cria o backend de armazenamento.
+
+    Args:
+        nome: 'postgres' ou 'parquet' (padrão: variável ARMAZENAMENTO_BACKEND
+              ou 'postgres')
+        caminho: Diretório Parquet (padrão: ARMAZENAMENTO_PARQUET ou dados/)
+
+    Returns:
+        BackendPostgres, BackendParquet ou None se não conectar ao banco
+    """
+    nome = nome or os.environ.get('ARMAZENAMENTO_BACKEND', 'postgres')
+
+    if nome == 'parquet':
+        return BackendParquet(caminho or os.environ.get('ARMAZENAMENTO_PARQUET', PARQUET_PADRAO))
+
+    if nome == 'postgres':
+        # Import tardio: o modo offline não precisa do psycopg2
+        from utils.db_config import conectar_banco
+        conn = conectar_banco()
+        return BackendPostgres(conn) if conn else None
+
+    raise ValueError(f"Backend desconhecido: {nome} (use 'postgres' ou 'parquet')")
+
+
+def gerar_precos_sinteticos(n_moedas=5, horas=24 * 90, seed=42):
+    """
+    Gera preços horários sintéticos (passeio aleatório geométrico) no
+    formato de raw_bitcoin_prices, para rodar o pipeline sem banco (CI).
+
+    Returns:
+        pd.DataFrame: coin_id, price_usd, price_brl, fetched_at
+    """
+    rng = np.random.default_rng(seed)
+    fim = pd.Timestamp.now().floor('h')
+    datas = pd.date_range(end=fim, periods=horas, freq='h')
+    partes = []
+    for i in range(n_moedas):
+        retornos = rng.normal(0, 0.005 * (1 + i), horas)
+        precos = 10.0 ** (4 - i) * np.exp(np.cumsum(retornos))
+        partes.append(pd.DataFrame({
+            'coin_id': f'moeda_{i:02d}' if i else 'bitcoin',
+            'price_usd': precos,
+            'price_brl': precos * 5.0,
+            'fetched_at': datas
+        }))
+    return pd.concat(partes, ignore_index=True)
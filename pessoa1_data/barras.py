@@ -0,0 +1,152 @@
+# pessoa1_data/barras.py
+import pandas as pd
+import numpy as np
+import argparse
+import sys
+import os
+
+# Adicionar a pasta raiz ao path para importações funcionarem
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pessoa1_data.backends import obter_backend
+
+# Colunas da tabela de barras horárias
+COLUNAS_BARRAS = [
+    'coin_id', 'fetched_at', 'open', 'high', 'low', 'close',
+    'price_usd', 'price_brl', 'n_ticks', 'preenchido'
+]
+
+
+def criar_barras_horarias(df, anteriores=None):
+    """
+    Reamostra os ticks brutos em barras OHLC horárias por moeda.
+
+    Cada moeda ganha uma grade horária completa, do primeiro ao último tick.
+    Horas sem nenhum tick (lacunas) são detectadas de forma vetorizada e
+    preenchidas com o último fechamento (forward-fill): open = high = low =
+    close = fechamento anterior, n_ticks = 0 e preenchido = True.
+
+    Na atualização incremental, `anteriores` traz a última barra já gravada
+    de cada moeda antes dos ticks: a grade começa nela, então as horas sem
+    tick logo depois são preenchidas com o fechamento dela, como numa
+    reconstrução completa. Essas barras não entram no resultado.
+
+    `price_usd` é o fechamento da barra, então `criar_features` roda sem
+    mudanças sobre as barras — e, como há exatamente uma linha por hora,
+    as janelas por número de linhas passam a ser janelas de tempo.
+
+    Args:
+        df: DataFrame de ticks (coin_id, price_usd, price_brl, fetched_at)
+        anteriores: Última barra gravada por moeda (coin_id, price_usd,
+                    price_brl, fetched_at), anterior a todos os ticks
+
+    Returns:
+        pd.DataFrame: Barras com as colunas de COLUNAS_BARRAS
+    """
+    if len(df) == 0:
+        return pd.DataFrame(columns=COLUNAS_BARRAS)
+
+    df = df.assign(fetched_at=pd.to_datetime(df['fetched_at']))
+    df = df.sort_values(['coin_id', 'fetched_at'])
+    hora = df['fetched_at'].dt.floor('h')
+
+    barras = df.groupby([df['coin_id'], hora], sort=True).agg(
+        open=('price_usd', 'first'),
+        high=('price_usd', 'max'),
+        low=('price_usd', 'min'),
+        close=('price_usd', 'last'),
+        price_brl=('price_brl', 'last'),
+        n_ticks=('price_usd', 'size')
+    )
+    barras['semente'] = False
+
+    if anteriores is not None and len(anteriores) > 0:
+        anteriores = anteriores[anteriores['coin_id'].isin(df['coin_id'])]
+        semente = pd.DataFrame({
+            'coin_id': anteriores['coin_id'].to_numpy(),
+            'fetched_at': pd.to_datetime(anteriores['fetched_at']).dt.floor('h').to_numpy(),
+            'close': anteriores['price_usd'].to_numpy(),
+            'price_brl': anteriores['price_brl'].to_numpy(),
+            'n_ticks': 0,
+            'semente': True
+        }).set_index(['coin_id', 'fetched_at'])
+        barras = pd.concat([barras, semente]).sort_index()
+
+    # Grade horária completa por moeda, montada sem laço por moeda
+    limites = barras.reset_index().groupby('coin_id')['fetched_at'].agg(['min', 'max'])
+    n_horas = ((limites['max'] - limites['min']) // pd.Timedelta(hours=1)).astype(int) + 1
+    moedas = np.repeat(limites.index.to_numpy(), n_horas.to_numpy())
+    inicio_por_linha = np.repeat(limites['min'].to_numpy(), n_horas.to_numpy())
+    # Posição de cada linha dentro da própria moeda (0, 1, 2, ...)
+    deslocamento = np.arange(n_horas.sum()) - np.repeat(np.cumsum(n_horas.to_numpy()) - n_horas.to_numpy(),
+                                                         n_horas.to_numpy())
+    horas = inicio_por_linha + deslocamento.astype('timedelta64[h]')
+    grade = pd.MultiIndex.from_arrays([moedas, horas], names=['coin_id', 'fetched_at'])
+
+    barras = barras.reindex(grade)
+    lacuna = barras['n_ticks'].isna().to_numpy()
+
+    # Forward-fill do fechamento dentro de cada moeda (a grade nunca começa em lacuna)
+    barras[['close', 'price_brl']] = barras[['close', 'price_brl']].ffill()
+    for coluna in ('open', 'high', 'low'):
+        barras.loc[lacuna, coluna] = barras.loc[lacuna, 'close']
+    barras['n_ticks'] = barras['n_ticks'].fillna(0).astype('int64')
+    barras['preenchido'] = lacuna
+    barras['price_usd'] = barras['close']
+
+    barras = barras[barras['semente'].ne(True).to_numpy()]
+    return barras.reset_index()[COLUNAS_BARRAS]
+
+
+def materializar_barras(backend, coin_ids=None, desde=None):
+    """
+    Lê os ticks do backend, gera as barras horárias e as persiste.
+
+    Com `desde`, só as horas a partir dali são recalculadas e gravadas
+    (atualização incremental após novas coletas). A última barra gravada
+    antes de `desde` continua o forward-fill: o resultado é o mesmo de uma
+    reconstrução completa.
+
+    Args:
+        backend: Backend de armazenamento (ver pessoa1_data/backends.py)
+        coin_ids: Moedas a materializar (None = todas)
+        desde: Data/hora inicial (arredondada para baixo na hora)
+
+    Returns:
+        pd.DataFrame: Barras gravadas
+    """
+    print("\n" + "="*60)
+    print("🕐 MATERIALIZANDO BARRAS HORÁRIAS")
+    print("="*60)
+
+    inicio = pd.Timestamp(desde).floor('h') if desde is not None else None
+    ticks = backend.ler_precos(coin_ids=coin_ids, inicio=inicio)
+    anteriores = backend.ler_ultimos(1, barras=True, fim=inicio) if inicio is not None else None
+    barras = criar_barras_horarias(ticks, anteriores)
+    backend.escrever_barras(barras)
+
+    n_ticks, n_barras = len(ticks), len(barras)
+    print(f"\n📥 Ticks lidos: {n_ticks}")
+    print(f"📊 Barras gravadas: {n_barras} ({int(barras['preenchido'].sum())} lacunas preenchidas)")
+    if n_ticks > 0:
+        print(f"💾 Linhas poupadas no cálculo de features: {n_ticks - n_barras} "
+              f"({(1 - n_barras / n_ticks):.1%})")
+    print("="*60)
+
+    return barras
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materializa barras OHLC horárias por moeda")
+    parser.add_argument("--backend", choices=["postgres", "parquet"], default=None,
+                        help="armazenamento (padrão: ARMAZENAMENTO_BACKEND ou postgres)")
+    parser.add_argument("--dados", default=None, help="diretório Parquet do backend local")
+    parser.add_argument("--moedas", nargs="+", default=None, help="moedas a materializar")
+    parser.add_argument("--desde", default=None, help="recalcula só a partir desta data/hora")
+    args = parser.parse_args()
+
+    backend = obter_backend(args.backend, args.dados)
+    if backend is None:
+        sys.exit(1)
+    materializar_barras(backend, coin_ids=args.moedas, desde=args.desde)
+    backend.fechar()
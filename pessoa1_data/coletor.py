@@ -0,0 +1,417 @@
+# pessoa1_data/coletor.py
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import pandas as pd
+import numpy as np
+import threading
+import argparse
+import asyncio
+import random
+import socket
+import httpx
+import time
+import sys
+import os
+
+# Adicionar a pasta raiz ao path para importações funcionarem
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pessoa1_data.backends import obter_backend, COLUNAS_PRECOS
+
+COINGECKO_URL = os.environ.get('COINGECKO_URL', 'https://api.coingecko.com/api/v3')
+
+MOEDAS_PADRAO = ['bitcoin', 'ethereum', 'tether', 'binancecoin', 'solana',
+                 'ripple', 'cardano', 'dogecoin', 'tron', 'polkadot']
+
+# Moedas por chamada do /simple/price (a API aceita vários ids por vez)
+MOEDAS_POR_REQUISICAO = 50
+
+# Plano gratuito do CoinGecko: ~30 chamadas/minuto
+REQUISICOES_POR_MINUTO = 30
+
+# Conexões HTTP simultâneas (reaproveitadas entre rodadas)
+CONEXOES_MAX = 10
+
+# Segundos entre rodadas de coleta (o CoinGecko atualiza o preço a cada ~60 s)
+INTERVALO_COLETA = 60
+
+# Buffer de linhas: grava ao atingir o tamanho ou a cada INTERVALO_FLUSH segundos
+TAMANHO_BUFFER = 5000
+INTERVALO_FLUSH = 5.0
+
+# Tentativas (HTTP e gravação) com espera exponencial a partir de ESPERA_BASE
+TENTATIVAS = 5
+ESPERA_BASE = 1.0
+
+# Espera após um 429 sem header Retry-After
+ESPERA_429 = 60.0
+
+TIMEOUT_S = 10
+
+
+class LimiteTaxa:
+    """
+    Token bucket assíncrono: no máximo `por_minuto` requisições por minuto,
+    com rajada de até `rajada`. Um 429 pausa todas as requisições até o
+    instante indicado pelo servidor.
+    """
+
+    def __init__(self, por_minuto=REQUISICOES_POR_MINUTO, rajada=None):
+        self.taxa = por_minuto / 60.0
+        # Rajada padrão: até 10 s de requisições, limitada ao nº de conexões
+        self.rajada = rajada or max(1, min(CONEXOES_MAX, por_minuto // 6))
+        self.fichas = float(self.rajada)
+        self._atualizado = time.monotonic()
+        self._pausa_ate = 0.0
+        self._lock = asyncio.Lock()
+
+    def pausar(self, segundos):
+        self._pausa_ate = max(self._pausa_ate, time.monotonic() + segundos)
+        self.fichas = 0.0
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                if agora < self._pausa_ate:
+                    await asyncio.sleep(self._pausa_ate - agora)
+                    self._atualizado = time.monotonic()
+                    continue
+                self.fichas = min(self.rajada, self.fichas + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                await asyncio.sleep((1 - self.fichas) / self.taxa)
+
+
+def _espera(tentativa, base=ESPERA_BASE):
+    """Espera exponencial com jitter (evita que as tarefas repitam juntas)."""
+    return base * (2 ** tentativa) * (0.5 + random.random())
+
+
+def _retry_after(valor, padrao=ESPERA_429):
+    """
+    Segundos pedidos pelo cabeçalho Retry-After de um 429.
+
+    O cabeçalho pode vir em segundos ("120") ou como data HTTP
+    ("Wed, 21 Oct 2026 07:28:00 GMT"); ausente ou inválido vale `padrao`.
+    """
+    if valor is None:
+        return padrao
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        quando = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return padrao
+    if quando.tzinfo is None:
+        quando = quando.replace(tzinfo=timezone.utc)
+    return max(0.0, (quando - datetime.now(timezone.utc)).total_seconds())
+
+
+class ColetorPrecos:
+    """
+    Coletor assíncrono de preços do CoinGecko para raw_bitcoin_prices.
+
+    - Cada rodada divide as moedas em grupos de `moedas_por_requisicao` e
+      busca os grupos em paralelo num único httpx.AsyncClient (pool de
+      conexões keep-alive), respeitando o LimiteTaxa e os 429 da API.
+    - Erros de rede e 5xx são repetidos com espera exponencial.
+    - As linhas vão para um buffer gravado em lote (`backend.escrever_precos`:
+      COPY + insert idempotente no PostgreSQL, arquivo Parquet no backend
+      local) numa thread, sem parar as requisições. Uma gravação que falha
+      é repetida com o mesmo lote; se todas as tentativas falharem, as
+      linhas voltam para o buffer.
+    - Um preço com o mesmo `last_updated_at` da coleta anterior da moeda
+      é descartado (a API não mudou), então coletar mais rápido que a
+      atualização da API não gera linhas duplicadas.
+    """
+
+    def __init__(self, backend, moedas=None, url=COINGECKO_URL,
+                 requisicoes_por_minuto=REQUISICOES_POR_MINUTO, moedas_por_requisicao=MOEDAS_POR_REQUISICAO,
+                 conexoes=CONEXOES_MAX, tamanho_buffer=TAMANHO_BUFFER, intervalo_flush=INTERVALO_FLUSH,
+                 tentativas=TENTATIVAS, espera_base=ESPERA_BASE):
+        self.backend = backend
+        self.moedas = list(moedas or MOEDAS_PADRAO)
+        self.url = url
+        self.limite = LimiteTaxa(requisicoes_por_minuto)
+        self.moedas_por_requisicao = moedas_por_requisicao
+        self.conexoes = conexoes
+        self.tamanho_buffer = tamanho_buffer
+        self.intervalo_flush = intervalo_flush
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+
+        self._buffer = []
+        self._ultimo = {}
+        self._lock_flush = asyncio.Lock()
+        self.requisicoes = 0
+        self.limitadas = 0
+        self.repetidas = 0
+        self.falhas_http = 0
+        self.linhas_recebidas = 0
+        self.duplicadas = 0
+        self.linhas_gravadas = 0
+        self.gravacoes = 0
+        self.falhas_gravacao = 0
+        self.tempo_gravacao = 0.0
+
+    def _grupos(self):
+        n = self.moedas_por_requisicao
+        return [self.moedas[i:i + n] for i in range(0, len(self.moedas), n)]
+
+    async def _buscar(self, cliente, ids):
+        """Uma chamada do /simple/price com retry; devolve o JSON ou None."""
+        params = {'ids': ','.join(ids), 'vs_currencies': 'usd,brl', 'include_last_updated_at': 'true'}
+        for tentativa in range(self.tentativas):
+            await self.limite.adquirir()
+            self.requisicoes += 1
+            try:
+                resposta = await cliente.get('/simple/price', params=params)
+            except httpx.TransportError:
+                resposta = None
+
+            if resposta is not None and resposta.status_code == 200:
+                return resposta.json()
+            if resposta is not None and resposta.status_code == 429:
+                self.limitadas += 1
+                self.limite.pausar(_retry_after(resposta.headers.get('Retry-After')))
+            elif resposta is not None and resposta.status_code < 500:
+                print(f"❌ HTTP {resposta.status_code} em /simple/price: {resposta.text[:200]}")
+                self.falhas_http += 1
+                return None
+            else:
+                await asyncio.sleep(_espera(tentativa, self.espera_base))
+            self.repetidas += 1
+
+        self.falhas_http += 1
+        return None
+
+    def _linhas(self, dados):
+        linhas = []
+        for coin_id, valores in dados.items():
+            if 'usd' not in valores:
+                continue
+            self.linhas_recebidas += 1
+            atualizado = valores.get('last_updated_at')
+            if atualizado is None:
+                fetched_at = datetime.now(timezone.utc).replace(tzinfo=None)
+            else:
+                if self._ultimo.get(coin_id) == atualizado:
+                    self.duplicadas += 1
+                    continue
+                self._ultimo[coin_id] = atualizado
+                fetched_at = datetime.fromtimestamp(atualizado, timezone.utc).replace(tzinfo=None)
+            linhas.append((coin_id, valores['usd'], valores.get('brl'), fetched_at))
+        return linhas
+
+    async def rodada(self, cliente):
+        """Busca todas as moedas uma vez (grupos em paralelo)."""
+        respostas = await asyncio.gather(*(self._buscar(cliente, ids) for ids in self._grupos()))
+        for dados in respostas:
+            if dados:
+                self._buffer.extend(self._linhas(dados))
+        if len(self._buffer) >= self.tamanho_buffer:
+            await self.gravar()
+
+    async def gravar(self):
+        """Grava o buffer atual em lote (na thread padrão do asyncio)."""
+        async with self._lock_flush:
+            if not self._buffer:
+                return
+            linhas, self._buffer = self._buffer, []
+            df = pd.DataFrame(linhas, columns=COLUNAS_PRECOS)
+            for tentativa in range(self.tentativas):
+                inicio = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self.backend.escrever_precos, df)
+                except Exception as e:
+                    print(f"⚠️  Falha ao gravar {len(df)} linhas (tentativa {tentativa + 1}): {e}")
+                    await asyncio.sleep(_espera(tentativa, self.espera_base))
+                    continue
+                self.tempo_gravacao += time.perf_counter() - inicio
+                self.linhas_gravadas += len(df)
+                self.gravacoes += 1
+                return
+            self.falhas_gravacao += 1
+            self._buffer[:0] = linhas
+
+    async def _gravar_periodicamente(self):
+        while True:
+            await asyncio.sleep(self.intervalo_flush)
+            await self.gravar()
+
+    async def executar(self, intervalo=INTERVALO_COLETA, duracao=None, rodadas=None):
+        """
+        Coleta em rodadas a cada `intervalo` segundos até `duracao` segundos
+        ou `rodadas` rodadas (None e None = até ser cancelado).
+
+        Returns:
+            dict: estatisticas() ao fim
+        """
+        limites = httpx.Limits(max_connections=self.conexoes, max_keepalive_connections=self.conexoes)
+        self._inicio = time.monotonic()
+        fim = self._inicio + duracao if duracao else None
+        n = 0
+        async with httpx.AsyncClient(base_url=self.url, limits=limites, timeout=TIMEOUT_S) as cliente:
+            gravador = asyncio.create_task(self._gravar_periodicamente())
+            try:
+                while (fim is None or time.monotonic() < fim) and (rodadas is None or n < rodadas):
+                    proxima = time.monotonic() + intervalo
+                    await self.rodada(cliente)
+                    n += 1
+                    espera = proxima - time.monotonic()
+                    if fim is not None:
+                        espera = min(espera, fim - time.monotonic())
+                    if espera > 0:
+                        await asyncio.sleep(espera)
+            finally:
+                gravador.cancel()
+                await self.gravar()
+        return self.estatisticas()
+
+    def estatisticas(self):
+        duracao = time.monotonic() - self._inicio
+        return {
+            'duracao_s': duracao,
+            'requisicoes': self.requisicoes,
+            'limitadas_429': self.limitadas,
+            'repetidas': self.repetidas,
+            'falhas_http': self.falhas_http,
+            'linhas_recebidas': self.linhas_recebidas,
+            'duplicadas': self.duplicadas,
+            'linhas_gravadas': self.linhas_gravadas,
+            'gravacoes': self.gravacoes,
+            'falhas_gravacao': self.falhas_gravacao,
+            'tempo_gravacao_s': self.tempo_gravacao,
+            'linhas_por_s': self.linhas_gravadas / duracao if duracao > 0 else 0.0
+        }
+
+
+def relatorio(estatisticas):
+    """Imprime o resumo da coleta."""
+    e = estatisticas
+    print("\n" + "="*60)
+    print("📥 COLETA DE PREÇOS")
+    print("="*60)
+    print(f"⏱️  Duração: {e['duracao_s']:.1f}s")
+    print(f"🌐 Requisições: {e['requisicoes']} (429: {e['limitadas_429']}, repetidas: {e['repetidas']}, "
+          f"falhas: {e['falhas_http']})")
+    print(f"📊 Preços recebidos: {e['linhas_recebidas']} (sem atualização na API: {e['duplicadas']})")
+    print(f"💾 Linhas gravadas: {e['linhas_gravadas']} em {e['gravacoes']} lotes "
+          f"({e['tempo_gravacao_s']:.2f}s gravando, falhas: {e['falhas_gravacao']})")
+    print(f"🚀 Vazão: {e['linhas_por_s']:.0f} linhas/s")
+    print("="*60)
+
+
+# ==================== SERVIDOR SIMULADO ====================
+
+def criar_servidor_simulado(taxa_429=0.0, taxa_erro=0.0, latencia=0.0, seed=42):
+    """
+    App ASGI que imita o GET /simple/price do CoinGecko para testes locais.
+
+    Cada moeda é um passeio aleatório e cada chamada avança `last_updated_at`
+    em 1 s (sempre há preço novo). `taxa_429` e `taxa_erro` sorteiam
+    respostas 429 (Retry-After: 1) e 500; `latencia` em segundos.
+    """
+    from fastapi import FastAPI, Query
+    from fastapi.responses import JSONResponse
+
+    app = FastAPI()
+    rng = np.random.default_rng(seed)
+    precos, instantes = {}, {}
+    inicio = int(time.time()) - 86400
+
+    @app.get("/simple/price")
+    async def simple_price(ids: str = Query(...), vs_currencies: str = 'usd',
+                           include_last_updated_at: bool = False):
+        if latencia:
+            await asyncio.sleep(latencia)
+        sorteio = rng.random()
+        if sorteio < taxa_429:
+            return JSONResponse({"status": {"error_code": 429}}, status_code=429, headers={"Retry-After": "1"})
+        if sorteio < taxa_429 + taxa_erro:
+            return JSONResponse({"erro": "simulado"}, status_code=500)
+
+        resposta = {}
+        for coin_id in ids.split(','):
+            preco = precos.get(coin_id, 100.0) * float(np.exp(rng.normal(0, 0.001)))
+            precos[coin_id] = preco
+            instantes[coin_id] = instantes.get(coin_id, inicio) + 1
+            resposta[coin_id] = {'usd': preco, 'brl': preco * 5.0}
+            if include_last_updated_at:
+                resposta[coin_id]['last_updated_at'] = instantes[coin_id]
+        return resposta
+
+    return app
+
+
+def iniciar_servidor_simulado(**kwargs):
+    """
+    Sobe o servidor simulado num uvicorn em thread (porta livre).
+
+    Returns:
+        tuple: (url base, uvicorn.Server — chame `should_exit = True` para parar)
+    """
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        porta = s.getsockname()[1]
+    servidor = uvicorn.Server(uvicorn.Config(
+        criar_servidor_simulado(**kwargs), host='127.0.0.1', port=porta, log_level='warning'
+    ))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{porta}", servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coletor assíncrono de preços (CoinGecko → raw_bitcoin_prices)")
+    parser.add_argument("--backend", choices=["postgres", "parquet"], default=None,
+                        help="armazenamento de destino (padrão: ARMAZENAMENTO_BACKEND ou postgres)")
+    parser.add_argument("--dados", default=None, help="diretório Parquet do backend local")
+    parser.add_argument("--moedas", nargs="+", default=None, help="coin_id coletados")
+    parser.add_argument("--url", default=COINGECKO_URL, help="URL base da API")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_COLETA, help="segundos entre rodadas")
+    parser.add_argument("--duracao", type=float, default=None, help="segundos de coleta (padrão: sem fim)")
+    parser.add_argument("--rpm", type=int, default=REQUISICOES_POR_MINUTO, help="requisições por minuto")
+    parser.add_argument("--conexoes", type=int, default=CONEXOES_MAX, help="conexões HTTP simultâneas")
+    parser.add_argument("--por-requisicao", type=int, default=MOEDAS_POR_REQUISICAO,
+                        help="moedas por chamada do /simple/price")
+    parser.add_argument("--buffer", type=int, default=TAMANHO_BUFFER, help="linhas por gravação")
+    parser.add_argument("--simulado", type=int, default=0, metavar="N_MOEDAS",
+                        help="coleta N moedas de um servidor simulado local (sem rede)")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="fração de 429 no servidor simulado")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de 500 no servidor simulado")
+    parser.add_argument("--latencia", type=float, default=0.0, help="latência (s) do servidor simulado")
+    args = parser.parse_args()
+
+    backend = obter_backend(args.backend, args.dados)
+    if backend is None:
+        sys.exit(1)
+
+    moedas, url, servidor = args.moedas, args.url, None
+    if args.simulado:
+        url, servidor = iniciar_servidor_simulado(taxa_429=args.taxa_429, taxa_erro=args.taxa_erro,
+                                                  latencia=args.latencia)
+        moedas = moedas or [f'moeda_{i:05d}' for i in range(args.simulado)]
+        print(f"🧪 Servidor simulado em {url} ({len(moedas)} moedas)")
+
+    coletor = ColetorPrecos(
+        backend, moedas=moedas, url=url, requisicoes_por_minuto=args.rpm,
+        moedas_por_requisicao=args.por_requisicao, conexoes=args.conexoes, tamanho_buffer=args.buffer
+    )
+    print(f"📡 Coletando {len(coletor.moedas)} moedas em {len(coletor._grupos())} requisições por rodada")
+    try:
+        estatisticas = asyncio.run(coletor.executar(intervalo=args.intervalo, duracao=args.duracao))
+    except KeyboardInterrupt:
+        estatisticas = coletor.estatisticas()
+    relatorio(estatisticas)
+    if servidor is not None:
+        servidor.should_exit = True
+    backend.fechar()
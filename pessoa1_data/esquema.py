@@ -0,0 +1,422 @@
+# pessoa1_data/esquema.py
+from datetime import date, datetime, timedelta
+import pandas as pd
+import numpy as np
+import argparse
+import time
+import json
+import io
+import sys
+import os
+
+# Adicionar a pasta raiz ao path para importações funcionarem
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pessoa1_data.backends import SQL_CRIAR_BARRAS, COLUNAS_PRECOS
+
+TABELA = 'raw_bitcoin_prices'
+
+# Índice composto usado pelos filtros e pelo ORDER BY coin_id, fetched_at
+INDICE = 'raw_bitcoin_prices_coin_fetched_idx'
+
+# Partição que recebe o que não cai em nenhum mês criado
+PARTICAO_PADRAO = 'raw_bitcoin_prices_padrao'
+
+# Meses criados à frente do mês atual
+MESES_FUTUROS = 3
+
+# Ticks mais antigos que isso viram barras horárias (barras_horarias)
+RETENCAO_DIAS = 90
+
+
+def _mes(instante):
+    return date(instante.year, instante.month, 1)
+
+
+def _proximo_mes(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _nome_particao(mes):
+    return f"{TABELA}_{mes:%Y_%m}"
+
+
+def _tipo_tabela(cur, esquema, nome):
+    """'p' (particionada), 'r' (comum) ou None (não existe)."""
+    cur.execute("""
+        SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = %s
+    """, (esquema, nome))
+    linha = cur.fetchone()
+    return linha[0] if linha else None
+
+
+def particoes(cur, esquema='public'):
+    """Partições mensais existentes: lista de (nome, primeiro dia do mês)."""
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = %s AND p.relname = %s
+    """, (esquema, TABELA))
+    resultado = []
+    for (nome,) in cur.fetchall():
+        if nome != PARTICAO_PADRAO:
+            ano, mes = nome[len(TABELA) + 1:].split('_')
+            resultado.append((nome, date(int(ano), int(mes), 1)))
+    return sorted(resultado, key=lambda p: p[1])
+
+
+def criar_particao(cur, mes, esquema='public'):
+    """
+    Cria a partição do mês. Linhas desse mês que já caíram na partição
+    padrão são movidas para ela antes do ATTACH (senão o PostgreSQL
+    recusa a nova partição).
+
+    Returns:
+        bool: False se a partição já existia
+    """
+    nome = _nome_particao(mes)
+    if _tipo_tabela(cur, esquema, nome) is not None:
+        return False
+    ate = _proximo_mes(mes)
+    cur.execute(f"CREATE TABLE {esquema}.{nome} (LIKE {esquema}.{TABELA} INCLUDING DEFAULTS)")
+    cur.execute(f"""
+        WITH movidas AS (
+            DELETE FROM {esquema}.{PARTICAO_PADRAO}
+            WHERE fetched_at >= %s AND fetched_at < %s
+            RETURNING *
+        )
+        INSERT INTO {esquema}.{nome} SELECT * FROM movidas
+    """, (mes, ate))
+    cur.execute(f"ALTER TABLE {esquema}.{TABELA} ATTACH PARTITION {esquema}.{nome} "
+                f"FOR VALUES FROM (%s) TO (%s)", (mes, ate))
+    return True
+
+
+def garantir_particoes(cur, inicio, fim, esquema='public'):
+    """Cria as partições mensais de `inicio` até `fim` (inclusive). Retorna quantas criou."""
+    mes, ultimo, criadas = _mes(inicio), _mes(fim), 0
+    while mes <= ultimo:
+        criadas += criar_particao(cur, mes, esquema)
+        mes = _proximo_mes(mes)
+    return criadas
+
+
+def migrar(conn, esquema='public', meses_futuros=MESES_FUTUROS, manter_legado=False):
+    """
+    Deixa raw_bitcoin_prices particionada por mês com o índice composto.
+
+    - Tabela inexistente: cria a tabela particionada.
+    - Tabela comum (legado): renomeia para raw_bitcoin_prices_legado, cria
+      a particionada com as mesmas colunas, uma partição por mês dos dados
+      + a partição padrão, copia as linhas sem duplicatas de
+      (coin_id, fetched_at), cria o índice e apaga o legado. Tudo numa
+      transação: se algo falhar, a tabela original fica como estava.
+    - Já particionada: só cria as partições dos próximos meses.
+
+    Pode ser rodada de novo a qualquer momento (ex.: mensalmente no cron).
+
+    Returns:
+        dict: O que foi feito
+    """
+    inicio = time.perf_counter()
+    resumo = {'convertida': False, 'linhas_copiadas': 0, 'duplicatas_removidas': 0}
+    hoje = datetime.now()
+    futuro = hoje + timedelta(days=31 * meses_futuros)
+    try:
+        with conn.cursor() as cur:
+            tipo = _tipo_tabela(cur, esquema, TABELA)
+            primeiro = hoje
+            if tipo == 'r':
+                legado = f"{TABELA}_legado"
+                cur.execute(f"ALTER TABLE {esquema}.{TABELA} RENAME TO {legado}")
+                cur.execute(f"CREATE TABLE {esquema}.{TABELA} (LIKE {esquema}.{legado} INCLUDING DEFAULTS) "
+                            f"PARTITION BY RANGE (fetched_at)")
+                cur.execute(f"SELECT MIN(fetched_at), COUNT(*) FROM {esquema}.{legado}")
+                minimo, n_legado = cur.fetchone()
+                primeiro = minimo or hoje
+            elif tipo is None:
+                cur.execute(f"""
+                    CREATE TABLE {esquema}.{TABELA} (
+                        coin_id TEXT NOT NULL,
+                        price_usd DOUBLE PRECISION,
+                        price_brl DOUBLE PRECISION,
+                        fetched_at TIMESTAMP NOT NULL
+                    ) PARTITION BY RANGE (fetched_at)
+                """)
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {esquema}.{PARTICAO_PADRAO} "
+                        f"PARTITION OF {esquema}.{TABELA} DEFAULT")
+            resumo['particoes_criadas'] = garantir_particoes(cur, primeiro, futuro, esquema)
+
+            if tipo == 'r':
+                # Sem índice durante a cópia (criado de uma vez no fim)
+                cur.execute(f"""
+                    INSERT INTO {esquema}.{TABELA}
+                    SELECT DISTINCT ON (coin_id, fetched_at) * FROM {esquema}.{legado}
+                """)
+                resumo['linhas_copiadas'] = cur.rowcount
+                resumo['duplicatas_removidas'] = n_legado - cur.rowcount
+                # Sequências (colunas SERIAL) passam a pertencer à tabela nova
+                cur.execute("""
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_schema = %s AND table_name = %s
+                """, (esquema, legado))
+                for (coluna,) in cur.fetchall():
+                    cur.execute("SELECT pg_get_serial_sequence(%s, %s)", (f"{esquema}.{legado}", coluna))
+                    sequencia = cur.fetchone()[0]
+                    if sequencia:
+                        cur.execute(f"ALTER SEQUENCE {sequencia} OWNED BY {esquema}.{TABELA}.{coluna}")
+                if not manter_legado:
+                    cur.execute(f"DROP TABLE {esquema}.{legado}")
+                resumo['convertida'] = True
+
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {INDICE} ON {esquema}.{TABELA} (coin_id, fetched_at)")
+            cur.execute(f"ANALYZE {esquema}.{TABELA}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    resumo['duracao_s'] = time.perf_counter() - inicio
+    return resumo
+
+
+SQL_BARRAS_DE_TICKS = """
+    INSERT INTO {esquema}.barras_horarias
+        (coin_id, fetched_at, open, high, low, close, price_usd, price_brl, n_ticks, preenchido)
+    SELECT coin_id, date_trunc('hour', fetched_at),
+           (array_agg(price_usd ORDER BY fetched_at))[1],
+           MAX(price_usd), MIN(price_usd),
+           (array_agg(price_usd ORDER BY fetched_at DESC))[1],
+           (array_agg(price_usd ORDER BY fetched_at DESC))[1],
+           (array_agg(price_brl ORDER BY fetched_at DESC))[1],
+           COUNT(*), FALSE
+    FROM {fonte}
+    {where}
+    GROUP BY coin_id, date_trunc('hour', fetched_at)
+    ON CONFLICT (coin_id, fetched_at) DO NOTHING
+"""
+
+
+def aplicar_retencao(conn, dias=RETENCAO_DIAS, esquema='public'):
+    """
+    Política de retenção: ticks com mais de `dias` dias viram barras OHLC
+    horárias em barras_horarias e saem de raw_bitcoin_prices.
+
+    Partições de meses inteiramente anteriores ao corte são agregadas e
+    removidas com DROP TABLE (sem DELETE linha a linha nem VACUUM); da
+    partição padrão saem só as linhas antigas. Horas que já têm barra
+    (materializada por pessoa1_data/barras.py) não são sobrescritas.
+
+    Returns:
+        dict: Partições removidas, ticks agregados e barras criadas
+    """
+    corte = _mes(datetime.now() - timedelta(days=dias))
+    resumo = {'corte': str(corte), 'particoes_removidas': [], 'ticks_agregados': 0, 'barras_criadas': 0}
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SQL_CRIAR_BARRAS.format(esquema=esquema))
+            for nome, mes in particoes(cur, esquema):
+                if _proximo_mes(mes) > corte:
+                    continue
+                cur.execute(f"SELECT COUNT(*) FROM {esquema}.{nome}")
+                resumo['ticks_agregados'] += cur.fetchone()[0]
+                cur.execute(SQL_BARRAS_DE_TICKS.format(esquema=esquema, fonte=f"{esquema}.{nome}", where=""))
+                resumo['barras_criadas'] += cur.rowcount
+                cur.execute(f"DROP TABLE {esquema}.{nome}")
+                resumo['particoes_removidas'].append(nome)
+
+            if _tipo_tabela(cur, esquema, PARTICAO_PADRAO) is not None:
+                cur.execute(SQL_BARRAS_DE_TICKS.format(
+                    esquema=esquema, fonte=f"{esquema}.{PARTICAO_PADRAO}", where="WHERE fetched_at < %s"
+                ), (corte,))
+                resumo['barras_criadas'] += cur.rowcount
+                cur.execute(f"DELETE FROM {esquema}.{PARTICAO_PADRAO} WHERE fetched_at < %s", (corte,))
+                resumo['ticks_agregados'] += cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return resumo
+
+
+def _nos_plano(no):
+    yield no
+    for filho in no.get('Plans', []):
+        yield from _nos_plano(filho)
+
+
+def verificar_consultas(conn, esquema='public', repeticoes=3):
+    """
+    EXPLAIN ANALYZE das leituras feitas por BackendPostgres.ler_precos
+    (mesmo WHERE e ORDER BY), relativas ao tick mais recente da tabela.
+
+    Returns:
+        list: Por consulta, melhor tempo (ms), linhas, partições lidas,
+              se usou índice e os tipos de nó do plano
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT MAX(fetched_at), MIN(coin_id) FROM {esquema}.{TABELA}")
+        ultimo, moeda = cur.fetchone()
+        if ultimo is None:
+            return []
+        consultas = {
+            'uma moeda, 7 dias': ("WHERE coin_id IN (%s) AND fetched_at >= %s", [moeda, ultimo - timedelta(days=7)]),
+            'uma moeda, tudo': ("WHERE coin_id IN (%s)", [moeda]),
+            'todas, 30 dias': ("WHERE fetched_at >= %s", [ultimo - timedelta(days=30)]),
+            'todas, tudo': ("", []),
+        }
+        resultados = []
+        for nome, (where, params) in consultas.items():
+            melhor = None
+            for _ in range(repeticoes):
+                cur.execute(f"""
+                    EXPLAIN (ANALYZE, FORMAT JSON)
+                    SELECT coin_id, price_usd, price_brl, fetched_at
+                    FROM {esquema}.{TABELA} {where}
+                    ORDER BY coin_id, fetched_at
+                """, params)
+                plano = cur.fetchone()[0]
+                plano = plano[0] if isinstance(plano, list) else json.loads(plano)[0]
+                if melhor is None or plano['Execution Time'] < melhor['Execution Time']:
+                    melhor = plano
+            nos = list(_nos_plano(melhor['Plan']))
+            resultados.append({
+                'consulta': nome,
+                'tempo_ms': melhor['Execution Time'] + melhor['Planning Time'],
+                'linhas': melhor['Plan'].get('Actual Rows'),
+                'tabelas_lidas': len({n['Relation Name'] for n in nos if 'Relation Name' in n}),
+                'usa_indice': any('Index' in n['Node Type'] for n in nos),
+                'nos': sorted({n['Node Type'] for n in nos})
+            })
+    return resultados
+
+
+def imprimir_verificacao(resultados, titulo):
+    print(f"\n🔎 {titulo}")
+    print(f"{'consulta':<20} {'tempo':>10} {'linhas':>9} {'tabelas':>8} {'índice':>7}  plano")
+    for r in resultados:
+        print(f"{r['consulta']:<20} {r['tempo_ms']:>8.1f}ms {r['linhas']:>9} {r['tabelas_lidas']:>8} "
+              f"{'sim' if r['usa_indice'] else 'não':>7}  {', '.join(r['nos'])}")
+
+
+def _ticks_sinteticos(n_moedas, dias, intervalo_min, seed=42):
+    """Ticks a cada `intervalo_min` minutos até agora (passeio aleatório)."""
+    rng = np.random.default_rng(seed)
+    datas = pd.date_range(end=pd.Timestamp.now().floor('min'), periods=dias * 24 * 60 // intervalo_min,
+                          freq=f'{intervalo_min}min')
+    partes = []
+    for i in range(n_moedas):
+        precos = 10.0 ** (4 - min(i, 4)) * np.exp(np.cumsum(rng.normal(0, 0.001, len(datas))))
+        partes.append(pd.DataFrame({
+            'coin_id': f'moeda_{i:02d}' if i else 'bitcoin',
+            'price_usd': precos, 'price_brl': precos * 5.0, 'fetched_at': datas
+        }))
+    return pd.concat(partes, ignore_index=True)
+
+
+def benchmark(conn, n_moedas=10, dias=365, intervalo_min=5, retencao_dias=RETENCAO_DIAS,
+              esquema='benchmark_esquema'):
+    """
+    Compara as leituras antes (tabela comum sem índice, como hoje) e
+    depois da migração e da retenção, num esquema separado que é apagado
+    no fim. Use com um PostgreSQL local.
+    """
+    df = _ticks_sinteticos(n_moedas, dias, intervalo_min)
+    print(f"\n🧪 Benchmark: {len(df)} ticks ({n_moedas} moedas x {dias} dias, a cada {intervalo_min} min) "
+          f"no esquema {esquema}")
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {esquema} CASCADE")
+        cur.execute(f"CREATE SCHEMA {esquema}")
+        cur.execute(f"""
+            CREATE TABLE {esquema}.{TABELA} (
+                coin_id TEXT, price_usd DOUBLE PRECISION, price_brl DOUBLE PRECISION, fetched_at TIMESTAMP
+            )
+        """)
+        buffer = io.StringIO()
+        df[COLUNAS_PRECOS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cur.copy_expert(f"COPY {esquema}.{TABELA} FROM STDIN WITH (FORMAT csv)", buffer)
+        cur.execute(f"ANALYZE {esquema}.{TABELA}")
+    conn.commit()
+
+    try:
+        antes = verificar_consultas(conn, esquema)
+        imprimir_verificacao(antes, "Antes: tabela comum, sem índice")
+
+        resumo = migrar(conn, esquema)
+        print(f"\n🔧 Migração: {resumo['linhas_copiadas']} linhas, {resumo['particoes_criadas']} partições "
+              f"em {resumo['duracao_s']:.1f}s")
+        depois = verificar_consultas(conn, esquema)
+        imprimir_verificacao(depois, "Depois: particionada por mês + índice (coin_id, fetched_at)")
+
+        inicio = time.perf_counter()
+        retencao = aplicar_retencao(conn, retencao_dias, esquema)
+        print(f"\n🗄️  Retenção ({retencao_dias} dias): {retencao['ticks_agregados']} ticks → "
+              f"{retencao['barras_criadas']} barras, {len(retencao['particoes_removidas'])} partições removidas "
+              f"em {time.perf_counter() - inicio:.1f}s")
+        retido = verificar_consultas(conn, esquema)
+        imprimir_verificacao(retido, "Após a retenção")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {esquema} CASCADE")
+        conn.commit()
+    return {'antes': antes, 'depois': depois, 'retencao': retido}
+
+
+def conectar(dsn=None):
+    """Conexão psycopg2 por DSN (--dsn ou DATABASE_URL) ou a de utils/db_config."""
+    dsn = dsn or os.environ.get('DATABASE_URL')
+    if dsn:
+        import psycopg2
+        return psycopg2.connect(dsn)
+    from utils.db_config import conectar_banco
+    return conectar_banco()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice, partições mensais e retenção de raw_bitcoin_prices")
+    parser.add_argument("--dsn", default=None, help="conexão PostgreSQL (padrão: DATABASE_URL ou utils/db_config)")
+    parser.add_argument("--migrar", action="store_true",
+                        help="particiona por mês, cria o índice composto e as partições futuras")
+    parser.add_argument("--manter-legado", action="store_true",
+                        help="na conversão, mantém a tabela antiga como raw_bitcoin_prices_legado")
+    parser.add_argument("--retencao", action="store_true",
+                        help="agrega ticks antigos em barras horárias e remove as partições")
+    parser.add_argument("--retencao-dias", type=int, default=RETENCAO_DIAS,
+                        help="idade mínima (dias) dos ticks agregados")
+    parser.add_argument("--verificar", action="store_true",
+                        help="EXPLAIN ANALYZE das leituras do pipeline")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="antes/depois com dados sintéticos num esquema temporário")
+    parser.add_argument("--moedas", type=int, default=10, help="moedas no benchmark")
+    parser.add_argument("--dias", type=int, default=365, help="dias de ticks no benchmark")
+    parser.add_argument("--intervalo-min", type=int, default=5, help="minutos entre ticks no benchmark")
+    args = parser.parse_args()
+
+    if not (args.migrar or args.retencao or args.verificar or args.benchmark):
+        parser.print_help()
+        sys.exit(0)
+
+    conn = conectar(args.dsn)
+    if conn is None:
+        sys.exit(1)
+
+    if args.migrar:
+        resumo = migrar(conn, manter_legado=args.manter_legado)
+        print(f"🔧 Migração: {'tabela convertida' if resumo['convertida'] else 'já particionada'}, "
+              f"{resumo['linhas_copiadas']} linhas copiadas ({resumo['duplicatas_removidas']} duplicatas), "
+              f"{resumo['particoes_criadas']} partições novas em {resumo['duracao_s']:.1f}s")
+    if args.retencao:
+        resumo = aplicar_retencao(conn, args.retencao_dias)
+        removidas = resumo['particoes_removidas']
+        print(f"🗄️  Retenção (antes de {resumo['corte']}): {resumo['ticks_agregados']} ticks → "
+              f"{resumo['barras_criadas']} barras; {len(removidas)} partições removidas"
+              + (f" ({removidas[0]} … {removidas[-1]})" if removidas else ""))
+    if args.verificar:
+        imprimir_verificacao(verificar_consultas(conn), "Leituras de raw_bitcoin_prices")
+    if args.benchmark:
+        benchmark(conn, n_moedas=args.moedas, dias=args.dias, intervalo_min=args.intervalo_min,
+                  retencao_dias=args.retencao_dias)
+    conn.close()
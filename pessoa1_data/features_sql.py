@@ -0,0 +1,336 @@
+# pessoa1_data/features_sql.py
+import pandas as pd
+import numpy as np
+import argparse
+import time
+import sys
+import os
+
+# Adicionar a pasta raiz ao path para importações funcionarem
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pessoa2_ml.features import HORIZONTES, colunas_target
+
+# Linhas de contexto antes da marca d'água: a maior janela/defasagem é 24
+LINHAS_CONTEXTO = 24
+
+# Targets de todos os horizontes de pessoa2_ml/features.py, para o treino
+# de uma ou várias saídas (--horizontes) ler do banco
+COLUNAS_TARGET = colunas_target(HORIZONTES)
+
+# Colunas das linhas de features, na mesma ordem de `criar_features`
+COLUNAS_FEATURES = [
+    'coin_id', 'price_usd', 'price_brl', 'fetched_at',
+    'preco_variacao_1h', 'preco_variacao_6h', 'preco_variacao_12h', 'preco_variacao_24h',
+    'media_movel_6h', 'media_movel_12h', 'media_movel_24h',
+    'volatilidade_6h', 'volatilidade_24h',
+    'max_24h', 'min_24h', 'rsi',
+    'preco_futuro_24h', 'target'
+] + COLUNAS_TARGET
+
+
+def _janela(linhas):
+    """Janela das últimas `linhas` linhas da moeda (como rolling(window=linhas))."""
+    return (f"(PARTITION BY coin_id ORDER BY fetched_at "
+            f"ROWS BETWEEN {linhas - 1} PRECEDING AND CURRENT ROW)")
+
+
+def _rolling(funcao, expressao, linhas):
+    """Agregação móvel que só existe com a janela cheia (igual ao pandas)."""
+    return (f"CASE WHEN COUNT({expressao}) OVER {_janela(linhas)} = {linhas} "
+            f"THEN {funcao}({expressao}) OVER {_janela(linhas)} END")
+
+
+def sql_features(fonte):
+    """
+    Query das features com funções de janela, equivalente a `criar_features`.
+
+    Cada feature usa a mesma definição em linhas do pandas:
+    pct_change(n) -> preço / LAG(preço, n) - 1; rolling(n).mean/std/max/min
+    -> AVG/STDDEV_SAMP/MAX/MIN OVER (ROWS n-1 PRECEDING) só com a janela
+    cheia; RSI com médias de 14 linhas de ganhos e perdas; target com LEAD(24)
+    e target_{h}h com LEAD(h) (nulo sem preço futuro). Linhas com qualquer
+    valor nulo são descartadas, como no dropna().
+
+    Args:
+        fonte: Corpo de uma CTE com (coin_id, price_usd, price_brl, fetched_at)
+
+    Returns:
+        str: Query SELECT (PostgreSQL e DuckDB)
+    """
+    particao = "(PARTITION BY coin_id ORDER BY fetched_at)"
+    variacoes = ",\n".join(
+        f"            price_usd / NULLIF(LAG(price_usd, {n}) OVER {particao}, 0) - 1 AS preco_variacao_{n}h"
+        for n in (1, 6, 12, 24)
+    )
+    futuros = "".join(
+        f",\n            LEAD(price_usd, {h}) OVER {particao} AS futuro_{h}h" for h in HORIZONTES
+    )
+    targets = "".join(
+        f",\n                   CASE WHEN futuro_{h}h > price_usd THEN 1 "
+        f"WHEN futuro_{h}h IS NOT NULL THEN 0 END AS target_{h}h"
+        for h in HORIZONTES
+    )
+    return f"""
+        WITH fonte AS (
+            {fonte}
+        ),
+        deltas AS (
+            SELECT coin_id, price_usd, price_brl, fetched_at,
+                   price_usd - LAG(price_usd, 1) OVER {particao} AS delta
+            FROM fonte
+        ),
+        janelas AS (
+            SELECT coin_id, price_usd, price_brl, fetched_at,
+{variacoes},
+            {_rolling('AVG', 'price_usd', 6)} AS media_movel_6h,
+            {_rolling('AVG', 'price_usd', 12)} AS media_movel_12h,
+            {_rolling('AVG', 'price_usd', 24)} AS media_movel_24h,
+            {_rolling('STDDEV_SAMP', 'price_usd', 6)} AS volatilidade_6h,
+            {_rolling('STDDEV_SAMP', 'price_usd', 24)} AS volatilidade_24h,
+            {_rolling('MAX', 'price_usd', 24)} AS max_24h,
+            {_rolling('MIN', 'price_usd', 24)} AS min_24h,
+            {_rolling('AVG', 'CASE WHEN delta > 0 THEN delta ELSE 0 END', 14)} AS ganho,
+            {_rolling('AVG', 'CASE WHEN delta < 0 THEN -delta ELSE 0 END', 14)} AS perda,
+            LEAD(price_usd, 24) OVER {particao} AS preco_futuro_24h{futuros}
+            FROM deltas
+        ),
+        features AS (
+            SELECT coin_id, price_usd, price_brl, fetched_at,
+                   preco_variacao_1h, preco_variacao_6h, preco_variacao_12h, preco_variacao_24h,
+                   media_movel_6h, media_movel_12h, media_movel_24h,
+                   volatilidade_6h, volatilidade_24h, max_24h, min_24h,
+                   100 - (100 / (1 + ganho / NULLIF(perda, 0))) AS rsi,
+                   preco_futuro_24h,
+                   CASE WHEN preco_futuro_24h > price_usd THEN 1 ELSE 0 END AS target{targets}
+            FROM janelas
+        )
+        SELECT * FROM features
+        WHERE {' AND '.join(f'{c} IS NOT NULL' for c in COLUNAS_FEATURES)}
+    """
+
+
+# Fonte completa (view): toda a tabela bruta
+FONTE_COMPLETA = "SELECT coin_id, price_usd, price_brl, fetched_at FROM public.raw_bitcoin_prices"
+
+# Fonte incremental: ticks após a marca d'água de cada moeda + 24 linhas de
+# contexto antes dela (lidas pelo índice (coin_id, fetched_at) com LIMIT)
+FONTE_INCREMENTAL = f"""
+            SELECT r.coin_id, r.price_usd, r.price_brl, r.fetched_at
+            FROM public.raw_bitcoin_prices r
+            LEFT JOIN (
+                SELECT coin_id, MAX(fetched_at) AS ate FROM public.features_precos GROUP BY coin_id
+            ) m ON m.coin_id = r.coin_id
+            WHERE m.ate IS NULL OR r.fetched_at > m.ate
+            UNION ALL
+            SELECT ctx.coin_id, ctx.price_usd, ctx.price_brl, ctx.fetched_at
+            FROM (
+                SELECT coin_id, MAX(fetched_at) AS ate FROM public.features_precos GROUP BY coin_id
+            ) m
+            CROSS JOIN LATERAL (
+                SELECT r.coin_id, r.price_usd, r.price_brl, r.fetched_at
+                FROM public.raw_bitcoin_prices r
+                WHERE r.coin_id = m.coin_id AND r.fetched_at <= m.ate
+                ORDER BY r.fetched_at DESC
+                LIMIT {LINHAS_CONTEXTO}
+            ) ctx"""
+
+SQL_TABELA = f"""
+    CREATE TABLE IF NOT EXISTS public.features_precos (
+        coin_id TEXT NOT NULL,
+        price_usd DOUBLE PRECISION, price_brl DOUBLE PRECISION,
+        fetched_at TIMESTAMP NOT NULL,
+        preco_variacao_1h DOUBLE PRECISION, preco_variacao_6h DOUBLE PRECISION,
+        preco_variacao_12h DOUBLE PRECISION, preco_variacao_24h DOUBLE PRECISION,
+        media_movel_6h DOUBLE PRECISION, media_movel_12h DOUBLE PRECISION,
+        media_movel_24h DOUBLE PRECISION,
+        volatilidade_6h DOUBLE PRECISION, volatilidade_24h DOUBLE PRECISION,
+        max_24h DOUBLE PRECISION, min_24h DOUBLE PRECISION, rsi DOUBLE PRECISION,
+        preco_futuro_24h DOUBLE PRECISION, target INTEGER,
+        {', '.join(f'{c} INTEGER' for c in COLUNAS_TARGET)},
+        PRIMARY KEY (coin_id, fetched_at)
+    )
+"""
+
+SQL_VIEW = f"CREATE OR REPLACE VIEW public.features_precos_v AS {sql_features(FONTE_COMPLETA)}"
+
+# Só linhas novas: a marca d'água é a última linha completa de cada moeda.
+# As últimas 24 linhas (ainda sem target) ficam de fora e entram na próxima rodada.
+SQL_INCREMENTAL = f"""
+    INSERT INTO public.features_precos
+    SELECT f.* FROM ({sql_features(FONTE_INCREMENTAL)}) f
+    LEFT JOIN (
+        SELECT coin_id, MAX(fetched_at) AS ate FROM public.features_precos GROUP BY coin_id
+    ) m ON m.coin_id = f.coin_id
+    WHERE m.ate IS NULL OR f.fetched_at > m.ate
+"""
+
+
+def criar_objetos(conn):
+    """
+    Cria a tabela materializada e a view de features (idempotente).
+
+    Tabelas criadas antes dos targets por horizonte ganham as colunas; as
+    linhas antigas (sem esses targets) são apagadas e recalculadas pela
+    próxima atualização incremental, que volta a ler a moeda desde o início.
+    """
+    cur = conn.cursor()
+    cur.execute(SQL_TABELA)
+    for c in COLUNAS_TARGET:
+        cur.execute(f"ALTER TABLE public.features_precos ADD COLUMN IF NOT EXISTS {c} INTEGER")
+    cur.execute(
+        f"DELETE FROM public.features_precos WHERE {' OR '.join(f'{c} IS NULL' for c in COLUNAS_TARGET)}"
+    )
+    cur.execute(SQL_VIEW)
+    cur.close()
+    conn.commit()
+
+
+def atualizar_features(conn):
+    """
+    Atualização incremental da tabela public.features_precos.
+
+    Só os ticks posteriores à última linha materializada de cada moeda
+    (mais 24 linhas de contexto) são lidos e calculados.
+
+    Args:
+        conn: Conexão PostgreSQL (psycopg2) ou DuckDB
+
+    Returns:
+        int: Linhas de features inseridas
+    """
+    criar_objetos(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM public.features_precos")
+    antes = cur.fetchone()[0]
+    cur.execute(SQL_INCREMENTAL)
+    cur.execute("SELECT COUNT(*) FROM public.features_precos")
+    depois = cur.fetchone()[0]
+    cur.close()
+    conn.commit()
+    return depois - antes
+
+
+def _bytes(df):
+    """Tamanho aproximado de um resultado transferido (bytes em memória)."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def verificar(df_ticks, rtol=1e-7):
+    """
+    Harness local: confere se as features em SQL batem com `criar_features`.
+
+    Usa um DuckDB em memória (SQL compatível com PostgreSQL: window
+    functions, LATERAL, ON CONFLICT) com a tabela public.raw_bitcoin_prices.
+    A materialização é feita em duas etapas (metade dos ticks e depois o
+    resto) para exercitar a atualização incremental.
+
+    Args:
+        df_ticks: DataFrame de ticks (coin_id, price_usd, price_brl, fetched_at)
+        rtol: Tolerância relativa. As linhas e o target batem exatamente; o
+              desvio padrão móvel do pandas usa variância online e difere do
+              STDDEV_SAMP do banco em até ~1e-8 (arredondamento)
+
+    Returns:
+        dict: Resultado da comparação e tamanhos de transferência
+    """
+    import duckdb
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pessoa2_ml'))
+    from features import criar_features
+
+    print("\n" + "="*60)
+    print("🧪 VERIFICANDO FEATURES SQL vs PYTHON (DuckDB local)")
+    print("="*60)
+
+    df_ticks = df_ticks.sort_values(['coin_id', 'fetched_at']).reset_index(drop=True)
+    df_ticks['fetched_at'] = pd.to_datetime(df_ticks['fetched_at'])
+    meio = df_ticks['fetched_at'].quantile(0.5)
+
+    con = duckdb.connect()
+    con.execute("CREATE SCHEMA IF NOT EXISTS public")
+    con.execute("""
+        CREATE TABLE public.raw_bitcoin_prices (
+            coin_id TEXT, price_usd DOUBLE, price_brl DOUBLE, fetched_at TIMESTAMP
+        )
+    """)
+    con.register('lote', df_ticks[df_ticks['fetched_at'] <= meio])
+    con.execute("INSERT INTO public.raw_bitcoin_prices SELECT coin_id, price_usd, price_brl, fetched_at FROM lote")
+    inseridas_1 = atualizar_features(con)
+
+    con.register('lote', df_ticks[df_ticks['fetched_at'] > meio])
+    con.execute("INSERT INTO public.raw_bitcoin_prices SELECT coin_id, price_usd, price_brl, fetched_at FROM lote")
+    inicio = time.perf_counter()
+    inseridas_2 = atualizar_features(con)
+    tempo_incremental = time.perf_counter() - inicio
+
+    df_sql = con.execute(
+        "SELECT * FROM public.features_precos ORDER BY coin_id, fetched_at"
+    ).df()
+    df_view = con.execute(
+        "SELECT * FROM public.features_precos_v ORDER BY coin_id, fetched_at"
+    ).df()
+    con.close()
+
+    df_py = criar_features(df_ticks[['coin_id', 'price_usd', 'price_brl', 'fetched_at']])
+    df_py = df_py.sort_values(['coin_id', 'fetched_at']).reset_index(drop=True)
+
+    colunas_num = [c for c in COLUNAS_FEATURES if c not in ('coin_id', 'fetched_at')]
+    chaves = ['coin_id', 'fetched_at']
+    juntos = df_py.merge(df_sql, on=chaves, how='outer', suffixes=('_py', '_sql'), indicator=True)
+    so_py = int((juntos['_merge'] == 'left_only').sum())
+    so_sql = int((juntos['_merge'] == 'right_only').sum())
+    ambos = juntos[juntos['_merge'] == 'both']
+
+    divergentes = {}
+    for c in colunas_num:
+        a = ambos[f'{c}_py'].to_numpy(dtype=float)
+        b = ambos[f'{c}_sql'].to_numpy(dtype=float)
+        n = int((~np.isclose(a, b, rtol=rtol, atol=0)).sum())
+        if n:
+            divergentes[c] = n
+
+    # Transferência: caminho Python traz todos os ticks; caminho SQL traz as
+    # linhas de features (todas, ou só as novas na leitura incremental)
+    bytes_ticks = _bytes(df_ticks[['coin_id', 'price_usd', 'price_brl', 'fetched_at']])
+    bytes_features = _bytes(df_sql)
+    bytes_novas = _bytes(df_sql.tail(inseridas_2))
+
+    ok = so_py == 0 and so_sql == 0 and not divergentes and len(df_view) == len(df_sql)
+    print(f"\n📊 Linhas Python: {len(df_py)} | SQL incremental: {len(df_sql)} | View: {len(df_view)}")
+    print(f"🔁 Inseridas por rodada: {inseridas_1} + {inseridas_2} ({tempo_incremental:.3f}s na 2ª)")
+    print(f"🔍 Só no Python: {so_py} | Só no SQL: {so_sql} | Valores divergentes: {divergentes or 0}")
+    print("\n📦 Transferência (bytes):")
+    print(f"   Ticks brutos (caminho Python): {bytes_ticks:,}")
+    print(f"   Features completas (SQL):      {bytes_features:,}")
+    print(f"   Só linhas novas (SQL incr.):   {bytes_novas:,}")
+    print(f"\n{'✅ Caminhos equivalentes!' if ok else '❌ Caminhos divergem!'}")
+    print("="*60)
+
+    return {
+        'ok': ok, 'so_python': so_py, 'so_sql': so_sql, 'divergentes': divergentes,
+        'bytes_ticks': bytes_ticks, 'bytes_features': bytes_features, 'bytes_novas': bytes_novas
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Features calculadas no banco (window functions)")
+    parser.add_argument("--atualizar", action="store_true",
+                        help="cria a tabela/view e materializa as linhas novas no PostgreSQL")
+    parser.add_argument("--verificar", action="store_true",
+                        help="compara SQL e Python num DuckDB local (dados sintéticos ou --dados)")
+    parser.add_argument("--dados", default=None, help="diretório Parquet com ticks para --verificar")
+    args = parser.parse_args()
+
+    if args.atualizar:
+        from utils.db_config import conectar_banco
+        conn = conectar_banco()
+        if conn is None:
+            sys.exit(1)
+        print(f"✅ Linhas de features inseridas: {atualizar_features(conn)}")
+        conn.close()
+    elif args.verificar:
+        from pessoa1_data.backends import BackendParquet, gerar_precos_sinteticos
+        ticks = BackendParquet(args.dados).ler_precos() if args.dados else gerar_precos_sinteticos()
+        sys.exit(0 if verificar(ticks)['ok'] else 1)
+    else:
+        parser.print_help()
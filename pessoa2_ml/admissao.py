@@ -0,0 +1,309 @@
+# pessoa2_ml/admissao.py
+from collections import deque
+import asyncio
+import math
+import time
+import json
+import os
+
+# Inferências executando ao mesmo tempo (o resto espera na fila). Acima do
+# nº de CPUs as threads só disputam o GIL com o event loop
+ADMISSAO_CONCORRENCIA = int(os.environ.get('ADMISSAO_CONCORRENCIA', max(2, os.cpu_count() or 1)))
+
+# Vagas que lotes podem ocupar: o resto fica reservado para /predict
+ADMISSAO_LOTES = int(os.environ.get('ADMISSAO_LOTES', max(1, ADMISSAO_CONCORRENCIA // 2)))
+
+# Profundidade máxima da fila (total e só de lotes) e espera máxima nela (s)
+ADMISSAO_FILA = int(os.environ.get('ADMISSAO_FILA', 16))
+ADMISSAO_FILA_LOTES = int(os.environ.get('ADMISSAO_FILA_LOTES', 8))
+ADMISSAO_ESPERA = float(os.environ.get('ADMISSAO_ESPERA', 0.5))
+
+# Linhas máximas por requisição do /predict/batch
+MAX_LINHAS_LOTE = int(os.environ.get('MAX_LINHAS_LOTE', 1000))
+
+# Corpo máximo (bytes) das rotas de lote, conferido antes da admissão e do
+# parse: ~1 KiB por linha (uma linha do /predict/batch tem ~500 bytes em JSON)
+MAX_BYTES_LOTE = int(os.environ.get('MAX_BYTES_LOTE', MAX_LINHAS_LOTE * 1024))
+
+# Classes de trabalho, em ordem de prioridade
+UNITARIA = 'unitaria'
+LOTE = 'lote'
+
+# Rotas controladas (prefixo -> classe); as demais passam direto
+ROTAS_ADMISSAO = {
+    '/predict/batch': LOTE,
+    '/predict': UNITARIA,
+    '/historico/': LOTE,
+    '/precos': LOTE
+}
+
+# Status de cada motivo de recusa
+STATUS_RECUSA = {
+    'fila_cheia': 503,
+    'espera_esgotada': 503,
+    'lotes_demais': 429,
+    'lote_grande': 413
+}
+
+
+class Recusada(Exception):
+    """Requisição recusada pelo controle de admissão."""
+
+    def __init__(self, motivo, retry_after):
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.status = STATUS_RECUSA[motivo]
+        self.retry_after = retry_after
+
+
+class ControleAdmissao:
+    """
+    Limita a inferência em andamento e a fila na frente dela.
+
+    Até `concorrencia` requisições executam ao mesmo tempo; as seguintes
+    esperam numa fila de no máximo `fila` posições por até `espera`
+    segundos. Fila cheia ou espera esgotada viram 503 com Retry-After, em
+    vez de latência crescendo sem limite.
+
+    Prioridade: vaga liberada vai primeiro para uma requisição unitária
+    da fila; lotes ocupam no máximo `lotes` vagas e `fila_lotes` posições
+    (além disso, 429), então um pico de lotes nunca bloqueia o /predict.
+
+    Todos os métodos rodam no event loop da API (sem locks).
+    """
+
+    def __init__(self, concorrencia=ADMISSAO_CONCORRENCIA, lotes=ADMISSAO_LOTES, fila=ADMISSAO_FILA,
+                 fila_lotes=ADMISSAO_FILA_LOTES, espera=ADMISSAO_ESPERA, max_linhas_lote=MAX_LINHAS_LOTE,
+                 max_bytes_lote=MAX_BYTES_LOTE):
+        self.concorrencia = concorrencia
+        self.lotes = min(lotes, concorrencia)
+        self.fila = fila
+        self.fila_lotes = fila_lotes
+        self.espera = espera
+        self.max_linhas_lote = max_linhas_lote
+        self.max_bytes_lote = max_bytes_lote
+        self._ativos = {UNITARIA: 0, LOTE: 0}
+        self._filas = {UNITARIA: deque(), LOTE: deque()}
+        # Duração média de uma execução (média móvel exponencial), para o Retry-After
+        self._duracao_media = 0.05
+        self.admitidas = {UNITARIA: 0, LOTE: 0}
+        self.enfileiradas = {UNITARIA: 0, LOTE: 0}
+        self.recusadas = {UNITARIA: {}, LOTE: {}}
+        self.espera_total = 0.0
+        self.maior_fila = 0
+
+    @property
+    def ativos(self):
+        return self._ativos[UNITARIA] + self._ativos[LOTE]
+
+    @property
+    def na_fila(self):
+        return len(self._filas[UNITARIA]) + len(self._filas[LOTE])
+
+    def _tem_vaga(self, classe):
+        if self.ativos >= self.concorrencia:
+            return False
+        return classe == UNITARIA or self._ativos[LOTE] < self.lotes
+
+    def retry_after(self):
+        """Segundos sugeridos até tentar de novo: tempo para esvaziar a fila atual."""
+        return max(1, math.ceil((self.na_fila + 1) * self._duracao_media / self.concorrencia))
+
+    def registrar_recusa(self, classe, motivo):
+        """Conta a recusa e devolve a exceção correspondente."""
+        recusadas = self.recusadas[classe]
+        recusadas[motivo] = recusadas.get(motivo, 0) + 1
+        return Recusada(motivo, self.retry_after())
+
+    async def entrar(self, classe):
+        """
+        Espera uma vaga para `classe` (ou levanta Recusada).
+
+        Returns:
+            float: Instante de admissão (para `sair`)
+        """
+        fila = self._filas[classe]
+        # Sem ninguém da mesma classe ou de maior prioridade esperando: entra direto
+        if self._tem_vaga(classe) and not fila and not (classe == LOTE and self._filas[UNITARIA]):
+            return self._admitir(classe, 0.0)
+
+        if self.na_fila >= self.fila:
+            raise self.registrar_recusa(classe, 'fila_cheia')
+        if classe == LOTE and len(fila) >= self.fila_lotes:
+            raise self.registrar_recusa(classe, 'lotes_demais')
+
+        vez = asyncio.get_running_loop().create_future()
+        fila.append(vez)
+        self.enfileiradas[classe] += 1
+        self.maior_fila = max(self.maior_fila, self.na_fila)
+        inicio = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(vez), self.espera)
+        except asyncio.TimeoutError:
+            if not vez.done():
+                fila.remove(vez)
+                raise self.registrar_recusa(classe, 'espera_esgotada')
+        except asyncio.CancelledError:
+            # Cliente desistiu: devolve a vaga se ela já tinha sido passada
+            if vez.done():
+                self._ativos[classe] -= 1
+                self._acordar()
+            else:
+                fila.remove(vez)
+            raise
+        # A vaga já foi reservada por `_acordar`
+        return self._admitir(classe, time.monotonic() - inicio, reservada=True)
+
+    def _admitir(self, classe, espera, reservada=False):
+        if not reservada:
+            self._ativos[classe] += 1
+        self.admitidas[classe] += 1
+        self.espera_total += espera
+        return time.monotonic()
+
+    def sair(self, classe, admitida_em):
+        self._ativos[classe] -= 1
+        self._duracao_media += 0.1 * (time.monotonic() - admitida_em - self._duracao_media)
+        self._acordar()
+
+    def _acordar(self):
+        """Passa as vagas livres para a fila, unitárias primeiro."""
+        for classe in (UNITARIA, LOTE):
+            fila = self._filas[classe]
+            while fila and self._tem_vaga(classe):
+                vez = fila.popleft()
+                self._ativos[classe] += 1
+                vez.set_result(None)
+
+    def estatisticas(self):
+        admitidas = sum(self.admitidas.values())
+        return {
+            'limites': {
+                'concorrencia': self.concorrencia,
+                'lotes': self.lotes,
+                'fila': self.fila,
+                'fila_lotes': self.fila_lotes,
+                'espera_s': self.espera,
+                'max_linhas_lote': self.max_linhas_lote,
+                'max_bytes_lote': self.max_bytes_lote
+            },
+            'ativos': dict(self._ativos),
+            'na_fila': {classe: len(fila) for classe, fila in self._filas.items()},
+            'maior_fila': self.maior_fila,
+            'admitidas': dict(self.admitidas),
+            'enfileiradas': dict(self.enfileiradas),
+            'recusadas': {classe: dict(motivos) for classe, motivos in self.recusadas.items()},
+            'espera_media_ms': 1000 * self.espera_total / admitidas if admitidas else 0.0,
+            'duracao_media_ms': 1000 * self._duracao_media
+        }
+
+
+def classe_da_rota(caminho, rotas=ROTAS_ADMISSAO):
+    for prefixo, classe in rotas.items():
+        if caminho == prefixo or (prefixo.endswith('/') and caminho.startswith(prefixo)):
+            return classe
+    return None
+
+
+def _cabecalho(scope, nome):
+    for chave, valor in scope.get('headers', ()):
+        if chave == nome:
+            return valor
+    return None
+
+
+async def _ler_corpo(receive, limite):
+    """
+    Lê o corpo inteiro (sem Content-Length, ex. chunked) até `limite` bytes.
+
+    Returns:
+        list: Mensagens ASGI lidas, ou None se o corpo passar do limite
+    """
+    mensagens, tamanho = [], 0
+    while True:
+        mensagem = await receive()
+        mensagens.append(mensagem)
+        if mensagem['type'] != 'http.request':
+            return mensagens
+        tamanho += len(mensagem.get('body', b''))
+        if tamanho > limite:
+            return None
+        if not mensagem.get('more_body', False):
+            return mensagens
+
+
+class AdmissaoRequisicoes:
+    """
+    Middleware ASGI do controle de admissão: as rotas de ROTAS_ADMISSAO
+    só chegam ao endpoint (e ao pool de threads) depois de `entrar`;
+    recusas respondem na hora, sem ler o corpo da requisição.
+
+    Nas rotas de lote o tamanho do corpo é conferido antes de `entrar`:
+    Content-Length acima de `max_bytes_lote` é 413 sem ocupar fila nem
+    vaga. Sem Content-Length (chunked) o corpo é lido até o limite antes
+    da admissão e repassado ao endpoint.
+    """
+
+    def __init__(self, app, controle=None):
+        self.app = app
+        self.controle = controle or ControleAdmissao()
+
+    async def __call__(self, scope, receive, send):
+        classe = classe_da_rota(scope['path']) if scope['type'] == 'http' else None
+        if classe is None:
+            return await self.app(scope, receive, send)
+
+        if classe == LOTE:
+            limite = self.controle.max_bytes_lote
+            tamanho = _cabecalho(scope, b'content-length')
+            if tamanho is not None:
+                grande = not tamanho.isdigit() or int(tamanho) > limite
+            elif _cabecalho(scope, b'transfer-encoding') is not None:
+                lidas = await _ler_corpo(receive, limite)
+                grande = lidas is None
+                if not grande:
+                    receive = _repetir(lidas, receive)
+            else:
+                grande = False
+            if grande:
+                return await responder_recusa(send, self.controle.registrar_recusa(classe, 'lote_grande'))
+
+        try:
+            admitida_em = await self.controle.entrar(classe)
+        except Recusada as recusa:
+            return await responder_recusa(send, recusa)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controle.sair(classe, admitida_em)
+
+
+def _repetir(mensagens, receive):
+    """`receive` que entrega primeiro as mensagens já lidas."""
+    pendentes = list(mensagens)
+
+    async def receber():
+        if pendentes:
+            return pendentes.pop(0)
+        return await receive()
+    return receber
+
+
+async def responder_recusa(send, recusa):
+    corpo = json.dumps({
+        'detail': {
+            'erro': 'API sobrecarregada' if recusa.status != 413 else 'Lote grande demais',
+            'motivo': recusa.motivo,
+            'retry_after': recusa.retry_after
+        }
+    }).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': recusa.status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(corpo)).encode()),
+            (b'retry-after', str(recusa.retry_after).encode())
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': corpo})
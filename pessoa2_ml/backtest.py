@@ -0,0 +1,498 @@
+# pessoa2_ml/backtest.py
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from datetime import datetime
+import pandas as pd
+import numpy as np
+import argparse
+import time
+import sys
+import os
+
+# Adicionar a pasta raiz ao path para importações funcionarem
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pessoa1_data.armazenamento import coletar_dados
+from pessoa1_data.backends import obter_backend
+from pessoa2_ml.features import criar_features
+from pessoa2_ml.inferencia import carregar_modelo_leve
+from pessoa2_ml.painel import Painel, FREQUENCIA_PAINEL
+from pessoa2_ml.treino import FEATURE_COLUMNS
+
+# Grade padrão de limiares: compra quando P(subida) >= limiar
+LIMIARES_PADRAO = [0.50, 0.52, 0.54, 0.56, 0.58, 0.60, 0.62, 0.65, 0.70]
+
+# Walk-forward: janela de treino deslizante e tamanho de cada passo de teste
+JANELA_TREINO_DIAS = 60
+PASSO_DIAS = 30
+
+# Horizonte do target em linhas da própria moeda ('target' = preço 24 linhas
+# à frente em criar_features): linhas de treino cujo target ainda "vê" o
+# período de teste são descartadas (embargo), senão há vazamento
+HORIZONTE_LINHAS = 24
+
+# Treino de cada janela: floresta menor e amostra limitada para caber em minutos
+N_ARVORES = 50
+MAX_AMOSTRAS_TREINO = 100_000
+
+# Custo por troca de posição (basis points sobre o valor da posição)
+CUSTO_BPS = 10
+
+# Blocos de trabalho enviados aos processos
+MOEDAS_POR_BLOCO = 64
+LIMIARES_POR_BLOCO = 4
+
+# Anualização (uma linha por hora, como nas barras horárias)
+HORAS_ANO = 24 * 365
+
+
+def _treinar_janela(X_train, y_train, X_teste, n_arvores):
+    """
+    Treina scaler + Random Forest em uma janela e pontua o período seguinte.
+    Executado em um processo separado por `prever_walk_forward`.
+
+    Returns:
+        np.ndarray: P(subida) de cada linha de X_teste
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+
+    # n_jobs=1: o paralelismo já está entre processos (uma janela por processo)
+    modelo = RandomForestClassifier(
+        n_estimators=n_arvores,
+        max_depth=10,
+        min_samples_split=5,
+        random_state=42,
+        n_jobs=1,
+        verbose=0
+    )
+    modelo.fit(X_train_scaled, y_train)
+    return modelo.predict_proba(scaler.transform(X_teste))[:, 1]
+
+
+def janelas_walk_forward(df_features, janela_treino_dias=JANELA_TREINO_DIAS, passo_dias=PASSO_DIAS,
+                         horizonte=HORIZONTE_LINHAS, max_amostras=MAX_AMOSTRAS_TREINO, seed=42):
+    """
+    Monta as janelas (teste, treino) do walk-forward.
+
+    Para cada passo [a, a + passo) o treino são as linhas de [a - janela, a)
+    de todas as moedas cujo target termina antes de `a`: o target é o preço
+    `horizonte` linhas à frente na própria moeda, então o embargo é contado
+    em linhas (com ticks de minutos, 24 linhas não são 24h).
+
+    Returns:
+        list: (índices de teste, índices de treino) por janela
+    """
+    tempos = pd.to_datetime(df_features['fetched_at']).to_numpy()
+    ordem = np.argsort(tempos, kind='stable')
+    tempos_ordenados = tempos[ordem]
+    y = df_features['target'].to_numpy()
+
+    # Instante da linha que define o target (NaT = moeda sem linha tão à frente)
+    serie = pd.Series(tempos_ordenados, index=ordem)
+    instante_alvo = serie.groupby(df_features['coin_id'].to_numpy()[ordem]).shift(-horizonte)
+    instante_alvo = instante_alvo.reindex(np.arange(len(tempos))).to_numpy()
+
+    janela = np.timedelta64(janela_treino_dias * 24, 'h')
+    passo = np.timedelta64(passo_dias * 24, 'h')
+    rng = np.random.default_rng(seed)
+
+    inicios = np.arange(tempos_ordenados[0] + janela, tempos_ordenados[-1] + np.timedelta64(1, 'h'), passo)
+
+    tarefas = []
+    for inicio in inicios:
+        fim = inicio + passo
+        teste = ordem[np.searchsorted(tempos_ordenados, inicio):np.searchsorted(tempos_ordenados, fim)]
+        treino = ordem[np.searchsorted(tempos_ordenados, inicio - janela):np.searchsorted(tempos_ordenados, inicio)]
+        # NaT < inicio é False: linhas sem target completo também saem
+        treino = treino[instante_alvo[treino] < inicio]
+        if len(teste) == 0 or len(np.unique(y[treino])) < 2:
+            continue
+        if len(treino) > max_amostras:
+            treino = rng.choice(treino, max_amostras, replace=False)
+        tarefas.append((teste, treino))
+    return tarefas
+
+
+def prever_walk_forward(df_features, feature_columns, janela_treino_dias=JANELA_TREINO_DIAS,
+                        passo_dias=PASSO_DIAS, horizonte=HORIZONTE_LINHAS, n_arvores=N_ARVORES,
+                        max_amostras=MAX_AMOSTRAS_TREINO, n_processos=None):
+    """
+    Gera probabilidades fora da amostra com retreino em janelas deslizantes.
+
+    Cada passo é pontuado por um modelo treinado só com linhas anteriores
+    cujo target não alcança o passo (ver `janelas_walk_forward`): cada linha
+    é prevista por um modelo que nunca viu o seu target. As janelas são
+    treinadas em paralelo (um processo por janela).
+
+    Args:
+        df_features: DataFrame com features, target, coin_id e fetched_at
+        feature_columns: Colunas usadas pelo modelo
+        janela_treino_dias: Tamanho da janela de treino
+        passo_dias: Tamanho de cada período de teste (e do deslocamento)
+        horizonte: Horizonte do target em linhas da moeda (embargo)
+        n_arvores: Árvores por modelo
+        max_amostras: Máximo de linhas de treino por janela (amostra aleatória)
+        n_processos: Número de processos (None = número de CPUs)
+
+    Returns:
+        np.ndarray: P(subida) por linha de df_features (NaN nas linhas que
+        caem antes da primeira janela completa)
+    """
+    print("\n🔁 Walk-forward: treinando janelas deslizantes...")
+
+    X = df_features[feature_columns].to_numpy(dtype=np.float64)
+    y = df_features['target'].to_numpy()
+    tarefas = janelas_walk_forward(df_features, janela_treino_dias, passo_dias, horizonte, max_amostras)
+
+    prob = np.full(len(df_features), np.nan)
+    if not tarefas:
+        print("   ⚠️  Histórico menor que uma janela de treino: nada a prever")
+        return prob
+
+    print(f"   Janelas: {len(tarefas)} | treino {janela_treino_dias}d | passo {passo_dias}d | "
+          f"embargo {horizonte} linhas")
+    with ProcessPoolExecutor(max_workers=n_processos) as executor:
+        futuros = [
+            executor.submit(_treinar_janela, X[treino], y[treino], X[teste], n_arvores)
+            for teste, treino in tarefas
+        ]
+        for (teste, _), futuro in zip(tarefas, futuros):
+            prob[teste] = futuro.result()
+
+    print(f"   ✅ {np.isfinite(prob).sum()} linhas previstas fora da amostra")
+    return prob
+
+
+def prever_com_modelo(df_features):
+    """
+    Pontua todas as linhas com o modelo global salvo, sem retreinar.
+
+    Rápido, mas o modelo foi treinado com parte dessas linhas: serve para
+    inspecionar o modelo em produção, não para estimar desempenho futuro.
+
+    Returns:
+        np.ndarray: P(subida) por linha de df_features
+    """
+    modelo = carregar_modelo_leve()
+    if modelo is None:
+        raise FileNotFoundError("Modelo não encontrado em models/ — rode o pipeline de treino")
+    print("\n⚠️  Modo 'modelo': métricas dentro da amostra (o modelo viu parte destes dados)")
+    X = df_features[modelo.feature_columns].to_numpy(dtype=np.float64)
+    return modelo.prever_proba(X)[:, list(modelo.classes).index(1)]
+
+
+def montar_painel(df_features, prob, frequencia=FREQUENCIA_PAINEL):
+    """
+    Reorganiza as linhas em matrizes densas moeda x tempo.
+
+    Os coletores não gravam as moedas no mesmo instante: a grade é a do
+    `Painel.de_longo` (fetched_at arredondado para baixo em `frequencia`,
+    fica a última linha de cada moeda no intervalo), transposta. Assim a
+    mesma coluna é o mesmo período para todas as moedas.
+
+    Args:
+        frequencia: Intervalo das colunas (None = instantes exatos; só
+                    para dados já alinhados, ex. barras horárias)
+
+    Returns:
+        dict: moedas, tempos e matrizes (n_moedas, n_tempos) de preço e
+        probabilidade (NaN onde a moeda não tem linha)
+    """
+    grade = Painel.de_longo(df_features, frequencia=frequencia)
+    descartadas = len(df_features) - int(grade.valido.sum())
+    if descartadas:
+        print(f"   ℹ️  {descartadas} linhas no mesmo intervalo ({frequencia}) de outra da moeda: fica a última")
+
+    return {
+        'moedas': grade.moedas,
+        'tempos': grade.tempos,
+        'preco': np.ascontiguousarray(grade.valores.T),
+        'prob': np.ascontiguousarray(grade.grade(prob).T)
+    }
+
+
+def _avaliar_bloco(preco, prob, limiares, custo, vender_descoberto):
+    """
+    Avalia um bloco de moedas para um bloco de limiares (vetorizado).
+
+    A posição decidida na linha t (1 = comprado, -1 = vendido, 0 = fora)
+    recebe o retorno de t até o próximo preço da própria moeda, mesmo que
+    haja colunas vazias no meio. Cada troca de posição (em relação à linha
+    anterior da moeda) paga `custo` (fração) sobre o valor negociado.
+    O acerto usa esse mesmo retorno (comprado e subiu, vendido e caiu), não
+    o target de 24 linhas do treino: P&L e acerto medem o mesmo horizonte.
+
+    Returns:
+        dict: Somas por tempo (para a carteira) e totais por moeda, um
+        elemento por limiar
+    """
+    n_tempos = preco.shape[1]
+    tem_preco = np.isfinite(preco)
+    colunas = np.arange(n_tempos)
+    # Próxima e anterior coluna com preço de cada moeda (n_tempos / -1 = nenhuma)
+    proxima = np.full_like(colunas, n_tempos, shape=preco.shape)
+    proxima[:, :-1] = np.minimum.accumulate(np.where(tem_preco, colunas, n_tempos)[:, :0:-1], axis=1)[:, ::-1]
+    anterior = np.full_like(colunas, -1, shape=preco.shape)
+    anterior[:, 1:] = np.maximum.accumulate(np.where(tem_preco, colunas, -1), axis=1)[:, :-1]
+
+    preco_prox = np.take_along_axis(preco, np.minimum(proxima, n_tempos - 1), axis=1)
+    retorno_prox = np.where(tem_preco & (proxima < n_tempos), preco_prox / preco - 1, np.nan)
+    tem_retorno = np.isfinite(retorno_prox)
+    tem_prob = np.isfinite(prob)
+    retorno_prox = np.where(tem_retorno, retorno_prox, 0.0)
+    # Linhas que contam no retorno, na exposição e no acerto
+    ativa = tem_retorno & tem_prob
+    sobe, cai = retorno_prox > 0, retorno_prox < 0
+
+    resultado = {
+        'soma_tempo': [], 'retorno_moeda': [], 'acertos': [], 'n_posicoes': [], 'n_trocas': []
+    }
+    for limiar in limiares:
+        posicao = (prob >= limiar).astype(np.float64)
+        if vender_descoberto:
+            posicao -= prob <= 1 - limiar
+        posicao[~tem_prob] = 0.0
+
+        posicao_anterior = np.take_along_axis(posicao, np.maximum(anterior, 0), axis=1)
+        posicao_anterior[anterior < 0] = 0.0
+        trocas = np.where(tem_preco, np.abs(posicao - posicao_anterior), 0.0)
+        retorno = posicao * retorno_prox - trocas * custo
+
+        em_posicao = (posicao != 0) & ativa
+        acertos = (((posicao > 0) & sobe) | ((posicao < 0) & cai)) & ativa
+
+        resultado['soma_tempo'].append(retorno.sum(axis=0))
+        resultado['retorno_moeda'].append(np.expm1(np.log1p(retorno).sum(axis=1)))
+        resultado['acertos'].append(acertos.sum(axis=1))
+        resultado['n_posicoes'].append(em_posicao.sum(axis=1))
+        resultado['n_trocas'].append(trocas.sum(axis=1))
+
+    resultado = {chave: np.array(valor) for chave, valor in resultado.items()}
+    resultado['ativas_tempo'] = ativa.sum(axis=0)
+    resultado['horas_moeda'] = ativa.sum(axis=1)
+    return resultado
+
+
+def _metricas_carteira(soma_tempo, ativas_tempo):
+    """Retorno, Sharpe e drawdown da carteira igualmente ponderada entre moedas ativas."""
+    retorno = np.divide(soma_tempo, ativas_tempo, out=np.zeros_like(soma_tempo), where=ativas_tempo > 0)
+    retorno = retorno[ativas_tempo > 0]
+    if len(retorno) == 0:
+        return 0.0, 0.0, 0.0
+    patrimonio = np.cumprod(1 + retorno)
+    drawdown = 1 - patrimonio / np.maximum.accumulate(np.maximum(patrimonio, 1.0))
+    desvio = retorno.std()
+    sharpe = retorno.mean() / desvio * np.sqrt(HORAS_ANO) if desvio > 0 else 0.0
+    return patrimonio[-1] - 1, sharpe, drawdown.max()
+
+
+def executar_backtest(painel, limiares=LIMIARES_PADRAO, custo_bps=CUSTO_BPS, vender_descoberto=False,
+                      n_processos=None, moedas_por_bloco=MOEDAS_POR_BLOCO,
+                      limiares_por_bloco=LIMIARES_POR_BLOCO):
+    """
+    Roda a grade de limiares sobre todas as moedas.
+
+    O trabalho é dividido em blocos (moedas x limiares) avaliados em
+    paralelo; cada bloco é vetorizado em NumPy sobre a matriz moeda x tempo.
+    O limiar 0.0 é sempre incluído como referência (sempre comprado).
+
+    Args:
+        painel: Saída de `montar_painel`
+        limiares: Grade de limiares de P(subida) para entrar comprado
+        custo_bps: Custo por troca de posição, em basis points
+        vender_descoberto: Também entra vendido quando P(subida) <= 1 - limiar
+        n_processos: Número de processos (None = número de CPUs)
+
+    Returns:
+        tuple: (resumo por limiar, métricas por moeda e limiar) em DataFrames
+    """
+    limiares = sorted(set([0.0] + [float(l) for l in limiares]))
+    custo = custo_bps / 10_000
+    n_moedas, n_tempos = painel['preco'].shape
+
+    blocos_moedas = [slice(i, i + moedas_por_bloco) for i in range(0, n_moedas, moedas_por_bloco)]
+    blocos_limiares = [limiares[i:i + limiares_por_bloco] for i in range(0, len(limiares), limiares_por_bloco)]
+    print(f"\n📐 Grade: {len(limiares)} limiares x {n_moedas} moedas x {n_tempos} horas "
+          f"({len(blocos_moedas) * len(blocos_limiares)} blocos)")
+
+    soma_tempo = np.zeros((len(limiares), n_tempos))
+    ativas_tempo = np.zeros(n_tempos)
+    por_moeda = []
+
+    with ProcessPoolExecutor(max_workers=n_processos) as executor:
+        futuros = {
+            executor.submit(_avaliar_bloco, painel['preco'][bm], painel['prob'][bm], bl, custo,
+                            vender_descoberto): (bm, bl)
+            for bm, bl in product(blocos_moedas, blocos_limiares)
+        }
+        for futuro, (bm, bl) in futuros.items():
+            r = futuro.result()
+            indices = [limiares.index(l) for l in bl]
+            soma_tempo[indices] += r['soma_tempo']
+            if bl is blocos_limiares[0]:
+                ativas_tempo += r['ativas_tempo']
+            for j, limiar in enumerate(bl):
+                por_moeda.append(pd.DataFrame({
+                    'limiar': limiar,
+                    'coin_id': painel['moedas'][bm],
+                    'retorno': r['retorno_moeda'][j],
+                    'taxa_acerto': r['acertos'][j] / np.maximum(r['n_posicoes'][j], 1),
+                    'exposicao': r['n_posicoes'][j] / np.maximum(r['horas_moeda'], 1),
+                    'acertos': r['acertos'][j],
+                    'n_posicoes': r['n_posicoes'][j],
+                    'horas': r['horas_moeda'],
+                    'n_trocas': r['n_trocas'][j]
+                }))
+
+    por_moeda = pd.concat(por_moeda, ignore_index=True).sort_values(['limiar', 'coin_id'])
+
+    resumo = []
+    for i, limiar in enumerate(limiares):
+        retorno, sharpe, drawdown = _metricas_carteira(soma_tempo[i], ativas_tempo)
+        moedas = por_moeda[por_moeda['limiar'] == limiar]
+        resumo.append({
+            'limiar': limiar,
+            'retorno_total': retorno,
+            'sharpe': sharpe,
+            'max_drawdown': drawdown,
+            'taxa_acerto': moedas['acertos'].sum() / max(moedas['n_posicoes'].sum(), 1),
+            'exposicao': moedas['n_posicoes'].sum() / max(moedas['horas'].sum(), 1),
+            'n_trocas': int(moedas['n_trocas'].sum())
+        })
+    return pd.DataFrame(resumo), por_moeda.reset_index(drop=True)
+
+
+def imprimir_resumo(resumo):
+    """Mostra a tabela de resultados por limiar."""
+    print("\n" + "="*78)
+    print("📊 BACKTEST - RESULTADO POR LIMIAR (carteira igualmente ponderada)")
+    print("="*78)
+    print(f"{'limiar':>7} {'retorno':>10} {'sharpe':>8} {'max dd':>8} {'acerto':>8} {'exposição':>10} {'trocas':>9}")
+    for linha in resumo.itertuples():
+        nome = 'sempre' if linha.limiar == 0 else f"{linha.limiar:.2f}"
+        print(f"{nome:>7} {linha.retorno_total:>10.1%} {linha.sharpe:>8.2f} {linha.max_drawdown:>8.1%} "
+              f"{linha.taxa_acerto:>8.1%} {linha.exposicao:>10.1%} {linha.n_trocas:>9,}")
+    print("-"*78)
+    print("limiar 'sempre' = sempre comprado (referência).")
+    print("Acerto = posição no sentido do retorno até o próximo preço (o mesmo do retorno).")
+    print("="*78)
+
+
+def backtest_completo(backend=None, caminho_dados=None, coin_ids=None, inicio=None, fim=None,
+                      barras=False, features_sql=False, modo='walk-forward', limiares=LIMIARES_PADRAO,
+                      janela_treino_dias=JANELA_TREINO_DIAS, passo_dias=PASSO_DIAS, n_arvores=N_ARVORES,
+                      max_amostras=MAX_AMOSTRAS_TREINO, custo_bps=CUSTO_BPS, vender_descoberto=False,
+                      n_processos=None, saida=None):
+    """
+    Coleta os dados, gera as probabilidades e roda a grade de limiares.
+
+    Args:
+        modo: 'walk-forward' (retreina em janelas, fora da amostra) ou
+              'modelo' (pontua com o modelo salvo, dentro da amostra)
+        saida: Diretório para salvar resumo.csv e por_moeda.csv (opcional)
+        (demais argumentos: ver `pipeline_completo`, `prever_walk_forward`
+        e `executar_backtest`)
+
+    Returns:
+        tuple: (resumo, por_moeda) ou None se não houver dados
+    """
+    print("\n" + "="*70)
+    print("🧪 BACKTEST WALK-FORWARD - CRYPTO TREND PREDICTOR")
+    print("="*70)
+    print(f"⏰ Início: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    conn = obter_backend(backend, caminho_dados)
+    if not conn:
+        print("\n❌ ERRO: Não foi possível conectar ao armazenamento!")
+        return None
+    df = coletar_dados(conn, coin_ids=coin_ids, inicio=inicio, fim=fim, barras=barras, features=features_sql)
+    conn.fechar()
+
+    df_features = df if features_sql else criar_features(df)
+    if len(df_features) == 0:
+        print("\n⚠️  Sem dados suficientes para o backtest")
+        return None
+
+    tempos = {}
+    t0 = time.perf_counter()
+    if modo == 'modelo':
+        prob = prever_com_modelo(df_features)
+    else:
+        prob = prever_walk_forward(
+            df_features, FEATURE_COLUMNS, janela_treino_dias=janela_treino_dias, passo_dias=passo_dias,
+            n_arvores=n_arvores, max_amostras=max_amostras, n_processos=n_processos
+        )
+    tempos['previsoes'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    painel = montar_painel(df_features, prob)
+    resumo, por_moeda = executar_backtest(
+        painel, limiares=limiares, custo_bps=custo_bps, vender_descoberto=vender_descoberto,
+        n_processos=n_processos
+    )
+    tempos['grade'] = time.perf_counter() - t0
+
+    imprimir_resumo(resumo)
+    print(f"\n⏱️  Previsões: {tempos['previsoes']:.1f}s | Grade de limiares: {tempos['grade']:.1f}s")
+
+    if saida:
+        os.makedirs(saida, exist_ok=True)
+        resumo.to_csv(os.path.join(saida, 'resumo.csv'), index=False)
+        por_moeda.to_csv(os.path.join(saida, 'por_moeda.csv'), index=False)
+        print(f"💾 Resultados salvos em {saida}/")
+
+    return resumo, por_moeda
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest walk-forward das previsões")
+    parser.add_argument("--backend", choices=["postgres", "parquet"], default=None,
+                        help="armazenamento dos dados (padrão: ARMAZENAMENTO_BACKEND ou postgres)")
+    parser.add_argument("--dados", default=None, help="diretório Parquet do backend local")
+    parser.add_argument("--moedas", nargs="+", default=None, help="usa só estas moedas (coin_id)")
+    parser.add_argument("--inicio", default=None, help="data inicial dos dados (ex.: 2025-01-01)")
+    parser.add_argument("--fim", default=None, help="data final dos dados, exclusiva")
+    parser.add_argument("--barras", action="store_true", help="usa as barras horárias em vez dos ticks")
+    parser.add_argument("--features-sql", action="store_true", help="lê as features calculadas no banco")
+    parser.add_argument("--modo", choices=["walk-forward", "modelo"], default="walk-forward",
+                        help="walk-forward (retreina, fora da amostra) ou modelo (modelo salvo)")
+    parser.add_argument("--limiares", nargs="+", type=float, default=LIMIARES_PADRAO,
+                        help="limiares de P(subida) para entrar comprado")
+    parser.add_argument("--janela-treino-dias", type=int, default=JANELA_TREINO_DIAS,
+                        help="dias de histórico em cada janela de treino")
+    parser.add_argument("--passo-dias", type=int, default=PASSO_DIAS,
+                        help="dias de teste entre dois retreinos")
+    parser.add_argument("--arvores", type=int, default=N_ARVORES, help="árvores por modelo walk-forward")
+    parser.add_argument("--max-amostras", type=int, default=MAX_AMOSTRAS_TREINO,
+                        help="máximo de linhas de treino por janela")
+    parser.add_argument("--custo-bps", type=float, default=CUSTO_BPS,
+                        help="custo por troca de posição (basis points)")
+    parser.add_argument("--vender", action="store_true",
+                        help="entra vendido quando P(subida) <= 1 - limiar")
+    parser.add_argument("--processos", type=int, default=None, help="número de processos")
+    parser.add_argument("--saida", default=None, help="diretório para salvar os CSVs de resultado")
+    args = parser.parse_args()
+
+    backtest_completo(
+        backend=args.backend,
+        caminho_dados=args.dados,
+        coin_ids=args.moedas,
+        inicio=args.inicio,
+        fim=args.fim,
+        barras=args.barras,
+        features_sql=args.features_sql,
+        modo=args.modo,
+        limiares=args.limiares,
+        janela_treino_dias=args.janela_treino_dias,
+        passo_dias=args.passo_dias,
+        n_arvores=args.arvores,
+        max_amostras=args.max_amostras,
+        custo_bps=args.custo_bps,
+        vender_descoberto=args.vender,
+        n_processos=args.processos,
+        saida=args.saida
+    )
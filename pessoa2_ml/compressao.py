@@ -0,0 +1,315 @@
+# pessoa2_ml/compressao.py
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split
+from datetime import datetime
+import pandas as pd
+import numpy as np
+import argparse
+import tempfile
+import time
+import sys
+import os
+
+# Adicionar a pasta raiz ao path para importações funcionarem
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pessoa1_data.armazenamento import coletar_dados
+from pessoa1_data.backends import obter_backend
+from pessoa2_ml.features import criar_features
+from pessoa2_ml.inferencia import (
+    ModeloLeve, carregar_modelo_leve, pasta_modelo, versao_origem, gravar_manifesto, remover_manifesto,
+    MODELO_COMPRIMIDO
+)
+
+# Variantes podadas: nº de árvores x profundidade máxima (None = original)
+ARVORES_PODA = [None, 50, 25, 10, 5]
+PROFUNDIDADES_PODA = [None, 8, 6, 4]
+
+# Alunos destilados: (nº de árvores, profundidade) treinados nas previsões do modelo original
+ALUNOS_DESTILADOS = [(1, 6), (1, 8), (10, 6), (20, 8)]
+
+# Medição de latência
+N_LINHAS_LATENCIA = 2000
+TAMANHO_LOTE = 1000
+N_LOTES_LATENCIA = 30
+
+# Orçamento padrão de latência por linha (p99, ms)
+ORCAMENTO_P99_MS = 0.5
+
+
+def dividir_como_treino(df_features, feature_columns):
+    """
+    Separa treino/teste com a mesma divisão de `treino.treinar_modelo`
+    (80/20 estratificado, random_state=42): rodando sobre os mesmos dados
+    do pipeline, o teste são exatamente as linhas que o modelo não viu.
+
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test) como arrays NumPy
+    """
+    X = df_features[feature_columns].to_numpy(dtype=np.float64)
+    y = df_features['target'].to_numpy()
+    return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+
+def destilar(professor, X_train, n_arvores, profundidade):
+    """
+    Treina uma floresta rasa que imita o modelo original.
+
+    O aluno aprende as classes previstas pelo professor (não o target real):
+    a fronteira de decisão do professor é mais simples de copiar do que o
+    ruído do target, e é ela que queremos preservar. Professores
+    multi-saída ensinam todos os horizontes (um rótulo por horizonte).
+
+    Returns:
+        ModeloLeve
+    """
+    multi_saida = len(professor.horizontes) > 1
+    if multi_saida:
+        rotulos = (professor.prever_proba_horizontes(X_train) > 0.5).astype(int)
+    else:
+        rotulos = professor.prever(X_train)
+    # Mesmo X_train do professor (ver `dividir_como_treino`): mesmo scaler
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X_train)
+
+    aluno = RandomForestClassifier(
+        n_estimators=n_arvores,
+        max_depth=profundidade,
+        min_samples_split=5,
+        bootstrap=n_arvores > 1,
+        random_state=42,
+        n_jobs=-1
+    )
+    aluno.fit(X_scaled, rotulos)
+    if multi_saida:
+        aluno.horizontes_ = professor.horizontes
+        aluno.saida_principal_ = professor.saida_principal
+
+    leve = ModeloLeve.de_sklearn(aluno, scaler, professor.feature_columns)
+    leve.baseline_drift = professor.baseline_drift
+    return leve
+
+
+def medir_latencia(modelo, X, n_linhas=N_LINHAS_LATENCIA, tamanho_lote=TAMANHO_LOTE,
+                   n_lotes=N_LOTES_LATENCIA):
+    """
+    Mede a latência de previsão do caminho usado pela API.
+
+    Por linha: `prever_dict_horizontes` com um dicionário de features (como
+    no /predict).
+    Por lote: `prever_proba` com `tamanho_lote` linhas.
+
+    Returns:
+        dict: p50/p99 por linha e por lote, em ms
+    """
+    linhas = [dict(zip(modelo.feature_columns, x)) for x in X[:n_linhas]]
+    modelo.prever_dict_horizontes(linhas[0])
+
+    tempos_linha = np.empty(len(linhas))
+    for i, linha in enumerate(linhas):
+        inicio = time.perf_counter()
+        modelo.prever_dict_horizontes(linha)
+        tempos_linha[i] = time.perf_counter() - inicio
+
+    lote = X[:tamanho_lote]
+    tempos_lote = np.empty(n_lotes)
+    for i in range(n_lotes):
+        inicio = time.perf_counter()
+        modelo.prever_proba(lote)
+        tempos_lote[i] = time.perf_counter() - inicio
+
+    return {
+        'p50_linha_ms': np.percentile(tempos_linha, 50) * 1000,
+        'p99_linha_ms': np.percentile(tempos_linha, 99) * 1000,
+        'p50_lote_ms': np.percentile(tempos_lote, 50) * 1000,
+        'p99_lote_ms': np.percentile(tempos_lote, 99) * 1000
+    }
+
+
+def tamanho_artefato(modelo):
+    """Tamanho em bytes do .npz que seria servido."""
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, MODELO_COMPRIMIDO)
+        modelo.salvar(caminho)
+        return os.path.getsize(caminho)
+
+
+def marcar_pareto(tabela):
+    """
+    Marca as variantes não dominadas: nenhuma outra tem acurácia maior ou
+    igual com p99 por linha e tamanho menores ou iguais (e uma estritamente melhor).
+    """
+    valores = tabela[['acuracia', 'p99_linha_ms', 'tamanho_kb']].to_numpy() * [-1, 1, 1]
+    menor_igual = (valores[:, None, :] <= valores[None, :, :]).all(axis=2)
+    menor = (valores[:, None, :] < valores[None, :, :]).any(axis=2)
+    dominada = (menor_igual & menor).any(axis=0)
+    return tabela.assign(pareto=~dominada)
+
+
+def avaliar_variantes(professor, X_train, X_test, y_test, arvores=ARVORES_PODA,
+                      profundidades=PROFUNDIDADES_PODA, alunos=ALUNOS_DESTILADOS):
+    """
+    Gera as variantes (poda e destilação) e mede acurácia, latência e tamanho.
+
+    Returns:
+        tuple: (tabela ordenada por p99 por linha, {nome: ModeloLeve})
+    """
+    variantes = {}
+    for n in arvores:
+        for p in profundidades:
+            nome = f"poda_{n or professor.n_arvores}a_{p or professor.profundidade}p"
+            variantes[nome] = professor.podar(n_arvores=n, profundidade=p)
+    for n, p in alunos:
+        print(f"   🎓 Destilando {n} árvore(s), profundidade {p}...")
+        variantes[f"destilado_{n}a_{p}p"] = destilar(professor, X_train, n, p)
+
+    linhas = []
+    for nome, modelo in variantes.items():
+        previsao = modelo.prever(X_test)
+        linhas.append({
+            'variante': nome,
+            'n_arvores': modelo.n_arvores,
+            'profundidade': modelo.profundidade,
+            'n_nos': modelo.n_nos,
+            'acuracia': (previsao == y_test).mean(),
+            'concordancia': (previsao == professor.prever(X_test)).mean(),
+            **medir_latencia(modelo, X_test),
+            'tamanho_kb': tamanho_artefato(modelo) / 1024
+        })
+
+    tabela = marcar_pareto(pd.DataFrame(linhas))
+    return tabela.sort_values('p99_linha_ms').reset_index(drop=True), variantes
+
+
+def escolher_variante(tabela, orcamento_p99_ms):
+    """
+    Melhor acurácia entre as variantes dentro do orçamento de p99 por linha
+    (empate: menor artefato). Retorna None se nenhuma couber.
+    """
+    cabem = tabela[tabela['p99_linha_ms'] <= orcamento_p99_ms]
+    if len(cabem) == 0:
+        return None
+    return cabem.sort_values(['acuracia', 'tamanho_kb'], ascending=[False, True]).iloc[0]
+
+
+def imprimir_tabela(tabela, orcamento_p99_ms):
+    """Mostra a tabela de variantes (★ = fronteira de Pareto)."""
+    print("\n" + "="*104)
+    print("📦 VARIANTES DO MODELO (★ = Pareto: acurácia x p99 por linha x tamanho)")
+    print("="*104)
+    print(f"{'variante':<22} {'árv':>4} {'prof':>4} {'nós':>7} {'acurácia':>9} {'concord.':>9} "
+          f"{'p50 lin':>8} {'p99 lin':>8} {'p99 lote':>9} {'tamanho':>10}")
+    for linha in tabela.itertuples():
+        marca = '★' if linha.pareto else ' '
+        estouro = ' ' if linha.p99_linha_ms <= orcamento_p99_ms else '!'
+        print(f"{marca}{linha.variante:<21} {linha.n_arvores:>4} {linha.profundidade:>4} {linha.n_nos:>7,} "
+              f"{linha.acuracia:>9.2%} {linha.concordancia:>9.2%} {linha.p50_linha_ms:>8.3f} "
+              f"{linha.p99_linha_ms:>7.3f}{estouro} {linha.p99_lote_ms:>9.2f} {linha.tamanho_kb:>8.0f}KB")
+    print("-"*104)
+    print(f"Latências em ms (por linha: prever_dict_horizontes; lote: {TAMANHO_LOTE} linhas). "
+          f"'!' = acima do orçamento de {orcamento_p99_ms} ms.")
+    print("="*104)
+
+
+def comprimir_modelo(backend=None, caminho_dados=None, coin_ids=None, inicio=None, fim=None,
+                     barras=False, features_sql=False, orcamento_p99_ms=ORCAMENTO_P99_MS,
+                     salvar=True, saida=None):
+    """
+    Avalia variantes menores do modelo salvo e publica a melhor que cabe
+    no orçamento de latência como artefato de serviço: a variante vai para
+    modelo_crypto_classifier.comprimido.npz e o manifesto servico.json (com
+    a versão do modelo de origem) faz a API carregá-la. Os artefatos do
+    treino não mudam, e uma nova rodada parte sempre do modelo original.
+
+    Args:
+        orcamento_p99_ms: Latência p99 máxima por linha (ms)
+        salvar: Grava a variante escolhida e o manifesto na pasta do modelo
+        saida: Caminho de um CSV para a tabela de variantes (opcional)
+        (demais argumentos: ver `pipeline_ml.pipeline_completo`)
+
+    Returns:
+        pd.DataFrame: Tabela de variantes
+    """
+    print("\n" + "="*70)
+    print("🗜️  COMPRESSÃO DO MODELO COM ORÇAMENTO DE LATÊNCIA")
+    print("="*70)
+    print(f"⏰ Início: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    professor = carregar_modelo_leve(comprimido=False)
+    if professor is None:
+        print("\n❌ Modelo não encontrado em models/ — rode o pipeline de treino")
+        return None
+
+    conn = obter_backend(backend, caminho_dados)
+    if not conn:
+        print("\n❌ ERRO: Não foi possível conectar ao armazenamento!")
+        return None
+    df = coletar_dados(conn, coin_ids=coin_ids, inicio=inicio, fim=fim, barras=barras, features=features_sql)
+    conn.fechar()
+    df_features = df if features_sql else criar_features(df)
+
+    X_train, X_test, y_train, y_test = dividir_como_treino(df_features, professor.feature_columns)
+    print(f"\n📊 Modelo original: {professor.n_arvores} árvores, profundidade {professor.profundidade}, "
+          f"{professor.n_nos:,} nós | teste: {len(X_test)} linhas")
+
+    tabela, variantes = avaliar_variantes(professor, X_train, X_test, y_test)
+    imprimir_tabela(tabela, orcamento_p99_ms)
+
+    if saida:
+        tabela.to_csv(saida, index=False)
+        print(f"💾 Tabela salva em {saida}")
+
+    escolhida = escolher_variante(tabela, orcamento_p99_ms)
+    if escolhida is None:
+        print(f"\n⚠️  Nenhuma variante com p99 <= {orcamento_p99_ms} ms: artefato mantido")
+        return tabela
+
+    print(f"\n🏆 Escolhida: {escolhida['variante']} | acurácia {escolhida['acuracia']:.2%} | "
+          f"p99 {escolhida['p99_linha_ms']:.3f} ms | {escolhida['tamanho_kb']:.0f} KB")
+    if salvar:
+        pasta = pasta_modelo()
+        if escolhida['variante'] == f"poda_{professor.n_arvores}a_{professor.profundidade}p":
+            remover_manifesto(pasta)
+            print("   ✅ O modelo original já é o melhor: segue em serviço")
+            return tabela
+        # Grava ao lado e troca por rename: o manifesto atual pode apontar para ele
+        caminho = os.path.join(pasta, MODELO_COMPRIMIDO)
+        temporario = caminho.replace('.npz', '.tmp.npz')
+        variantes[escolhida['variante']].salvar(temporario)
+        os.replace(temporario, caminho)
+        gravar_manifesto(pasta, MODELO_COMPRIMIDO, escolhida['variante'], versao_origem(pasta))
+        print(f"   ✅ Artefato de serviço: {caminho} (manifesto em {pasta})")
+        print("   (os artefatos do treino ficam intactos; um novo treino volta ao modelo completo)")
+
+    return tabela
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressão do modelo com orçamento de latência")
+    parser.add_argument("--backend", choices=["postgres", "parquet"], default=None,
+                        help="armazenamento dos dados (padrão: ARMAZENAMENTO_BACKEND ou postgres)")
+    parser.add_argument("--dados", default=None, help="diretório Parquet do backend local")
+    parser.add_argument("--moedas", nargs="+", default=None, help="usa só estas moedas (coin_id)")
+    parser.add_argument("--inicio", default=None, help="data inicial dos dados (ex.: 2025-01-01)")
+    parser.add_argument("--fim", default=None, help="data final dos dados, exclusiva")
+    parser.add_argument("--barras", action="store_true", help="usa as barras horárias em vez dos ticks")
+    parser.add_argument("--features-sql", action="store_true", help="lê as features calculadas no banco")
+    parser.add_argument("--orcamento-p99-ms", type=float, default=ORCAMENTO_P99_MS,
+                        help="latência p99 máxima por linha (ms)")
+    parser.add_argument("--nao-salvar", action="store_true", help="só mostra a tabela, não troca o artefato")
+    parser.add_argument("--saida", default=None, help="CSV para a tabela de variantes")
+    args = parser.parse_args()
+
+    comprimir_modelo(
+        backend=args.backend,
+        caminho_dados=args.dados,
+        coin_ids=args.moedas,
+        inicio=args.inicio,
+        fim=args.fim,
+        barras=args.barras,
+        features_sql=args.features_sql,
+        orcamento_p99_ms=args.orcamento_p99_ms,
+        salvar=not args.nao_salvar,
+        saida=args.saida
+    )
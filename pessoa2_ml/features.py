@@ -2,7 +2,86 @@
 import pandas as pd
 import numpy as np
 
-def criar_features(df):
+# Horizontes (em linhas; horas nas barras horárias) dos targets: um
+# target_{h}h por horizonte. 'target' continua sendo o de 24h
+HORIZONTES = [1, 6, 24]
+
+# Horizontes treinados por padrão: só o de 24h (floresta de uma saída);
+# a floresta multi-saída é opcional (--horizontes 1 6 24)
+HORIZONTES_TREINO = [24]
+
+
+def colunas_target(horizontes=HORIZONTES):
+    """Nomes das colunas de target de cada horizonte."""
+    return [f'target_{h}h' for h in horizontes]
+
+
+def ordenar_precos(df):
+    """Preços ordenados por moeda e tempo, com índice posicional (a ordem de `linha_preco`)."""
+    return df.sort_values(['coin_id', 'fetched_at']).reset_index(drop=True)
+
+
+def _features_preco(coin_df):
+    """
+    Acrescenta as 13 features de preço a `coin_df` (uma moeda, ordenada
+    por fetched_at). Só olha para o passado: serve para treino e inferência.
+    """
+    # 1. VARIAÇÕES PERCENTUAIS
+    coin_df['preco_variacao_1h'] = coin_df['price_usd'].pct_change(1)
+    coin_df['preco_variacao_6h'] = coin_df['price_usd'].pct_change(6)
+    coin_df['preco_variacao_12h'] = coin_df['price_usd'].pct_change(12)
+    coin_df['preco_variacao_24h'] = coin_df['price_usd'].pct_change(24)
+    
+    # 2. MÉDIAS MÓVEIS
+    coin_df['media_movel_6h'] = coin_df['price_usd'].rolling(window=6).mean()
+    coin_df['media_movel_12h'] = coin_df['price_usd'].rolling(window=12).mean()
+    coin_df['media_movel_24h'] = coin_df['price_usd'].rolling(window=24).mean()
+    
+    # 3. VOLATILIDADE (desvio padrão)
+    coin_df['volatilidade_6h'] = coin_df['price_usd'].rolling(window=6).std()
+    coin_df['volatilidade_24h'] = coin_df['price_usd'].rolling(window=24).std()
+    
+    # 4. MÁXIMO E MÍNIMO
+    coin_df['max_24h'] = coin_df['price_usd'].rolling(window=24).max()
+    coin_df['min_24h'] = coin_df['price_usd'].rolling(window=24).min()
+    
+    # 5. RSI (Relative Strength Index) - Indicador técnico
+    delta = coin_df['price_usd'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    
+    # Evitar divisão por zero
+    rs = gain / loss.replace(0, np.nan)
+    coin_df['rsi'] = 100 - (100 / (1 + rs))
+
+
+def features_inferencia(df):
+    """
+    Features de preço sem target, para pontuar dados com o modelo.
+
+    Diferente de `criar_features`, mantém as linhas mais recentes (que ainda
+    não têm preço futuro) e não imprime nada. Linhas sem histórico suficiente
+    para as janelas são descartadas.
+
+    Args:
+        df: DataFrame com coin_id, price_usd e fetched_at
+
+    Returns:
+        pd.DataFrame: df ordenado por moeda e tempo, com as 13 features
+    """
+    df = ordenar_precos(df)
+    partes = []
+    for _, coin_df in df.groupby('coin_id', sort=False, observed=True):
+        coin_df = coin_df.copy()
+        _features_preco(coin_df)
+        partes.append(coin_df)
+    if not partes:
+        return df
+    df_features = pd.concat(partes, ignore_index=True)
+    return df_features.dropna(subset=[c for c in df_features.columns if c not in df.columns])
+
+
+def criar_features(df, enxuto=False, horizontes=HORIZONTES, janela_lags=0):
     """
     Engenharia de features avançada para classificação.
     Cria 13 features + target para cada moeda.
@@ -14,12 +93,29 @@ def criar_features(df):
     - Máximo e mínimo (24h)
     - RSI (Relative Strength Index)
     - Target: Preço sobe nas próximas 24h?
+    - Targets por horizonte (target_1h, target_6h, ...): preço sobe nas
+      próximas h linhas? Linhas sem o preço futuro de algum horizonte são
+      descartadas junto com as demais linhas incompletas
+    
+    As janelas são contadas em linhas: só equivalem a horas quando há uma
+    linha por hora, como nas barras de pessoa1_data/barras.py (--barras).
+    
+    Com `enxuto=True` (pipeline_ml.py --enxuto) cada moeda é convertida para
+    float32 assim que suas features ficam prontas (os cálculos continuam em
+    float64) e coin_id vira categoria, reduzindo o pico de memória.
+    
+    Com `janela_lags=N` as janelas de retornos (pessoa2_ml/lags.py) não
+    viram colunas: cada linha ganha só `linha_preco`, sua posição em
+    `ordenar_precos(df)`, e as linhas com menos de N retornos da moeda saem.
+    A matriz vem depois de `montar_matriz` com `JanelaLags.de_precos`.
     """
     print("\n🧩 Criando features avançadas...")
     
     # Ordenar por moeda e timestamp
-    df = df.sort_values(['coin_id', 'fetched_at']).reset_index(drop=True)
+    df = ordenar_precos(df)
     df['fetched_at'] = pd.to_datetime(df['fetched_at'])
+    if janela_lags:
+        df['linha_preco'] = np.arange(len(df))
     
     features_list = []
     
@@ -29,45 +125,40 @@ def criar_features(df):
         
         print(f"  📊 Processando {coin}... ({len(coin_df)} registros)")
         
-        # 1. VARIAÇÕES PERCENTUAIS
-        coin_df['preco_variacao_1h'] = coin_df['price_usd'].pct_change(1)
-        coin_df['preco_variacao_6h'] = coin_df['price_usd'].pct_change(6)
-        coin_df['preco_variacao_12h'] = coin_df['price_usd'].pct_change(12)
-        coin_df['preco_variacao_24h'] = coin_df['price_usd'].pct_change(24)
-        
-        # 2. MÉDIAS MÓVEIS
-        coin_df['media_movel_6h'] = coin_df['price_usd'].rolling(window=6).mean()
-        coin_df['media_movel_12h'] = coin_df['price_usd'].rolling(window=12).mean()
-        coin_df['media_movel_24h'] = coin_df['price_usd'].rolling(window=24).mean()
-        
-        # 3. VOLATILIDADE (desvio padrão)
-        coin_df['volatilidade_6h'] = coin_df['price_usd'].rolling(window=6).std()
-        coin_df['volatilidade_24h'] = coin_df['price_usd'].rolling(window=24).std()
-        
-        # 4. MÁXIMO E MÍNIMO
-        coin_df['max_24h'] = coin_df['price_usd'].rolling(window=24).max()
-        coin_df['min_24h'] = coin_df['price_usd'].rolling(window=24).min()
-        
-        # 5. RSI (Relative Strength Index) - Indicador técnico
-        delta = coin_df['price_usd'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        
-        # Evitar divisão por zero
-        rs = gain / loss.replace(0, np.nan)
-        coin_df['rsi'] = 100 - (100 / (1 + rs))
+        # 1-5. FEATURES DE PREÇO
+        _features_preco(coin_df)
         
         # 6. TARGET: Preço sobe ou desce nas próximas 24h?
         coin_df['preco_futuro_24h'] = coin_df['price_usd'].shift(-24)
         coin_df['target'] = (coin_df['preco_futuro_24h'] > coin_df['price_usd']).astype(int)
         
+        # 7. TARGETS POR HORIZONTE (NaN sem preço futuro: a linha sai no dropna)
+        for h in horizontes:
+            futuro = coin_df['price_usd'].shift(-h)
+            coin_df[f'target_{h}h'] = (futuro > coin_df['price_usd']).astype(int).where(futuro.notna())
+        
+        # 8. JANELA DE LAGS: só linhas com `janela_lags` retornos da própria moeda
+        if janela_lags:
+            coin_df = coin_df.iloc[janela_lags:]
+        
+        if enxuto:
+            coin_df = coin_df.dropna()
+            colunas_float = coin_df.select_dtypes('float64').columns
+            coin_df = coin_df.astype({c: 'float32' for c in colunas_float} |
+                                     {c: 'int8' for c in ['target'] + colunas_target(horizontes)})
+        
         features_list.append(coin_df)
     
     # Concatenar todas as moedas
     df_features = pd.concat(features_list, ignore_index=True)
+    del features_list
+    if enxuto:
+        df_features['coin_id'] = df_features['coin_id'].astype('category')
     
     # Remover linhas com valores nulos (primeiros registros sem histórico suficiente)
     df_features = df_features.dropna()
+    if not enxuto:
+        df_features = df_features.astype({c: int for c in colunas_target(horizontes)})
     
     print(f"\n✅ Features criadas com sucesso!")
     print(f"📊 Total de registros válidos: {len(df_features)}")
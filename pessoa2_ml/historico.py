@@ -0,0 +1,222 @@
+# pessoa2_ml/historico.py
+from collections import OrderedDict
+from datetime import timedelta
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from pessoa2_ml.features import features_inferencia
+
+# Pontos devolvidos por padrão e limite por requisição
+PONTOS_PADRAO = 1000
+PONTOS_MAX = 5000
+
+
+# Histórico lido antes de `inicio` só para as janelas das features (24 linhas)
+CONTEXTO_FEATURES = timedelta(hours=48)
+
+# Cache de respostas: nº de entradas e validade das que vão até "agora"
+# (intervalos fechados no passado não expiram)
+HISTORICO_CACHE_ITENS = 128
+HISTORICO_CACHE_TTL = 60
+
+
+def lttb(x, y, n_pontos):
+    """
+    Largest-Triangle-Three-Buckets: escolhe `n_pontos` pontos que preservam
+    a forma da série (picos e vales), em vez de pegar um ponto a cada k.
+
+    O primeiro e o último ponto são mantidos; o resto é dividido em
+    n_pontos - 2 baldes e, de cada balde, fica o ponto que forma o maior
+    triângulo com o ponto escolhido no balde anterior e a média do próximo.
+
+    Args:
+        x: Array crescente (ex. tempo em segundos)
+        y: Valores da série
+        n_pontos: Pontos desejados
+
+    Returns:
+        np.ndarray: Índices (ordenados) dos pontos escolhidos
+    """
+    n = len(x)
+    if n_pontos >= n or n_pontos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bordas dos baldes (o último ponto é um "balde" sozinho)
+    bordas = np.append(np.arange(n_pontos - 1) * (n - 2) // (n_pontos - 2) + 1, n)
+    tamanhos = np.diff(bordas)
+    media_x = np.add.reduceat(x, bordas[:-1]) / tamanhos
+    media_y = np.add.reduceat(y, bordas[:-1]) / tamanhos
+
+    indices = np.empty(n_pontos, dtype=np.intp)
+    indices[0] = a = 0
+    for i in range(n_pontos - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        area = np.abs(
+            (x[a] - media_x[i + 1]) * (y[inicio:fim] - y[a])
+            - (x[a] - x[inicio:fim]) * (media_y[i + 1] - y[a])
+        )
+        a = inicio + int(np.argmax(area))
+        indices[i + 1] = a
+    indices[-1] = n - 1
+    return indices
+
+
+class HistoricoPrecos:
+    """
+    Histórico de preços de uma moeda reduzido no servidor para gráficos.
+
+    Lê ticks ou barras do backend de armazenamento, reduz a série com LTTB
+    e, nos pontos escolhidos que têm histórico suficiente para as features,
+    sobrepõe a previsão do modelo (P(subida) da saída principal; o modelo
+    vem de `obter_modelo(coin_id)`, que pode devolver None). Respostas
+    ficam num cache LRU; intervalos que terminam no passado não mudam e não
+    expiram, os que vão até agora valem `ttl` segundos.
+    """
+
+    def __init__(self, backend, obter_modelo, max_itens=HISTORICO_CACHE_ITENS, ttl=HISTORICO_CACHE_TTL):
+        self.backend = backend
+        self.obter_modelo = obter_modelo
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._lock_backend = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def _escolher_fonte(self, fonte, inicio, fim, pontos):
+        """'auto': barras quando o intervalo tem ao menos `pontos` horas (a
+        redução já parte de dados agregados); senão ticks, mais detalhados."""
+        if fonte != 'auto':
+            return fonte
+        if inicio is None:
+            return 'barras'
+        fim = fim if fim is not None else pd.Timestamp.now()
+        return 'barras' if fim - inicio >= timedelta(hours=pontos) else 'ticks'
+
+    def _ler(self, coin_id, fonte, inicio, fim):
+        leitura_inicio = inicio - CONTEXTO_FEATURES if inicio is not None else None
+        with self._lock_backend:
+            if fonte == 'barras':
+                df = self.backend.ler_barras(coin_ids=[coin_id], inicio=leitura_inicio, fim=fim)
+                if len(df):
+                    return df[['coin_id', 'price_usd', 'fetched_at']], 'barras'
+            # Sem barras materializadas: cai nos ticks
+            df = self.backend.ler_precos(coin_ids=[coin_id], inicio=leitura_inicio, fim=fim)
+        return df[['coin_id', 'price_usd', 'fetched_at']], 'ticks'
+
+    def consultar(self, coin_id, inicio=None, fim=None, pontos=PONTOS_PADRAO, fonte='auto'):
+        """
+        Série reduzida com previsões sobrepostas.
+
+        Args:
+            coin_id: Moeda
+            inicio, fim: Intervalo [inicio, fim) (None = desde o início / até agora)
+            pontos: Pontos desejados (limitado a PONTOS_MAX)
+            fonte: 'ticks', 'barras' ou 'auto' (barras se houver ao menos
+                   `pontos` horas no intervalo)
+
+        Returns:
+            dict ou None se não houver dados da moeda no intervalo
+        """
+        inicio = pd.Timestamp(inicio) if inicio is not None else None
+        fim = pd.Timestamp(fim) if fim is not None else None
+        pontos = max(3, min(int(pontos), PONTOS_MAX))
+        fonte = self._escolher_fonte(fonte, inicio, fim, pontos)
+        modelo = self.obter_modelo(coin_id)
+
+        # A versão do modelo (hash do artefato) entra na chave: uma promoção
+        # invalida o cache. id() não serve: o endereço de um modelo
+        # descartado pode ser reusado pelo próximo
+        chave = (coin_id, inicio, fim, pontos, fonte, modelo.versao if modelo is not None else None)
+        agora = time.monotonic()
+        with self._lock:
+            item = self._cache.get(chave)
+            if item is not None and (item[0] is None or agora < item[0]):
+                self._cache.move_to_end(chave)
+                self.acertos += 1
+                return dict(item[1], cache='hit')
+            self.faltas += 1
+
+        resultado = self._calcular(coin_id, inicio, fim, pontos, fonte, modelo)
+        if resultado is None:
+            return None
+
+        aberto = fim is None or fim > pd.Timestamp.now()
+        with self._lock:
+            self._cache[chave] = (agora + self.ttl if aberto else None, resultado)
+            self._cache.move_to_end(chave)
+            while len(self._cache) > self.max_itens:
+                self._cache.popitem(last=False)
+        return dict(resultado, cache='miss')
+
+    def _calcular(self, coin_id, inicio, fim, pontos, fonte, modelo):
+        df, fonte_usada = self._ler(coin_id, fonte, inicio, fim)
+        if len(df) == 0:
+            return None
+        df = df.sort_values('fetched_at').reset_index(drop=True)
+        df['fetched_at'] = pd.to_datetime(df['fetched_at'])
+
+        # Features sobre tudo o que foi lido (com o contexto); -1 = linha sem
+        # histórico suficiente para as janelas
+        linha_features = np.full(len(df), -1)
+        X = None
+        if modelo is not None:
+            df_features = features_inferencia(df)
+            if len(df_features):
+                posicoes = np.searchsorted(df['fetched_at'].to_numpy(), df_features['fetched_at'].to_numpy())
+                linha_features[posicoes] = np.arange(len(df_features))
+                X = df_features[modelo.feature_columns].to_numpy(dtype=np.float64)
+
+        visivel = df if inicio is None else df[df['fetched_at'] >= inicio]
+        if len(visivel) == 0:
+            return None
+        tempos = visivel['fetched_at'].to_numpy()
+        precos = visivel['price_usd'].to_numpy(dtype=np.float64)
+        segundos = (tempos - tempos[0]) / np.timedelta64(1, 's')
+        escolhidos = lttb(segundos, precos, pontos)
+        linhas = visivel.index.to_numpy()[escolhidos]
+
+        # Só os pontos escolhidos passam pelo modelo
+        probabilidades = [None] * len(linhas)
+        tendencias = [None] * len(linhas)
+        k = linha_features[linhas]
+        if X is not None and (k >= 0).any():
+            proba = modelo.prever_proba(X[k[k >= 0]])
+            p_subida = proba[:, list(modelo.classes).index(1)]
+            classes = modelo.classes[np.argmax(proba, axis=1)]
+            for i, p, c in zip(np.flatnonzero(k >= 0), p_subida, classes):
+                probabilidades[i] = float(p)
+                tendencias[i] = int(c)
+
+        return {
+            'coin_id': coin_id,
+            'fonte': fonte_usada,
+            'inicio': str(tempos[0]),
+            'fim': str(tempos[-1]),
+            'n_original': int(len(visivel)),
+            'n_pontos': int(len(linhas)),
+            'fetched_at': np.datetime_as_string(tempos[escolhidos], unit='s').tolist(),
+            'price_usd': precos[escolhidos].tolist(),
+            'probabilidade': probabilidades,
+            'tendencia': tendencias
+        }
+
+    def limpar(self):
+        """Esvazia o cache (ex.: modelo promovido)."""
+        with self._lock:
+            self._cache.clear()
+
+    def estatisticas(self):
+        """Uso do cache."""
+        with self._lock:
+            return {
+                'itens': len(self._cache),
+                'max_itens': self.max_itens,
+                'acertos': self.acertos,
+                'faltas': self.faltas
+            }
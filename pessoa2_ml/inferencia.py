@@ -0,0 +1,482 @@
+# pessoa2_ml/inferencia.py
+from datetime import datetime
+import numpy as np
+import hashlib
+import shutil
+import json
+import os
+
+# Caminhos dos artefatos (relativos à pasta raiz do projeto)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+MODELO_NPZ = 'modelo_crypto_classifier.npz'
+MODELO_PKL = 'modelo_crypto_classifier.pkl'
+
+# Variante menor gerada por pessoa2_ml/compressao.py e o manifesto que a põe
+# em serviço no lugar do .npz do treino (ambos na pasta da versão)
+MODELO_COMPRIMIDO = 'modelo_crypto_classifier.comprimido.npz'
+MANIFESTO_SERVICO = 'servico.json'
+
+# Versão em produção: models/ATUAL guarda o nome de uma subpasta de
+# models/versoes/ (sem o ponteiro, os artefatos ficam direto em models/)
+PONTEIRO_MODELO = 'ATUAL'
+VERSOES_DIR = 'versoes'
+
+# Versões anteriores mantidas em models/versoes/ (as mais antigas são apagadas)
+VERSOES_MANTIDAS = int(os.environ.get('MODELO_VERSOES_MANTIDAS', 3))
+
+# Modelos de uma saída (treinados antes dos horizontes) preveem só o target de 24h
+HORIZONTES_PADRAO = [24]
+
+
+class ModeloLeve:
+    """
+    Random Forest + StandardScaler avaliados só com NumPy.
+
+    As árvores do sklearn são achatadas em arrays únicos (filhos, feature,
+    limiar e probabilidade por nó). A previsão percorre todas as árvores e
+    todas as linhas ao mesmo tempo, um nível por iteração; folhas apontam
+    para si mesmas, então basta iterar `profundidade` vezes. O resultado é
+    o mesmo do `predict_proba` do sklearn (até arredondamento na média).
+
+    Florestas multi-saída (um target por horizonte) guardam, em cada folha,
+    a probabilidade de todas as saídas: um único percurso das árvores
+    responde todos os horizontes. `saida_principal` é a saída usada por
+    `prever_proba`/`prever` (o target de 24h).
+    """
+
+    def __init__(self, esquerda, direita, feature, limiar, proba, raizes, profundidade,
+                 media, escala, classes, feature_columns, baseline_drift=None,
+                 horizontes=None, saida_principal=0):
+        # Índices em intp: evita conversões a cada `take`
+        self.esquerda = np.asarray(esquerda, dtype=np.intp)
+        self.direita = np.asarray(direita, dtype=np.intp)
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.limiar = limiar
+        # (n_nos, n_saidas, n_classes); arquivos antigos têm (n_nos, n_classes)
+        self.proba = proba if proba.ndim == 3 else proba[:, None, :]
+        self.saida_principal = int(saida_principal)
+        self.horizontes = [int(h) for h in horizontes] if horizontes is not None else list(HORIZONTES_PADRAO)
+        self._proba_principal = np.ascontiguousarray(self.proba[:, self.saida_principal, :])
+        self.raizes = np.asarray(raizes, dtype=np.intp)
+        self.profundidade = int(profundidade)
+        self.media = media
+        self.escala = escala
+        self.classes = classes
+        self.feature_columns = list(feature_columns)
+        self.baseline_drift = baseline_drift
+        # Versão do artefato de origem (hash do arquivo; ver `versao_arquivo`)
+        self.versao = None
+        # Versão do .pkl do qual o .npz foi convertido (gravada no .npz)
+        self.versao_pkl = None
+
+    @classmethod
+    def de_sklearn(cls, modelo, scaler, feature_columns):
+        """
+        Converte um RandomForestClassifier + StandardScaler já treinados.
+        Só lê atributos dos objetos: não importa o sklearn. Florestas
+        multi-saída trazem os horizontes em `modelo.horizontes_`.
+        """
+        multi_saida = modelo.n_outputs_ > 1
+        saida_principal = getattr(modelo, 'saida_principal_', 0)
+        esquerda, direita, feature, limiar, proba, raizes = [], [], [], [], [], []
+        offset = 0
+        profundidade = 0
+        for arvore in modelo.estimators_:
+            t = arvore.tree_
+            ids = np.arange(t.node_count)
+            folha = t.children_left == -1
+            # Folhas apontam para si mesmas e comparam a feature 0 (resultado ignorado)
+            esquerda.append(np.where(folha, ids, t.children_left) + offset)
+            direita.append(np.where(folha, ids, t.children_right) + offset)
+            feature.append(np.where(folha, 0, t.feature))
+            limiar.append(np.where(folha, 0.0, t.threshold))
+            valores = t.value
+            soma = valores.sum(axis=2, keepdims=True)
+            soma[soma == 0] = 1.0
+            proba.append(valores / soma)
+            raizes.append(offset)
+            offset += t.node_count
+            profundidade = max(profundidade, t.max_depth)
+
+        return cls(
+            esquerda=np.concatenate(esquerda),
+            direita=np.concatenate(direita),
+            feature=np.concatenate(feature),
+            limiar=np.concatenate(limiar),
+            proba=np.concatenate(proba),
+            raizes=raizes,
+            profundidade=profundidade,
+            media=np.asarray(scaler.mean_, dtype=np.float64),
+            escala=np.asarray(scaler.scale_, dtype=np.float64),
+            classes=np.asarray(modelo.classes_[saida_principal] if multi_saida else modelo.classes_),
+            feature_columns=feature_columns,
+            baseline_drift=getattr(modelo, 'baseline_drift_', None),
+            horizontes=getattr(modelo, 'horizontes_', None),
+            saida_principal=saida_principal
+        )
+
+    def salvar(self, caminho):
+        """Salva em .npz (carregável sem pickle e sem sklearn)."""
+        extras = {}
+        if self.baseline_drift is not None:
+            extras = {
+                'drift_edges': self.baseline_drift['edges'],
+                'drift_proporcoes': self.baseline_drift['proporcoes'],
+                'drift_n_amostras': np.asarray(self.baseline_drift['n_amostras'])
+            }
+        if self.versao_pkl is not None:
+            extras['versao_pkl'] = np.asarray(self.versao_pkl)
+        np.savez(
+            caminho,
+            esquerda=self.esquerda.astype(np.int32), direita=self.direita.astype(np.int32),
+            feature=self.feature.astype(np.int32), limiar=self.limiar, proba=self.proba,
+            raizes=self.raizes.astype(np.int32),
+            profundidade=np.asarray(self.profundidade),
+            media=self.media, escala=self.escala, classes=self.classes,
+            feature_columns=np.asarray(self.feature_columns),
+            horizontes=np.asarray(self.horizontes), saida_principal=np.asarray(self.saida_principal),
+            **extras
+        )
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Carrega um modelo salvo por `salvar`."""
+        modelo = cls._carregar_npz(caminho)
+        modelo.versao = versao_arquivo(caminho)
+        return modelo
+
+    @classmethod
+    def _carregar_npz(cls, caminho):
+        with np.load(caminho, allow_pickle=False) as dados:
+            baseline = None
+            if 'drift_edges' in dados:
+                baseline = {
+                    'features': dados['feature_columns'].tolist(),
+                    'edges': dados['drift_edges'],
+                    'proporcoes': dados['drift_proporcoes'],
+                    'n_amostras': int(dados['drift_n_amostras'])
+                }
+            modelo = cls(
+                esquerda=dados['esquerda'], direita=dados['direita'], feature=dados['feature'],
+                limiar=dados['limiar'], proba=dados['proba'], raizes=dados['raizes'],
+                profundidade=dados['profundidade'], media=dados['media'], escala=dados['escala'],
+                classes=dados['classes'], feature_columns=dados['feature_columns'].tolist(),
+                baseline_drift=baseline,
+                horizontes=dados['horizontes'].tolist() if 'horizontes' in dados else None,
+                saida_principal=int(dados['saida_principal']) if 'saida_principal' in dados else 0
+            )
+            modelo.versao_pkl = _versao_pkl(dados)
+            return modelo
+
+    @property
+    def n_arvores(self):
+        return len(self.raizes)
+
+    @property
+    def n_nos(self):
+        return len(self.esquerda)
+
+    @property
+    def nbytes(self):
+        """Memória ocupada pelos arrays do modelo (o que o cache da API guarda)."""
+        arrays = [self.esquerda, self.direita, self.feature, self.limiar, self.proba,
+                  self._proba_principal, self.raizes, self.media, self.escala, self.classes]
+        return sum(np.asarray(a).nbytes for a in arrays)
+
+    def podar(self, n_arvores=None, profundidade=None):
+        """
+        Variante menor do modelo, sem retreinar.
+
+        `n_arvores` mantém só as primeiras árvores (os nós de cada árvore são
+        contíguos). `profundidade` corta todas as árvores nesse nível: nós
+        internos guardam a distribuição de classes das amostras que chegaram
+        a eles, então parar a descida ali equivale a transformá-los em folha.
+
+        Returns:
+            ModeloLeve
+        """
+        n_arvores = self.n_arvores if n_arvores is None else min(n_arvores, self.n_arvores)
+        profundidade = self.profundidade if profundidade is None else min(profundidade, self.profundidade)
+        fim = self.raizes[n_arvores] if n_arvores < self.n_arvores else self.n_nos
+        raizes = self.raizes[:n_arvores]
+
+        # Nível de cada nó até `profundidade` (-1 = abaixo do corte, descartado)
+        nivel = np.full(fim, -1)
+        nivel[raizes] = 0
+        frente = raizes
+        for k in range(1, profundidade + 1):
+            filhos = np.concatenate([self.esquerda[frente], self.direita[frente]])
+            filhos = np.unique(filhos[nivel[filhos] == -1])
+            nivel[filhos] = k
+            frente = filhos
+
+        manter = np.flatnonzero(nivel >= 0)
+        novo_indice = np.cumsum(nivel >= 0) - 1
+        esquerda = novo_indice[self.esquerda[manter]]
+        direita = novo_indice[self.direita[manter]]
+        feature = self.feature[manter]
+        limiar = self.limiar[manter]
+
+        # Nós no nível do corte viram folhas (apontam para si mesmos)
+        corte = nivel[manter] == profundidade
+        ids = np.arange(len(manter))
+        esquerda[corte] = ids[corte]
+        direita[corte] = ids[corte]
+        feature = np.where(corte, 0, feature)
+        limiar = np.where(corte, 0.0, limiar)
+
+        return ModeloLeve(
+            esquerda=esquerda, direita=direita, feature=feature, limiar=limiar,
+            proba=self.proba[manter], raizes=novo_indice[raizes], profundidade=profundidade,
+            media=self.media, escala=self.escala, classes=self.classes,
+            feature_columns=self.feature_columns, baseline_drift=self.baseline_drift,
+            horizontes=self.horizontes, saida_principal=self.saida_principal
+        )
+
+    def _folhas(self, X):
+        """
+        Folha alcançada em cada árvore.
+
+        Args:
+            X: Array (n, n_features) na escala original, na ordem de feature_columns
+
+        Returns:
+            np.ndarray (n, n_arvores) com índices de nós
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        # Mesma sequência do sklearn: padroniza em float64 e compara em float32
+        X = ((X - self.media) / self.escala).astype(np.float32).astype(np.float64)
+
+        # Índice achatado de X: linha * n_features + feature do nó
+        X_plano = X.ravel()
+        base = (np.arange(len(X)) * X.shape[1])[:, None]
+        nos = np.broadcast_to(self.raizes, (len(X), self.n_arvores))
+        for _ in range(self.profundidade):
+            vai_esquerda = X_plano.take(base + self.feature.take(nos)) <= self.limiar.take(nos)
+            nos = np.where(vai_esquerda, self.esquerda.take(nos), self.direita.take(nos))
+        return nos
+
+    def prever_proba(self, X):
+        """
+        Probabilidade de cada classe na saída principal.
+
+        Returns:
+            np.ndarray (n, n_classes)
+        """
+        return self._proba_principal.take(self._folhas(X), axis=0).mean(axis=1)
+
+    def prever_proba_horizontes(self, X):
+        """
+        Probabilidade da classe 1 em cada horizonte, num único percurso.
+
+        Returns:
+            np.ndarray (n, n_horizontes), colunas na ordem de `horizontes`
+        """
+        return self.proba.take(self._folhas(X), axis=0).mean(axis=1)[:, :, -1]
+
+    def prever_lote_horizontes(self, X):
+        """
+        Como `prever_dict_horizontes`, para várias linhas num único percurso.
+
+        Returns:
+            tuple: (classes previstas (n,), probabilidade da classe 1 na saída
+            principal (n,), probabilidade de subida por horizonte (n, n_horizontes))
+        """
+        proba = self.proba.take(self._folhas(X), axis=0).mean(axis=1)
+        principal = proba[:, self.saida_principal]
+        return self.classes[np.argmax(principal, axis=1)], principal[:, -1], proba[:, :, -1]
+
+    def prever(self, X):
+        """Classe prevista para cada linha."""
+        return self.classes[np.argmax(self.prever_proba(X), axis=1)]
+
+    def prever_dict(self, dados):
+        """
+        Previsão de uma linha recebida como dicionário {feature: valor}.
+
+        Returns:
+            tuple: (classe prevista, probabilidade da classe 1)
+        """
+        proba = self.prever_proba([dados[f] for f in self.feature_columns])[0]
+        return self.classes[np.argmax(proba)], proba[-1]
+
+    def prever_dict_horizontes(self, dados):
+        """
+        Como `prever_dict`, com a probabilidade de subida de cada horizonte
+        (mesmo percurso das árvores).
+
+        Returns:
+            tuple: (classe prevista, probabilidade da classe 1, {"1h": p, ...})
+        """
+        nos = self._folhas([dados[f] for f in self.feature_columns])[0]
+        proba = self.proba.take(nos, axis=0).mean(axis=0)
+        principal = proba[self.saida_principal]
+        por_horizonte = {f"{h}h": float(p) for h, p in zip(self.horizontes, proba[:, -1])}
+        return self.classes[np.argmax(principal)], principal[-1], por_horizonte
+
+
+def prever_sklearn(modelo, X_escalado, planejador=None):
+    """
+    Classe e probabilidade de subida de um RandomForest do sklearn na saída
+    principal. Florestas multi-saída devolvem uma lista de probabilidades
+    (uma por horizonte) em `predict_proba`.
+
+    Args:
+        planejador: PlanejadorInferencia do modelo (escolhe sequencial,
+                    threads ou processos pelo tamanho do lote); None chama
+                    o modelo direto
+
+    Returns:
+        tuple: (classes previstas, probabilidade da classe 1)
+    """
+    proba = (planejador or modelo).predict_proba(X_escalado)
+    classes = modelo.classes_
+    if isinstance(proba, list):
+        saida = getattr(modelo, 'saida_principal_', 0)
+        proba, classes = proba[saida], classes[saida]
+    return classes[np.argmax(proba, axis=1)], proba[:, -1]
+
+
+def versao_arquivo(caminho=None, conteudo=None):
+    """Versão curta de um artefato: os 12 primeiros dígitos do SHA-1 do conteúdo."""
+    if conteudo is None:
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+    return hashlib.sha1(conteudo).hexdigest()[:12]
+
+
+def pasta_modelo(models_dir=MODELS_DIR):
+    """
+    Pasta dos artefatos em produção: a versão apontada por
+    `models_dir/ATUAL` ou, sem ponteiro, a própria `models_dir`.
+    """
+    try:
+        with open(os.path.join(models_dir, PONTEIRO_MODELO)) as f:
+            versao = f.read().strip()
+    except FileNotFoundError:
+        return models_dir
+    return os.path.join(models_dir, VERSOES_DIR, versao)
+
+
+def nova_versao(models_dir=MODELS_DIR):
+    """Cria a pasta (vazia) dos artefatos de uma nova versão em models_dir/versoes/."""
+    pasta = os.path.join(models_dir, VERSOES_DIR, datetime.now().strftime('%Y%m%d-%H%M%S-%f'))
+    os.makedirs(pasta)
+    return pasta
+
+
+def publicar_versao(pasta, models_dir=MODELS_DIR, mantidas=VERSOES_MANTIDAS):
+    """
+    Coloca em produção a versão em `pasta` (de `nova_versao`, já completa).
+
+    Só o ponteiro muda, com um único rename atômico: quem resolve
+    `pasta_modelo` vê todos os artefatos antigos ou todos os novos, nunca
+    uma mistura. Das versões anteriores ficam as `mantidas` mais novas.
+    """
+    versao = os.path.basename(pasta)
+    temporario = os.path.join(models_dir, PONTEIRO_MODELO + '.tmp')
+    with open(temporario, 'w') as f:
+        f.write(versao)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, os.path.join(models_dir, PONTEIRO_MODELO))
+
+    anteriores = sorted(v for v in os.listdir(os.path.join(models_dir, VERSOES_DIR)) if v < versao)
+    for antiga in anteriores[:max(0, len(anteriores) - mantidas)]:
+        shutil.rmtree(os.path.join(models_dir, VERSOES_DIR, antiga), ignore_errors=True)
+    return versao
+
+
+def _versao_pkl(dados):
+    return str(dados['versao_pkl']) if 'versao_pkl' in dados else None
+
+
+def versao_pkl_do_npz(caminho):
+    """Versão do .pkl gravada no .npz (só essa chave é lida); None em arquivos antigos."""
+    with np.load(caminho, allow_pickle=False) as dados:
+        return _versao_pkl(dados)
+
+
+def versao_origem(models_dir):
+    """Versão do modelo treinado numa pasta: hash do .pkl (ou do .npz sem .pkl); None sem modelo."""
+    for nome in (MODELO_PKL, MODELO_NPZ):
+        caminho = os.path.join(models_dir, nome)
+        if os.path.exists(caminho):
+            return versao_arquivo(caminho)
+    return None
+
+
+def ler_manifesto(models_dir):
+    """Manifesto da variante em serviço ({arquivo, variante, origem}) ou None."""
+    try:
+        with open(os.path.join(models_dir, MANIFESTO_SERVICO)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def gravar_manifesto(models_dir, arquivo, variante, origem):
+    """Põe `arquivo` em serviço para o modelo de versão `origem` (troca atômica)."""
+    temporario = os.path.join(models_dir, MANIFESTO_SERVICO + '.tmp')
+    with open(temporario, 'w') as f:
+        json.dump({'arquivo': arquivo, 'variante': variante, 'origem': origem}, f)
+    os.replace(temporario, os.path.join(models_dir, MANIFESTO_SERVICO))
+
+
+def remover_manifesto(models_dir):
+    """Volta a servir o .npz do treino."""
+    try:
+        os.remove(os.path.join(models_dir, MANIFESTO_SERVICO))
+    except FileNotFoundError:
+        pass
+
+
+def carregar_modelo_leve(models_dir=MODELS_DIR, comprimido=True):
+    """
+    Carrega o modelo global para inferência (da versão em produção, ver
+    `pasta_modelo`; uma pasta sem ponteiro, como a do candidato, é lida direto).
+
+    Com `comprimido`, a variante do manifesto (servico.json) tem prioridade,
+    desde que tenha sido gerada a partir do modelo treinado que está na
+    pasta; um manifesto de outro modelo é ignorado.
+
+    Senão usa o .npz quando ele foi convertido do .pkl que está na pasta
+    (hash do .pkl gravado no .npz, não a data dos arquivos, que cópias e
+    checkouts mudam) ou quando não há .pkl; senão converte o pickle (aí, e
+    só aí, o sklearn é importado pelo unpickle).
+
+    Returns:
+        ModeloLeve ou None se não houver modelo treinado
+    """
+    models_dir = pasta_modelo(models_dir)
+    manifesto = ler_manifesto(models_dir) if comprimido else None
+    if manifesto is not None:
+        if manifesto['origem'] == versao_origem(models_dir):
+            return ModeloLeve.carregar(os.path.join(models_dir, manifesto['arquivo']))
+        print(f"⚠️  {MANIFESTO_SERVICO} é de outro modelo (retreinado?): usando o do treino")
+
+    caminho_npz = os.path.join(models_dir, MODELO_NPZ)
+    caminho_pkl = os.path.join(models_dir, MODELO_PKL)
+
+    if os.path.exists(caminho_npz):
+        if not os.path.exists(caminho_pkl) or versao_pkl_do_npz(caminho_npz) == versao_arquivo(caminho_pkl):
+            return ModeloLeve.carregar(caminho_npz)
+        print(f"⚠️  {MODELO_NPZ} não é do {MODELO_PKL} atual (ou é antigo, sem versão): convertendo o .pkl")
+
+    if not os.path.exists(caminho_pkl):
+        return None
+
+    import pickle
+    with open(caminho_pkl, "rb") as f:
+        conteudo = f.read()
+    modelo = pickle.loads(conteudo)
+    with open(os.path.join(models_dir, 'scaler.pkl'), "rb") as f:
+        scaler = pickle.load(f)
+    with open(os.path.join(models_dir, 'feature_columns.pkl'), "rb") as f:
+        feature_columns = pickle.load(f)
+    leve = ModeloLeve.de_sklearn(modelo, scaler, feature_columns)
+    leve.versao = versao_arquivo(conteudo=conteudo)
+    return leve
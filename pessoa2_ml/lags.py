@@ -0,0 +1,214 @@
+# pessoa2_ml/lags.py
+from numpy.lib.stride_tricks import sliding_window_view
+import pandas as pd
+import numpy as np
+import argparse
+import tracemalloc
+import time
+import sys
+import os
+
+# Prefixo das colunas da família de lags: retorno_lag_1 (último retorno) ... retorno_lag_N
+PREFIXO_LAG = 'retorno_lag_'
+
+# Linhas copiadas por vez em `materializar` (limita o buffer temporário)
+LINHAS_POR_BLOCO = 65536
+
+
+def colunas_lag(janela):
+    """Nomes das colunas de uma janela de `janela` retornos (o mais recente primeiro)."""
+    return [f'{PREFIXO_LAG}{k}' for k in range(1, janela + 1)]
+
+
+def janela_lags(feature_columns):
+    """
+    Tamanho da janela de lags pedida numa lista de features (0 = nenhuma).
+
+    A janela é configurada acrescentando `colunas_lag(N)` à lista de
+    features (ex. FEATURE_COLUMNS + colunas_lag(48)).
+
+    Raises:
+        ValueError: Se as colunas de lag não forem exatamente retorno_lag_1..N
+    """
+    lags = [c for c in feature_columns if c.startswith(PREFIXO_LAG)]
+    if lags and lags != colunas_lag(len(lags)):
+        raise ValueError(f"Colunas de lag devem ser {PREFIXO_LAG}1..{PREFIXO_LAG}{len(lags)}, em ordem")
+    return len(lags)
+
+
+class JanelaLags:
+    """
+    Últimos `janela` retornos de cada linha de preço, sem copiá-los.
+
+    Guarda um único array de retornos (uma coluna, na ordem de
+    `features.ordenar_precos`) e uma visão por strides dele
+    (`sliding_window_view`): a linha j da visão são os retornos j..j+janela-1.
+    Nenhuma janela é copiada até `materializar`, que reúne só as linhas
+    pedidas direto na matriz final.
+
+    O primeiro retorno de cada moeda é NaN (não há preço anterior dela),
+    então janelas que atravessam a fronteira entre moedas nunca são válidas:
+    `valida` marca as linhas com ao menos `janela` retornos da própria moeda.
+
+    Args:
+        retornos: Array (n,) de retornos de 1 linha, NaN no início de cada moeda
+        posicao_na_moeda: Array (n,) com a posição de cada linha dentro da sua moeda
+        janela: Número de retornos por linha
+    """
+
+    def __init__(self, retornos, posicao_na_moeda, janela):
+        self.janela = int(janela)
+        self.retornos = retornos
+        self.valida = posicao_na_moeda >= self.janela
+        # Visão (n - janela + 1, janela) com o retorno mais recente na coluna 0
+        self.janelas = sliding_window_view(retornos, self.janela)[:, ::-1]
+
+    @classmethod
+    def de_precos(cls, df, janela):
+        """
+        Monta as janelas a partir dos preços já ordenados por moeda e tempo
+        (`features.ordenar_precos`); as posições são as de `linha_preco`.
+        """
+        precos = df['price_usd'].to_numpy(dtype=np.float64)
+        moedas = pd.factorize(df['coin_id'])[0]
+        inicio = np.r_[True, moedas[1:] != moedas[:-1]]
+
+        retornos = np.empty(len(precos))
+        retornos[0] = np.nan
+        np.divide(precos[1:], precos[:-1], out=retornos[1:])
+        retornos[1:] -= 1
+        retornos[inicio] = np.nan
+
+        posicoes = np.arange(len(precos))
+        posicao_na_moeda = posicoes - np.maximum.accumulate(np.where(inicio, posicoes, 0))
+        return cls(retornos, posicao_na_moeda, janela)
+
+    @property
+    def bytes_guardados(self):
+        """Memória realmente ocupada pelas janelas (o array de retornos)."""
+        return self.retornos.nbytes
+
+    def materializar(self, linhas, out=None, dtype=np.float64):
+        """
+        Copia as janelas das `linhas` (posições de `linha_preco`) numa matriz.
+
+        Args:
+            linhas: Posições das linhas (todas precisam ser válidas)
+            out: Destino (len(linhas), janela), ex. uma fatia de colunas da
+                 matriz de treino; None aloca um novo
+
+        Returns:
+            np.ndarray (len(linhas), janela): lag 1 (retorno mais recente) primeiro
+        """
+        linhas = np.asarray(linhas)
+        if not self.valida[linhas].all():
+            raise ValueError(f"Linhas sem {self.janela} retornos da própria moeda")
+        if out is None:
+            out = np.empty((len(linhas), self.janela), dtype=dtype)
+        # Em blocos: o np.take tornaria a visão contígua (uma cópia de todas as janelas)
+        inicio_janela = linhas - (self.janela - 1)
+        for i in range(0, len(linhas), LINHAS_POR_BLOCO):
+            out[i:i + LINHAS_POR_BLOCO] = self.janelas[inicio_janela[i:i + LINHAS_POR_BLOCO]]
+        return out
+
+
+def montar_matriz(df_features, feature_columns, lags=None, dtype=np.float64):
+    """
+    Matriz de treino/previsão com as features de `feature_columns`.
+
+    As colunas comuns vêm de `df_features`; as de lag (retorno_lag_k) vêm
+    de `lags`, pela coluna `linha_preco`. A matriz é alocada uma vez e
+    preenchida no lugar: é a única cópia das janelas.
+
+    Returns:
+        np.ndarray (len(df_features), len(feature_columns)) ou o DataFrame
+        `df_features[feature_columns]` quando não há colunas de lag
+    """
+    janela = janela_lags(feature_columns)
+    if janela == 0:
+        return df_features[feature_columns]
+    if lags is None or lags.janela != janela:
+        raise ValueError(f"feature_columns pede {janela} lags: passe JanelaLags.de_precos(df, {janela})")
+
+    # Lags no fim da lista, como em FEATURE_COLUMNS + colunas_lag(N)
+    comuns = feature_columns[:len(feature_columns) - janela]
+    if comuns + colunas_lag(janela) != list(feature_columns):
+        raise ValueError("As colunas de lag devem vir depois das demais features")
+
+    X = np.empty((len(df_features), len(feature_columns)), dtype=dtype)
+    for j, coluna in enumerate(comuns):
+        X[:, j] = df_features[coluna].to_numpy()
+    lags.materializar(df_features['linha_preco'].to_numpy(), out=X[:, len(comuns):])
+    return X
+
+
+def _lags_com_shift(df, janela):
+    """Construção de referência: um `shift` por lag, uma coluna nova por lag."""
+    retornos = df.groupby('coin_id', sort=False)['price_usd'].pct_change()
+    grupos = retornos.groupby(df['coin_id'], sort=False)
+    colunas = colunas_lag(janela)
+    for k, coluna in enumerate(colunas):
+        df[coluna] = grupos.shift(k)
+    validas = df[colunas].notna().all(axis=1).to_numpy()
+    return df.loc[validas, colunas].to_numpy()
+
+
+def _medir(funcao):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, duracao, pico / 1024**2
+
+
+def comparar_com_shift(n_moedas=100, horas=8760, janelas=(24, 48, 96)):
+    """
+    Tempo e pico de memória (tracemalloc) da família de lags construída com
+    `shift` (uma coluna por lag no DataFrame) contra as janelas por strides.
+
+    Returns:
+        pd.DataFrame: Uma linha por (janela, método)
+    """
+    from pessoa1_data.backends import gerar_precos_sinteticos
+    from pessoa2_ml.features import ordenar_precos
+
+    precos = ordenar_precos(gerar_precos_sinteticos(n_moedas=n_moedas, horas=horas))
+    print(f"\n📐 Lags: {len(precos):,} linhas ({n_moedas} moedas x {horas} horas)")
+
+    linhas = []
+    for janela in janelas:
+        X_shift, t_shift, pico_shift = _medir(lambda: _lags_com_shift(precos[['coin_id', 'price_usd']].copy(), janela))
+
+        def por_strides():
+            lags = JanelaLags.de_precos(precos, janela)
+            visao_mb = tracemalloc.get_traced_memory()[0] / 1024**2
+            return lags.materializar(np.flatnonzero(lags.valida)), visao_mb
+
+        (X_visao, visao_mb), t_visao, pico_visao = _medir(por_strides)
+        if not np.array_equal(X_shift, X_visao, equal_nan=True):
+            raise AssertionError("Janelas por strides diferentes do shift")
+
+        matriz_mb = X_visao.nbytes / 1024**2
+        linhas.append({'janela': janela, 'metodo': 'shift', 'tempo_s': t_shift, 'pico_mb': pico_shift,
+                       'antes_da_matriz_mb': pico_shift, 'matriz_mb': matriz_mb})
+        linhas.append({'janela': janela, 'metodo': 'strides', 'tempo_s': t_visao, 'pico_mb': pico_visao,
+                       'antes_da_matriz_mb': visao_mb, 'matriz_mb': matriz_mb})
+        del X_shift, X_visao
+
+    resultado = pd.DataFrame(linhas)
+    print(resultado.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+    return resultado
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    parser = argparse.ArgumentParser(description="Família de lags por strides vs. shift")
+    parser.add_argument('--moedas', type=int, default=100)
+    parser.add_argument('--horas', type=int, default=8760)
+    parser.add_argument('--janelas', type=int, nargs='+', default=[24, 48, 96])
+    args = parser.parse_args()
+    comparar_com_shift(args.moedas, args.horas, args.janelas)
@@ -0,0 +1,252 @@
+# pessoa2_ml/log_previsoes.py
+from datetime import datetime
+import threading
+import queue
+import glob
+import time
+import os
+
+from pessoa2_ml.inferencia import BASE_DIR
+from pessoa2_ml.features import HORIZONTES
+from pessoa2_ml.tempo_real import COLUNAS_FEATURES
+
+# Pasta dos arquivos do log (um Parquet por rotação)
+LOG_PREVISOES_DIR = os.environ.get('LOG_PREVISOES_DIR', os.path.join(BASE_DIR, 'logs', 'previsoes'))
+
+# Registros esperando o gravador. Fila cheia = registro descartado (contado),
+# nunca espera na requisição nem memória crescendo sem limite
+LOG_MAX_PENDENTES = int(os.environ.get('LOG_MAX_PENDENTES', 10000))
+
+# Um row group é gravado a cada LOG_LINHAS_LOTE registros ou LOG_INTERVALO segundos
+LOG_LINHAS_LOTE = int(os.environ.get('LOG_LINHAS_LOTE', 5000))
+LOG_INTERVALO = float(os.environ.get('LOG_INTERVALO', 5))
+
+# O arquivo atual é fechado (e fica legível) a cada LOG_ROTACAO segundos ou LOG_LINHAS_ARQUIVO linhas
+LOG_ROTACAO = float(os.environ.get('LOG_ROTACAO', 300))
+LOG_LINHAS_ARQUIVO = int(os.environ.get('LOG_LINHAS_ARQUIVO', 500000))
+
+# Horizontes com coluna própria de probabilidade (todos os que um modelo pode ter)
+HORIZONTES_LOG = HORIZONTES
+
+# Sufixo do arquivo ainda aberto (renomeado para .parquet ao fechar)
+SUFIXO_ABERTO = '.parquet.aberto'
+
+
+def _esquema(colunas_features):
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ('registrado_em', pa.timestamp('us')),
+            ('coin_id', pa.string()),
+            ('modelo', pa.string()),
+            ('versao_modelo', pa.string()),
+            ('tendencia', pa.int8()),
+            ('probabilidade', pa.float64())
+        ]
+        + [(f'probabilidade_{h}h', pa.float64()) for h in HORIZONTES_LOG]
+        + [(coluna, pa.float64()) for coluna in colunas_features]
+    )
+
+
+class LogPrevisoes:
+    """
+    Log só de acréscimo das previsões servidas, em Parquet.
+
+    `registrar` (chamado pela requisição) só monta uma tupla e a coloca
+    numa fila limitada; uma thread gravadora junta os registros em row
+    groups e os escreve no arquivo atual, que é fechado e renomeado para
+    .parquet a cada rotação. Só arquivos fechados são lidos por
+    `ler_log_previsoes`; um encerramento abrupto perde no máximo o arquivo
+    aberto.
+
+    Args:
+        pasta: Pasta dos arquivos
+        colunas_features: Features gravadas (uma coluna cada)
+    """
+
+    def __init__(self, pasta=LOG_PREVISOES_DIR, colunas_features=COLUNAS_FEATURES,
+                 max_pendentes=LOG_MAX_PENDENTES, linhas_lote=LOG_LINHAS_LOTE, intervalo=LOG_INTERVALO,
+                 rotacao=LOG_ROTACAO, linhas_arquivo=LOG_LINHAS_ARQUIVO):
+        self.pasta = pasta
+        self.colunas_features = list(colunas_features)
+        self.linhas_lote = linhas_lote
+        self.intervalo = intervalo
+        self.rotacao = rotacao
+        self.linhas_arquivo = linhas_arquivo
+        self._fila = queue.Queue(maxsize=max_pendentes)
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._aberto_em = 0.0
+        self._linhas_arquivo_atual = 0
+        self.recebidos = 0
+        self.descartados = 0
+        self.gravados = 0
+        self.arquivos = 0
+        self.erros = 0
+        self.ultimo_erro = None
+        self._thread = threading.Thread(target=self._gravar_continuamente, name='log-previsoes', daemon=True)
+        self._thread.start()
+
+    def registrar(self, dados, resultado, coin_id=None, versao_modelo=None):
+        """
+        Enfileira uma previsão servida (não bloqueia).
+
+        Args:
+            dados: Entrada do /predict (dict com as features)
+            resultado: Saída de `prever_tendencia`
+
+        Returns:
+            bool: False se o registro foi descartado (fila cheia)
+        """
+        probabilidades = resultado.get('probabilidades') or {}
+        registro = (
+            time.time(), coin_id, resultado.get('modelo'), versao_modelo,
+            resultado['tendencia'], resultado['probabilidade'],
+            tuple(probabilidades.get(f'{h}h') for h in HORIZONTES_LOG),
+            tuple(dados.get(coluna) for coluna in self.colunas_features)
+        )
+        try:
+            self._fila.put_nowait(registro)
+        except queue.Full:
+            with self._lock:
+                self.recebidos += 1
+                self.descartados += 1
+            return False
+        with self._lock:
+            self.recebidos += 1
+        return True
+
+    def _gravar_continuamente(self):
+        lote = []
+        prazo = time.monotonic() + self.intervalo
+        while True:
+            try:
+                lote.append(self._fila.get(timeout=max(0.0, prazo - time.monotonic())))
+                while len(lote) < self.linhas_lote:
+                    lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                pass
+            parar = self._parar.is_set()
+            if len(lote) >= self.linhas_lote or time.monotonic() >= prazo or parar:
+                try:
+                    if lote:
+                        self._gravar_lote(lote)
+                    if self._arquivo is not None and (
+                        parar or self._linhas_arquivo_atual >= self.linhas_arquivo
+                        or time.monotonic() - self._aberto_em >= self.rotacao
+                    ):
+                        self._fechar_arquivo()
+                except Exception as e:
+                    # Disco cheio/sem permissão: perde o lote, mas a API continua
+                    self.erros += 1
+                    self.ultimo_erro = str(e)
+                    # O escritor não é reaproveitado depois de um erro: fecha o
+                    # arquivo (os row groups já gravados viram .parquet)
+                    if self._arquivo is not None:
+                        self._descartar_arquivo()
+                lote = []
+                prazo = time.monotonic() + self.intervalo
+                if parar and self._fila.empty():
+                    return
+
+    def _gravar_lote(self, lote):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        instantes, moedas, modelos, versoes, tendencias, probs, horizontes, features = zip(*lote)
+        colunas = [
+            pa.array([datetime.fromtimestamp(t) for t in instantes], pa.timestamp('us')),
+            pa.array(moedas, pa.string()),
+            pa.array(modelos, pa.string()),
+            pa.array(versoes, pa.string()),
+            pa.array(tendencias, pa.int8()),
+            pa.array(probs, pa.float64())
+        ]
+        colunas += [pa.array(valores, pa.float64()) for valores in zip(*horizontes)]
+        colunas += [pa.array(valores, pa.float64()) for valores in zip(*features)]
+        esquema = _esquema(self.colunas_features)
+        tabela = pa.Table.from_arrays(colunas, schema=esquema)
+
+        if self._arquivo is None:
+            os.makedirs(self.pasta, exist_ok=True)
+            nome = f"previsoes-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self.arquivos:04d}"
+            caminho = os.path.join(self.pasta, nome + SUFIXO_ABERTO)
+            try:
+                escritor = pq.ParquetWriter(caminho, esquema, compression='zstd')
+            except Exception:
+                _remover(caminho)
+                raise
+            self._arquivo = (caminho, escritor)
+            self._aberto_em = time.monotonic()
+            self._linhas_arquivo_atual = 0
+        self._arquivo[1].write_table(tabela)
+        self._linhas_arquivo_atual += len(lote)
+        self.gravados += len(lote)
+
+    def _fechar_arquivo(self):
+        caminho, escritor = self._arquivo
+        self._arquivo = None
+        try:
+            escritor.close()
+            os.replace(caminho, caminho[:-len(SUFIXO_ABERTO)] + '.parquet')
+        except Exception:
+            # Sem rodapé o arquivo não é legível: não deixa o .aberto para trás
+            _remover(caminho)
+            raise
+        self.arquivos += 1
+
+    def _descartar_arquivo(self):
+        """Fecha o arquivo atual depois de um erro, sem propagar um segundo erro."""
+        try:
+            self._fechar_arquivo()
+        except Exception as e:
+            self.ultimo_erro = str(e)
+
+    def encerrar(self, timeout=10):
+        """Grava o que está na fila e fecha o arquivo atual (encerramento da API)."""
+        self._parar.set()
+        self._thread.join(timeout)
+
+    def estatisticas(self):
+        return {
+            'pasta': self.pasta,
+            'recebidos': self.recebidos,
+            'gravados': self.gravados,
+            'descartados': self.descartados,
+            'pendentes': self._fila.qsize(),
+            'max_pendentes': self._fila.maxsize,
+            'arquivos_fechados': self.arquivos,
+            'linhas_arquivo_aberto': self._linhas_arquivo_atual if self._arquivo is not None else 0,
+            'erros': self.erros,
+            'ultimo_erro': self.ultimo_erro
+        }
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+def ler_log_previsoes(pasta=LOG_PREVISOES_DIR, inicio=None, fim=None):
+    """
+    Lê os arquivos fechados do log (para medir a acurácia ao vivo depois).
+
+    Returns:
+        pd.DataFrame ordenado por registrado_em (vazio se não houver arquivos)
+    """
+    import pandas as pd
+
+    arquivos = sorted(glob.glob(os.path.join(pasta, '*.parquet')))
+    if not arquivos:
+        return pd.DataFrame()
+    filtros = []
+    if inicio is not None:
+        filtros.append(('registrado_em', '>=', pd.Timestamp(inicio)))
+    if fim is not None:
+        filtros.append(('registrado_em', '<', pd.Timestamp(fim)))
+    df = pd.read_parquet(arquivos, filters=filtros or None)
+    return df.sort_values('registrado_em', ignore_index=True)
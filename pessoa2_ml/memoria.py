@@ -0,0 +1,122 @@
+# pessoa2_ml/memoria.py
+from contextlib import contextmanager
+import tracemalloc
+import threading
+import time
+import os
+
+# Intervalo de amostragem do RSS (segundos)
+INTERVALO_RSS = 0.01
+
+# Locais de alocação mostrados por etapa
+TOP_ALOCACOES = 3
+
+MB = 1024 * 1024
+
+
+def rss_atual():
+    """
+    Memória residente (RSS) do processo em bytes, lida de /proc/self/statm.
+    Retorna None fora do Linux.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PerfilMemoria:
+    """
+    Perfil de memória por etapa do pipeline.
+
+    Em cada etapa registra:
+    - pico de alocações rastreadas pelo tracemalloc (objetos Python e
+      buffers NumPy/pandas) acima do que já estava alocado no início;
+    - saldo de alocações ao fim da etapa e os maiores locais de alocação;
+    - pico de RSS, amostrado por uma thread a cada INTERVALO_RSS segundos
+      (pega também memória que o tracemalloc não vê, como a do sklearn em C).
+
+    Desligado (`ativo=False`), `etapa` não faz nada: sem custo no pipeline.
+    """
+
+    def __init__(self, ativo=True, intervalo=INTERVALO_RSS, top=TOP_ALOCACOES):
+        self.ativo = ativo
+        self.intervalo = intervalo
+        self.top = top
+        self.etapas = []
+
+    def _amostrar_rss(self, parar, pico):
+        while not parar.wait(self.intervalo):
+            atual = rss_atual()
+            if atual is not None and atual > pico[0]:
+                pico[0] = atual
+
+    @contextmanager
+    def etapa(self, nome):
+        """Mede o bloco `with` como uma etapa chamada `nome`."""
+        if not self.ativo:
+            yield
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        alocado_inicio, _ = tracemalloc.get_traced_memory()
+        antes = tracemalloc.take_snapshot()
+
+        rss_inicio = rss_atual() or 0
+        pico_rss = [rss_inicio]
+        parar = threading.Event()
+        amostrador = threading.Thread(target=self._amostrar_rss, args=(parar, pico_rss), daemon=True)
+        amostrador.start()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            parar.set()
+            amostrador.join()
+            alocado_fim, alocado_pico = tracemalloc.get_traced_memory()
+            rss_fim = rss_atual() or 0
+
+            diferencas = tracemalloc.take_snapshot().compare_to(antes, 'lineno')
+            maiores = [
+                (f"{os.path.basename(d.traceback[0].filename)}:{d.traceback[0].lineno}", d.size_diff)
+                for d in diferencas[:self.top] if d.size_diff > 0
+            ]
+
+            self.etapas.append({
+                'etapa': nome,
+                'duracao_s': duracao,
+                'alocado_pico_mb': (alocado_pico - alocado_inicio) / MB,
+                'alocado_saldo_mb': (alocado_fim - alocado_inicio) / MB,
+                'alocado_fim_mb': alocado_fim / MB,
+                'rss_pico_mb': max(pico_rss[0], rss_fim) / MB,
+                'rss_fim_mb': rss_fim / MB,
+                'maiores_alocacoes': maiores
+            })
+
+    def pico_total_mb(self):
+        """Maior pico de RSS entre as etapas."""
+        return max((e['rss_pico_mb'] for e in self.etapas), default=0.0)
+
+    def relatorio(self):
+        """Imprime a tabela de memória por etapa."""
+        if not self.ativo or not self.etapas:
+            return
+        print("\n" + "="*86)
+        print("🧠 PERFIL DE MEMÓRIA POR ETAPA (MB)")
+        print("="*86)
+        print(f"{'etapa':<24} {'tempo':>7} {'pico aloc.':>11} {'saldo':>9} {'em uso':>9} "
+              f"{'pico RSS':>10} {'RSS fim':>9}")
+        for e in self.etapas:
+            print(f"{e['etapa']:<24} {e['duracao_s']:>6.1f}s {e['alocado_pico_mb']:>11.1f} "
+                  f"{e['alocado_saldo_mb']:>+9.1f} {e['alocado_fim_mb']:>9.1f} "
+                  f"{e['rss_pico_mb']:>10.1f} {e['rss_fim_mb']:>9.1f}")
+            for local, tamanho in e['maiores_alocacoes']:
+                print(f"{'':<26}↳ {local} (+{tamanho / MB:.1f} MB)")
+        print("-"*86)
+        print(f"Pico de RSS do pipeline: {self.pico_total_mb():.1f} MB "
+              f"(tempos incluem o custo do tracemalloc)")
+        print("="*86)
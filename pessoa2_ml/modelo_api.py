@@ -1,8 +1,16 @@
 # pessoa2_ml/modelo_api.py
+import threading
 import pickle
-import pandas as pd
+import time
 import os
 
+# Caminho de inferência leve: só NumPy no import (pandas/sklearn ficam de fora)
+from pessoa2_ml.inferencia import carregar_modelo_leve, prever_sklearn, pasta_modelo
+from pessoa2_ml.registro_modelos import CacheModelos, CACHE_BYTES_PADRAO
+from pessoa2_ml.monitor_drift import MonitorDrift, JANELA_LINHAS
+from pessoa2_ml.sombra import ModeloSombra, promover_arquivos, CANDIDATO_DIR
+from pessoa2_ml.tempo_real import FluxoPrecos, DifusorPrevisoes
+
 # Features utilizadas no modelo (ATUALIZADAS com 13 features)
 FEATURE_COLUMNS = [
     'price_usd', 'preco_variacao_1h', 'preco_variacao_6h', 
@@ -12,6 +20,57 @@ FEATURE_COLUMNS = [
     'max_24h', 'min_24h', 'rsi'
 ]
 
+# Exemplo de entrada usado no aquecimento do modelo
+EXEMPLO_FEATURES = {
+    'price_usd': 45000.00,
+    'preco_variacao_1h': 0.02,
+    'preco_variacao_6h': 0.05,
+    'preco_variacao_12h': 0.03,
+    'preco_variacao_24h': 0.08,
+    'media_movel_6h': 44500.50,
+    'media_movel_12h': 44200.30,
+    'media_movel_24h': 43800.00,
+    'volatilidade_6h': 250.5,
+    'volatilidade_24h': 450.2,
+    'max_24h': 45500.00,
+    'min_24h': 43000.00,
+    'rsi': 65.5
+}
+
+# Modelo global em memória (ModeloLeve) e estado do aquecimento
+_modelo_leve = None
+_aquecimento = {'pronto': False}
+
+# Cache LRU dos modelos por moeda (criado no primeiro uso)
+_cache_modelos = None
+
+# Monitor de drift das entradas (criado no primeiro uso, se houver baseline)
+_monitor_drift = None
+_monitor_drift_iniciado = False
+
+# Modelo candidato em modo sombra (carregado no primeiro uso, se existir)
+_sombra = None
+_sombra_iniciada = False
+_lock_promocao = threading.Lock()
+
+# Histórico de preços para os gráficos (criado no primeiro uso)
+_historico = None
+
+# Preços ao vivo e difusão das previsões via WebSocket (criados no primeiro uso)
+_fluxo_precos = None
+
+# Snapshot das previsões atuais por moeda (criado no primeiro uso)
+_snapshot = None
+
+# Floresta do sklearn e seu planejador de execução, para o prever_batch
+# (carregados e calibrados no primeiro uso, uma vez: o lock evita duas calibrações)
+_modelo_sklearn = None
+_lock_modelo_sklearn = threading.Lock()
+
+# Log das previsões servidas (criado no primeiro uso, se LOG_PREVISOES != 0)
+_log_previsoes = None
+_log_previsoes_iniciado = False
+
 def carregar_modelo():
     """
     Carrega o modelo treinado e objetos necessários para predição.
@@ -20,9 +79,8 @@ def carregar_modelo():
         tuple: (modelo, scaler, feature_columns)
     """
     try:
-        # Caminho relativo à pasta raiz do projeto
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        models_dir = os.path.join(base_dir, 'models')
+        # Versão em produção (models/ATUAL) ou a própria models/
+        models_dir = pasta_modelo()
         
         modelo_path = os.path.join(models_dir, 'modelo_crypto_classifier.pkl')
         scaler_path = os.path.join(models_dir, 'scaler.pkl')
@@ -40,10 +98,270 @@ def carregar_modelo():
         return None, None, None
 
 
-def prever_tendencia(dados_novos):
+def obter_modelo_leve():
+    """
+    Retorna o modelo global para inferência (só NumPy), carregando-o uma
+    única vez por processo.
+    
+    Returns:
+        ModeloLeve ou None se não houver modelo treinado
+    """
+    global _modelo_leve
+    if _modelo_leve is None:
+        _modelo_leve = carregar_modelo_leve()
+    return _modelo_leve
+
+
+def aquecer_modelo():
+    """
+    Carrega o modelo global e faz uma previsão de aquecimento.
+    Chamado na inicialização da API; o /health só fica pronto depois disso.
+    
+    Returns:
+        dict: Estado do aquecimento (pronto, tempos em ms)
+    """
+    global _aquecimento
+    inicio = time.perf_counter()
+    modelo = obter_modelo_leve()
+    carregado = time.perf_counter()
+    
+    if modelo is None:
+        _aquecimento = {'pronto': False, 'erro': 'Modelo não encontrado'}
+        return _aquecimento
+    
+    modelo.prever_dict(EXEMPLO_FEATURES)
+    fim = time.perf_counter()
+    
+    _aquecimento = {
+        'pronto': True,
+        'carga_ms': round((carregado - inicio) * 1000, 2),
+        'primeira_previsao_ms': round((fim - carregado) * 1000, 2),
+        'n_arvores': modelo.n_arvores
+    }
+    print(f"🔥 Modelo aquecido: carga {_aquecimento['carga_ms']}ms, "
+          f"1ª previsão {_aquecimento['primeira_previsao_ms']}ms")
+    return _aquecimento
+
+
+def estado_aquecimento():
+    """Estado do último aquecimento (para o /health)."""
+    return dict(_aquecimento)
+
+
+def obter_cache_modelos():
+    """
+    Retorna o cache de modelos por moeda, criando-o no primeiro uso.
+    O orçamento em bytes vem da variável de ambiente MODELOS_CACHE_BYTES.
+    
+    Returns:
+        CacheModelos: Cache compartilhado pelo processo
+    """
+    global _cache_modelos
+    if _cache_modelos is None:
+        max_bytes = int(os.environ.get('MODELOS_CACHE_BYTES', CACHE_BYTES_PADRAO))
+        _cache_modelos = CacheModelos(max_bytes=max_bytes)
+    return _cache_modelos
+
+
+def obter_monitor_drift():
+    """
+    Retorna o monitor de drift das entradas, criando-o no primeiro uso a
+    partir do baseline salvo no modelo global (`baseline_drift`).
+    O tamanho da janela vem da variável de ambiente DRIFT_JANELA_LINHAS.
+    
+    Returns:
+        MonitorDrift ou None se o modelo não tiver baseline
+    """
+    global _monitor_drift, _monitor_drift_iniciado
+    if not _monitor_drift_iniciado:
+        _monitor_drift_iniciado = True
+        modelo = obter_modelo_leve()
+        baseline = modelo.baseline_drift if modelo is not None else None
+        if baseline is not None:
+            janela = int(os.environ.get('DRIFT_JANELA_LINHAS', JANELA_LINHAS))
+            _monitor_drift = MonitorDrift(baseline, janela_linhas=janela)
+    return _monitor_drift
+
+
+def obter_sombra():
+    """
+    Retorna o modelo candidato em modo sombra, carregando-o no primeiro uso
+    da pasta MODELO_CANDIDATO_DIR (padrão: models/candidato/).
+    
+    Returns:
+        ModeloSombra ou None se não houver candidato
+    """
+    global _sombra, _sombra_iniciada
+    if not _sombra_iniciada:
+        _sombra_iniciada = True
+        candidato = carregar_modelo_leve(os.environ.get('MODELO_CANDIDATO_DIR', CANDIDATO_DIR))
+        if candidato is not None:
+            _sombra = ModeloSombra(candidato)
+    return _sombra
+
+
+def encerrar_sombra():
+    """Desliga a sombra da API e só depois para o pool dela."""
+    global _sombra
+    with _lock_promocao:
+        sombra, _sombra = _sombra, None
+    if sombra is not None:
+        sombra.encerrar()
+
+
+def recarregar_candidato():
+    """
+    Troca a sombra pelo candidato que estiver agora em MODELO_CANDIDATO_DIR
+    (ex.: novo `pipeline_ml.py --candidato`), sem reiniciar a API. As
+    estatísticas recomeçam do zero.
+    
+    Returns:
+        ModeloSombra ou None se não houver candidato
+    """
+    global _sombra, _sombra_iniciada
+    with _lock_promocao:
+        antiga, _sombra = _sombra, None
+        _sombra_iniciada = False
+        sombra = obter_sombra()
+    if antiga is not None:
+        antiga.encerrar()
+    return sombra
+
+
+def _modelo_da_moeda(coin_id):
+    """Modelo dedicado da moeda, se houver; senão o global."""
+    return obter_cache_modelos().obter(coin_id) or obter_modelo_leve()
+
+
+def obter_historico():
+    """
+    Retorna o leitor de histórico de preços (LTTB + previsões), criando-o
+    no primeiro uso sobre o armazenamento de ARMAZENAMENTO_BACKEND (e
+    ARMAZENAMENTO_PARQUET). pandas e o backend só são importados aqui, fora
+    do caminho do /predict. Sem armazenamento disponível, tenta de novo na
+    próxima chamada.
+    
+    Returns:
+        HistoricoPrecos ou None se o armazenamento não estiver acessível
+    """
+    global _historico
+    if _historico is None:
+        from pessoa1_data.backends import obter_backend
+        from pessoa2_ml.historico import HistoricoPrecos
+        
+        backend = obter_backend()
+        if backend is not None:
+            _historico = HistoricoPrecos(backend, _modelo_da_moeda)
+    return _historico
+
+
+def obter_fluxo_precos():
+    """
+    Retorna o fluxo de preços ao vivo (buffers por moeda + difusor das
+    previsões para os WebSockets), criando-o no primeiro uso.
+    
+    Returns:
+        FluxoPrecos: Compartilhado pelo processo (usado no event loop da API)
+    """
+    global _fluxo_precos
+    if _fluxo_precos is None:
+        _fluxo_precos = FluxoPrecos(_modelo_da_moeda, DifusorPrevisoes())
+    return _fluxo_precos
+
+
+def obter_snapshot():
+    """
+    Retorna o snapshot da última previsão de cada moeda, criando-o no
+    primeiro uso sobre o armazenamento (se acessível) e o fluxo ao vivo.
+    SNAPSHOT_FONTE=barras lê as barras horárias em vez dos ticks.
+    
+    Returns:
+        SnapshotPrevisoes: Compartilhado pelo processo
+    """
+    global _snapshot
+    if _snapshot is None:
+        from pessoa1_data.backends import obter_backend
+        from pessoa2_ml.snapshot import SnapshotPrevisoes
+        
+        try:
+            backend = obter_backend()
+        except Exception as e:
+            print(f"⚠️  Snapshot sem armazenamento: {e}")
+            backend = None
+        _snapshot = SnapshotPrevisoes(_modelo_da_moeda, obter_modelo_leve, backend=backend,
+                                      fluxo=obter_fluxo_precos(),
+                                      barras=os.environ.get('SNAPSHOT_FONTE') == 'barras')
+    return _snapshot
+
+
+def obter_log_previsoes():
+    """
+    Retorna o log das previsões servidas pelo /predict (thread gravadora
+    de Parquet em LOG_PREVISOES_DIR), criando-o no primeiro uso.
+    
+    Returns:
+        LogPrevisoes ou None se LOG_PREVISOES=0
+    """
+    global _log_previsoes, _log_previsoes_iniciado
+    if not _log_previsoes_iniciado:
+        _log_previsoes_iniciado = True
+        if os.environ.get('LOG_PREVISOES', '1') != '0':
+            from pessoa2_ml.log_previsoes import LogPrevisoes
+            _log_previsoes = LogPrevisoes()
+    return _log_previsoes
+
+
+def promover_candidato():
+    """
+    Coloca o candidato em produção sem derrubar a API.
+    
+    Os arquivos do candidato viram uma nova versão de models/ publicada
+    pela troca atômica do ponteiro (`promover_arquivos`) e o modelo em
+    memória é trocado por uma única atribuição: requisições em andamento
+    terminam com o modelo antigo, as seguintes já usam o novo. O monitor
+    de drift é recriado com o baseline do novo modelo, e o registro por
+    moeda e o cache do histórico são recarregados. Um novo candidato é
+    carregado com `recarregar_candidato`.
+    
+    Returns:
+        dict: Versão publicada, arquivos promovidos e estatísticas finais
+        da sombra, ou None se não houver candidato
+    """
+    global _modelo_leve, _sombra, _monitor_drift, _monitor_drift_iniciado, _modelo_sklearn
+    with _lock_promocao:
+        sombra = obter_sombra()
+        if sombra is None:
+            return None
+        
+        versao, arquivos = promover_arquivos(os.environ.get('MODELO_CANDIDATO_DIR', CANDIDATO_DIR))
+        _modelo_leve = sombra.modelo
+        with _lock_modelo_sklearn:
+            antigo, _modelo_sklearn = _modelo_sklearn, None
+        if antigo is not None:
+            # Os pools do planejador antigo guardam cópias da floresta antiga
+            antigo[3].encerrar()
+        _monitor_drift = None
+        _monitor_drift_iniciado = False
+        if _cache_modelos is not None:
+            _cache_modelos.recarregar_indice()
+        if _historico is not None:
+            _historico.limpar()
+        # Desliga da API antes de encerrar: novas requisições já não a veem,
+        # e as que a pegaram antes têm o envio ignorado (ModeloSombra.enviar)
+        _sombra = None
+        sombra.encerrar()
+    
+    print(f"🚀 Candidato promovido ({sombra.modelo.n_arvores} árvores): versão {versao}, {arquivos}")
+    return {'versao': versao, 'arquivos': arquivos, 'sombra': sombra.estatisticas()}
+
+
+def prever_tendencia(dados_novos, coin_id=None):
     """
     Faz previsão de tendência para novos dados.
     
+    Se `coin_id` tiver modelo próprio no registro (models/registro/), ele é
+    usado; caso contrário, a previsão cai no modelo global.
+    
     Args:
         dados_novos (dict): Dicionário com as 13 features necessárias
             Exemplo: {
@@ -61,21 +379,36 @@ def prever_tendencia(dados_novos):
                 'min_24h': 43000.00,
                 'rsi': 65.5
             }
+        coin_id (str, opcional): Moeda, para escolher o modelo dedicado
     
     Returns:
         dict: {
             'tendencia': int (0 ou 1),
             'probabilidade': float (0.0 a 1.0),
             'previsao_texto': str,
-            'confianca': str
+            'confianca': str,
+            'modelo': str ('global' ou 'moeda:<coin_id>'),
+            'versao_modelo': str (hash do arquivo do modelo),
+            'probabilidades': dict ({"1h": p, "6h": p, "24h": p}: probabilidade
+                              de subida por horizonte, do mesmo percurso das
+                              árvores; modelos de uma saída só têm "24h")
         }
     """
-    modelo, scaler, features = carregar_modelo()
+    modelo = None
+    origem = 'global'
+    if coin_id is not None:
+        modelo = obter_cache_modelos().obter(coin_id)
+        origem = f'moeda:{coin_id}'
+    
+    if modelo is None:
+        modelo = obter_modelo_leve()
+        origem = 'global'
     
     if modelo is None:
         return {'erro': 'Modelo não encontrado'}
     
     # Validar se todas as features necessárias estão presentes
+    features = modelo.feature_columns
     missing_features = [f for f in features if f not in dados_novos]
     if missing_features:
         return {
@@ -83,16 +416,8 @@ def prever_tendencia(dados_novos):
             'features_necessarias': features
         }
     
-    # Criar DataFrame com os dados
-    df = pd.DataFrame([dados_novos])
-    X = df[features]
-    
-    # Normalizar dados
-    X_scaled = scaler.transform(X)
-    
-    # Fazer previsão
-    previsao = modelo.predict(X_scaled)[0]
-    probabilidade = modelo.predict_proba(X_scaled)[0, 1]
+    # Normalização + previsão (NumPy, sem montar DataFrame)
+    previsao, probabilidade, probabilidades = modelo.prever_dict_horizontes(dados_novos)
     
     # Interpretar resultado
     previsao_texto = "⬆️  SUBIDA" if previsao == 1 else "⬇️  QUEDA"
@@ -101,10 +426,37 @@ def prever_tendencia(dados_novos):
         'tendencia': int(previsao),
         'probabilidade': float(probabilidade),
         'previsao_texto': previsao_texto,
-        'confianca': f"{probabilidade * 100:.2f}%"
+        'confianca': f"{probabilidade * 100:.2f}%",
+        'modelo': origem,
+        'versao_modelo': modelo.versao,
+        'probabilidades': probabilidades
     }
 
 
+def obter_modelo_sklearn():
+    """
+    Retorna a floresta do sklearn com o planejador de execução calibrado
+    nesta máquina (pessoa2_ml/planejador.py), carregando-os uma única vez
+    por processo.
+    
+    Returns:
+        tuple: (modelo, scaler, feature_columns, PlanejadorInferencia) ou
+        None se não houver modelo treinado
+    """
+    global _modelo_sklearn
+    with _lock_modelo_sklearn:
+        if _modelo_sklearn is None:
+            from pessoa2_ml.planejador import PlanejadorInferencia
+            
+            modelo, scaler, features = carregar_modelo()
+            if modelo is None:
+                return None
+            planejador = PlanejadorInferencia(modelo)
+            print(f"🧭 Planejador calibrado em {planejador.tempo_calibracao_s}s: {planejador.limiares}")
+            _modelo_sklearn = (modelo, scaler, features, planejador)
+        return _modelo_sklearn
+
+
 def prever_batch(df_dados):
     """
     Faz previsões para múltiplos registros de uma vez.
@@ -115,11 +467,12 @@ def prever_batch(df_dados):
     Returns:
         pd.DataFrame: DataFrame original com colunas de previsão adicionadas
     """
-    modelo, scaler, features = carregar_modelo()
+    carregado = obter_modelo_sklearn()
     
-    if modelo is None:
+    if carregado is None:
         print("❌ Erro ao carregar modelo")
         return df_dados
+    modelo, scaler, features, planejador = carregado
     
     # Verificar se todas as features estão presentes
     missing_features = [f for f in features if f not in df_dados.columns]
@@ -133,13 +486,12 @@ def prever_batch(df_dados):
     X_scaled = scaler.transform(X)
     
     # Fazer previsões
-    df_dados['previsao'] = modelo.predict(X_scaled)
-    df_dados['probabilidade'] = modelo.predict_proba(X_scaled)[:, 1]
+    df_dados['previsao'], df_dados['probabilidade'] = prever_sklearn(modelo, X_scaled, planejador)
     df_dados['previsao_texto'] = df_dados['previsao'].apply(
         lambda x: "⬆️  SUBIDA" if x == 1 else "⬇️  QUEDA"
     )
     
-    print(f"✅ Previsões realizadas para {len(df_dados)} registros")
+    print(f"✅ Previsões realizadas para {len(df_dados)} registros (plano: {planejador.escolher(len(df_dados))})")
     
     # Estatísticas
     subidas = (df_dados['previsao'] == 1).sum()
@@ -157,9 +509,8 @@ def verificar_modelo():
     Returns:
         dict: Status dos arquivos do modelo
     """
-    # Caminho relativo à pasta raiz do projeto
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    models_dir = os.path.join(base_dir, 'models')
+    # Versão em produção (models/ATUAL) ou a própria models/
+    models_dir = pasta_modelo()
     
     arquivos = {
         'modelo': os.path.join(models_dir, 'modelo_crypto_classifier.pkl'),
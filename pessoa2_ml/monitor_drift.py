@@ -0,0 +1,180 @@
+# pessoa2_ml/monitor_drift.py
+from bisect import bisect_left
+import numpy as np
+import threading
+
+# Número de faixas (bins) por feature no histograma
+N_BINS = 20
+
+# Linhas por janela do monitor: o score usa a janela atual + a anterior
+JANELA_LINHAS = 10000
+
+# Limiares usuais de PSI
+PSI_MODERADO = 0.1
+PSI_SIGNIFICATIVO = 0.25
+
+# Suavização para faixas vazias (evita log(0) no PSI)
+_EPS = 1e-4
+
+
+def _indices_faixas(X, edges):
+    """
+    Faixa de cada valor, feature a feature, em uma única operação.
+
+    Args:
+        X: np.ndarray (n, n_features)
+        edges: np.ndarray (n_features, n_bins - 1) com os cortes internos
+
+    Returns:
+        np.ndarray (n, n_features) com índices em [0, n_bins - 1]
+    """
+    return (X[:, :, None] > edges[None, :, :]).sum(axis=2)
+
+
+def criar_baseline(X, feature_columns, n_bins=N_BINS):
+    """
+    Snapshot da distribuição de treino usado como referência do monitor.
+
+    Os cortes são os quantis de cada feature no treino, então cada faixa
+    tem ~1/n_bins dos dados de referência.
+
+    Args:
+        X: Features de treino (DataFrame ou array), na escala original
+        feature_columns: Nomes das colunas, na ordem de X
+        n_bins: Número de faixas por feature
+
+    Returns:
+        dict: {'features', 'edges', 'proporcoes', 'n_amostras'}
+    """
+    X = np.asarray(X, dtype=np.float64)
+    quantis = np.linspace(0, 1, n_bins + 1)[1:-1]
+    edges = np.quantile(X, quantis, axis=0).T.copy()
+
+    idx = _indices_faixas(X, edges)
+    contagens = np.zeros((X.shape[1], n_bins), dtype=np.int64)
+    for j in range(X.shape[1]):
+        contagens[j] = np.bincount(idx[:, j], minlength=n_bins)
+
+    return {
+        'features': list(feature_columns),
+        'edges': edges,
+        'proporcoes': contagens / max(len(X), 1),
+        'n_amostras': len(X)
+    }
+
+
+class MonitorDrift:
+    """
+    Monitor de drift das features de entrada com memória constante.
+
+    Mantém, para cada feature, um histograma de contagens nas mesmas faixas
+    do baseline. São duas janelas de `janela_linhas` linhas: ao encher a
+    atual, ela vira a anterior e a mais antiga é descartada. O tráfego já
+    visto nunca é guardado, só as contagens.
+
+    As contagens ficam numa lista Python achatada (feature x faixa): para
+    uma linha só, `bisect` em listas custa menos que montar arrays NumPy,
+    e é o caso do /predict. Lotes usam o caminho vetorizado.
+    """
+
+    def __init__(self, baseline, janela_linhas=JANELA_LINHAS):
+        self.features = baseline['features']
+        self.edges = baseline['edges']
+        self.referencia = baseline['proporcoes']
+        self.janela_linhas = janela_linhas
+        self.n_bins = self.referencia.shape[1]
+        n_features = len(self.features)
+
+        self._tamanho = n_features * self.n_bins
+        self._atual = [0] * self._tamanho
+        self._anterior = [0] * self._tamanho
+        self._n_atual = 0
+        self._n_anterior = 0
+        self._total = 0
+        # Deslocamento de cada feature no vetor achatado de contagens
+        self._offsets = np.arange(n_features) * self.n_bins
+        self._bases = self._offsets.tolist()
+        self._edges_lista = self.edges.tolist()
+        self._lock = threading.Lock()
+
+    def _avancar(self, n):
+        """Conta `n` linhas e gira as janelas se a atual encheu (com o lock)."""
+        self._n_atual += n
+        self._total += n
+        if self._n_atual >= self.janela_linhas:
+            self._anterior = self._atual
+            self._atual = [0] * self._tamanho
+            self._n_anterior, self._n_atual = self._n_atual, 0
+
+    def registrar_linha(self, linha):
+        """
+        Registra uma única linha (lista de floats na ordem de `features`).
+        """
+        with self._lock:
+            contagens = self._atual
+            for base, valor, edges in zip(self._bases, linha, self._edges_lista):
+                contagens[base + bisect_left(edges, valor)] += 1
+            self._avancar(1)
+
+    def registrar_dict(self, dados):
+        """Registra uma linha recebida como dicionário {feature: valor}."""
+        self.registrar_linha([dados[f] for f in self.features])
+
+    def registrar(self, X):
+        """
+        Registra um lote de linhas de forma vetorizada.
+
+        Args:
+            X: Array (n, n_features), na ordem de `features`
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        idx = _indices_faixas(X, self.edges) + self._offsets
+        contagens = np.bincount(idx.ravel(), minlength=self._tamanho).tolist()
+
+        with self._lock:
+            self._atual = [a + c for a, c in zip(self._atual, contagens)]
+            self._avancar(len(X))
+
+    def scores(self):
+        """
+        Calcula PSI e KS por feature contra o baseline.
+
+        O KS é aproximado pelas CDFs dos histogramas (máxima diferença
+        entre as proporções acumuladas nas faixas).
+
+        Returns:
+            dict: {'n_linhas', 'n_total', 'features': {nome: {psi, ks, status}}}
+        """
+        with self._lock:
+            contagens = np.add(self._atual, self._anterior).reshape(-1, self.n_bins)
+            n = self._n_atual + self._n_anterior
+            total = self._total
+
+        resultado = {'n_linhas': int(n), 'n_total': int(total), 'features': {}}
+        if n == 0:
+            return resultado
+
+        atual = np.clip(contagens / n, _EPS, None)
+        ref = np.clip(self.referencia, _EPS, None)
+        psi = ((atual - ref) * np.log(atual / ref)).sum(axis=1)
+        ks = np.abs(np.cumsum(contagens / n, axis=1) - np.cumsum(self.referencia, axis=1)).max(axis=1)
+
+        for nome, p, k in zip(self.features, psi, ks):
+            if p >= PSI_SIGNIFICATIVO:
+                status = 'significativo'
+            elif p >= PSI_MODERADO:
+                status = 'moderado'
+            else:
+                status = 'estável'
+            resultado['features'][nome] = {'psi': float(p), 'ks': float(k), 'status': status}
+        return resultado
+
+    def resetar(self):
+        """Zera as contagens (ex.: após trocar o modelo)."""
+        with self._lock:
+            self._atual = [0] * self._tamanho
+            self._anterior = [0] * self._tamanho
+            self._n_atual = self._n_anterior = self._total = 0
@@ -0,0 +1,348 @@
+# pessoa2_ml/painel.py
+import pandas as pd
+import numpy as np
+import argparse
+import time
+
+# Janela (em linhas da grade) das features cruzadas e moeda de referência
+JANELA_CRUZADA = 24
+MOEDA_REFERENCIA = 'bitcoin'
+
+# Intervalo das linhas da grade: os ticks de moedas diferentes nunca caem no
+# mesmo instante, então a grade é por hora (e as janelas contam horas)
+FREQUENCIA_PAINEL = 'h'
+
+FEATURES_CRUZADAS = [
+    'corr_btc_24h',           # correlação móvel dos retornos de 1 linha com a referência
+    'retorno_rel_btc_24h',    # variação 24 linhas da moeda menos a da referência
+    'rank_retorno_24h',       # posição da variação 24 entre as moedas (0 = pior, 1 = melhor)
+    'zscore_retorno_24h',     # variação 24 padronizada entre as moedas no mesmo instante
+    'amplitude_mercado_24h'   # fração das moedas com variação 24 positiva
+]
+
+
+class Painel:
+    """
+    Preços de várias moedas numa grade de tempo comum.
+
+    `valores` é uma matriz (n_tempos, n_moedas) e `valido` diz quais células
+    têm preço (moedas começam em datas diferentes e podem ter lacunas).
+    Montado uma vez a partir do formato longo (uma linha por moeda e
+    instante), permite calcular features entre moedas com operações sobre
+    a matriz inteira, sem merge por instante nem laço por moeda.
+
+    As janelas contam linhas da grade: com `frequencia='h'` (padrão) cada
+    linha é uma hora.
+    """
+
+    def __init__(self, tempos, moedas, valores, valido, instantes=None, posicoes=None):
+        self.tempos = tempos
+        self.moedas = moedas
+        self.valores = valores
+        self.valido = valido
+        # Instante real da linha de origem de cada célula (NaT onde não há)
+        self.instantes = instantes
+        # (linha da grade, coluna, linha de origem) usados em `grade`
+        self._posicoes = posicoes
+
+    @classmethod
+    def de_longo(cls, df, coluna='price_usd', frequencia=FREQUENCIA_PAINEL):
+        """
+        Args:
+            df: DataFrame longo com coin_id, fetched_at e `coluna`
+            frequencia: Arredonda fetched_at para baixo (ex.: 'h') e fica com
+                        o último valor de cada moeda no intervalo; None usa
+                        os instantes exatos (só para dados já alinhados)
+
+        Returns:
+            Painel
+        """
+        exatos = pd.to_datetime(df['fetched_at'])
+        instantes = exatos.dt.floor(frequencia) if frequencia is not None else exatos
+        t = instantes.to_numpy()
+        codigos, moedas = pd.factorize(df['coin_id'], sort=True)
+        i, tempos = pd.factorize(t, sort=True)
+
+        # Ordem estável pelo instante exato: no mesmo intervalo fica o último valor
+        ordem = np.argsort(exatos.to_numpy(), kind='stable')
+        posicoes = (i[ordem], codigos[ordem], ordem)
+        valores = np.full((len(tempos), len(moedas)), np.nan)
+        valores[posicoes[0], posicoes[1]] = df[coluna].to_numpy(dtype=np.float64)[ordem]
+        origem = np.full(valores.shape, np.datetime64('NaT'), dtype=exatos.to_numpy().dtype)
+        origem[posicoes[0], posicoes[1]] = exatos.to_numpy()[ordem]
+        return cls(tempos, np.asarray(moedas), valores, ~np.isnan(valores), origem, posicoes)
+
+    def grade(self, valores):
+        """
+        Outra coluna do DataFrame de origem na mesma grade (mesma célula
+        escolhida para cada moeda e intervalo que em `valores`).
+
+        Args:
+            valores: Array alinhado às linhas do DataFrame passado a `de_longo`
+
+        Returns:
+            np.ndarray (n_tempos, n_moedas), NaN onde a moeda não tem linha
+        """
+        linhas, colunas, ordem = self._posicoes
+        matriz = np.full(self.valores.shape, np.nan)
+        matriz[linhas, colunas] = np.asarray(valores, dtype=np.float64)[ordem]
+        return matriz
+
+    def coluna(self, coin_id):
+        """Índice da moeda na matriz."""
+        posicao = np.flatnonzero(self.moedas == coin_id)
+        if len(posicao) == 0:
+            raise ValueError(f"Moeda {coin_id} não está no painel")
+        return int(posicao[0])
+
+    def variacao(self, passos):
+        """Variação percentual de `passos` linhas (NaN se um dos preços falta)."""
+        resultado = np.full_like(self.valores, np.nan)
+        resultado[passos:] = self.valores[passos:] / self.valores[:-passos] - 1
+        return resultado
+
+    def para_longo(self, colunas):
+        """
+        Volta para o formato longo (só células com preço), ordenado por
+        moeda e tempo como o resto do pipeline.
+
+        Args:
+            colunas: dict {nome: matriz (n_tempos, n_moedas) ou vetor (n_tempos,)}
+        """
+        # Máscara transposta: percorre moeda a moeda, tempo a tempo
+        mascara = self.valido.T
+        dados = {
+            'coin_id': np.repeat(self.moedas, mascara.sum(axis=1)),
+            'fetched_at': np.broadcast_to(self.tempos, mascara.shape)[mascara]
+        }
+        for nome, matriz in colunas.items():
+            if matriz.ndim == 1:
+                matriz = matriz[:, None]
+            dados[nome] = np.broadcast_to(matriz, self.valores.shape).T[mascara]
+        return pd.DataFrame(dados)
+
+
+def _soma_movel(a, janela):
+    """Soma das últimas `janela` linhas (coluna a coluna); NaN nas primeiras."""
+    resultado = np.full(a.shape, np.nan)
+    if len(a) < janela:
+        return resultado
+    acumulado = np.cumsum(a, axis=0)
+    resultado[janela - 1] = acumulado[janela - 1]
+    resultado[janela:] = acumulado[janela:] - acumulado[:-janela]
+    return resultado
+
+
+def correlacao_movel(x, y, janela):
+    """
+    Correlação de Pearson móvel entre cada coluna de `x` e o vetor `y`,
+    para todas as colunas de uma vez (somas móveis por cumsum). Janelas com
+    algum NaN (ou inf) em x ou y dão NaN, como o rolling().corr() do pandas.
+    """
+    y = np.broadcast_to(y[:, None], x.shape)
+    valido = np.isfinite(x) & np.isfinite(y)
+    x0, y0 = np.where(valido, x, 0.0), np.where(valido, y, 0.0)
+    n = _soma_movel(valido.astype(np.float64), janela)
+    sx, sy = _soma_movel(x0, janela), _soma_movel(y0, janela)
+    sxy, sxx, syy = _soma_movel(x0 * y0, janela), _soma_movel(x0 * x0, janela), _soma_movel(y0 * y0, janela)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = janela * sxy - sx * sy
+        var = (janela * sxx - sx * sx) * (janela * syy - sy * sy)
+        corr = cov / np.sqrt(np.maximum(var, 0))
+    corr[n < janela] = np.nan
+    return corr
+
+
+def rank_entre_moedas(x):
+    """
+    Posição de cada moeda entre as válidas do mesmo instante, de 0 (menor)
+    a 1 (maior); empates na ordem das colunas. NaN onde x é NaN ou há
+    menos de 2 moedas válidas.
+    """
+    invalido = np.isnan(x)
+    ordem = np.argsort(np.where(invalido, np.inf, x), axis=1, kind='stable')
+    posicao = np.empty(x.shape)
+    np.put_along_axis(posicao, ordem, np.broadcast_to(np.arange(x.shape[1], dtype=np.float64), x.shape), axis=1)
+    n = (~invalido).sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        resultado = posicao / (n - 1)
+    resultado[invalido | (n < 2)] = np.nan
+    return resultado
+
+
+def zscore_entre_moedas(x):
+    """(x - média) / desvio padrão amostral das moedas válidas no mesmo instante."""
+    valido = ~np.isnan(x)
+    n = valido.sum(axis=1, keepdims=True)
+    x0 = np.where(valido, x, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = x0.sum(axis=1, keepdims=True) / n
+        desvio = np.sqrt(np.where(valido, (x - media) ** 2, 0.0).sum(axis=1, keepdims=True) / (n - 1))
+        resultado = (x - media) / desvio
+    resultado[~valido | (n < 2)] = np.nan
+    return resultado
+
+
+def calcular_features_cruzadas(painel, janela=JANELA_CRUZADA, referencia=MOEDA_REFERENCIA):
+    """
+    Features entre moedas sobre o painel de preços.
+
+    Returns:
+        dict {nome: matriz (n_tempos, n_moedas)} com FEATURES_CRUZADAS
+    """
+    ref = painel.coluna(referencia)
+    retorno_1 = painel.variacao(1)
+    retorno_janela = painel.variacao(janela)
+    validos = ~np.isnan(retorno_janela)
+    n_validos = validos.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        amplitude = (validos & (retorno_janela > 0)).sum(axis=1) / n_validos
+
+    return {
+        'corr_btc_24h': correlacao_movel(retorno_1, retorno_1[:, ref], janela),
+        'retorno_rel_btc_24h': retorno_janela - retorno_janela[:, [ref]],
+        'rank_retorno_24h': rank_entre_moedas(retorno_janela),
+        'zscore_retorno_24h': zscore_entre_moedas(retorno_janela),
+        'amplitude_mercado_24h': np.broadcast_to(amplitude[:, None], retorno_janela.shape)
+    }
+
+
+def features_cruzadas(df, janela=JANELA_CRUZADA, referencia=MOEDA_REFERENCIA, frequencia=FREQUENCIA_PAINEL):
+    """
+    Features entre moedas no formato longo (coin_id, fetched_at + FEATURES_CRUZADAS),
+    uma linha por moeda e intervalo da grade (`fetched_at` = início do intervalo).
+    Linhas sem histórico suficiente ficam com NaN.
+
+    Args:
+        df: DataFrame longo com coin_id, price_usd e fetched_at (ticks ou barras)
+        janela: Linhas da grade nas janelas (24 = 24h com frequencia='h')
+        referencia: coin_id usado na correlação e no retorno relativo
+        frequencia: Ver Painel.de_longo
+    """
+    painel = Painel.de_longo(df, frequencia=frequencia)
+    return painel.para_longo(calcular_features_cruzadas(painel, janela, referencia))
+
+
+def adicionar_features_cruzadas(df_features, janela=JANELA_CRUZADA, referencia=MOEDA_REFERENCIA,
+                                frequencia=FREQUENCIA_PAINEL):
+    """
+    Acrescenta FEATURES_CRUZADAS a um DataFrame de `criar_features`.
+
+    Uma linha da grade só está completa no último tick de qualquer moeda
+    nela (rank, z-score e correlação usam todas). Cada linha recebe as
+    features da célula mais recente da sua moeda já completa no instante
+    dela: ticks do meio de uma hora ficam com a hora anterior, nunca com
+    um preço futuro. Sobre barras alinhadas é o mesmo que o merge exato.
+    """
+    painel = Painel.de_longo(df_features, frequencia=frequencia)
+    colunas = calcular_features_cruzadas(painel, janela, referencia)
+    # NaT é o menor int64: o máximo da linha ignora as células vazias
+    completa_em = painel.instantes.view('int64').max(axis=1).view(painel.instantes.dtype)
+    cruzadas = painel.para_longo({**colunas, 'instante_origem': completa_em}).drop(columns='fetched_at')
+
+    df_features = df_features.assign(fetched_at=pd.to_datetime(df_features['fetched_at']))
+    ordem = np.argsort(df_features['fetched_at'].to_numpy(), kind='stable')
+    juntos = pd.merge_asof(
+        df_features.iloc[ordem], cruzadas.sort_values('instante_origem'),
+        left_on='fetched_at', right_on='instante_origem', by='coin_id', direction='backward'
+    )
+    juntos.index = df_features.index[ordem]
+    return juntos.drop(columns='instante_origem').loc[df_features.index]
+
+
+def _features_cruzadas_longo(df, janela=JANELA_CRUZADA, referencia=MOEDA_REFERENCIA):
+    """As mesmas features em pandas no formato longo (groupby + merge), para comparação."""
+    df = df.sort_values(['coin_id', 'fetched_at']).reset_index(drop=True)
+    precos = df.groupby('coin_id')['price_usd']
+    df['retorno_1'] = precos.pct_change(1)
+    df['retorno_janela'] = precos.pct_change(janela)
+    ref = df.loc[df['coin_id'] == referencia, ['fetched_at', 'retorno_1', 'retorno_janela']]
+    df = df.merge(ref.rename(columns={'retorno_1': 'ref_1', 'retorno_janela': 'ref_janela'}),
+                  on='fetched_at', how='left')
+
+    df['corr_btc_24h'] = df.groupby('coin_id', group_keys=False)[['retorno_1', 'ref_1']].apply(
+        lambda d: d['retorno_1'].rolling(janela).corr(d['ref_1'])
+    )
+    df['retorno_rel_btc_24h'] = df['retorno_janela'] - df['ref_janela']
+    no_instante = df.groupby('fetched_at')['retorno_janela']
+    contagem = no_instante.transform('count')
+    df['rank_retorno_24h'] = (no_instante.rank(method='first') - 1) / (contagem - 1)
+    df['zscore_retorno_24h'] = (df['retorno_janela'] - no_instante.transform('mean')) / no_instante.transform('std')
+    df['amplitude_mercado_24h'] = (df['retorno_janela'] > 0).groupby(df['fetched_at']).transform('sum') / contagem
+    return df[['coin_id', 'fetched_at'] + FEATURES_CRUZADAS]
+
+
+def _precos_correlacionados(n_moedas, horas, seed=42):
+    """
+    Preços horários sintéticos com um fator de mercado comum (correlações
+    não triviais com o bitcoin) e inícios escalonados (exercita a máscara).
+    """
+    rng = np.random.default_rng(seed)
+    datas = pd.date_range(end=pd.Timestamp.now().floor('h'), periods=horas, freq='h')
+    mercado = rng.normal(0, 0.01, horas)
+    betas = rng.uniform(0, 1.5, n_moedas)
+    betas[0] = 1.0
+    retornos = mercado[:, None] * betas + rng.normal(0, 0.01, (horas, n_moedas))
+    precos = 100.0 * np.exp(np.cumsum(retornos, axis=0))
+    moedas = ['bitcoin'] + [f'moeda_{i:03d}' for i in range(1, n_moedas)]
+    df = pd.DataFrame({
+        'coin_id': np.repeat(moedas, horas),
+        'price_usd': precos.T.ravel(),
+        'fetched_at': np.tile(datas, n_moedas)
+    })
+    inicio = np.repeat(datas[(np.arange(n_moedas) * 7) % (horas // 2)], horas)
+    return df[df['fetched_at'].to_numpy() >= inicio].reset_index(drop=True)
+
+
+def comparar_com_formato_longo(lista_moedas=(5, 20, 50, 100, 200), horas=4000, janela=JANELA_CRUZADA):
+    """
+    Tempo das features cruzadas no painel vs pandas no formato longo,
+    conforme o número de moedas cresce (preços sintéticos horários).
+    Confere também que os dois caminhos dão os mesmos valores.
+    """
+    print("\n" + "="*78)
+    print("🧮 FEATURES CRUZADAS: PAINEL (NumPy) vs FORMATO LONGO (pandas)")
+    print("="*78)
+    print(f"{'moedas':>7} {'linhas':>9} {'montar':>8} {'features':>9} {'painel':>8} {'longo':>8} "
+          f"{'ganho':>6} {'dif. máx':>9}")
+    resultados = []
+    for n_moedas in lista_moedas:
+        df = _precos_correlacionados(n_moedas, horas)
+
+        t0 = time.perf_counter()
+        painel = Painel.de_longo(df)
+        t1 = time.perf_counter()
+        matrizes = calcular_features_cruzadas(painel, janela)
+        t_features = time.perf_counter() - t1
+        cruzadas = painel.para_longo(matrizes)
+        t2 = time.perf_counter()
+        longo = _features_cruzadas_longo(df, janela)
+        t3 = time.perf_counter()
+
+        a = cruzadas[FEATURES_CRUZADAS].to_numpy()
+        b = longo[FEATURES_CRUZADAS].to_numpy()
+        mesmos_nans = bool((np.isnan(a) == np.isnan(b)).all())
+        ambos = ~np.isnan(a) & ~np.isnan(b)
+        diferenca = float(np.abs(a[ambos] - b[ambos]).max()) if ambos.any() else 0.0
+
+        tempo_painel = t2 - t0
+        resultados.append({'moedas': n_moedas, 'linhas': len(df), 'montar_s': t1 - t0,
+                           'features_s': t_features, 'painel_s': tempo_painel, 'longo_s': t3 - t2,
+                           'diferenca_max': diferenca, 'mesmos_nans': mesmos_nans})
+        print(f"{n_moedas:>7} {len(df):>9} {t1 - t0:>7.3f}s {t_features:>8.3f}s {tempo_painel:>7.3f}s "
+              f"{t3 - t2:>7.3f}s {(t3 - t2) / tempo_painel:>5.1f}x {diferenca:>9.1e}"
+              f"{'' if mesmos_nans else ' ⚠️ NaNs diferentes'}")
+    print("="*78)
+    print("painel = montar + features + volta ao formato longo; longo = pandas groupby/merge")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Painel moeda x tempo e features entre moedas")
+    parser.add_argument("--moedas", type=int, nargs="+", default=[5, 20, 50, 100, 200],
+                        help="números de moedas comparados")
+    parser.add_argument("--horas", type=int, default=4000, help="horas de preços sintéticos por moeda")
+    parser.add_argument("--janela", type=int, default=JANELA_CRUZADA, help="janela das features (linhas)")
+    args = parser.parse_args()
+
+    comparar_com_formato_longo(args.moedas, args.horas, args.janela)
@@ -0,0 +1,261 @@
+# pessoa2_ml/perfil_cpu.py
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+import functools
+import threading
+import hmac
+import time
+import sys
+import os
+
+from pessoa2_ml.inferencia import BASE_DIR
+
+# Pasta dos perfis gravados (relativa à raiz do projeto, não ao diretório atual)
+PERFIL_DIR = os.environ.get('PERFIL_DIR', os.path.join(BASE_DIR, 'perfis'))
+
+# Intervalo entre amostras de pilha (s): 200 Hz
+INTERVALO_AMOSTRAGEM = 0.005
+
+# Na API: intervalo mínimo entre dois perfis (s); só um perfil por vez
+PERFIL_INTERVALO_MIN = float(os.environ.get('PERFIL_INTERVALO_MIN', 30))
+
+# Funções mostradas no resumo
+TOP_FUNCOES = 15
+
+# Amostrador da requisição em andamento (None = requisição sem perfil)
+_amostrador_atual = ContextVar('amostrador_perfil', default=None)
+
+
+def _nome_quadro(codigo, nomes):
+    nome = nomes.get(codigo)
+    if nome is None:
+        nome = f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+        nomes[codigo] = nome
+    return nome
+
+
+class AmostradorPilhas:
+    """
+    Profiler por amostragem: uma thread lê a pilha Python da thread alvo a
+    cada `intervalo` segundos e conta as pilhas repetidas.
+
+    A saída é o formato "collapsed stacks" (uma linha por pilha,
+    `raiz;...;folha contagem`), aceito por flamegraph.pl, speedscope e
+    inferno. Diferente do cProfile, não instrumenta cada chamada: o custo
+    é o da thread amostradora, independente do código medido.
+
+    A thread alvo é a que criou o amostrador; `seguir()` troca o alvo
+    enquanto outra thread executa a parte medida (ex.: um endpoint síncrono
+    no pool de threads do FastAPI).
+    """
+
+    def __init__(self, intervalo=INTERVALO_AMOSTRAGEM):
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self.amostras = 0
+        self.duracao = 0.0
+        self._alvos = [threading.get_ident()]
+        self._nomes = {}
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self._alvos[-1])
+            if quadro is None:
+                continue
+            pilha = []
+            while quadro is not None:
+                pilha.append(_nome_quadro(quadro.f_code, self._nomes))
+                quadro = quadro.f_back
+            self.pilhas[';'.join(reversed(pilha))] += 1
+            self.amostras += 1
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._thread = threading.Thread(target=self._amostrar, name='perfil_cpu', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        self.duracao = time.perf_counter() - self._inicio
+
+    @contextmanager
+    def seguir(self):
+        """Amostra a thread atual durante o bloco `with`."""
+        self._alvos.append(threading.get_ident())
+        try:
+            yield
+        finally:
+            self._alvos.pop()
+
+    def salvar(self, caminho):
+        """Grava as pilhas no formato collapsed (flamegraph)."""
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        with open(caminho, 'w') as f:
+            for pilha, contagem in self.pilhas.most_common():
+                f.write(f"{pilha} {contagem}\n")
+        return caminho
+
+    def resumo(self, top=TOP_FUNCOES):
+        """Funções com mais amostras no topo da pilha (tempo próprio) e no total."""
+        proprio, total = Counter(), Counter()
+        for pilha, contagem in self.pilhas.items():
+            quadros = pilha.split(';')
+            proprio[quadros[-1]] += contagem
+            for quadro in set(quadros):
+                total[quadro] += contagem
+        return [
+            {'funcao': funcao, 'proprio': n / self.amostras, 'total': total[funcao] / self.amostras}
+            for funcao, n in proprio.most_common(top)
+        ] if self.amostras else []
+
+    def relatorio(self, caminho=None, top=TOP_FUNCOES):
+        """Imprime as funções mais amostradas."""
+        print("\n" + "="*86)
+        print(f"🔬 PERFIL DE CPU ({self.amostras} amostras em {self.duracao:.1f}s)")
+        print("="*86)
+        print(f"{'próprio':>8} {'total':>8}  função")
+        for linha in self.resumo(top):
+            print(f"{linha['proprio']:>8.1%} {linha['total']:>8.1%}  {linha['funcao']}")
+        if caminho:
+            print("-"*86)
+            print(f"Pilhas em {caminho} (flamegraph.pl, speedscope.app ou inferno-flamegraph)")
+        print("="*86)
+
+
+def caminho_perfil(nome, diretorio=None):
+    """Arquivo .folded com data/hora no nome."""
+    carimbo = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    return os.path.join(diretorio or PERFIL_DIR, f"{carimbo}_{nome}.folded")
+
+
+@contextmanager
+def perfil_cpu(nome, diretorio=None, ativo=True, intervalo=INTERVALO_AMOSTRAGEM):
+    """
+    Amostra a thread atual durante o bloco `with` e grava o perfil.
+    Desligado (`ativo=False`) não faz nada.
+    """
+    if not ativo:
+        yield None
+        return
+    amostrador = AmostradorPilhas(intervalo)
+    amostrador.iniciar()
+    try:
+        yield amostrador
+    finally:
+        amostrador.parar()
+        caminho = amostrador.salvar(caminho_perfil(nome, diretorio))
+        amostrador.relatorio(caminho)
+
+
+def perfilavel(func):
+    """
+    Decorador de endpoints síncronos: se a requisição tem perfil ligado, o
+    amostrador passa a seguir a thread do pool que executa o endpoint.
+    Sem perfil, o custo é uma leitura de ContextVar.
+    """
+    @functools.wraps(func)
+    def envolto(*args, **kwargs):
+        amostrador = _amostrador_atual.get()
+        if amostrador is None:
+            return func(*args, **kwargs)
+        with amostrador.seguir():
+            return func(*args, **kwargs)
+    return envolto
+
+
+class LimitePerfis:
+    """Um perfil por vez e no máximo um a cada `intervalo_min` segundos."""
+
+    def __init__(self, intervalo_min=PERFIL_INTERVALO_MIN):
+        self.intervalo_min = intervalo_min
+        self._lock = threading.Lock()
+        self._ultimo = None
+        self._ativo = False
+        self.concedidos = 0
+        self.negados = 0
+
+    def tentar(self):
+        agora = time.monotonic()
+        with self._lock:
+            if self._ativo or (self._ultimo is not None and agora - self._ultimo < self.intervalo_min):
+                self.negados += 1
+                return False
+            self._ativo = True
+            self._ultimo = agora
+            self.concedidos += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self._ativo = False
+
+
+class PerfilRequisicoes:
+    """
+    Middleware ASGI: perfila uma requisição HTTP quando ela traz o header
+    `X-Perfil` (ou `?perfil=` na URL) com o token de PERFIL_TOKEN. Sem
+    token configurado nenhum pedido liga o perfil (o arquivo revela código
+    e caminhos do servidor e a amostragem custa CPU).
+
+    O arquivo vai para `diretorio` e o nome volta no header `X-Perfil`
+    da resposta; pedidos acima do limite seguem sem perfil e recebem
+    `X-Perfil: limitado`. Requisições sem o header só passam por uma
+    busca na lista de headers.
+    """
+
+    def __init__(self, app, diretorio=None, token=None, limite=None):
+        self.app = app
+        self.diretorio = diretorio or PERFIL_DIR
+        self.token = token if token is not None else os.environ.get('PERFIL_TOKEN')
+        self.limite = limite or LimitePerfis()
+
+    def _pedido(self, scope):
+        for chave, valor in scope['headers']:
+            if chave == b'x-perfil':
+                return valor.decode('latin-1')
+        if b'perfil=' in scope.get('query_string', b''):
+            for parte in scope['query_string'].decode('latin-1').split('&'):
+                if parte.startswith('perfil='):
+                    return parte[len('perfil='):]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        pedido = self._pedido(scope)
+        if pedido is None or not self.token or not hmac.compare_digest(pedido.encode(), self.token.encode()):
+            return await self.app(scope, receive, send)
+
+        if not self.limite.tentar():
+            async def enviar_limitado(mensagem):
+                if mensagem['type'] == 'http.response.start':
+                    mensagem['headers'] = list(mensagem.get('headers', [])) + [(b'x-perfil', b'limitado')]
+                await send(mensagem)
+            return await self.app(scope, receive, enviar_limitado)
+
+        nome = scope['path'].strip('/').replace('/', '_') or 'home'
+        caminho = caminho_perfil(nome, self.diretorio)
+
+        async def enviar(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                mensagem['headers'] = list(mensagem.get('headers', [])) + [
+                    (b'x-perfil', os.path.basename(caminho).encode())
+                ]
+            await send(mensagem)
+
+        amostrador = AmostradorPilhas()
+        marca = _amostrador_atual.set(amostrador)
+        amostrador.iniciar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            amostrador.parar()
+            _amostrador_atual.reset(marca)
+            self.limite.liberar()
+            amostrador.salvar(caminho)
+            print(f"🔬 Perfil de {scope['path']}: {amostrador.amostras} amostras → {caminho}")
@@ -1,24 +1,75 @@
 # pessoa2_ml/pipeline_ml.py
 import sys
 import os
+import gc
+import argparse
 
 # Adicionar a pasta raiz ao path para importações funcionarem
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.db_config import conectar_banco
 from pessoa1_data.armazenamento import coletar_dados
+from pessoa1_data.backends import obter_backend
 from eda import analise_exploratoria
-from features import criar_features
-from treino import treinar_modelo, salvar_modelo
+from features import criar_features, colunas_target, ordenar_precos, HORIZONTES_TREINO
+from treino import treinar_modelo, salvar_modelo, comparar_com_modelos_separados, FEATURE_COLUMNS
 from previsao import fazer_previsao
+from pessoa2_ml.registro_modelos import (
+    treinar_modelos_por_moeda, salvar_registro, MIN_AMOSTRAS_POR_MOEDA
+)
+from pessoa2_ml.treino_incremental import (
+    treinar_incremental, comparar_com_treino_completo,
+    N_ARVORES_NOVAS, MAX_ARVORES, IDADE_MAX_DIAS
+)
+from pessoa2_ml.memoria import PerfilMemoria
+from pessoa2_ml.perfil_cpu import perfil_cpu, PERFIL_DIR
+from pessoa2_ml.treino_fora_memoria import (
+    gravar_particoes, treinar_fora_da_memoria, PARTICOES_DIR, MEMORIA_MB
+)
+from pessoa2_ml.lags import JanelaLags, colunas_lag
 from datetime import datetime
 
-def pipeline_completo():
+def pipeline_completo(backend=None, caminho_dados=None, coin_ids=None, inicio=None, fim=None,
+                      barras=False, features_sql=False, por_moeda=False, min_amostras=MIN_AMOSTRAS_POR_MOEDA, n_processos=None,
+                      incremental=False, n_arvores=N_ARVORES_NOVAS, max_arvores=MAX_ARVORES,
+                      idade_max_dias=IDADE_MAX_DIAS, comparar_incremental=False,
+                      perfil_memoria=False, enxuto=False, candidato=False,
+                      horizontes=HORIZONTES_TREINO, comparar_horizontes=False, lags=0):
     """
     Pipeline completo de Machine Learning para previsão de criptomoedas.
     
+    Args:
+        backend: 'postgres' ou 'parquet' (padrão: ARMAZENAMENTO_BACKEND ou 'postgres')
+        caminho_dados: Diretório Parquet do backend local
+        coin_ids: Moedas a usar (None = todas)
+        inicio: Data inicial dos dados (None = desde o início)
+        fim: Data final dos dados, exclusiva (None = até o fim)
+        barras: Usa as barras horárias materializadas em vez dos ticks brutos
+        features_sql: Lê as features já calculadas no banco (window functions)
+                      e pula a engenharia de features em Python
+        por_moeda: Também treina um modelo por coin_id (registro em models/registro/)
+        min_amostras: Mínimo de registros para uma moeda ter modelo próprio
+        n_processos: Processos usados no treino por moeda (None = nº de CPUs)
+        incremental: Atualiza o modelo salvo com warm_start em vez de retreinar
+        n_arvores: Árvores acrescentadas por rodada incremental
+        max_arvores: Tamanho máximo da floresta no modo incremental
+        idade_max_dias: Idade máxima (dias) dos dados vistos por uma árvore
+        comparar_incremental: Mede tempo/acurácia do incremental vs retreino completo
+        perfil_memoria: Mede pico de memória e alocações por etapa (tracemalloc + RSS)
+        enxuto: Features em float32, coin_id categórico e liberação explícita
+                dos DataFrames entre etapas (menor pico de memória)
+        candidato: Salva o modelo global em models/candidato/ (modo sombra
+                   na API) em vez de substituir o modelo em produção
+        horizontes: Horizontes (horas) dos targets; mais de um treina uma
+                    única floresta multi-saída ([24] = só o target de 24h)
+        comparar_horizontes: Compara o custo da floresta multi-saída com um
+                             modelo separado por horizonte
+        lags: Acrescenta os últimos `lags` retornos às features do modelo
+              global (FEATURE_COLUMNS + colunas_lag(lags); janelas por
+              strides, pessoa2_ml/lags.py), salvo em models/lags/ para
+              avaliação offline. 0 = só as 13 features
+    
     Etapas:
-    1. Conexão com banco de dados
+    1. Conexão com o armazenamento (PostgreSQL ou Parquet local)
     2. Coleta de dados
     3. Análise exploratória (EDA)
     4. Engenharia de features
@@ -32,19 +83,31 @@ def pipeline_completo():
     print(f"⏰ Início: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*70)
     
-    # 1. CONECTAR AO BANCO
-    print("\n[1/7] 🔌 Conectando ao banco de dados...")
-    conn = conectar_banco()
+    perfil = PerfilMemoria(ativo=perfil_memoria)
+    
+    if lags and (features_sql or incremental or por_moeda or comparar_incremental or comparar_horizontes):
+        print("\n❌ --lags só vale para o treino global a partir dos preços")
+        print("   (sem --features-sql, --incremental, --por-moeda e comparações)")
+        return
+    
+    # 1. CONECTAR AO ARMAZENAMENTO
+    print("\n[1/7] 🔌 Conectando ao armazenamento...")
+    conn = obter_backend(backend, caminho_dados)
     
     if not conn:
         print("\n❌ ERRO: Não foi possível conectar ao banco!")
         print("   Verifique as configurações em utils/db_config.py")
+        print("   Para rodar offline: --backend parquet")
         return
     
     # 2. COLETAR DADOS
-    print("\n[2/7] 📊 Coletando dados do banco...")
-    df = coletar_dados(conn)
-    conn.close()
+    print(f"\n[2/7] 📊 Coletando dados ({conn.nome})...")
+    with perfil.etapa("coleta"):
+        df = coletar_dados(conn, coin_ids=coin_ids, inicio=inicio, fim=fim, barras=barras,
+                           features=features_sql)
+        conn.fechar()
+        if enxuto:
+            df['coin_id'] = df['coin_id'].astype('category')
     
     # Verificar se há dados suficientes
     if len(df) < 100:
@@ -56,11 +119,27 @@ def pipeline_completo():
     
     # 3. ANÁLISE EXPLORATÓRIA
     print("\n[3/7] 🔍 Realizando análise exploratória...")
-    analise_exploratoria(df)
+    with perfil.etapa("eda"):
+        analise_exploratoria(df)
     
     # 4. CRIAR FEATURES
     print("\n[4/7] 🧩 Criando features...")
-    df_features = criar_features(df)
+    lags_precos = None
+    with perfil.etapa("features"):
+        if features_sql:
+            print("   ✅ Features calculadas no banco (features_precos)")
+            df_features = df
+        else:
+            if lags:
+                # Um único array de retornos; as janelas são visões dele
+                df = ordenar_precos(df)
+                lags_precos = JanelaLags.de_precos(df, lags)
+                print(f"   🪟 Janela de {lags} retornos: {lags_precos.bytes_guardados / 1024**2:.1f} MB guardados")
+            df_features = criar_features(df, enxuto=enxuto, horizontes=horizontes, janela_lags=lags)
+        if enxuto:
+            # Os ticks brutos não são mais usados: libera antes do treino
+            del df
+            gc.collect()
     
     # Verificar se há features suficientes
     if len(df_features) < 50:
@@ -70,17 +149,59 @@ def pipeline_completo():
         print("   Aguarde mais coletas de dados.")
         return
     
+    faltando = [c for c in colunas_target(horizontes) if c not in df_features.columns]
+    if faltando:
+        print(f"\n❌ Targets indisponíveis: {faltando}")
+        print("   As features do banco têm só os horizontes de pessoa1_data/features_sql.py")
+        return
+    
     # 5. TREINAR MODELO
     print("\n[5/7] 🤖 Treinando modelo...")
-    modelo, scaler, feature_columns = treinar_modelo(df_features)
+    with perfil.etapa("treino"):
+        modelo = None
+        if incremental:
+            modelo, scaler, feature_columns = treinar_incremental(
+                df_features, n_arvores=n_arvores, max_arvores=max_arvores,
+                idade_max_dias=idade_max_dias
+            )
+            if modelo is None:
+                print("\n⚠️  Sem modelo anterior: fazendo treino completo.")
+        if modelo is None:
+            modelo, scaler, feature_columns = treinar_modelo(
+                df_features, enxuto=enxuto, horizontes=horizontes,
+                feature_columns=FEATURE_COLUMNS + colunas_lag(lags) if lags else None, lags=lags_precos
+            )
+        
+        if comparar_incremental:
+            comparar_com_treino_completo(df_features, feature_columns, n_arvores=n_arvores)
+        if comparar_horizontes and len(horizontes) > 1:
+            comparar_com_modelos_separados(df_features, horizontes)
+        elif comparar_horizontes:
+            print("   ℹ️  --comparar-horizontes precisa de mais de um horizonte (ex.: --horizontes 1 6 24)")
+        
+        # O modelo global continua sendo treinado: é o fallback do registro
+        modelos_moeda = {}
+        if por_moeda:
+            modelos_moeda = treinar_modelos_por_moeda(
+                df_features, feature_columns, min_amostras=min_amostras, n_processos=n_processos,
+                horizontes=getattr(modelo, 'horizontes_', None)
+            )
+        if enxuto:
+            gc.collect()
     
     # 6. SALVAR MODELO
     print("\n[6/7] 💾 Salvando modelo e artefatos...")
-    salvar_modelo(modelo, scaler, feature_columns)
+    with perfil.etapa("salvar"):
+        # O /predict só recebe as 13 features: modelo com lags fica fora da produção
+        pasta = "models/lags" if lags else "models/candidato" if candidato else "models"
+        salvar_modelo(modelo, scaler, feature_columns, pasta=pasta)
+        if por_moeda:
+            salvar_registro(modelos_moeda, feature_columns)
     
     # 7. FAZER PREVISÕES
     print("\n[7/7] 📈 Fazendo previsões de exemplo...")
-    df_previsoes = fazer_previsao(modelo, scaler, feature_columns, df_features)
+    with perfil.etapa("previsoes"):
+        df_previsoes = fazer_previsao(modelo, scaler, feature_columns, df_features, lags=lags_precos)
     
     # RESUMO FINAL
     print("\n" + "="*70)
@@ -93,11 +214,15 @@ def pipeline_completo():
     print("      - modelo_crypto_classifier.pkl")
     print("      - scaler.pkl")
     print("      - feature_columns.pkl")
+    if por_moeda:
+        print(f"      - registro/ ({len(modelos_moeda)} modelos por moeda)")
     print("   📁 graficos/")
     print("      - eda_completa.png")
     print("      - matriz_confusao.png")
     print("      - feature_importance.png")
     
+    perfil.relatorio()
+    
     print("\n🎯 PRÓXIMOS PASSOS:")
     print("   1. Revise os gráficos em 'graficos/'")
     print("   2. Verifique a acurácia do modelo")
@@ -107,5 +232,153 @@ def pipeline_completo():
     print("\n" + "="*70)
 
 
+def pipeline_fora_da_memoria(backend=None, caminho_dados=None, coin_ids=None, inicio=None, fim=None,
+                             barras=False, horizontes=HORIZONTES_TREINO, particoes=PARTICOES_DIR,
+                             reusar_particoes=False, memoria_mb=MEMORIA_MB, candidato=False):
+    """
+    Pipeline para históricos maiores que a memória: as features são
+    gravadas em partições Parquet (uma moeda por vez) e a floresta é
+    treinada lendo as partições (pessoa2_ml/treino_fora_memoria.py).
+    Sem EDA e sem previsões de exemplo, que precisariam do histórico inteiro.
+    
+    Args:
+        particoes: Pasta das partições de features
+        reusar_particoes: Treina com as partições já gravadas, sem ler o armazenamento
+        memoria_mb: Orçamento de memória dos dados do treino
+        (demais como em `pipeline_completo`)
+    """
+    print("\n" + "="*70)
+    print("🚀 PIPELINE DE MACHINE LEARNING - FORA DA MEMÓRIA")
+    print("="*70)
+    print(f"⏰ Início: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*70)
+    
+    # 1. FEATURES EM PARTIÇÕES
+    if not reusar_particoes:
+        print("\n[1/3] 🧩 Criando features por moeda...")
+        conn = obter_backend(backend, caminho_dados)
+        if not conn:
+            print("\n❌ ERRO: Não foi possível conectar ao banco!")
+            print("   Para rodar offline: --backend parquet")
+            return
+        gravar_particoes(conn, particoes, coin_ids=coin_ids, inicio=inicio, fim=fim, barras=barras,
+                         horizontes=horizontes)
+        conn.fechar()
+    else:
+        print(f"\n[1/3] 🧩 Reusando as partições de {particoes}")
+    
+    # 2. TREINAR MODELO
+    print("\n[2/3] 🤖 Treinando modelo...")
+    modelo, scaler, feature_columns = treinar_fora_da_memoria(particoes, memoria_mb=memoria_mb,
+                                                              horizontes=horizontes)
+    if modelo is None:
+        return
+    
+    # 3. SALVAR MODELO
+    print("\n[3/3] 💾 Salvando modelo e artefatos...")
+    salvar_modelo(modelo, scaler, feature_columns, pasta="models/candidato" if candidato else "models")
+    
+    print("\n" + "="*70)
+    print("✅ PIPELINE CONCLUÍDO COM SUCESSO!")
+    print("="*70)
+    print(f"⏰ Fim: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+
 if __name__ == "__main__":
-    pipeline_completo()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pipeline de ML - Crypto Trend Predictor")
+    parser.add_argument("--backend", choices=["postgres", "parquet"], default=None,
+                        help="armazenamento dos dados (padrão: ARMAZENAMENTO_BACKEND ou postgres)")
+    parser.add_argument("--dados", default=None,
+                        help="diretório Parquet do backend local")
+    parser.add_argument("--moedas", nargs="+", default=None,
+                        help="usa só estas moedas (coin_id)")
+    parser.add_argument("--inicio", default=None,
+                        help="data inicial dos dados (ex.: 2025-01-01)")
+    parser.add_argument("--fim", default=None,
+                        help="data final dos dados, exclusiva")
+    parser.add_argument("--barras", action="store_true",
+                        help="usa as barras horárias (python pessoa1_data/barras.py) em vez dos ticks")
+    parser.add_argument("--features-sql", action="store_true",
+                        help="lê as features calculadas no banco (python pessoa1_data/features_sql.py)")
+    parser.add_argument("--por-moeda", action="store_true",
+                        help="treina também um modelo por coin_id (em paralelo)")
+    parser.add_argument("--min-amostras", type=int, default=MIN_AMOSTRAS_POR_MOEDA,
+                        help="mínimo de registros para uma moeda ter modelo próprio")
+    parser.add_argument("--processos", type=int, default=None,
+                        help="número de processos no treino por moeda")
+    parser.add_argument("--incremental", action="store_true",
+                        help="acrescenta árvores ao modelo salvo (warm_start) em vez de retreinar")
+    parser.add_argument("--arvores-novas", type=int, default=N_ARVORES_NOVAS,
+                        help="árvores acrescentadas por rodada incremental")
+    parser.add_argument("--max-arvores", type=int, default=MAX_ARVORES,
+                        help="tamanho máximo da floresta no modo incremental")
+    parser.add_argument("--idade-max-dias", type=int, default=IDADE_MAX_DIAS,
+                        help="aposenta árvores cujos dados são mais antigos que isso")
+    parser.add_argument("--comparar-incremental", action="store_true",
+                        help="compara tempo e acurácia do incremental com o retreino completo")
+    parser.add_argument("--perfil-memoria", action="store_true",
+                        help="mede pico de memória e alocações por etapa (tracemalloc + RSS)")
+    parser.add_argument("--perfil-cpu", "--profile", action="store_true",
+                        help="amostra as pilhas durante o pipeline e grava um perfil para flamegraph")
+    parser.add_argument("--perfil-dir", default=PERFIL_DIR,
+                        help="pasta dos perfis de CPU (padrão: PERFIL_DIR ou perfis/ na raiz do projeto)")
+    parser.add_argument("--enxuto", action="store_true",
+                        help="float32, coin_id categórico e liberação de memória entre etapas")
+    parser.add_argument("--candidato", action="store_true",
+                        help="salva em models/candidato/ para avaliação em modo sombra na API")
+    parser.add_argument("--horizontes", type=int, nargs="+", default=HORIZONTES_TREINO,
+                        help="horizontes (horas) treinados; mais de um = floresta multi-saída "
+                             "(padrão: 24; ex.: 1 6 24)")
+    parser.add_argument("--comparar-horizontes", action="store_true",
+                        help="compara a floresta multi-saída com um modelo por horizonte")
+    parser.add_argument("--lags", type=int, default=0,
+                        help="acrescenta os últimos N retornos como features (janelas por strides; 0 = sem)")
+    parser.add_argument("--fora-memoria", action="store_true",
+                        help="grava as features em partições e treina lendo do disco (históricos maiores que a RAM)")
+    parser.add_argument("--memoria-mb", type=float, default=MEMORIA_MB,
+                        help="orçamento de memória dos dados no treino fora da memória")
+    parser.add_argument("--particoes", default=PARTICOES_DIR,
+                        help="pasta das partições de features (--fora-memoria)")
+    parser.add_argument("--reusar-particoes", action="store_true",
+                        help="treina com as partições já gravadas (--fora-memoria)")
+    args = parser.parse_args()
+    
+    with perfil_cpu('pipeline', args.perfil_dir, ativo=args.perfil_cpu):
+        if args.fora_memoria:
+            pipeline_fora_da_memoria(
+                backend=args.backend,
+                caminho_dados=args.dados,
+                coin_ids=args.moedas,
+                inicio=args.inicio,
+                fim=args.fim,
+                barras=args.barras,
+                horizontes=args.horizontes,
+                particoes=args.particoes,
+                reusar_particoes=args.reusar_particoes,
+                memoria_mb=args.memoria_mb,
+                candidato=args.candidato
+            )
+        else:
+            pipeline_completo(
+                backend=args.backend,
+                caminho_dados=args.dados,
+                coin_ids=args.moedas,
+                inicio=args.inicio,
+                fim=args.fim,
+                barras=args.barras,
+                features_sql=args.features_sql,
+                por_moeda=args.por_moeda,
+                min_amostras=args.min_amostras,
+                n_processos=args.processos,
+                incremental=args.incremental,
+                n_arvores=args.arvores_novas,
+                max_arvores=args.max_arvores,
+                idade_max_dias=args.idade_max_dias,
+                comparar_incremental=args.comparar_incremental,
+                perfil_memoria=args.perfil_memoria,
+                enxuto=args.enxuto,
+                candidato=args.candidato,
+                horizontes=args.horizontes,
+                comparar_horizontes=args.comparar_horizontes,
+                lags=args.lags
+            )
\ No newline at end of file
@@ -0,0 +1,241 @@
+# pessoa2_ml/planejador.py
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import threading
+import argparse
+import pickle
+import copy
+import time
+import sys
+import os
+
+# Tempo máximo (s) da calibração ao carregar o modelo
+TEMPO_CALIBRACAO = float(os.environ.get('TEMPO_CALIBRACAO', 3.0))
+
+# Tamanhos de lote medidos na calibração (até esgotar TEMPO_CALIBRACAO)
+TAMANHOS_CALIBRACAO = [1, 16, 128, 1024, 8192, 65536]
+
+# Trabalhadores dos planos paralelos (padrão: nº de CPUs)
+TRABALHADORES = int(os.environ.get('PLANEJADOR_TRABALHADORES', os.cpu_count() or 1))
+
+# Planos, do mais barato de iniciar ao mais caro
+SEQUENCIAL = 'sequencial'
+THREADS = 'threads'
+PROCESSOS = 'processos'
+PLANOS = [SEQUENCIAL, THREADS, PROCESSOS]
+
+# Referência da calibração: o modelo como foi salvo (n_jobs do treino)
+ORIGINAL = 'original'
+
+# Modelo de cada processo do pool (carregado uma vez no initializer)
+_modelo_processo = None
+
+
+def _iniciar_processo(modelo_serializado):
+    global _modelo_processo
+    _modelo_processo = pickle.loads(modelo_serializado)
+
+
+def _prever_no_processo(X):
+    return _modelo_processo.predict_proba(X)
+
+
+def _juntar(partes):
+    """Concatena as saídas de `predict_proba` por pedaço (lista por horizonte em multi-saída)."""
+    if isinstance(partes[0], list):
+        return [np.concatenate(saida) for saida in zip(*partes)]
+    return np.concatenate(partes)
+
+
+class PlanejadorInferencia:
+    """
+    Escolhe como executar o `predict_proba` de uma floresta do sklearn
+    conforme o tamanho do lote.
+
+    A floresta é salva com n_jobs=-1: cada chamada, até de uma linha, sobe
+    threads do joblib. O planejador usa uma cópia com n_jobs=1 e, ao ser
+    criado, mede na máquina atual três planos em lotes crescentes:
+
+    - sequencial: uma chamada com n_jobs=1;
+    - threads: o lote dividido em pedaços, um por thread (as árvores do
+      sklearn soltam o GIL);
+    - processos: pedaços enviados a um pool de processos, cada um com sua
+      cópia do modelo (paga serializar X e o resultado).
+
+    O limiar de cada plano paralelo é o menor lote a partir do qual ele
+    vence todos os planos mais baratos em todos os tamanhos medidos.
+
+    Args:
+        modelo: RandomForest (ou qualquer estimador com `predict_proba` e `n_jobs`)
+        trabalhadores: Threads/processos dos planos paralelos
+        tempo_calibracao: Tempo máximo da calibração (0 = não calibra, sempre sequencial)
+    """
+
+    def __init__(self, modelo, trabalhadores=TRABALHADORES, tempo_calibracao=TEMPO_CALIBRACAO,
+                 tamanhos=TAMANHOS_CALIBRACAO):
+        self.modelo = modelo
+        self.trabalhadores = max(1, trabalhadores)
+        # Cópia rasa: compartilha as árvores, só muda o n_jobs
+        self._sequencial = copy.copy(modelo)
+        if hasattr(self._sequencial, 'n_jobs'):
+            self._sequencial.n_jobs = 1
+        self._threads = None
+        self._processos = None
+        self._lock = threading.Lock()
+        self.encerrado = False
+        self.calibracao = []
+        self.limiares = {THREADS: None, PROCESSOS: None}
+        self.tempo_calibracao_s = 0.0
+        self.usos = {plano: 0 for plano in PLANOS}
+        if tempo_calibracao > 0:
+            self.calibrar(tamanhos, tempo_calibracao)
+
+    def _pool_threads(self):
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix='planejador')
+        return self._threads
+
+    def _pool_processos(self):
+        with self._lock:
+            if self._processos is None:
+                self._processos = ProcessPoolExecutor(
+                    max_workers=self.trabalhadores, initializer=_iniciar_processo,
+                    initargs=(pickle.dumps(self._sequencial),)
+                )
+        return self._processos
+
+    def _pedacos(self, X):
+        n = min(self.trabalhadores, len(X))
+        return np.array_split(X, n) if n > 1 else [X]
+
+    def _executar(self, plano, X):
+        if plano == SEQUENCIAL or self.encerrado:
+            return self._sequencial.predict_proba(X)
+        if plano == ORIGINAL:
+            return self.modelo.predict_proba(X)
+        pool = self._pool_threads() if plano == THREADS else self._pool_processos()
+        funcao = self._sequencial.predict_proba if plano == THREADS else _prever_no_processo
+        try:
+            return _juntar(list(pool.map(funcao, self._pedacos(X))))
+        except RuntimeError:
+            # Pool encerrado no meio da chamada (modelo substituído): termina sem ele
+            if not self.encerrado:
+                raise
+            return self._sequencial.predict_proba(X)
+
+    def calibrar(self, tamanhos=TAMANHOS_CALIBRACAO, tempo_max=TEMPO_CALIBRACAO):
+        """
+        Mede cada plano (e o modelo original) em lotes crescentes até
+        `tempo_max` segundos e recalcula os limiares.
+
+        Returns:
+            list: Uma linha por tamanho {'linhas', 'original', 'sequencial', 'threads', 'processos'} (ms)
+        """
+        inicio = time.perf_counter()
+        rng = np.random.default_rng(0)
+        n_features = getattr(self.modelo, 'n_features_in_', None)
+        planos = [ORIGINAL, SEQUENCIAL]
+        if self.trabalhadores > 1:
+            planos += [THREADS, PROCESSOS]
+            # Sobe os pools fora da medição (custo único, não por chamada)
+            for plano in (THREADS, PROCESSOS):
+                self._executar(plano, rng.standard_normal((self.trabalhadores, n_features)))
+
+        self.calibracao = []
+        for n in tamanhos:
+            X = rng.standard_normal((n, n_features))
+            linha = {'linhas': n}
+            for plano in planos:
+                # Melhor de 3 nos lotes pequenos, 1 medição nos grandes
+                repeticoes = 3 if n <= 1024 else 1
+                melhor = float('inf')
+                for _ in range(repeticoes):
+                    t = time.perf_counter()
+                    self._executar(plano, X)
+                    melhor = min(melhor, time.perf_counter() - t)
+                linha[plano] = round(melhor * 1000, 3)
+            self.calibracao.append(linha)
+            if time.perf_counter() - inicio > tempo_max:
+                break
+
+        self.tempo_calibracao_s = round(time.perf_counter() - inicio, 3)
+        self.limiares = {
+            THREADS: self._limiar(THREADS, [SEQUENCIAL]),
+            PROCESSOS: self._limiar(PROCESSOS, [SEQUENCIAL, THREADS])
+        }
+        return self.calibracao
+
+    def _limiar(self, plano, mais_baratos):
+        limiar = None
+        for linha in reversed(self.calibracao):
+            if plano not in linha or any(linha[plano] >= linha[outro] for outro in mais_baratos):
+                break
+            limiar = linha['linhas']
+        return limiar
+
+    def escolher(self, n_linhas):
+        """Plano para um lote de `n_linhas`."""
+        if self.limiares[PROCESSOS] is not None and n_linhas >= self.limiares[PROCESSOS]:
+            return PROCESSOS
+        if self.limiares[THREADS] is not None and n_linhas >= self.limiares[THREADS]:
+            return THREADS
+        return SEQUENCIAL
+
+    def predict_proba(self, X):
+        """Mesma saída do `predict_proba` do modelo, executada no plano escolhido."""
+        plano = self.escolher(len(X))
+        self.usos[plano] += 1
+        return self._executar(plano, X)
+
+    def estatisticas(self):
+        return {
+            'trabalhadores': self.trabalhadores,
+            'limiares': dict(self.limiares),
+            'plano_por_tamanho': {linha['linhas']: self.escolher(linha['linhas']) for linha in self.calibracao},
+            'calibracao_ms': self.calibracao,
+            'tempo_calibracao_s': self.tempo_calibracao_s,
+            'usos': dict(self.usos)
+        }
+
+    def encerrar(self):
+        """
+        Para os pools (threads e processos com cópias da floresta). Chamadas
+        que ainda usam este planejador passam a rodar sequenciais.
+        """
+        with self._lock:
+            self.encerrado = True
+            threads, processos = self._threads, self._processos
+            self._threads = self._processos = None
+        if threads is not None:
+            threads.shutdown(wait=False)
+        if processos is not None:
+            processos.shutdown(wait=False, cancel_futures=True)
+
+
+def imprimir_calibracao(planejador):
+    colunas = [ORIGINAL] + [p for p in PLANOS if p in planejador.calibracao[0]]
+    print(f"\n{'linhas':>8} | " + " | ".join(f"{c:>11}" for c in colunas) + " | plano")
+    print("-" * (11 + 14 * len(colunas) + 10))
+    for linha in planejador.calibracao:
+        print(f"{linha['linhas']:>8} | " + " | ".join(f"{linha[c]:>8.2f} ms" for c in colunas)
+              + f" | {planejador.escolher(linha['linhas'])}")
+    print(f"\nLimiares: {planejador.limiares} ({planejador.trabalhadores} trabalhadores, "
+          f"calibração em {planejador.tempo_calibracao_s}s)")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from pessoa2_ml.modelo_api import carregar_modelo
+
+    parser = argparse.ArgumentParser(description="Calibra o planejador de inferência do modelo salvo")
+    parser.add_argument('--tempo', type=float, default=30.0, help="Tempo máximo da calibração (s)")
+    parser.add_argument('--trabalhadores', type=int, default=TRABALHADORES)
+    args = parser.parse_args()
+
+    modelo, _, _ = carregar_modelo()
+    if modelo is None:
+        sys.exit(1)
+    planejador = PlanejadorInferencia(modelo, trabalhadores=args.trabalhadores, tempo_calibracao=args.tempo)
+    imprimir_calibracao(planejador)
+    planejador.encerrar()
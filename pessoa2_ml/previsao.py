@@ -1,7 +1,10 @@
 # pessoa2_ml/previsao.py
 import pandas as pd
 
-def fazer_previsao(modelo, scaler, feature_columns, df_features):
+from pessoa2_ml.inferencia import prever_sklearn
+from pessoa2_ml.lags import montar_matriz
+
+def fazer_previsao(modelo, scaler, feature_columns, df_features, lags=None, planejador=None):
     """
     Faz previsões usando o modelo treinado.
     
@@ -10,6 +13,10 @@ def fazer_previsao(modelo, scaler, feature_columns, df_features):
         scaler: StandardScaler ajustado
         feature_columns: Lista de features
         df_features: DataFrame com os dados
+        lags: JanelaLags, se feature_columns tiver colunas de lag
+        planejador: PlanejadorInferencia já calibrado para este modelo
+                    (None = uma chamada direta ao modelo: calibrar para
+                    prever um único lote custa mais que o lote)
         
     Returns:
         pd.DataFrame: DataFrame com previsões adicionadas
@@ -19,19 +26,19 @@ def fazer_previsao(modelo, scaler, feature_columns, df_features):
     print("="*60)
     
     # Preparar features
-    X = df_features[feature_columns]
+    X = montar_matriz(df_features, feature_columns, lags)
     X_scaled = scaler.transform(X)
     
     # Fazer previsões
-    df_features['previsao'] = modelo.predict(X_scaled)
-    df_features['probabilidade'] = modelo.predict_proba(X_scaled)[:, 1]
+    df_features['previsao'], df_features['probabilidade'] = prever_sklearn(modelo, X_scaled, planejador)
     
     # Adicionar texto descritivo
     df_features['previsao_texto'] = df_features['previsao'].apply(
         lambda x: '⬆️  SUBIDA' if x == 1 else '⬇️  QUEDA'
     )
     
-    print(f"\n✅ Previsões realizadas para {len(df_features)} registros")
+    plano = f" (plano: {planejador.escolher(len(X_scaled))})" if planejador is not None else ""
+    print(f"\n✅ Previsões realizadas para {len(df_features)} registros{plano}")
     
     # Mostrar exemplos
     print("\n📊 Últimas 10 previsões:")
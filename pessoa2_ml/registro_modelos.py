@@ -0,0 +1,289 @@
+# pessoa2_ml/registro_modelos.py
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+import threading
+import hashlib
+import pickle
+import os
+
+from pessoa2_ml.inferencia import ModeloLeve, versao_arquivo
+from pessoa2_ml.features import colunas_target
+
+# Caminhos do registro (relativos à pasta raiz do projeto)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRO_DIR = os.path.join(BASE_DIR, 'models', 'registro')
+INDICE_PATH = os.path.join(REGISTRO_DIR, 'indice.pkl')
+
+# Moedas com menos amostras que isso usam o modelo global (fallback)
+MIN_AMOSTRAS_POR_MOEDA = 500
+
+# Orçamento padrão do cache de modelos na API (bytes)
+CACHE_BYTES_PADRAO = 256 * 1024 * 1024
+
+
+def _arquivo_moeda(coin_id):
+    """
+    Nome do arquivo do modelo de uma moeda dentro do registro.
+
+    O nome legível troca caracteres fora de [A-Za-z0-9_-] por '_' ("a.b" e
+    "a_b" ficariam iguais), então leva também um hash curto do coin_id.
+    """
+    nome = ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(coin_id))
+    hash_id = hashlib.sha1(str(coin_id).encode()).hexdigest()[:8]
+    return f"modelo_{nome}_{hash_id}.npz"
+
+
+def _treinar_moeda(coin_id, X, y, horizontes=None):
+    """
+    Treina scaler + Random Forest para uma única moeda.
+    Executado em um processo separado por `treinar_modelos_por_moeda`.
+
+    Com mais de um horizonte `y` tem uma coluna por horizonte e a floresta
+    é multi-saída, como o modelo global (mesmas `probabilidades` na API).
+
+    Returns:
+        tuple: (coin_id, modelo, scaler, acuracia da saída principal)
+    """
+    # sklearn só é importado no treino (a API não precisa dele)
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score
+    from pessoa2_ml.treino import _saida_principal
+
+    multi_saida = horizontes is not None and len(horizontes) > 1
+    principal = _saida_principal(list(horizontes)) if multi_saida else None
+    y_principal = y[:, principal] if multi_saida else y
+    estratificar = y_principal if len(set(y_principal)) > 1 else None
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=estratificar
+    )
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    # n_jobs=1: o paralelismo já está entre processos (uma moeda por processo)
+    modelo = RandomForestClassifier(
+        n_estimators=100,
+        max_depth=10,
+        min_samples_split=5,
+        random_state=42,
+        n_jobs=1,
+        verbose=0
+    )
+    modelo.fit(X_train_scaled, y_train)
+
+    previstos = modelo.predict(X_test_scaled)
+    if multi_saida:
+        modelo.horizontes_ = list(horizontes)
+        modelo.saida_principal_ = principal
+        y_test, previstos = y_test[:, principal], previstos[:, principal]
+    acuracia = accuracy_score(y_test, previstos)
+    return coin_id, modelo, scaler, acuracia
+
+
+def treinar_modelos_por_moeda(df_features, feature_columns, min_amostras=MIN_AMOSTRAS_POR_MOEDA,
+                              n_processos=None, horizontes=None):
+    """
+    Treina um modelo por `coin_id` em paralelo (um processo por moeda).
+
+    Moedas com menos de `min_amostras` registros não ganham modelo próprio
+    e passam a usar o modelo global (models/modelo_crypto_classifier.pkl).
+
+    Args:
+        df_features: DataFrame com features, target e coin_id
+        feature_columns: Lista de colunas usadas (as mesmas do modelo global)
+        min_amostras: Mínimo de registros para treinar um modelo dedicado
+        n_processos: Número de processos (None = número de CPUs)
+        horizontes: Os mesmos do modelo global (mais de um = multi-saída)
+
+    Returns:
+        dict: {coin_id: (modelo, scaler, acuracia)}
+    """
+    print("\n" + "="*60)
+    print("🗂️  TREINANDO MODELOS POR MOEDA")
+    print("="*60)
+
+    contagem = df_features['coin_id'].value_counts()
+    elegiveis = contagem[contagem >= min_amostras].index.tolist()
+    fallback = contagem[contagem < min_amostras].index.tolist()
+
+    print(f"\n📊 Moedas com modelo próprio: {len(elegiveis)}")
+    print(f"🔁 Moedas no modelo global (< {min_amostras} registros): {len(fallback)}")
+
+    modelos = {}
+    if not elegiveis:
+        return modelos
+
+    multi_saida = horizontes is not None and len(horizontes) > 1
+    colunas_y = colunas_target(horizontes) if multi_saida else 'target'
+    grupos = df_features[df_features['coin_id'].isin(elegiveis)].groupby('coin_id')
+
+    with ProcessPoolExecutor(max_workers=n_processos) as executor:
+        futuros = [
+            executor.submit(
+                _treinar_moeda,
+                coin,
+                grupo[feature_columns].to_numpy(),
+                grupo[colunas_y].to_numpy(),
+                horizontes
+            )
+            for coin, grupo in grupos
+        ]
+        for futuro in futuros:
+            coin, modelo, scaler, acuracia = futuro.result()
+            modelos[coin] = (modelo, scaler, acuracia)
+            print(f"   ✅ {coin}: acurácia {acuracia:.2%} ({contagem[coin]} registros)")
+
+    print("="*60)
+    return modelos
+
+
+def salvar_registro(modelos, feature_columns):
+    """
+    Salva os modelos por moeda em models/registro/ e grava o índice.
+
+    Cada moeda é salva já como `ModeloLeve` (.npz): a API carrega o modelo
+    sem pickle e sem sklearn. O índice mapeia coin_id -> {arquivo,
+    tamanho_bytes, acuracia} e é o único arquivo lido pela API para decidir
+    qual modelo usar.
+
+    Args:
+        modelos: dict retornado por `treinar_modelos_por_moeda`
+        feature_columns: Lista de colunas usadas
+    """
+    print("\n💾 Salvando registro de modelos por moeda...")
+    os.makedirs(REGISTRO_DIR, exist_ok=True)
+
+    indice = {}
+    for coin, (modelo, scaler, acuracia) in modelos.items():
+        arquivo = _arquivo_moeda(coin)
+        caminho = os.path.join(REGISTRO_DIR, arquivo)
+        ModeloLeve.de_sklearn(modelo, scaler, feature_columns).salvar(caminho)
+        indice[coin] = {
+            'arquivo': arquivo,
+            'tamanho_bytes': os.path.getsize(caminho),
+            'acuracia': float(acuracia)
+        }
+
+    with open(INDICE_PATH, "wb") as f:
+        pickle.dump(indice, f)
+
+    print(f"   ✅ {len(indice)} modelos em {REGISTRO_DIR}")
+    print(f"   ✅ Índice: {INDICE_PATH}")
+
+
+def carregar_indice():
+    """
+    Carrega o índice do registro de modelos por moeda.
+
+    Returns:
+        dict: coin_id -> metadados (vazio se não houver registro)
+    """
+    if not os.path.exists(INDICE_PATH):
+        return {}
+    with open(INDICE_PATH, "rb") as f:
+        return pickle.load(f)
+
+
+def _carregar_modelo_moeda(caminho):
+    """
+    Carrega o modelo de uma moeda do registro.
+
+    Registros salvos antes do .npz têm um pickle (modelo, scaler, features)
+    por moeda: esses ainda são convertidos, importando o sklearn.
+    """
+    if caminho.endswith('.npz'):
+        return ModeloLeve.carregar(caminho)
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+    modelo = ModeloLeve.de_sklearn(*pickle.loads(conteudo))
+    modelo.versao = versao_arquivo(conteudo=conteudo)
+    return modelo
+
+
+class CacheModelos:
+    """
+    Cache LRU de modelos por moeda limitado por orçamento em bytes.
+
+    Os modelos são lidos do .npz do registro como `ModeloLeve` (NumPy) e
+    contam no orçamento pelo `nbytes` dos arrays carregados.
+    Quando o orçamento estoura, os modelos usados há mais tempo são
+    descartados; um modelo maior que o orçamento inteiro não é mantido.
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES_PADRAO):
+        self.max_bytes = max_bytes
+        self.bytes_usados = 0
+        self.hits = 0
+        self.misses = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self._indice = carregar_indice()
+        # Muda a cada troca de índice: carga iniciada antes não entra no cache
+        self._geracao = 0
+
+    def recarregar_indice(self):
+        """Relê o índice do disco e limpa o cache (após novo treino)."""
+        indice = carregar_indice()
+        with self._lock:
+            self._indice = indice
+            self._geracao += 1
+            self._itens.clear()
+            self.bytes_usados = 0
+
+    def possui(self, coin_id):
+        """Indica se a moeda tem modelo próprio no registro."""
+        return coin_id in self._indice
+
+    def obter(self, coin_id):
+        """
+        Retorna o modelo da moeda, carregando do disco se preciso.
+
+        Returns:
+            ModeloLeve ou None se a moeda não tiver modelo próprio
+        """
+        while True:
+            with self._lock:
+                if coin_id in self._itens:
+                    self._itens.move_to_end(coin_id)
+                    self.hits += 1
+                    modelo, _ = self._itens[coin_id]
+                    return modelo
+                meta = self._indice.get(coin_id)
+                geracao = self._geracao
+
+            if meta is None:
+                return None
+
+            # Carregar fora do lock para não travar as outras moedas
+            modelo = _carregar_modelo_moeda(os.path.join(REGISTRO_DIR, meta['arquivo']))
+            tamanho = modelo.nbytes
+
+            with self._lock:
+                # O índice foi trocado durante a carga: o modelo pode ser o
+                # antigo, então não entra no cache e a moeda é procurada de novo
+                if self._geracao != geracao:
+                    continue
+                self.misses += 1
+                if tamanho > self.max_bytes or coin_id in self._itens:
+                    return modelo
+                self._itens[coin_id] = (modelo, tamanho)
+                self.bytes_usados += tamanho
+                while self.bytes_usados > self.max_bytes:
+                    _, (_, tamanho_antigo) = self._itens.popitem(last=False)
+                    self.bytes_usados -= tamanho_antigo
+                return modelo
+
+    def estatisticas(self):
+        """Resumo do estado do cache (para /health e /modelos)."""
+        with self._lock:
+            return {
+                'moedas_no_registro': len(self._indice),
+                'moedas_em_memoria': list(self._itens.keys()),
+                'bytes_usados': self.bytes_usados,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
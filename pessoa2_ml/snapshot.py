@@ -0,0 +1,218 @@
+# pessoa2_ml/snapshot.py
+from datetime import datetime, timedelta
+import numpy as np
+import asyncio
+import time
+import json
+import os
+
+from pessoa2_ml.tempo_real import features_ultimos_precos, COLUNAS_FEATURES, JANELA_PRECOS
+
+# Intervalo (s) entre leituras do armazenamento em busca de preços novos
+SNAPSHOT_INTERVALO = float(os.environ.get('SNAPSHOT_INTERVALO', 30))
+
+# Espera (s) depois do primeiro preço ao vivo, para juntar uma rajada numa atualização
+SNAPSHOT_AGRUPAR = float(os.environ.get('SNAPSHOT_AGRUPAR', 0.2))
+
+# Só olha o armazenamento a partir de agora - SNAPSHOT_CONTEXTO_HORAS
+# (poda as partições antigas; moedas paradas há mais tempo saem do snapshot)
+SNAPSHOT_CONTEXTO_HORAS = float(os.environ.get('SNAPSHOT_CONTEXTO_HORAS', 48))
+
+
+class Snapshot:
+    """
+    Última previsão de cada moeda, já serializada.
+
+    Imutável depois de criado: a atualização monta um Snapshot novo e troca
+    a referência numa atribuição, então a leitura é um `dict.get` sem lock.
+    Cada moeda tem sua própria versão, que só muda quando chega um preço
+    novo dela ou o modelo que a atende muda (base do ETag).
+    """
+
+    def __init__(self, versao, entradas, atualizado_em):
+        self.versao = versao
+        self.entradas = entradas
+        self.atualizado_em = atualizado_em
+
+    def obter(self, coin_id):
+        """(etag, corpo JSON em bytes) da moeda ou None."""
+        return self.entradas.get(coin_id)
+
+
+class SnapshotPrevisoes:
+    """
+    Mantém o snapshot das previsões atuais de todas as moedas.
+
+    `atualizar` junta os últimos JANELA_PRECOS preços de cada moeda (do
+    armazenamento e do fluxo ao vivo, o mais recente vence), calcula a
+    linha de features de todas de uma vez e chama cada modelo uma única vez
+    para o lote das moedas que ele atende.
+
+    Args:
+        obter_modelo: coin_id -> ModeloLeve (o da moeda ou o global)
+        obter_global: () -> ModeloLeve global (para rotular a origem)
+        backend: Armazenamento com `ler_ultimos` (None = só o fluxo ao vivo)
+        fluxo: FluxoPrecos da API (None = só o armazenamento)
+        barras: Lê as barras horárias em vez dos ticks
+    """
+
+    def __init__(self, obter_modelo, obter_global, backend=None, fluxo=None, barras=False,
+                 contexto_horas=SNAPSHOT_CONTEXTO_HORAS):
+        self.obter_modelo = obter_modelo
+        self.obter_global = obter_global
+        self.backend = backend
+        self.fluxo = fluxo
+        self.barras = barras
+        self.contexto_horas = contexto_horas
+        self.atual = Snapshot(0, {}, None)
+        # Por moeda: (instante do último preço, versão do modelo, versão do snapshot)
+        self._estado = {}
+        # Última leitura do armazenamento (refeita só a cada `intervalo` do atualizador)
+        self._armazenados = {}
+        self.atualizacoes = 0
+        self.sem_mudanca = 0
+        self.duracao_ultima = None
+
+    def _precos_armazenados(self):
+        if self.backend is None:
+            return {}
+        inicio = datetime.now() - timedelta(hours=self.contexto_horas)
+        df = self.backend.ler_ultimos(JANELA_PRECOS, inicio=inicio, barras=self.barras)
+        ultimos = {}
+        for coin_id, grupo in df.groupby('coin_id', sort=False):
+            ultimos[coin_id] = (grupo['fetched_at'].iloc[-1].to_pydatetime(), grupo['price_usd'].to_numpy())
+        return ultimos
+
+    def atualizar(self, ao_vivo=None, ler_armazenamento=True):
+        """
+        Recalcula o snapshot (roda fora do event loop: lê o armazenamento).
+
+        Args:
+            ao_vivo: `FluxoPrecos.ultimos()` copiado no event loop (None = sem fluxo)
+            ler_armazenamento: Relê o armazenamento; False reaproveita a
+                               última leitura (atualização por preço ao vivo)
+
+        Returns:
+            int: Moedas cuja previsão mudou
+        """
+        inicio = time.perf_counter()
+        if ler_armazenamento:
+            self._armazenados = self._precos_armazenados()
+        precos = dict(self._armazenados)
+        for coin_id, (instante, lista) in (ao_vivo or {}).items():
+            if coin_id not in precos or instante >= precos[coin_id][0]:
+                precos[coin_id] = (instante, np.asarray(lista, dtype=np.float64))
+
+        moedas = [c for c, (_, p) in precos.items() if len(p) >= JANELA_PRECOS]
+        if not moedas:
+            return 0
+        X, validas = features_ultimos_precos(np.stack([precos[c][1][-JANELA_PRECOS:] for c in moedas]))
+
+        # Um percurso das árvores por modelo, com todas as moedas que ele atende
+        global_ = self.obter_global()
+        grupos = {}
+        for i, coin_id in enumerate(moedas):
+            modelo = self.obter_modelo(coin_id) if validas[i] else None
+            if modelo is not None:
+                grupos.setdefault(id(modelo), (modelo, []))[1].append(i)
+
+        versao = self.atual.versao + 1
+        entradas = dict(self.atual.entradas)
+        mudaram = 0
+        agora = datetime.now().isoformat(timespec='seconds')
+        for modelo, linhas in grupos.values():
+            colunas = [COLUNAS_FEATURES.index(f) for f in modelo.feature_columns]
+            classes, p_principal, p_horizontes = modelo.prever_lote_horizontes(X[linhas][:, colunas])
+            origem_global = modelo is global_
+            for k, i in enumerate(linhas):
+                coin_id = moedas[i]
+                instante = precos[coin_id][0]
+                anterior = self._estado.get(coin_id)
+                # Pela versão do artefato, não por id(): o endereço de um
+                # modelo descartado pode ser reusado pelo próximo
+                if anterior is not None and anterior[:2] == (instante, modelo.versao):
+                    continue
+                self._estado[coin_id] = (instante, modelo.versao, versao)
+                corpo = json.dumps({
+                    'coin_id': coin_id,
+                    'fetched_at': instante.isoformat(),
+                    'price_usd': float(X[i, 0]),
+                    'tendencia': int(classes[k]),
+                    'probabilidade': float(p_principal[k]),
+                    'probabilidades': {f"{h}h": float(p) for h, p in zip(modelo.horizontes, p_horizontes[k])},
+                    'modelo': 'global' if origem_global else f'moeda:{coin_id}',
+                    'features': dict(zip(COLUNAS_FEATURES, X[i].tolist())),
+                    'versao': versao,
+                    'calculado_em': agora
+                }).encode()
+                entradas[coin_id] = (f'"{coin_id}-{versao}"', corpo)
+                mudaram += 1
+
+        self.duracao_ultima = time.perf_counter() - inicio
+        if mudaram:
+            self.atual = Snapshot(versao, entradas, agora)
+            self.atualizacoes += 1
+        else:
+            self.sem_mudanca += 1
+        return mudaram
+
+    def estatisticas(self):
+        snapshot = self.atual
+        return {
+            'versao': snapshot.versao,
+            'moedas': len(snapshot.entradas),
+            'atualizado_em': snapshot.atualizado_em,
+            'atualizacoes': self.atualizacoes,
+            'sem_mudanca': self.sem_mudanca,
+            'duracao_ultima_ms': round(self.duracao_ultima * 1000, 2) if self.duracao_ultima is not None else None,
+            'fontes': {
+                'armazenamento': (self.backend.nome + (' (barras)' if self.barras else '')) if self.backend else None,
+                'ao_vivo': self.fluxo is not None
+            }
+        }
+
+
+class AtualizadorSnapshot:
+    """
+    Tarefa de fundo da API que mantém o snapshot em dia.
+
+    Acorda quando o fluxo ao vivo aceita um preço (espera SNAPSHOT_AGRUPAR
+    para juntar a rajada; reaproveita a última leitura do armazenamento) ou
+    a cada `intervalo` segundos para ver o que chegou no armazenamento
+    (coletor). O cálculo roda numa thread: o event loop só copia os buffers
+    ao vivo.
+    """
+
+    def __init__(self, snapshot, intervalo=SNAPSHOT_INTERVALO, agrupar=SNAPSHOT_AGRUPAR):
+        self.snapshot = snapshot
+        self.intervalo = intervalo
+        self.agrupar = agrupar
+        self._aviso = asyncio.Event()
+        self.erros = 0
+        if snapshot.fluxo is not None:
+            snapshot.fluxo.ao_receber.append(self.avisar)
+
+    def avisar(self, coin_id=None):
+        self._aviso.set()
+
+    async def executar(self):
+        proxima_leitura = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._aviso.wait(), max(0.0, proxima_leitura - loop.time()))
+                await asyncio.sleep(self.agrupar)
+            except asyncio.TimeoutError:
+                pass
+            self._aviso.clear()
+            ler_armazenamento = loop.time() >= proxima_leitura
+            if ler_armazenamento:
+                proxima_leitura = loop.time() + self.intervalo
+            fluxo = self.snapshot.fluxo
+            ao_vivo = fluxo.ultimos() if fluxo is not None else None
+            try:
+                await asyncio.to_thread(self.snapshot.atualizar, ao_vivo, ler_armazenamento)
+            except Exception as e:
+                # Armazenamento fora do ar: tenta de novo no próximo ciclo
+                self.erros += 1
+                print(f"⚠️  Snapshot não atualizado: {e}")
@@ -0,0 +1,159 @@
+# pessoa2_ml/sombra.py
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import numpy as np
+import threading
+import time
+import os
+
+from pessoa2_ml.inferencia import MODELS_DIR, MODELO_NPZ, nova_versao, publicar_versao
+
+# Pasta do modelo candidato (gerado com pipeline_ml.py --candidato)
+CANDIDATO_DIR = os.path.join(MODELS_DIR, 'candidato')
+
+# Arquivos promovidos do candidato para a nova versão de models/
+ARQUIVOS_MODELO = ['modelo_crypto_classifier.pkl', 'scaler.pkl', 'feature_columns.pkl', MODELO_NPZ]
+
+# Pool em segundo plano: threads e limite de previsões pendentes. Acima do
+# limite as entradas são descartadas (contadas), nunca enfileiradas sem fim
+SOMBRA_WORKERS = 1
+SOMBRA_MAX_PENDENTES = 1000
+
+# Janela de amostras recentes usada nos percentis
+SOMBRA_JANELA = 10000
+
+
+class ModeloSombra:
+    """
+    Modelo candidato avaliado "à sombra" do modelo em produção.
+
+    Cada entrada do /predict é copiada para um pool de threads em segundo
+    plano; a resposta ao cliente não espera o candidato. Para cada entrada
+    o candidato registra se concorda com a classe do modelo principal, a
+    diferença de probabilidade e a própria latência.
+    """
+
+    def __init__(self, modelo, workers=SOMBRA_WORKERS, max_pendentes=SOMBRA_MAX_PENDENTES,
+                 janela=SOMBRA_JANELA):
+        self.modelo = modelo
+        self.max_pendentes = max_pendentes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sombra')
+        self._lock = threading.Lock()
+        self._deltas = deque(maxlen=janela)
+        self._latencias = deque(maxlen=janela)
+        self.encerrada = False
+        self.pendentes = 0
+        self.recebidas = 0
+        self.avaliadas = 0
+        self.concordancias = 0
+        self.descartadas = 0
+        self.erros = 0
+        self.soma_delta = 0.0
+        self.soma_delta_abs = 0.0
+
+    def enviar(self, dados, classe_principal, prob_principal):
+        """
+        Agenda a avaliação do candidato para uma entrada (não bloqueia).
+
+        Depois de `encerrar` (candidato promovido ou API parando) a entrada é
+        ignorada: uma requisição que pegou a sombra antes da promoção não
+        pode falhar por causa dela.
+
+        Returns:
+            bool: False se a entrada foi descartada (pool saturado ou encerrado)
+        """
+        with self._lock:
+            if self.encerrada:
+                return False
+            self.recebidas += 1
+            if self.pendentes >= self.max_pendentes:
+                self.descartadas += 1
+                return False
+            self.pendentes += 1
+        try:
+            self._executor.submit(self._avaliar, dict(dados), classe_principal, prob_principal)
+        except RuntimeError:
+            # Pool encerrado entre o lock e o submit
+            with self._lock:
+                self.pendentes -= 1
+                self.descartadas += 1
+            return False
+        return True
+
+    def _avaliar(self, dados, classe_principal, prob_principal):
+        try:
+            inicio = time.perf_counter()
+            classe, prob = self.modelo.prever_dict(dados)
+            latencia = time.perf_counter() - inicio
+        except Exception:
+            with self._lock:
+                self.pendentes -= 1
+                self.erros += 1
+            return
+
+        delta = float(prob) - float(prob_principal)
+        with self._lock:
+            self.pendentes -= 1
+            self.avaliadas += 1
+            self.concordancias += int(classe == classe_principal)
+            self.soma_delta += delta
+            self.soma_delta_abs += abs(delta)
+            self._deltas.append(delta)
+            self._latencias.append(latencia)
+
+    def estatisticas(self):
+        """Concordância, diferenças de probabilidade e latência do candidato."""
+        with self._lock:
+            deltas = np.abs(np.array(self._deltas))
+            latencias = np.array(self._latencias) * 1000
+            avaliadas = self.avaliadas
+            resumo = {
+                'recebidas': self.recebidas,
+                'avaliadas': avaliadas,
+                'pendentes': self.pendentes,
+                'descartadas': self.descartadas,
+                'erros': self.erros,
+                'taxa_concordancia': self.concordancias / avaliadas if avaliadas else None,
+                'delta_prob_medio': self.soma_delta / avaliadas if avaliadas else None,
+                'delta_prob_abs_medio': self.soma_delta_abs / avaliadas if avaliadas else None
+            }
+
+        if len(deltas):
+            resumo['delta_prob_abs'] = {
+                'p50': float(np.percentile(deltas, 50)),
+                'p95': float(np.percentile(deltas, 95)),
+                'max': float(deltas.max())
+            }
+            resumo['latencia_ms'] = {
+                'p50': float(np.percentile(latencias, 50)),
+                'p95': float(np.percentile(latencias, 95)),
+                'p99': float(np.percentile(latencias, 99))
+            }
+        resumo['n_arvores'] = self.modelo.n_arvores
+        return resumo
+
+    def encerrar(self):
+        """Para o pool (avaliações pendentes são concluídas em segundo plano)."""
+        with self._lock:
+            self.encerrada = True
+        self._executor.shutdown(wait=False)
+
+
+def promover_arquivos(origem=CANDIDATO_DIR, destino=MODELS_DIR):
+    """
+    Move os artefatos do candidato para uma nova versão em models/versoes/
+    e só então troca o ponteiro models/ATUAL (`publicar_versao`): quem lê
+    o modelo em produção vê o conjunto antigo inteiro ou o novo inteiro,
+    nunca o .pkl de um com o scaler do outro.
+
+    Returns:
+        tuple: (versão publicada, arquivos promovidos)
+    """
+    pasta = nova_versao(destino)
+    promovidos = []
+    for nome in ARQUIVOS_MODELO:
+        caminho = os.path.join(origem, nome)
+        if os.path.exists(caminho):
+            os.replace(caminho, os.path.join(pasta, nome))
+            promovidos.append(nome)
+    return publicar_versao(pasta, destino), promovidos
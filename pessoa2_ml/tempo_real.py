@@ -0,0 +1,418 @@
+# pessoa2_ml/tempo_real.py
+from collections import deque, OrderedDict
+from datetime import datetime
+import numpy as np
+import argparse
+import asyncio
+import json
+import time
+import re
+import os
+
+# Preços guardados por moeda: a maior janela (24) + 1 para a variação de 24 linhas
+JANELA_PRECOS = 25
+
+# Tempo máximo (s) de um envio para um cliente antes de desconectá-lo
+TEMPO_MAX_ENVIO = 5.0
+
+# Moedas acompanhadas ao mesmo tempo (histórico e última previsão). Acima
+# disso sai a moeda sem preço novo há mais tempo
+MAX_MOEDAS_FLUXO = int(os.environ.get('MAX_MOEDAS_FLUXO', 5000))
+
+# coin_id aceito no POST /precos (ids do CoinGecko: minúsculas, dígitos, '-')
+PADRAO_COIN_ID = r'^[a-z0-9][a-z0-9._-]{0,63}$'
+_COIN_ID = re.compile(PADRAO_COIN_ID)
+
+# Feed simulado: intervalo entre ticks (s) e volatilidade por tick
+INTERVALO_SIMULADO = 1.0
+VOLATILIDADE_SIMULADA = 0.002
+
+
+# Ordem das colunas de `features_ultimos_precos` (a mesma de FEATURE_COLUMNS)
+COLUNAS_FEATURES = [
+    'price_usd', 'preco_variacao_1h', 'preco_variacao_6h',
+    'preco_variacao_12h', 'preco_variacao_24h',
+    'media_movel_6h', 'media_movel_12h', 'media_movel_24h',
+    'volatilidade_6h', 'volatilidade_24h',
+    'max_24h', 'min_24h', 'rsi'
+]
+
+
+def features_ultimos_precos(P):
+    """
+    As 13 features da última linha de várias moedas de uma vez.
+
+    Mesmas definições de `pessoa2_ml.features` (janelas em linhas,
+    desvio padrão amostral, RSI com médias de 14 variações), calculadas só
+    para o preço mais recente de cada linha de P: O(janela) por moeda, sem pandas.
+
+    Args:
+        P: Array (n_moedas, JANELA_PRECOS) com os últimos preços de cada
+           moeda, do mais antigo ao atual
+
+    Returns:
+        tuple: (X (n_moedas, 13) na ordem de COLUNAS_FEATURES, máscara das
+        linhas válidas: sem RSI definido a linha é descartada, como no pandas)
+    """
+    P = np.asarray(P, dtype=np.float64)[:, -JANELA_PRECOS:]
+    atual = P[:, -1]
+    delta = np.diff(P[:, -15:], axis=1)
+    ganho = np.where(delta > 0, delta, 0.0).mean(axis=1)
+    perda = np.where(delta < 0, -delta, 0.0).mean(axis=1)
+    validas = perda > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + ganho / perda))
+    X = np.column_stack([
+        atual,
+        atual / P[:, -2] - 1,
+        atual / P[:, -7] - 1,
+        atual / P[:, -13] - 1,
+        atual / P[:, -25] - 1,
+        P[:, -6:].mean(axis=1),
+        P[:, -12:].mean(axis=1),
+        P[:, -24:].mean(axis=1),
+        P[:, -6:].std(axis=1, ddof=1),
+        P[:, -24:].std(axis=1, ddof=1),
+        P[:, -24:].max(axis=1),
+        P[:, -24:].min(axis=1),
+        rsi
+    ])
+    return X, validas
+
+
+def validar_coin_id(coin_id):
+    """
+    Raises:
+        ValueError: Se `coin_id` não segue PADRAO_COIN_ID
+    """
+    if not isinstance(coin_id, str) or not _COIN_ID.match(coin_id):
+        raise ValueError(f"coin_id inválido: {str(coin_id)[:70]!r}")
+    return coin_id
+
+
+def interpretar_instante(fetched_at):
+    """datetime de um instante (datetime, texto ISO 8601 ou None = agora)."""
+    if fetched_at is None:
+        return datetime.now()
+    if isinstance(fetched_at, datetime):
+        return fetched_at
+    return datetime.fromisoformat(str(fetched_at))
+
+
+def features_ultimo_preco(precos):
+    """
+    As 13 features da última linha de uma moeda (ver `features_ultimos_precos`).
+
+    Args:
+        precos: Últimos JANELA_PRECOS preços da moeda, do mais antigo ao atual
+
+    Returns:
+        dict {feature: valor} ou None se faltar histórico ou o RSI não existir
+    """
+    if len(precos) < JANELA_PRECOS:
+        return None
+    X, validas = features_ultimos_precos(np.asarray(precos, dtype=np.float64)[None, :])
+    if not validas[0]:
+        return None
+    return dict(zip(COLUNAS_FEATURES, X[0]))
+
+
+class Assinante:
+    """
+    Um cliente WebSocket inscrito em algumas moedas (None = todas).
+
+    Backpressure por substituição: enquanto o cliente não consome, só a
+    previsão mais recente de cada moeda fica pendente. Um consumidor lento
+    perde previsões intermediárias (contadas em `substituidas`), nunca
+    acumula fila: a memória por cliente é limitada ao nº de moedas.
+    """
+
+    def __init__(self, moedas=None):
+        self.moedas = set(moedas) if moedas else None
+        self._pendentes = {}
+        self._evento = asyncio.Event()
+        self.entregues = 0
+        self.substituidas = 0
+
+    def quer(self, coin_id):
+        return self.moedas is None or coin_id in self.moedas
+
+    def entregar(self, coin_id, texto):
+        if coin_id in self._pendentes:
+            self.substituidas += 1
+        self._pendentes[coin_id] = texto
+        self._evento.set()
+
+    async def proximas(self):
+        """Espera e devolve as mensagens pendentes (uma por moeda)."""
+        await self._evento.wait()
+        self._evento.clear()
+        pendentes, self._pendentes = self._pendentes, {}
+        self.entregues += len(pendentes)
+        return list(pendentes.values())
+
+
+class DifusorPrevisoes:
+    """
+    Difusão das previsões para os assinantes.
+
+    Cada previsão é serializada uma única vez e entregue a todos os
+    assinantes da moeda (fan-out único). A última previsão de cada moeda
+    fica guardada e é enviada a quem se inscreve depois (no máximo
+    `max_moedas`; sai a publicada há mais tempo).
+
+    Todos os métodos rodam no event loop da API (sem locks).
+    """
+
+    def __init__(self, max_moedas=MAX_MOEDAS_FLUXO):
+        self.assinantes = set()
+        self.ultimas = OrderedDict()
+        self.max_moedas = max_moedas
+        self.publicadas = 0
+        self.desconectados_lentos = 0
+        self.seq = 0
+        # Contadores dos assinantes que já saíram
+        self._entregues = 0
+        self._substituidas = 0
+
+    def conectar(self, moedas=None):
+        assinante = Assinante(moedas)
+        self.assinantes.add(assinante)
+        self._enviar_ultimas(assinante, self.ultimas)
+        return assinante
+
+    def desconectar(self, assinante):
+        if assinante in self.assinantes:
+            self.assinantes.discard(assinante)
+            self._entregues += assinante.entregues
+            self._substituidas += assinante.substituidas
+
+    def assinar(self, assinante, moedas):
+        """Acrescenta moedas à inscrição e envia a última previsão de cada uma."""
+        novas = set(moedas) - (assinante.moedas or set())
+        if assinante.moedas is not None:
+            assinante.moedas |= novas
+        self._enviar_ultimas(assinante, {c: self.ultimas[c] for c in novas if c in self.ultimas})
+
+    def cancelar(self, assinante, moedas):
+        if assinante.moedas is not None:
+            assinante.moedas -= set(moedas)
+
+    def _enviar_ultimas(self, assinante, ultimas):
+        for coin_id, texto in ultimas.items():
+            if assinante.quer(coin_id):
+                assinante.entregar(coin_id, texto)
+
+    def publicar(self, coin_id, mensagem):
+        self.seq += 1
+        texto = json.dumps(dict(mensagem, seq=self.seq))
+        self.ultimas[coin_id] = texto
+        self.ultimas.move_to_end(coin_id)
+        if len(self.ultimas) > self.max_moedas:
+            self.ultimas.popitem(last=False)
+        self.publicadas += 1
+        for assinante in self.assinantes:
+            if assinante.quer(coin_id):
+                assinante.entregar(coin_id, texto)
+
+    def estatisticas(self):
+        return {
+            'assinantes': len(self.assinantes),
+            'moedas': len(self.ultimas),
+            'publicadas': self.publicadas,
+            'entregues': self._entregues + sum(a.entregues for a in self.assinantes),
+            'substituidas': self._substituidas + sum(a.substituidas for a in self.assinantes),
+            'desconectados_lentos': self.desconectados_lentos
+        }
+
+
+class FluxoPrecos:
+    """
+    Recebe preços novos, mantém os últimos JANELA_PRECOS de cada moeda e
+    publica a previsão atualizada assim que há histórico para as features.
+
+    `obter_modelo(coin_id)` devolve o ModeloLeve da moeda (ou o global).
+
+    `receber` faz tudo no event loop. Para lotes, `registrar` e `publicar`
+    ficam no event loop e `prever` (a inferência) pode ir para uma thread.
+    No máximo `max_moedas` moedas são acompanhadas; sai a que está há mais
+    tempo sem preço novo.
+    """
+
+    def __init__(self, obter_modelo, difusor, janela=JANELA_PRECOS, max_moedas=MAX_MOEDAS_FLUXO):
+        self.obter_modelo = obter_modelo
+        self.difusor = difusor
+        self.janela = janela
+        self.max_moedas = max_moedas
+        self._precos = OrderedDict()
+        self._ultimo_instante = {}
+        self._publicado = {}
+        self.recebidos = 0
+        self.ignorados = 0
+        self.moedas_descartadas = 0
+        # Chamados com o coin_id de cada preço aceito (ex. o snapshot da API)
+        self.ao_receber = []
+
+    def receber(self, coin_id, price_usd, fetched_at=None):
+        """
+        Registra um preço e publica a previsão da moeda.
+
+        Args:
+            fetched_at: Instante do preço (datetime ou texto ISO 8601;
+                        padrão: agora). Preços que não são mais novos que o
+                        último da moeda são ignorados
+
+        Returns:
+            dict: Mensagem publicada ou None (sem histórico/modelo suficientes)
+        """
+        pendente = self.registrar(coin_id, price_usd, interpretar_instante(fetched_at))
+        if pendente is None:
+            return None
+        mensagens = self.publicar(self.prever([pendente]))
+        return mensagens[0] if mensagens else None
+
+    def registrar(self, coin_id, price_usd, fetched_at):
+        """
+        Guarda o preço (event loop).
+
+        Returns:
+            tuple: (coin_id, fetched_at, price_usd, features) para `prever`,
+            ou None (preço antigo ou histórico insuficiente)
+        """
+        if coin_id in self._ultimo_instante and fetched_at <= self._ultimo_instante[coin_id]:
+            self.ignorados += 1
+            return None
+        self._ultimo_instante[coin_id] = fetched_at
+        self.recebidos += 1
+
+        precos = self._precos.get(coin_id)
+        if precos is None:
+            precos = self._precos[coin_id] = deque(maxlen=self.janela)
+            if len(self._precos) > self.max_moedas:
+                antiga, _ = self._precos.popitem(last=False)
+                self._ultimo_instante.pop(antiga, None)
+                self._publicado.pop(antiga, None)
+                self.moedas_descartadas += 1
+        else:
+            self._precos.move_to_end(coin_id)
+        precos.append(float(price_usd))
+        for ouvinte in self.ao_receber:
+            ouvinte(coin_id)
+        features = features_ultimo_preco(precos)
+        if features is None:
+            return None
+        return coin_id, fetched_at, float(price_usd), features
+
+    def prever(self, pendentes):
+        """
+        Previsões dos preços registrados (só lê os modelos: pode rodar numa thread).
+
+        Returns:
+            list: Mensagens a publicar (moedas sem modelo ficam de fora)
+        """
+        mensagens = []
+        for coin_id, fetched_at, price_usd, features in pendentes:
+            modelo = self.obter_modelo(coin_id)
+            if modelo is None:
+                continue
+            classe, prob, probabilidades = modelo.prever_dict_horizontes(features)
+            mensagens.append({
+                'tipo': 'previsao',
+                'coin_id': coin_id,
+                'fetched_at': fetched_at.isoformat(),
+                'price_usd': price_usd,
+                'tendencia': int(classe),
+                'probabilidade': float(prob),
+                'probabilidades': probabilidades
+            })
+        return mensagens
+
+    def publicar(self, mensagens):
+        """
+        Publica as mensagens de `prever` (event loop). Uma previsão mais
+        antiga que a última publicada da moeda (lote concorrente que
+        terminou depois) é descartada.
+
+        Returns:
+            list: Mensagens publicadas
+        """
+        publicadas = []
+        for mensagem in mensagens:
+            coin_id = mensagem['coin_id']
+            instante = datetime.fromisoformat(mensagem['fetched_at'])
+            if coin_id not in self._precos or (coin_id in self._publicado and instante <= self._publicado[coin_id]):
+                continue
+            self._publicado[coin_id] = instante
+            self.difusor.publicar(coin_id, mensagem)
+            publicadas.append(mensagem)
+        return publicadas
+
+    def ultimos(self):
+        """{coin_id: (instante do último preço, lista dos preços guardados)}"""
+        return {coin_id: (self._ultimo_instante[coin_id], list(precos)) for coin_id, precos in self._precos.items()}
+
+    def estatisticas(self):
+        return {'recebidos': self.recebidos, 'ignorados': self.ignorados, 'moedas': len(self._precos),
+                'moedas_descartadas': self.moedas_descartadas}
+
+
+def _precos_iniciais(n_moedas, seed):
+    rng = np.random.default_rng(seed)
+    moedas = ['bitcoin'] + [f'moeda_{i:02d}' for i in range(1, n_moedas)]
+    return moedas, {m: 10.0 ** (4 - min(i, 4)) for i, m in enumerate(moedas)}, rng
+
+
+async def alimentar_simulado(fluxo, n_moedas=5, intervalo=INTERVALO_SIMULADO,
+                             volatilidade=VOLATILIDADE_SIMULADA, seed=42):
+    """
+    Feed local de preços (passeio aleatório) para testar a difusão sem coletor.
+    Começa com JANELA_PRECOS ticks por moeda para já haver previsões.
+    """
+    moedas, precos, rng = _precos_iniciais(n_moedas, seed)
+    repeticoes = fluxo.janela
+    while True:
+        for _ in range(repeticoes):
+            for moeda in moedas:
+                precos[moeda] *= np.exp(rng.normal(0, volatilidade))
+                fluxo.receber(moeda, precos[moeda])
+        repeticoes = 1
+        await asyncio.sleep(intervalo)
+
+
+def enviar_simulado(url, n_moedas=5, intervalo=INTERVALO_SIMULADO, volatilidade=VOLATILIDADE_SIMULADA,
+                    duracao=None, seed=42):
+    """
+    Feed simulado externo: envia ticks para o POST /precos de uma API rodando,
+    como faria um coletor. Roda até `duracao` segundos (None = até Ctrl+C).
+    """
+    import httpx
+
+    moedas, precos, rng = _precos_iniciais(n_moedas, seed)
+    fim = time.monotonic() + duracao if duracao else None
+    with httpx.Client(base_url=url, timeout=10) as cliente:
+        primeira = True
+        while fim is None or time.monotonic() < fim:
+            lote = []
+            for _ in range(JANELA_PRECOS if primeira else 1):
+                for moeda in moedas:
+                    precos[moeda] *= np.exp(rng.normal(0, volatilidade))
+                    lote.append({'coin_id': moeda, 'price_usd': precos[moeda],
+                                 'fetched_at': datetime.now().isoformat()})
+            resposta = cliente.post('/precos', json=lote).json()
+            print(f"📤 {len(lote)} preços | previsões publicadas: {resposta.get('publicadas')}")
+            primeira = False
+            time.sleep(intervalo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feed simulado de preços para o POST /precos da API")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL da API")
+    parser.add_argument("--moedas", type=int, default=5, help="número de moedas simuladas")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_SIMULADO, help="segundos entre ticks")
+    parser.add_argument("--duracao", type=float, default=None, help="segundos de envio (padrão: até Ctrl+C)")
+    args = parser.parse_args()
+
+    try:
+        enviar_simulado(args.url, n_moedas=args.moedas, intervalo=args.intervalo, duracao=args.duracao)
+    except KeyboardInterrupt:
+        print("\n⏹️  Feed encerrado")
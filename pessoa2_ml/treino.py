@@ -1,13 +1,21 @@
 # pessoa2_ml/treino.py
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
+import numpy as np
 import pickle
+import time
 import os
+from datetime import datetime
+
+from pessoa2_ml.monitor_drift import criar_baseline
+from pessoa2_ml.inferencia import ModeloLeve, MODELS_DIR, nova_versao, publicar_versao, versao_arquivo
+from pessoa2_ml.features import colunas_target
+from pessoa2_ml.lags import montar_matriz
 
 # Features que serão usadas no modelo
 FEATURE_COLUMNS = [
@@ -18,12 +26,35 @@ FEATURE_COLUMNS = [
     'max_24h', 'min_24h', 'rsi'
 ]
 
-def treinar_modelo(df_features):
+# Horizonte da saída principal (a de 'target': API, backtest e métricas)
+HORIZONTE_PRINCIPAL = 24
+
+
+def _saida_principal(horizontes):
+    """Índice do horizonte principal (24h; senão o maior horizonte)."""
+    if HORIZONTE_PRINCIPAL in horizontes:
+        return horizontes.index(HORIZONTE_PRINCIPAL)
+    return horizontes.index(max(horizontes))
+
+
+def treinar_modelo(df_features, enxuto=False, horizontes=None, feature_columns=None, lags=None):
     """
     Treina Random Forest Classifier com validação cruzada.
     
     Args:
         df_features: DataFrame com features e target
+        enxuto: Trabalha com uma única matriz float32 (o Random Forest já
+                converte para float32 internamente) e libera as cópias
+                intermediárias assim que deixam de ser usadas
+        horizontes: Lista de horizontes (ex. [1, 6, 24]) para treinar uma
+                    única floresta multi-saída com as colunas target_{h}h
+                    de criar_features. None: só o 'target' de 24h.
+                    Relatórios, validação cruzada e matriz de confusão usam
+                    a saída principal (24h)
+        feature_columns: Features do modelo (padrão: FEATURE_COLUMNS). Com
+                         colunas_lag(N) no fim, as janelas vêm de `lags`
+        lags: JanelaLags dos preços (pessoa2_ml/lags.py), copiadas só na
+              matriz de treino
         
     Returns:
         tuple: (modelo, scaler, feature_columns)
@@ -33,28 +64,44 @@ def treinar_modelo(df_features):
     print("="*60)
     
     # Separar features e target
-    X = df_features[FEATURE_COLUMNS]
-    y = df_features['target']
+    feature_columns = list(feature_columns or FEATURE_COLUMNS)
+    X = montar_matriz(df_features, feature_columns, lags, dtype=np.float32 if enxuto else np.float64)
+    multi_saida = horizontes is not None and len(horizontes) > 1
+    if multi_saida:
+        horizontes = list(horizontes)
+        principal = _saida_principal(horizontes)
+        y = df_features[colunas_target(horizontes)]
+    else:
+        y = df_features['target']
+    if enxuto and isinstance(X, pd.DataFrame):
+        X = X.astype(np.float32)
     
     print(f"\n📊 Dataset:")
-    print(f"   Features: {len(FEATURE_COLUMNS)}")
+    print(f"   Features: {len(feature_columns)}")
     print(f"   Amostras: {len(X)}")
-    print(f"   Classes: {y.nunique()}")
+    print(f"   Classes: {df_features['target'].nunique()}")
+    if multi_saida:
+        print(f"   Horizontes: {', '.join(f'{h}h' for h in horizontes)} (floresta multi-saída)")
     
-    # Split treino/teste com estratificação
+    # Split treino/teste com estratificação (sempre pelo target de 24h:
+    # o mesmo split com ou sem horizontes)
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
+        X, y, test_size=0.2, random_state=42, stratify=df_features['target']
     )
     
     print(f"\n📈 Divisão dos dados:")
     print(f"   Treino: {len(X_train)} amostras ({len(X_train)/len(X)*100:.1f}%)")
     print(f"   Teste: {len(X_test)} amostras ({len(X_test)/len(X)*100:.1f}%)")
+    if enxuto:
+        del X
     
     # Normalização dos dados
     print("\n🔄 Normalizando dados com StandardScaler...")
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
+    if enxuto:
+        del X_test
     
     # Criar e treinar modelo
     print("\n🌲 Treinando Random Forest...")
@@ -70,6 +117,25 @@ def treinar_modelo(df_features):
     modelo.fit(X_train_scaled, y_train)
     print("✅ Modelo treinado!")
     
+    if multi_saida:
+        modelo.horizontes_ = horizontes
+        modelo.saida_principal_ = principal
+    
+    # Janela de dados vista por cada árvore (usada pelo treino incremental)
+    if 'fetched_at' in df_features.columns:
+        janela = {
+            'inicio': df_features['fetched_at'].min(),
+            'fim': df_features['fetched_at'].max(),
+            'treinado_em': datetime.now(),
+            'n_amostras': len(X_train)
+        }
+        modelo.janelas_arvores_ = [dict(janela) for _ in modelo.estimators_]
+    
+    # Snapshot da distribuição de treino (referência do monitor de drift da API)
+    modelo.baseline_drift_ = criar_baseline(X_train, feature_columns)
+    if enxuto:
+        del X_train
+    
     # Fazer previsões
     y_pred = modelo.predict(X_test_scaled)
     
@@ -78,6 +144,19 @@ def treinar_modelo(df_features):
     print("📊 RESULTADOS DO MODELO")
     print("="*60)
     
+    if multi_saida:
+        print("\n🕒 Acurácia por horizonte:")
+        for i, h in enumerate(horizontes):
+            print(f"   {h:>3}h: {accuracy_score(y_test.iloc[:, i], y_pred[:, i]):.2%}")
+        y_test, y_pred = y_test.iloc[:, principal], y_pred[:, principal]
+        y_train_principal = y_train.iloc[:, principal]
+        
+        def scoring(estimador, X_cv, y_cv):
+            return accuracy_score(np.asarray(y_cv)[:, principal], estimador.predict(X_cv)[:, principal])
+    else:
+        y_train_principal = y_train
+        scoring = 'accuracy'
+    
     # Acurácia
     accuracy = accuracy_score(y_test, y_pred)
     print(f"\n✅ Acurácia no teste: {accuracy:.2%}")
@@ -89,7 +168,9 @@ def treinar_modelo(df_features):
     
     # Validação cruzada
     print("\n🔄 Validação Cruzada (5-fold):")
-    cv_scores = cross_val_score(modelo, X_train_scaled, y_train, cv=5, scoring='accuracy')
+    # Folds estratificados pelo target de 24h (os mesmos de cv=5 sem horizontes)
+    folds = list(StratifiedKFold(n_splits=5).split(X_train_scaled, y_train_principal))
+    cv_scores = cross_val_score(modelo, X_train_scaled, y_train, cv=folds, scoring=scoring)
     print(f"   Scores: {[f'{s:.2%}' for s in cv_scores]}")
     print(f"   Média: {cv_scores.mean():.2%} (±{cv_scores.std():.2%})")
     
@@ -113,7 +194,7 @@ def treinar_modelo(df_features):
     
     # Importância das Features
     importance_df = pd.DataFrame({
-        'feature': FEATURE_COLUMNS,
+        'feature': feature_columns,
         'importance': modelo.feature_importances_
     }).sort_values('importance', ascending=False)
     
@@ -133,10 +214,110 @@ def treinar_modelo(df_features):
     
     print("="*60)
     
-    return modelo, scaler, FEATURE_COLUMNS
+    return modelo, scaler, feature_columns
 
 
-def salvar_modelo(modelo, scaler, feature_columns):
+def comparar_com_modelos_separados(df_features, horizontes, n_requisicoes=500, tamanho_lote=10000):
+    """
+    Compara o custo de uma floresta multi-saída com uma floresta por
+    horizonte (mesmos hiperparâmetros, mesmo split e mesmo scaler).
+
+    Mede o tempo de treino, o tamanho dos modelos (nós), a acurácia por
+    horizonte e a latência de inferência com ModeloLeve (como na API): uma
+    requisição de uma linha e um lote de `tamanho_lote` linhas. Nos modelos
+    separados cada previsão percorre as árvores uma vez por horizonte.
+
+    Returns:
+        dict: Tempos, nós, latências e acurácias dos dois modos
+    """
+    print("\n" + "="*60)
+    print("⚖️  MULTI-SAÍDA vs UM MODELO POR HORIZONTE")
+    print("="*60)
+
+    horizontes = list(horizontes)
+    colunas = colunas_target(horizontes)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df_features[FEATURE_COLUMNS], df_features[colunas], test_size=0.2, random_state=42,
+        stratify=df_features['target']
+    )
+    scaler = StandardScaler().fit(X_train)
+    X_train_scaled = scaler.transform(X_train)
+
+    def _nova_floresta():
+        return RandomForestClassifier(
+            n_estimators=100, max_depth=10, min_samples_split=5,
+            random_state=42, n_jobs=-1, verbose=0
+        )
+
+    inicio = time.perf_counter()
+    multi = _nova_floresta().fit(X_train_scaled, y_train)
+    multi.horizontes_ = horizontes
+    multi.saida_principal_ = _saida_principal(horizontes)
+    tempo_multi = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    separados = [_nova_floresta().fit(X_train_scaled, y_train[c]) for c in colunas]
+    tempo_separados = time.perf_counter() - inicio
+
+    leve_multi = ModeloLeve.de_sklearn(multi, scaler, FEATURE_COLUMNS)
+    leves = [ModeloLeve.de_sklearn(m, scaler, FEATURE_COLUMNS) for m in separados]
+
+    X_teste = X_test.to_numpy()
+    previstos = (leve_multi.prever_proba_horizontes(X_teste) > 0.5).astype(int)
+    acc_multi = [accuracy_score(y_test[c], previstos[:, i]) for i, c in enumerate(colunas)]
+    acc_separados = [accuracy_score(y_test[c], leve.prever(X_teste)) for c, leve in zip(colunas, leves)]
+
+    # Latência por requisição de uma linha (mediana) e por lote
+    linhas = [dict(zip(FEATURE_COLUMNS, linha)) for linha in X_teste[:n_requisicoes]]
+
+    def _mediana_ms(funcao):
+        tempos = []
+        for dados in linhas:
+            inicio = time.perf_counter()
+            funcao(dados)
+            tempos.append(time.perf_counter() - inicio)
+        return float(np.median(tempos)) * 1000
+
+    lat_multi = _mediana_ms(leve_multi.prever_dict_horizontes)
+    lat_separados = _mediana_ms(lambda dados: [leve.prever_dict(dados) for leve in leves])
+
+    lote = X_teste[np.arange(tamanho_lote) % len(X_teste)]
+    inicio = time.perf_counter()
+    leve_multi.prever_proba_horizontes(lote)
+    lote_multi = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for leve in leves:
+        leve.prever_proba(lote)
+    lote_separados = time.perf_counter() - inicio
+
+    nos_multi = leve_multi.n_nos
+    nos_separados = sum(leve.n_nos for leve in leves)
+
+    print(f"\n📊 Treino: {len(X_train)} | Teste: {len(X_test)} | Horizontes: {horizontes}")
+    print(f"\n   {'':<26}{'Multi-saída':>14}{'Separados':>14}")
+    print(f"   {'Treino (s)':<26}{tempo_multi:>14.2f}{tempo_separados:>14.2f}")
+    print(f"   {'Nós':<26}{nos_multi:>14}{nos_separados:>14}")
+    print(f"   {'Latência 1 linha (ms)':<26}{lat_multi:>14.3f}{lat_separados:>14.3f}")
+    print(f"   {f'Lote {tamanho_lote} linhas (ms)':<26}{lote_multi * 1000:>14.1f}{lote_separados * 1000:>14.1f}")
+    for h, a_multi, a_sep in zip(horizontes, acc_multi, acc_separados):
+        print(f"   {f'Acurácia {h}h':<26}{a_multi:>14.2%}{a_sep:>14.2%}")
+    print("="*60)
+
+    return {
+        'tempo_treino_multi': tempo_multi,
+        'tempo_treino_separados': tempo_separados,
+        'nos_multi': nos_multi,
+        'nos_separados': nos_separados,
+        'latencia_ms_multi': lat_multi,
+        'latencia_ms_separados': lat_separados,
+        'lote_s_multi': lote_multi,
+        'lote_s_separados': lote_separados,
+        'acuracia_multi': dict(zip(horizontes, acc_multi)),
+        'acuracia_separados': dict(zip(horizontes, acc_separados))
+    }
+
+
+def salvar_modelo(modelo, scaler, feature_columns, pasta="models"):
     """
     Salva modelo, scaler e feature_columns em arquivos pickle.
     
@@ -144,25 +325,42 @@ def salvar_modelo(modelo, scaler, feature_columns):
         modelo: Modelo treinado
         scaler: StandardScaler ajustado
         feature_columns: Lista de colunas usadas
+        pasta: Pasta de destino ("models/candidato" para um candidato em
+               modo sombra na API). Em models/ os artefatos vão para uma
+               nova versão (models/versoes/) publicada pelo ponteiro ATUAL
+               só depois de todos gravados
     """
     print("\n💾 Salvando modelo e artefatos...")
     
-    # Criar pasta models
-    os.makedirs("models", exist_ok=True)
+    producao = os.path.abspath(pasta) == MODELS_DIR
+    if producao:
+        pasta = nova_versao()
+    else:
+        os.makedirs(pasta, exist_ok=True)
     
     # Salvar modelo
-    with open("models/modelo_crypto_classifier.pkl", "wb") as f:
+    with open(f"{pasta}/modelo_crypto_classifier.pkl", "wb") as f:
         pickle.dump(modelo, f)
-    print("   ✅ Modelo: models/modelo_crypto_classifier.pkl")
+    print(f"   ✅ Modelo: {pasta}/modelo_crypto_classifier.pkl")
     
     # Salvar scaler
-    with open("models/scaler.pkl", "wb") as f:
+    with open(f"{pasta}/scaler.pkl", "wb") as f:
         pickle.dump(scaler, f)
-    print("   ✅ Scaler: models/scaler.pkl")
+    print(f"   ✅ Scaler: {pasta}/scaler.pkl")
     
     # Salvar feature columns
-    with open("models/feature_columns.pkl", "wb") as f:
+    with open(f"{pasta}/feature_columns.pkl", "wb") as f:
         pickle.dump(feature_columns, f)
-    print("   ✅ Features: models/feature_columns.pkl")
+    print(f"   ✅ Features: {pasta}/feature_columns.pkl")
+    
+    # Versão só-NumPy para a API (carrega sem pickle e sem sklearn)
+    # com o hash do .pkl: a API só usa o .npz se ele for deste .pkl
+    leve = ModeloLeve.de_sklearn(modelo, scaler, feature_columns)
+    leve.versao_pkl = versao_arquivo(f"{pasta}/modelo_crypto_classifier.pkl")
+    leve.salvar(f"{pasta}/modelo_crypto_classifier.npz")
+    print(f"   ✅ Inferência leve: {pasta}/modelo_crypto_classifier.npz")
+    
+    if producao:
+        print(f"   ✅ Versão em produção: {publicar_versao(pasta)}")
     
     print("\n✅ Todos os artefatos salvos com sucesso!")
\ No newline at end of file
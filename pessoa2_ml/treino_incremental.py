@@ -0,0 +1,240 @@
+# pessoa2_ml/treino_incremental.py
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score
+from datetime import datetime, timedelta
+import pandas as pd
+import pickle
+import time
+import os
+
+from pessoa2_ml.features import colunas_target
+from pessoa2_ml.inferencia import pasta_modelo
+
+# Parâmetros padrão do modo incremental
+N_ARVORES_NOVAS = 20
+MAX_ARVORES = 300
+IDADE_MAX_DIAS = 30
+MIN_AMOSTRAS_NOVAS = 50
+
+
+def carregar_artefatos():
+    """
+    Carrega modelo, scaler e feature_columns salvos por `salvar_modelo`.
+
+    Returns:
+        tuple: (modelo, scaler, feature_columns) ou (None, None, None)
+    """
+    pasta = pasta_modelo()
+    try:
+        with open(os.path.join(pasta, "modelo_crypto_classifier.pkl"), "rb") as f:
+            modelo = pickle.load(f)
+        with open(os.path.join(pasta, "scaler.pkl"), "rb") as f:
+            scaler = pickle.load(f)
+        with open(os.path.join(pasta, "feature_columns.pkl"), "rb") as f:
+            feature_columns = pickle.load(f)
+        return modelo, scaler, feature_columns
+    except FileNotFoundError as e:
+        print(f"❌ Artefatos não encontrados: {e}")
+        return None, None, None
+
+
+def _janelas(modelo):
+    """Janelas por árvore; árvores antigas sem registro ficam como desconhecidas."""
+    janelas = list(getattr(modelo, 'janelas_arvores_', []))
+    faltando = len(modelo.estimators_) - len(janelas)
+    desconhecida = {'inicio': None, 'fim': None, 'treinado_em': None, 'n_amostras': None}
+    return [dict(desconhecida) for _ in range(faltando)] + janelas
+
+
+def _crescer_floresta(modelo, scaler, feature_columns, df_novos, n_arvores):
+    """
+    Acrescenta `n_arvores` à floresta com warm_start, treinadas só em `df_novos`.
+    O scaler existente é mantido para que as árvores antigas e novas vejam
+    as features na mesma escala. Florestas multi-saída recebem os targets
+    dos mesmos horizontes com que foram treinadas.
+    """
+    X_novos = scaler.transform(df_novos[feature_columns])
+    horizontes = getattr(modelo, 'horizontes_', None)
+    y_novos = df_novos[colunas_target(horizontes)] if horizontes else df_novos['target']
+
+    janelas = _janelas(modelo)
+    modelo.set_params(warm_start=True, n_estimators=len(modelo.estimators_) + n_arvores)
+    modelo.fit(X_novos, y_novos)
+    modelo.set_params(warm_start=False)
+
+    janela = {
+        'inicio': df_novos['fetched_at'].min(),
+        'fim': df_novos['fetched_at'].max(),
+        'treinado_em': datetime.now(),
+        'n_amostras': len(df_novos)
+    }
+    modelo.janelas_arvores_ = janelas + [dict(janela) for _ in range(n_arvores)]
+    return modelo
+
+
+def _aposentar_arvores(modelo, referencia, max_arvores, idade_max_dias, n_protegidas):
+    """
+    Remove as árvores mais antigas: as que passaram de `idade_max_dias`
+    (pelo fim da janela de dados, relativo a `referencia`) e o excesso
+    acima de `max_arvores`. As `n_protegidas` mais recentes nunca saem, e
+    sem árvores novas a idade não é aplicada (a floresta não pode esvaziar).
+
+    Returns:
+        int: Número de árvores removidas
+    """
+    janelas = _janelas(modelo)
+    total = len(janelas)
+    limite = referencia - timedelta(days=idade_max_dias) if idade_max_dias else None
+
+    # As árvores estão em ordem de criação: basta achar quantas cortar do início
+    remover = 0
+    if limite is not None and n_protegidas > 0:
+        for janela in janelas[:total - n_protegidas]:
+            if janela['fim'] is not None and janela['fim'] >= limite:
+                break
+            remover += 1
+    if max_arvores:
+        remover = max(remover, total - max_arvores)
+    remover = min(remover, total - n_protegidas)
+
+    if remover > 0:
+        modelo.estimators_ = modelo.estimators_[remover:]
+        modelo.n_estimators = len(modelo.estimators_)
+        modelo.janelas_arvores_ = janelas[remover:]
+    return remover
+
+
+def treinar_incremental(df_features, n_arvores=N_ARVORES_NOVAS, max_arvores=MAX_ARVORES,
+                        idade_max_dias=IDADE_MAX_DIAS, min_amostras=MIN_AMOSTRAS_NOVAS):
+    """
+    Atualiza o modelo salvo em vez de treinar do zero.
+
+    Só os registros posteriores à janela mais recente já vista pela floresta
+    são usados para treinar as novas árvores; depois as árvores velhas
+    demais (ou o excesso acima de `max_arvores`) são aposentadas.
+
+    Args:
+        df_features: DataFrame com features, target e fetched_at
+        n_arvores: Árvores acrescentadas por rodada
+        max_arvores: Tamanho máximo da floresta (None = sem limite)
+        idade_max_dias: Idade máxima da janela de uma árvore (None = sem limite)
+        min_amostras: Mínimo de registros novos para crescer a floresta
+
+    Returns:
+        tuple: (modelo, scaler, feature_columns) ou (None, None, None) se
+        não houver modelo anterior para atualizar
+    """
+    print("\n" + "="*60)
+    print("🌱 TREINO INCREMENTAL (warm_start)")
+    print("="*60)
+
+    modelo, scaler, feature_columns = carregar_artefatos()
+    if modelo is None:
+        return None, None, None
+
+    janelas = _janelas(modelo)
+    fins = [j['fim'] for j in janelas if j['fim'] is not None]
+    visto_ate = max(fins) if fins else None
+
+    df_features = df_features.copy()
+    df_features['fetched_at'] = pd.to_datetime(df_features['fetched_at'])
+    if visto_ate is not None:
+        df_novos = df_features[df_features['fetched_at'] > visto_ate]
+    else:
+        df_novos = df_features
+
+    print(f"\n📅 Dados já vistos até: {visto_ate}")
+    print(f"📊 Registros novos: {len(df_novos)}")
+    print(f"🌲 Árvores atuais: {len(modelo.estimators_)}")
+
+    inicio = time.perf_counter()
+    n_novas = 0
+    if len(df_novos) < min_amostras or df_novos['target'].nunique() < 2:
+        print(f"\n⚠️  Registros novos insuficientes (mínimo {min_amostras}, duas classes).")
+        print("   A floresta não foi alterada.")
+    else:
+        _crescer_floresta(modelo, scaler, feature_columns, df_novos, n_arvores)
+        n_novas = n_arvores
+
+    removidas = _aposentar_arvores(
+        modelo, df_features['fetched_at'].max(), max_arvores, idade_max_dias, n_novas
+    )
+    duracao = time.perf_counter() - inicio
+
+    print(f"\n➕ Árvores novas: {n_novas}")
+    print(f"➖ Árvores aposentadas: {removidas}")
+    print(f"🌲 Árvores no modelo: {len(modelo.estimators_)}")
+    print(f"⏱️  Tempo: {duracao:.2f}s")
+    print("="*60)
+
+    return modelo, scaler, feature_columns
+
+
+def comparar_com_treino_completo(df_features, feature_columns, fracao_nova=0.1, fracao_teste=0.1,
+                                 n_arvores=N_ARVORES_NOVAS):
+    """
+    Compara tempo e acurácia do treino incremental com um retreino completo
+    nos mesmos dados.
+
+    Os dados são ordenados no tempo e divididos em: base (antigos), novos
+    (`fracao_nova`) e teste (`fracao_teste`, os mais recentes). O modelo
+    incremental parte de uma floresta treinada na base e só vê os novos;
+    o completo é treinado do zero em base + novos. Ambos são avaliados no
+    mesmo teste, que nenhum dos dois viu.
+
+    Returns:
+        dict: Tempos (s) e acurácias dos dois modos
+    """
+    print("\n" + "="*60)
+    print("⚖️  INCREMENTAL vs RETREINO COMPLETO")
+    print("="*60)
+
+    df = df_features.sort_values('fetched_at').reset_index(drop=True)
+    n = len(df)
+    fim_base = int(n * (1 - fracao_nova - fracao_teste))
+    fim_novos = int(n * (1 - fracao_teste))
+    base, novos, teste = df.iloc[:fim_base], df.iloc[fim_base:fim_novos], df.iloc[fim_novos:]
+
+    def _nova_floresta():
+        return RandomForestClassifier(
+            n_estimators=100, max_depth=10, min_samples_split=5,
+            random_state=42, n_jobs=-1, verbose=0
+        )
+
+    # Retreino completo: scaler + floresta do zero em base + novos
+    inicio = time.perf_counter()
+    historico = pd.concat([base, novos])
+    scaler_completo = StandardScaler().fit(historico[feature_columns])
+    modelo_completo = _nova_floresta().fit(
+        scaler_completo.transform(historico[feature_columns]), historico['target']
+    )
+    tempo_completo = time.perf_counter() - inicio
+
+    # Incremental: floresta anterior (base) + árvores nos dados novos
+    scaler = StandardScaler().fit(base[feature_columns])
+    modelo_incremental = _nova_floresta().fit(scaler.transform(base[feature_columns]), base['target'])
+    inicio = time.perf_counter()
+    _crescer_floresta(modelo_incremental, scaler, feature_columns, novos, n_arvores)
+    tempo_incremental = time.perf_counter() - inicio
+
+    acc_completo = accuracy_score(
+        teste['target'], modelo_completo.predict(scaler_completo.transform(teste[feature_columns]))
+    )
+    acc_incremental = accuracy_score(
+        teste['target'], modelo_incremental.predict(scaler.transform(teste[feature_columns]))
+    )
+
+    print(f"\n📊 Base: {len(base)} | Novos: {len(novos)} | Teste: {len(teste)}")
+    print(f"\n   {'Modo':<14}{'Tempo (s)':>12}{'Acurácia':>12}")
+    print(f"   {'Completo':<14}{tempo_completo:>12.2f}{acc_completo:>12.2%}")
+    print(f"   {'Incremental':<14}{tempo_incremental:>12.2f}{acc_incremental:>12.2%}")
+    print(f"\n⚡ Speedup: {tempo_completo / tempo_incremental:.1f}x")
+    print("="*60)
+
+    return {
+        'tempo_completo': tempo_completo,
+        'tempo_incremental': tempo_incremental,
+        'acuracia_completo': acc_completo,
+        'acuracia_incremental': acc_incremental
+    }
@@ -1,9 +1,13 @@
 #pessoa3/api_fastapi
 
 # api_fastapi.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import List, Dict, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import sys
 import os
 
@@ -15,16 +19,87 @@ from pessoa2_ml.modelo_api import (
     prever_tendencia,
     verificar_modelo,
     obter_features_necessarias,
-    carregar_modelo
+    carregar_modelo,
+    obter_cache_modelos,
+    obter_monitor_drift,
+    aquecer_modelo,
+    estado_aquecimento,
+    obter_sombra,
+    encerrar_sombra,
+    recarregar_candidato,
+    promover_candidato,
+    obter_historico,
+    obter_fluxo_precos,
+    obter_snapshot,
+    obter_log_previsoes
 )
+from pessoa2_ml.tempo_real import (
+    alimentar_simulado, interpretar_instante, INTERVALO_SIMULADO, TEMPO_MAX_ENVIO, PADRAO_COIN_ID
+)
+from pessoa2_ml.perfil_cpu import PerfilRequisicoes, perfilavel
+from pessoa2_ml.admissao import ControleAdmissao, AdmissaoRequisicoes, LOTE, MAX_LINHAS_LOTE
+from pessoa2_ml.snapshot import AtualizadorSnapshot
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Carrega e aquece o modelo antes de aceitar requisições."""
+    aquecer_modelo()
+    sombra = obter_sombra()
+    if sombra is not None:
+        print(f"👥 Candidato em modo sombra ({sombra.modelo.n_arvores} árvores)")
+    log_previsoes = obter_log_previsoes()
+    if log_previsoes is not None:
+        print(f"📝 Log de previsões em {log_previsoes.pasta}")
+    
+    # Feed local de preços para testar o /ws/previsoes sem coletor
+    feed = None
+    n_simuladas = int(os.environ.get('PRECOS_SIMULADOS', 0))
+    if n_simuladas:
+        intervalo = float(os.environ.get('PRECOS_SIMULADOS_INTERVALO', INTERVALO_SIMULADO))
+        feed = asyncio.create_task(alimentar_simulado(obter_fluxo_precos(), n_moedas=n_simuladas,
+                                                      intervalo=intervalo))
+        print(f"📡 Feed simulado: {n_simuladas} moedas a cada {intervalo}s")
+    
+    # Snapshot das previsões atuais (GET /snapshot/{coin_id})
+    atualizador = None
+    if SNAPSHOT_ATIVO:
+        atualizador = asyncio.create_task(AtualizadorSnapshot(obter_snapshot()).executar())
+    yield
+    if feed is not None:
+        feed.cancel()
+    if atualizador is not None:
+        atualizador.cancel()
+    encerrar_sombra()
+    if log_previsoes is not None:
+        log_previsoes.encerrar()
+
 
 # Criar aplicação FastAPI
 app = FastAPI(
     title="🚀 Crypto Trend Predictor API",
     description="API para prever tendências de criptomoedas (SUBIDA/QUEDA)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Perfil de CPU de uma requisição sob demanda (header X-Perfil ou ?perfil=).
+# Fora do PERFIL_API=1 o middleware nem é instalado; exige PERFIL_TOKEN
+if os.environ.get('PERFIL_API') == '1':
+    if os.environ.get('PERFIL_TOKEN'):
+        app.add_middleware(PerfilRequisicoes)
+    else:
+        print("⚠️  PERFIL_API=1 sem PERFIL_TOKEN: perfil de requisições desligado")
+
+# Controle de admissão: limita inferências simultâneas e a fila na frente
+# delas, com prioridade do /predict sobre lotes. ADMISSAO=0 desliga
+admissao = ControleAdmissao() if os.environ.get('ADMISSAO', '1') != '0' else None
+if admissao is not None:
+    app.add_middleware(AdmissaoRequisicoes, controle=admissao)
+
+# Previsão mais recente de cada moeda recalculada em segundo plano. SNAPSHOT=0 desliga
+SNAPSHOT_ATIVO = os.environ.get('SNAPSHOT', '1') != '0'
+
 # Modelo de dados para entrada
 class DadosCrypto(BaseModel):
     price_usd: float = Field(..., description="Preço atual em USD", example=45000.00)
@@ -40,6 +115,7 @@ class DadosCrypto(BaseModel):
     max_24h: float = Field(..., description="Máximo 24h", example=45500.00)
     min_24h: float = Field(..., description="Mínimo 24h", example=43000.00)
     rsi: float = Field(..., description="RSI (0-100)", example=65.5)
+    coin_id: Optional[str] = Field(None, description="Moeda (usa o modelo dedicado, se existir)", example="bitcoin")
 
     class Config:
         schema_extra = {
@@ -61,12 +137,26 @@ class DadosCrypto(BaseModel):
         }
 
 
+# Preço novo para o fluxo ao vivo (coletor ou feed simulado)
+class PrecoNovo(BaseModel):
+    coin_id: str = Field(..., description="Moeda (minúsculas, dígitos, '.', '_' ou '-')", example="bitcoin",
+                         pattern=PADRAO_COIN_ID, max_length=64)
+    price_usd: float = Field(..., description="Preço em USD", example=45000.00)
+    fetched_at: Optional[str] = Field(None, description="Instante ISO 8601 (padrão: agora)")
+
+
 # Modelo de resposta
 class RespostaPrevisao(BaseModel):
     tendencia: int = Field(..., description="0 = QUEDA, 1 = SUBIDA")
     probabilidade: float = Field(..., description="Probabilidade (0.0 a 1.0)")
     previsao_texto: str = Field(..., description="Texto descritivo")
     confianca: str = Field(..., description="Confiança em %")
+    modelo: str = Field("global", description="Modelo usado: 'global' ou 'moeda:<coin_id>'")
+    versao_modelo: Optional[str] = Field(None, description="Versão do modelo usado (hash do arquivo)")
+    probabilidades: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Probabilidade de subida por horizonte, ex. {'1h': 0.48, '6h': 0.51, '24h': 0.55}"
+    )
 
 
 @app.get("/")
@@ -80,6 +170,15 @@ def home():
             "docs": "/docs",
             "health": "/health",
             "features": "/features",
+            "modelos": "/modelos",
+            "drift": "/drift",
+            "sombra": "/sombra",
+            "historico": "/historico/{coin_id}",
+            "precos": "/precos (POST)",
+            "tempo_real": "/ws/previsoes (WebSocket)",
+            "snapshot": "/snapshot/{coin_id}",
+            "admissao": "/admissao",
+            "log_previsoes": "/log-previsoes",
             "predict": "/predict (POST)"
         }
     }
@@ -89,14 +188,25 @@ def home():
 def health_check():
     """Verifica se a API e o modelo estão funcionando"""
     status = verificar_modelo()
+    aquecimento = estado_aquecimento()
     
-    if all(status.values()):
+    if all(status.values()) and aquecimento['pronto']:
         return {
             "status": "healthy",
             "modelo": "✅ OK",
             "scaler": "✅ OK",
-            "features": "✅ OK"
+            "features": "✅ OK",
+            "aquecimento": aquecimento
         }
+    elif all(status.values()):
+        # Arquivos existem, mas a previsão de aquecimento ainda não rodou
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "status": "aquecendo",
+                "aquecimento": aquecimento
+            }
+        )
     else:
         raise HTTPException(
             status_code=503,
@@ -133,20 +243,257 @@ def listar_features():
     }
 
 
+@app.get("/modelos")
+def listar_modelos():
+    """Estado do registro de modelos por moeda e do cache LRU"""
+    return obter_cache_modelos().estatisticas()
+
+
+@app.get("/drift")
+def drift_features():
+    """PSI e KS de cada feature das entradas recentes contra o treino"""
+    monitor = obter_monitor_drift()
+    if monitor is None:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "erro": "Baseline de drift indisponível",
+                "mensagem": "Retreine o modelo com 'python pessoa2_ml/pipeline_ml.py'"
+            }
+        )
+    return monitor.scores()
+
+
+@app.get("/sombra")
+def estatisticas_sombra():
+    """Concordância, diferenças de probabilidade e latência do modelo candidato"""
+    sombra = obter_sombra()
+    if sombra is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "erro": "Nenhum modelo candidato",
+                "mensagem": "Gere um com 'python pessoa2_ml/pipeline_ml.py --candidato'"
+            }
+        )
+    return sombra.estatisticas()
+
+
+@app.post("/sombra/promover")
+def promover_sombra():
+    """Coloca o candidato em produção (troca atômica, sem reiniciar a API)"""
+    resultado = promover_candidato()
+    if resultado is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"erro": "Nenhum modelo candidato para promover"}
+        )
+    return {"status": "promovido", **resultado}
+
+
+@app.post("/sombra/recarregar")
+def recarregar_sombra():
+    """Troca a sombra pelo candidato atual em MODELO_CANDIDATO_DIR (sem reiniciar a API)"""
+    sombra = recarregar_candidato()
+    if sombra is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "erro": "Nenhum modelo candidato",
+                "mensagem": "Gere um com 'python pessoa2_ml/pipeline_ml.py --candidato'"
+            }
+        )
+    return {"status": "recarregado", "n_arvores": sombra.modelo.n_arvores, "versao": sombra.modelo.versao}
+
+
+@app.get("/admissao")
+def estatisticas_admissao():
+    """Limites, fila e contadores de admissão/recusa por classe (unitária e lote)"""
+    if admissao is None:
+        return {"ativo": False}
+    return {"ativo": True, **admissao.estatisticas()}
+
+
+@app.get("/log-previsoes")
+def estatisticas_log_previsoes():
+    """Registros gravados, descartados (fila cheia) e pendentes do log de previsões"""
+    log_previsoes = obter_log_previsoes()
+    if log_previsoes is None:
+        return {"ativo": False}
+    return {"ativo": True, **log_previsoes.estatisticas()}
+
+
+@app.get("/snapshot")
+def estatisticas_snapshot():
+    """Versão, moedas e duração da última atualização do snapshot"""
+    if not SNAPSHOT_ATIVO:
+        return {"ativo": False}
+    return {"ativo": True, **obter_snapshot().estatisticas()}
+
+
+@app.get("/snapshot/{coin_id}")
+def snapshot_moeda(coin_id: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Previsão mais recente da moeda, já calculada em segundo plano
+    
+    - Consulta O(1): o corpo sai pronto do snapshot, sem features nem modelo
+    - **ETag** muda só com preço novo da moeda ou troca de modelo;
+      `If-None-Match` com o ETag atual responde 304 sem corpo
+    """
+    if not SNAPSHOT_ATIVO:
+        raise HTTPException(status_code=503, detail={"erro": "Snapshot desligado (SNAPSHOT=0)"})
+    snapshot = obter_snapshot().atual
+    entrada = snapshot.obter(coin_id)
+    if entrada is None:
+        if snapshot.versao == 0:
+            raise HTTPException(status_code=503, detail={"erro": "Snapshot ainda não calculado"})
+        raise HTTPException(status_code=404, detail={"erro": f"Sem previsão de '{coin_id}' no snapshot"})
+    
+    etag, corpo = entrada
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and (if_none_match.strip() == '*' or etag in
+                                      [t.strip() for t in if_none_match.split(',')]):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(corpo, media_type="application/json", headers=cabecalhos)
+
+
+@app.get("/historico/{coin_id}")
+@perfilavel
+def historico_precos(
+    coin_id: str,
+    inicio: Optional[str] = Query(None, description="Início do intervalo (ISO, ex. 2025-01-01T00:00)"),
+    fim: Optional[str] = Query(None, description="Fim do intervalo, exclusivo (padrão: agora)"),
+    pontos: int = Query(1000, ge=3, description="Pontos desejados (máx. 5000)"),
+    fonte: str = Query("auto", pattern="^(auto|ticks|barras)$",
+                       description="ticks, barras ou auto (barras se o intervalo tiver ao menos `pontos` horas)")
+):
+    """
+    Histórico de preços reduzido no servidor (LTTB) para gráficos
+    
+    - **Saída**: Colunas fetched_at/price_usd com até `pontos` pontos e a
+      previsão do modelo (probabilidade/tendencia, null sem histórico) em cada ponto
+    """
+    historico = obter_historico()
+    if historico is None:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "erro": "Armazenamento indisponível",
+                "mensagem": "Configure ARMAZENAMENTO_BACKEND (postgres ou parquet)"
+            }
+        )
+    try:
+        resultado = historico.consultar(coin_id, inicio=inicio, fim=fim, pontos=pontos, fonte=fonte)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"erro": str(e)})
+    if resultado is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"erro": f"Sem dados de '{coin_id}' no intervalo"}
+        )
+    # Só tipos JSON nativos: pula o jsonable_encoder (milhares de itens por resposta)
+    return JSONResponse(resultado)
+
+
+@app.post("/precos")
+async def receber_precos(precos: List[PrecoNovo]):
+    """
+    Recebe preços novos (coletor ou feed simulado) e publica as previsões
+    atualizadas para os assinantes de /ws/previsoes
+    
+    - **Entrada**: Lista de preços (máx. MAX_LINHAS_LOTE); com algum
+      `fetched_at` inválido nada é aplicado (400)
+    """
+    if len(precos) > MAX_LINHAS_LOTE:
+        raise HTTPException(
+            status_code=413,
+            detail={"erro": "Lote grande demais", "mensagem": f"Envie no máximo {MAX_LINHAS_LOTE} preços"}
+        )
+    try:
+        instantes = [interpretar_instante(p.fetched_at) for p in precos]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"erro": str(e)})
+    
+    # Estado e difusão no event loop; a inferência do lote vai para o pool de threads
+    fluxo = obter_fluxo_precos()
+    pendentes = [fluxo.registrar(p.coin_id, p.price_usd, t) for p, t in zip(precos, instantes)]
+    pendentes = [p for p in pendentes if p is not None]
+    mensagens = await run_in_threadpool(fluxo.prever, pendentes) if pendentes else []
+    publicadas = fluxo.publicar(mensagens)
+    return {"recebidos": len(precos), "publicadas": len(publicadas)}
+
+
+@app.get("/tempo-real")
+def estatisticas_tempo_real():
+    """Assinantes, previsões publicadas/entregues e substituídas (clientes lentos)"""
+    fluxo = obter_fluxo_precos()
+    return {**fluxo.difusor.estatisticas(), "precos": fluxo.estatisticas()}
+
+
+async def _enviar_previsoes(websocket, assinante, difusor):
+    """Envia as previsões pendentes; um envio parado por TEMPO_MAX_ENVIO derruba o cliente."""
+    try:
+        while True:
+            for texto in await assinante.proximas():
+                await asyncio.wait_for(websocket.send_text(texto), TEMPO_MAX_ENVIO)
+    except asyncio.TimeoutError:
+        difusor.desconectados_lentos += 1
+        await websocket.close(code=1013)
+    except Exception:
+        # Conexão já encerrada: a limpeza fica com o laço de recepção
+        pass
+
+
+@app.websocket("/ws/previsoes")
+async def ws_previsoes(websocket: WebSocket, moedas: Optional[str] = None):
+    """
+    Previsões ao vivo a cada preço novo
+    
+    - **Inscrição**: `?moedas=bitcoin,ethereum` (padrão: todas); depois,
+      mensagens `{"acao": "assinar" | "cancelar", "moedas": [...]}`
+    - **Mensagens**: `{"tipo": "previsao", "coin_id", "fetched_at", "price_usd",
+      "tendencia", "probabilidade", "probabilidades", "seq"}`; a última previsão
+      de cada moeda inscrita chega logo ao conectar
+    - Clientes lentos recebem só a previsão mais recente de cada moeda
+    """
+    await websocket.accept()
+    difusor = obter_fluxo_precos().difusor
+    assinante = difusor.conectar(moedas.split(',') if moedas else None)
+    envio = asyncio.create_task(_enviar_previsoes(websocket, assinante, difusor))
+    try:
+        while True:
+            pedido = await websocket.receive_json()
+            if pedido.get('acao') == 'assinar':
+                difusor.assinar(assinante, pedido.get('moedas', []))
+            elif pedido.get('acao') == 'cancelar':
+                difusor.cancelar(assinante, pedido.get('moedas', []))
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        difusor.desconectar(assinante)
+        envio.cancel()
+
+
 @app.post("/predict", response_model=RespostaPrevisao)
+@perfilavel
 def fazer_previsao(dados: DadosCrypto):
     """
     Faz predição de tendência para uma criptomoeda
     
     - **Entrada**: 13 features da criptomoeda
-    - **Saída**: Tendência (SUBIDA/QUEDA) + Probabilidade
+    - **Saída**: Tendência (SUBIDA/QUEDA) + Probabilidade + Probabilidade por horizonte
     """
     try:
         # Converter para dicionário
         dados_dict = dados.dict()
         
-        # Fazer predição
-        resultado = prever_tendencia(dados_dict)
+        # Registrar a entrada no monitor de drift
+        monitor = obter_monitor_drift()
+        if monitor is not None:
+            monitor.registrar_dict(dados_dict)
+        
+        # Fazer predição (modelo da moeda, se houver)
+        resultado = prever_tendencia(dados_dict, coin_id=dados.coin_id)
         
         # Verificar se houve erro
         if 'erro' in resultado:
@@ -155,6 +502,16 @@ def fazer_previsao(dados: DadosCrypto):
                 detail=resultado
             )
         
+        # Cópia da entrada para o candidato (segundo plano, não atrasa a resposta)
+        sombra = obter_sombra()
+        if sombra is not None and resultado['modelo'] == 'global':
+            sombra.enviar(dados_dict, resultado['tendencia'], resultado['probabilidade'])
+        
+        # Log da previsão servida (fila limitada; a gravação em Parquet fica com outra thread)
+        log_previsoes = obter_log_previsoes()
+        if log_previsoes is not None:
+            log_previsoes.registrar(dados_dict, resultado, dados.coin_id, resultado['versao_modelo'])
+        
         return resultado
         
     except Exception as e:
@@ -168,20 +525,41 @@ def fazer_previsao(dados: DadosCrypto):
 
 
 @app.post("/predict/batch")
+@perfilavel
 def fazer_previsao_batch(dados_lista: List[DadosCrypto]):
     """
     Faz predições para múltiplas criptomoedas de uma vez
     
-    - **Entrada**: Lista de dados de criptomoedas
+    - **Entrada**: Lista de dados de criptomoedas (máx. MAX_LINHAS_LOTE, padrão 1000)
     - **Saída**: Lista de predições
     """
+    if admissao is not None and len(dados_lista) > admissao.max_linhas_lote:
+        recusa = admissao.registrar_recusa(LOTE, 'lote_grande')
+        raise HTTPException(
+            status_code=recusa.status,
+            detail={
+                "erro": "Lote grande demais",
+                "motivo": recusa.motivo,
+                "mensagem": f"Envie no máximo {admissao.max_linhas_lote} linhas por requisição"
+            }
+        )
     try:
         resultados = []
         
+        # Registrar o lote inteiro no monitor de drift de uma vez
+        monitor = obter_monitor_drift()
+        if monitor is not None and dados_lista:
+            monitor.registrar([
+                [getattr(dados, f) for f in monitor.features] for dados in dados_lista
+            ])
+        
+        log_previsoes = obter_log_previsoes()
         for dados in dados_lista:
             dados_dict = dados.dict()
-            resultado = prever_tendencia(dados_dict)
+            resultado = prever_tendencia(dados_dict, coin_id=dados.coin_id)
             resultados.append(resultado)
+            if log_previsoes is not None and 'erro' not in resultado:
+                log_previsoes.registrar(dados_dict, resultado, dados.coin_id, resultado['versao_modelo'])
         
         return {
             "total": len(resultados),
@@ -0,0 +1,321 @@
+#pessoa3/carga
+
+# carga.py
+import numpy as np
+import subprocess
+import argparse
+import asyncio
+import socket
+import httpx
+import json
+import time
+import sys
+import os
+
+PESSOA3_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Linhas reais de exemplo usadas como base dos payloads
+PAYLOADS_CSV = os.path.join(PESSOA3_DIR, 'teste_lote.csv')
+
+# Mistura padrão de requisições (pesos relativos)
+MIX_PADRAO = 'predict=80,batch=10,health=10'
+
+TAMANHO_LOTE = 20
+DURACAO_S = 30
+TIMEOUT_S = 10
+N_PAYLOADS = 1000
+
+# Espera máxima pela API local ficar pronta (/health 200)
+ESPERA_API_S = 60
+
+
+def gerar_payloads(caminho=PAYLOADS_CSV, n=N_PAYLOADS, moedas=None, seed=42):
+    """
+    Gera payloads realistas para o /predict a partir de linhas de exemplo,
+    com ruído multiplicativo (~5%) em cada feature.
+
+    Args:
+        caminho: CSV com as 13 features (uma linha por exemplo)
+        n: Número de payloads
+        moedas: Lista de coin_id sorteados em cada payload (None = sem coin_id)
+
+    Returns:
+        list: Dicionários prontos para enviar como JSON
+    """
+    with open(caminho) as f:
+        colunas = f.readline().strip().split(',')
+        base = np.array([[float(v) for v in linha.strip().split(',')] for linha in f if linha.strip()])
+
+    rng = np.random.default_rng(seed)
+    linhas = base[rng.integers(0, len(base), n)] * rng.normal(1, 0.05, (n, len(colunas)))
+    payloads = [dict(zip(colunas, map(float, linha))) for linha in linhas]
+    if moedas:
+        for payload, moeda in zip(payloads, rng.choice(moedas, n)):
+            payload['coin_id'] = str(moeda)
+    return payloads
+
+
+def ler_mix(texto):
+    """'predict=80,batch=10,health=10' -> (['predict', 'batch', 'health'], [0.8, 0.1, 0.1])"""
+    pesos = {}
+    for parte in texto.split(','):
+        nome, peso = parte.split('=')
+        if nome not in ('predict', 'batch', 'health'):
+            raise ValueError(f"Endpoint desconhecido no mix: {nome}")
+        pesos[nome] = float(peso)
+    total = sum(pesos.values())
+    return list(pesos), [p / total for p in pesos.values()]
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def iniciar_api_local(workers=1):
+    """
+    Sobe a API num uvicorn local (subprocesso) e espera o /health ficar pronto.
+
+    Returns:
+        tuple: (processo, url)
+    """
+    porta = _porta_livre()
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api_fastapi:app', '--app-dir', PESSOA3_DIR,
+         '--host', '127.0.0.1', '--port', str(porta), '--workers', str(workers),
+         '--log-level', 'warning'],
+        stdout=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{porta}"
+
+    limite = time.monotonic() + ESPERA_API_S
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("A API local terminou durante a inicialização")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return processo, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+    processo.terminate()
+    raise RuntimeError(f"A API local não ficou pronta em {ESPERA_API_S}s")
+
+
+class GeradorCarga:
+    """
+    Gerador de carga assíncrono (httpx + asyncio).
+
+    Dois modos:
+    - taxa fixa (`rps`): as requisições saem em horários agendados, sem
+      esperar as anteriores (malha aberta). A latência é medida a partir do
+      horário agendado, então fila no cliente ou no servidor aparece nela
+      em vez de reduzir a taxa (evita "coordinated omission");
+    - concorrência fixa (`concorrencia`): N clientes em laço, cada um envia
+      a próxima requisição quando a anterior responde (malha fechada).
+    """
+
+    def __init__(self, url, payloads, mix=MIX_PADRAO, tamanho_lote=TAMANHO_LOTE,
+                 timeout=TIMEOUT_S, seed=42):
+        self.url = url.rstrip('/')
+        self.payloads = payloads
+        self.endpoints, self.pesos = ler_mix(mix)
+        self.tamanho_lote = tamanho_lote
+        self.timeout = timeout
+        self.rng = np.random.default_rng(seed)
+        self.resultados = []
+
+    def _sortear(self):
+        endpoint = self.endpoints[self.rng.choice(len(self.endpoints), p=self.pesos)]
+        if endpoint == 'predict':
+            return endpoint, 'POST', '/predict', self.payloads[self.rng.integers(len(self.payloads))]
+        if endpoint == 'batch':
+            indices = self.rng.integers(len(self.payloads), size=self.tamanho_lote)
+            return endpoint, 'POST', '/predict/batch', [self.payloads[i] for i in indices]
+        return endpoint, 'GET', '/health', None
+
+    async def _requisitar(self, cliente, inicio_agendado=None):
+        endpoint, metodo, caminho, corpo = self._sortear()
+        inicio = time.perf_counter()
+        referencia = inicio_agendado if inicio_agendado is not None else inicio
+        try:
+            resposta = await cliente.request(metodo, caminho, json=corpo)
+            status, erro = resposta.status_code, None
+        except httpx.HTTPError as e:
+            status, erro = None, type(e).__name__
+        fim = time.perf_counter()
+        self.resultados.append((endpoint, status, erro, fim - referencia, fim))
+
+    def _cliente(self, conexoes):
+        limites = httpx.Limits(max_connections=conexoes, max_keepalive_connections=conexoes)
+        return httpx.AsyncClient(base_url=self.url, timeout=self.timeout, limits=limites)
+
+    async def rodar_taxa(self, rps, duracao, conexoes=100):
+        """Malha aberta: `rps` requisições por segundo durante `duracao` segundos."""
+        async with self._cliente(conexoes) as cliente:
+            inicio = time.perf_counter()
+            tarefas = []
+            for i in range(int(rps * duracao)):
+                agendado = inicio + i / rps
+                espera = agendado - time.perf_counter()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                tarefas.append(asyncio.create_task(self._requisitar(cliente, agendado)))
+            await asyncio.gather(*tarefas)
+        return inicio
+
+    async def rodar_concorrencia(self, concorrencia, duracao):
+        """Malha fechada: `concorrencia` clientes em laço durante `duracao` segundos."""
+        async with self._cliente(concorrencia) as cliente:
+            inicio = time.perf_counter()
+            fim = inicio + duracao
+
+            async def usuario():
+                while time.perf_counter() < fim:
+                    await self._requisitar(cliente)
+
+            await asyncio.gather(*(usuario() for _ in range(concorrencia)))
+        return inicio
+
+    def relatorio(self, inicio, config):
+        """
+        Resume os resultados por endpoint e no total.
+
+        Returns:
+            dict: Configuração, vazão, taxa de erro e latências (ms)
+        """
+        duracao = max(r[4] for r in self.resultados) - inicio if self.resultados else 0.0
+
+        def resumir(linhas):
+            latencias = np.array([r[3] for r in linhas]) * 1000
+            erros = [r for r in linhas if r[2] is not None or r[1] is None or r[1] >= 400]
+            por_status = {}
+            for r in linhas:
+                chave = str(r[1]) if r[1] is not None else r[2]
+                por_status[chave] = por_status.get(chave, 0) + 1
+            return {
+                'requisicoes': len(linhas),
+                'vazao_rps': len(linhas) / duracao if duracao > 0 else 0.0,
+                'taxa_erro': len(erros) / len(linhas) if linhas else 0.0,
+                'status': por_status,
+                'latencia_ms': {
+                    'media': float(latencias.mean()),
+                    'p50': float(np.percentile(latencias, 50)),
+                    'p95': float(np.percentile(latencias, 95)),
+                    'p99': float(np.percentile(latencias, 99)),
+                    'max': float(latencias.max())
+                } if len(linhas) else None
+            }
+
+        return {
+            'config': config,
+            'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'duracao_s': duracao,
+            'total': resumir(self.resultados),
+            'endpoints': {
+                e: resumir([r for r in self.resultados if r[0] == e])
+                for e in self.endpoints if any(r[0] == e for r in self.resultados)
+            }
+        }
+
+
+def imprimir_relatorio(relatorio):
+    """Tabela resumida do relatório."""
+    print("\n" + "="*86)
+    print(f"📈 TESTE DE CARGA - {relatorio['config']['alvo']} ({relatorio['duracao_s']:.1f}s)")
+    print("="*86)
+    print(f"{'endpoint':<10} {'reqs':>8} {'req/s':>9} {'erros':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'máx ms':>9}")
+    linhas = list(relatorio['endpoints'].items()) + [('TOTAL', relatorio['total'])]
+    for nome, r in linhas:
+        lat = r['latencia_ms'] or {}
+        print(f"{nome:<10} {r['requisicoes']:>8} {r['vazao_rps']:>9.1f} {r['taxa_erro']:>8.2%} "
+              f"{lat.get('p50', 0):>9.2f} {lat.get('p95', 0):>9.2f} {lat.get('p99', 0):>9.2f} "
+              f"{lat.get('max', 0):>9.2f}")
+    print("="*86)
+
+
+def teste_carga(url=None, rps=None, concorrencia=None, duracao=DURACAO_S, mix=MIX_PADRAO,
+                tamanho_lote=TAMANHO_LOTE, moedas=None, workers=1, timeout=TIMEOUT_S, saida=None):
+    """
+    Roda um teste de carga e devolve o relatório.
+
+    Args:
+        url: API alvo (None = sobe uma API local em uvicorn)
+        rps: Taxa alvo em requisições/s (malha aberta)
+        concorrencia: Clientes simultâneos (malha fechada; usado se rps=None)
+        duracao: Duração do teste em segundos
+        mix: Pesos dos endpoints, ex. 'predict=80,batch=10,health=10'
+        tamanho_lote: Itens por requisição ao /predict/batch
+        moedas: coin_id sorteados nos payloads (None = modelo global)
+        workers: Workers do uvicorn local
+        saida: Arquivo JSON para o relatório (opcional)
+
+    Returns:
+        dict: Relatório (ver `GeradorCarga.relatorio`)
+    """
+    processo = None
+    if url is None:
+        print("🚀 Subindo a API local (uvicorn)...")
+        processo, url = iniciar_api_local(workers=workers)
+
+    try:
+        gerador = GeradorCarga(url, gerar_payloads(moedas=moedas), mix=mix,
+                               tamanho_lote=tamanho_lote, timeout=timeout)
+        if rps:
+            print(f"🔥 {rps} req/s por {duracao}s em {url} (mix: {mix})")
+            inicio = asyncio.run(gerador.rodar_taxa(rps, duracao))
+            modo = {'modo': 'taxa', 'rps_alvo': rps}
+        else:
+            concorrencia = concorrencia or 10
+            print(f"🔥 {concorrencia} clientes simultâneos por {duracao}s em {url} (mix: {mix})")
+            inicio = asyncio.run(gerador.rodar_concorrencia(concorrencia, duracao))
+            modo = {'modo': 'concorrencia', 'concorrencia': concorrencia}
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+    config = {
+        'alvo': url if processo is None else f'local ({workers} worker(s))',
+        **modo, 'duracao_s': duracao, 'mix': mix, 'tamanho_lote': tamanho_lote, 'moedas': moedas
+    }
+    relatorio = gerador.relatorio(inicio, config)
+    imprimir_relatorio(relatorio)
+
+    if saida:
+        with open(saida, 'w') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"💾 Relatório salvo em {saida}")
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da API de previsão")
+    parser.add_argument("--url", default=None, help="API alvo (padrão: sobe uma API local)")
+    parser.add_argument("--rps", type=float, default=None, help="taxa alvo (req/s, malha aberta)")
+    parser.add_argument("--concorrencia", type=int, default=None,
+                        help="clientes simultâneos (malha fechada; padrão 10 se --rps não for dado)")
+    parser.add_argument("--duracao", type=float, default=DURACAO_S, help="duração em segundos")
+    parser.add_argument("--mix", default=MIX_PADRAO, help="pesos dos endpoints (predict, batch, health)")
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE, help="itens por /predict/batch")
+    parser.add_argument("--moedas", nargs="+", default=None, help="coin_id sorteados nos payloads")
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn local")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_S, help="timeout por requisição (s)")
+    parser.add_argument("--saida", default=None, help="arquivo JSON do relatório")
+    args = parser.parse_args()
+
+    teste_carga(
+        url=args.url,
+        rps=args.rps,
+        concorrencia=args.concorrencia,
+        duracao=args.duracao,
+        mix=args.mix,
+        tamanho_lote=args.tamanho_lote,
+        moedas=args.moedas,
+        workers=args.workers,
+        timeout=args.timeout,
+        saida=args.saida
+    )
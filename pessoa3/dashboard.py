@@ -3,7 +3,9 @@
 import streamlit as st
 import requests
 import pandas as pd
+import streamlit.components.v1 as components
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import json
 
 # Configuração da página
@@ -16,6 +18,7 @@ st.set_page_config(
 
 # URL da API
 API_URL = "http://localhost:8000"
+WS_URL = API_URL.replace("http", "ws", 1) + "/ws/previsoes"
 
 # Título principal
 st.title("🚀 Crypto Trend Predictor Dashboard")
@@ -37,7 +40,19 @@ except:
     st.stop()
 
 # Tabs
-tab1, tab2, tab3 = st.tabs(["📊 Predição Individual", "📈 Predição em Lote", "ℹ️ Informações"])
+tab1, tab2, tab_hist, tab_vivo, tab3 = st.tabs(
+    ["📊 Predição Individual", "📈 Predição em Lote", "📉 Histórico", "⚡ Ao Vivo", "ℹ️ Informações"]
+)
+
+# Intervalos do gráfico de histórico (None = todo o histórico)
+PERIODOS_HISTORICO = {
+    "1 dia": pd.Timedelta(days=1),
+    "7 dias": pd.Timedelta(days=7),
+    "30 dias": pd.Timedelta(days=30),
+    "90 dias": pd.Timedelta(days=90),
+    "1 ano": pd.Timedelta(days=365),
+    "Tudo": None
+}
 
 # ==================== TAB 1: PREDIÇÃO INDIVIDUAL ====================
 with tab1:
@@ -237,6 +252,147 @@ with tab2:
         except Exception as e:
             st.error(f"❌ Erro ao ler arquivo: {str(e)}")
 
+# ==================== TAB HISTÓRICO ====================
+with tab_hist:
+    st.header("📉 Histórico de Preço e Previsões")
+    
+    col1, col2, col3 = st.columns([2, 3, 2])
+    with col1:
+        coin_id = st.text_input("Moeda (coin_id)", value="bitcoin")
+    with col2:
+        periodo = st.radio("Período", list(PERIODOS_HISTORICO), index=1, horizontal=True)
+    with col3:
+        pontos = st.slider("Pontos no gráfico", min_value=200, max_value=5000, value=1000, step=100)
+    
+    # Início arredondado para a hora: o mesmo período reaproveita o cache da API
+    params = {"pontos": pontos}
+    if PERIODOS_HISTORICO[periodo] is not None:
+        params["inicio"] = (pd.Timestamp.now().floor("h") - PERIODOS_HISTORICO[periodo]).isoformat()
+    
+    try:
+        response = requests.get(f"{API_URL}/historico/{coin_id}", params=params, timeout=30)
+        
+        if response.status_code == 200:
+            historico = response.json()
+            serie = pd.DataFrame({
+                "fetched_at": pd.to_datetime(historico["fetched_at"]),
+                "price_usd": historico["price_usd"],
+                "probabilidade": pd.Series(historico["probabilidade"], dtype=float),
+            })
+            com_previsao = serie.dropna(subset=["probabilidade"])
+            
+            fig = make_subplots(specs=[[{"secondary_y": True}]])
+            fig.add_trace(go.Scattergl(
+                x=serie["fetched_at"], y=serie["price_usd"], mode="lines",
+                name="Preço (USD)", line={"color": "#1f77b4", "width": 1.5}
+            ), secondary_y=False)
+            fig.add_trace(go.Scattergl(
+                x=com_previsao["fetched_at"], y=com_previsao["price_usd"], mode="markers",
+                name="Previsão (P subida 24h)",
+                marker={"size": 5, "color": com_previsao["probabilidade"], "colorscale": "RdYlGn",
+                        "cmin": 0, "cmax": 1, "colorbar": {"title": "P(subida)", "x": 1.08}},
+                hovertemplate="%{x}<br>US$ %{y:,.2f}<br>P(subida): %{marker.color:.2%}<extra></extra>"
+            ), secondary_y=False)
+            fig.add_trace(go.Scattergl(
+                x=com_previsao["fetched_at"], y=com_previsao["probabilidade"], mode="lines",
+                name="P(subida)", line={"color": "gray", "width": 1}, opacity=0.5
+            ), secondary_y=True)
+            fig.update_yaxes(title_text="Preço (USD)", secondary_y=False)
+            fig.update_yaxes(title_text="P(subida)", range=[0, 1], secondary_y=True)
+            fig.update_layout(height=500, hovermode="x unified", margin={"t": 30},
+                              legend={"orientation": "h", "y": -0.15})
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.caption(
+                f"{historico['n_pontos']} de {historico['n_original']} pontos ({historico['fonte']}, "
+                f"redução LTTB) | {historico['inicio']} → {historico['fim']} | cache: {historico['cache']}"
+            )
+        else:
+            st.warning(f"⚠️ {response.json().get('detail')}")
+    
+    except Exception as e:
+        st.error(f"❌ Erro ao buscar histórico: {str(e)}")
+
+# Tabela ao vivo: o navegador mantém o WebSocket e atualiza só a linha da
+# moeda que mudou (sem rerun do Streamlit nem polling da API)
+TABELA_AO_VIVO = """
+<style>
+  body { font-family: sans-serif; font-size: 14px; }
+  table { border-collapse: collapse; width: 100%; }
+  th, td { padding: 6px 10px; border-bottom: 1px solid #ddd; text-align: right; }
+  th:first-child, td:first-child { text-align: left; }
+  .subida { color: #2ca02c; font-weight: bold; }
+  .queda { color: #d62728; font-weight: bold; }
+  #status { color: gray; margin-bottom: 8px; }
+</style>
+<div id="status">conectando...</div>
+<table><thead id="cabecalho"></thead><tbody id="linhas"></tbody></table>
+<script>
+  const url = "__WS_URL__";
+  const linhas = {};
+  let horizontes = null;
+  function conectar() {
+    const ws = new WebSocket(url);
+    ws.onopen = () => { document.getElementById("status").textContent = "🟢 conectado"; };
+    ws.onclose = () => {
+      document.getElementById("status").textContent = "🔴 desconectado, reconectando...";
+      setTimeout(conectar, 2000);
+    };
+    ws.onmessage = (evento) => {
+      const m = JSON.parse(evento.data);
+      if (m.tipo !== "previsao") return;
+      // Só textContent: coin_id e horizontes vêm da API e nunca viram HTML
+      if (horizontes === null) {
+        horizontes = Object.keys(m.probabilidades);
+        const cab = document.createElement("tr");
+        ["Moeda", "Preço (USD)", "Tendência", ...horizontes.map(h => `P(subida) ${h}`), "Atualizado"]
+          .forEach(texto => { const th = document.createElement("th"); th.textContent = texto; cab.appendChild(th); });
+        document.getElementById("cabecalho").replaceChildren(cab);
+      }
+      let tr = linhas[m.coin_id];
+      if (!tr) {
+        tr = document.createElement("tr");
+        linhas[m.coin_id] = tr;
+        document.getElementById("linhas").appendChild(tr);
+      }
+      const celula = (texto, classe) => {
+        const td = document.createElement("td");
+        if (classe) {
+          const span = document.createElement("span");
+          span.className = classe;
+          span.textContent = texto;
+          td.appendChild(span);
+        } else {
+          td.textContent = texto;
+        }
+        return td;
+      };
+      tr.replaceChildren(
+        celula(String(m.coin_id)),
+        celula(Number(m.price_usd).toLocaleString("pt-BR", {maximumFractionDigits: 4})),
+        m.tendencia === 1 ? celula("📈 SUBIDA", "subida") : celula("📉 QUEDA", "queda"),
+        ...horizontes.map(h => celula(`${(100 * (m.probabilidades[h] ?? NaN)).toFixed(1)}%`)),
+        celula(String(m.fetched_at).replace("T", " ").slice(0, 19))
+      );
+    };
+  }
+  conectar();
+</script>
+"""
+
+# ==================== TAB AO VIVO ====================
+with tab_vivo:
+    st.header("⚡ Previsões ao Vivo")
+    
+    moedas_vivo = st.text_input("Moedas (separadas por vírgula; vazio = todas)", value="")
+    url_vivo = WS_URL + (f"?moedas={moedas_vivo.replace(' ', '')}" if moedas_vivo.strip() else "")
+    components.html(TABELA_AO_VIVO.replace("__WS_URL__", url_vivo), height=420, scrolling=True)
+    
+    st.caption(
+        "Cada preço novo que chega à API (POST /precos ou feed simulado com "
+        "PRECOS_SIMULADOS=<n moedas>) gera uma previsão enviada na hora por WebSocket."
+    )
+
 # ==================== TAB 3: INFORMAÇÕES ====================
 with tab3:
     st.header("ℹ️ Informações do Sistema")
@@ -272,8 +428,12 @@ with tab3:
 GET  /              - Informações da API
 GET  /health        - Status do sistema
 GET  /features      - Lista de features necessárias
+GET  /historico/{coin_id} - Histórico reduzido (LTTB) + previsões
+GET  /tempo-real    - Assinantes e previsões publicadas ao vivo
+POST /precos        - Preços novos (dispara as previsões ao vivo)
 POST /predict       - Predição individual
 POST /predict/batch - Predição em lote
+WS   /ws/previsoes  - Previsões ao vivo (?moedas=bitcoin,ethereum)
     """)
 
 # Footer
@@ -0,0 +1,48 @@
+# tests/test_admissao.py
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from pessoa2_ml.admissao import ControleAdmissao, AdmissaoRequisicoes, LOTE
+
+
+def _cliente(max_bytes_lote):
+    async def lote(request):
+        corpo = await request.body()
+        return JSONResponse({'bytes': len(corpo)})
+
+    controle = ControleAdmissao(max_bytes_lote=max_bytes_lote)
+    app = Starlette(routes=[Route('/predict/batch', lote, methods=['POST'])])
+    app.add_middleware(AdmissaoRequisicoes, controle=controle)
+    return TestClient(app), controle
+
+
+def test_content_length_grande_recusado_antes_da_admissao():
+    cliente, controle = _cliente(100)
+    resposta = cliente.post('/predict/batch', content=b'x' * 101)
+    assert resposta.status_code == 413
+    assert resposta.json()['detail']['motivo'] == 'lote_grande'
+    assert controle.admitidas[LOTE] == 0
+    assert controle.recusadas[LOTE] == {'lote_grande': 1}
+
+    resposta = cliente.post('/predict/batch', content=b'x' * 100)
+    assert resposta.status_code == 200
+    assert controle.admitidas[LOTE] == 1
+
+
+def test_corpo_chunked_conferido_antes_da_admissao():
+    cliente, controle = _cliente(100)
+
+    def partes(n):
+        for _ in range(n):
+            yield b'x' * 30
+
+    resposta = cliente.post('/predict/batch', content=partes(4))
+    assert resposta.status_code == 413
+    assert controle.admitidas[LOTE] == 0
+
+    # Dentro do limite o endpoint recebe o corpo inteiro já lido
+    resposta = cliente.post('/predict/batch', content=partes(3))
+    assert resposta.json() == {'bytes': 90}
+    assert controle.admitidas[LOTE] == 1
@@ -0,0 +1,89 @@
+# tests/test_backtest.py
+import pandas as pd
+import numpy as np
+import pytest
+
+from pessoa2_ml.backtest import montar_painel, executar_backtest, janelas_walk_forward
+
+
+def _linhas(n_moedas=4, horas=500, seed=0):
+    """Linhas horárias com preço, probabilidade e target (subida na próxima hora)."""
+    rng = np.random.default_rng(seed)
+    partes = []
+    for i in range(n_moedas):
+        precos = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, horas)))
+        alvo = np.append((precos[1:] > precos[:-1]).astype(float), np.nan)
+        partes.append(pd.DataFrame({
+            'coin_id': f'moeda_{i}',
+            'fetched_at': pd.date_range('2026-01-01', periods=horas, freq='h'),
+            'price_usd': precos,
+            'target': alvo,
+            'prob': rng.uniform(0.3, 0.7, horas)
+        }))
+    return pd.concat(partes, ignore_index=True).dropna(subset=['target']).reset_index(drop=True)
+
+
+def _rodar(df):
+    painel = montar_painel(df, df['prob'].to_numpy())
+    return executar_backtest(painel, limiares=[0.55], n_processos=1)
+
+
+def test_exposicao_sempre_comprado_e_um():
+    resumo, por_moeda = _rodar(_linhas())
+    sempre = resumo[resumo['limiar'] == 0.0].iloc[0]
+    assert sempre['exposicao'] == 1.0
+    assert (por_moeda[por_moeda['limiar'] == 0.0]['exposicao'] == 1.0).all()
+
+
+def test_ticks_desalinhados_entre_moedas():
+    df = _linhas()
+    resumo, _ = _rodar(df)
+
+    # Coletor real: cada moeda gravada alguns segundos depois da anterior
+    desalinhado = df.assign(
+        fetched_at=df['fetched_at'] + pd.to_timedelta(df['coin_id'].str[-1].astype(int) * 3 + 1, unit='s')
+    )
+    resumo_desalinhado, _ = _rodar(desalinhado)
+
+    sempre = resumo_desalinhado[resumo_desalinhado['limiar'] == 0.0].iloc[0]
+    assert sempre['n_trocas'] == 4
+    assert sempre['exposicao'] == 1.0
+    for coluna in ('retorno_total', 'sharpe', 'exposicao', 'n_trocas', 'taxa_acerto'):
+        assert resumo_desalinhado[coluna].to_numpy() == pytest.approx(resumo[coluna].to_numpy())
+
+
+def test_retorno_atravessa_horas_sem_linha():
+    df = _linhas(n_moedas=1, horas=50)
+    # Uma hora sem linha: o retorno da hora anterior vai até o próximo preço
+    com_lacuna = df.drop(index=20).reset_index(drop=True)
+    _, por_moeda = _rodar(com_lacuna)
+    sempre = por_moeda[por_moeda['limiar'] == 0.0].iloc[0]
+
+    precos = com_lacuna['price_usd'].to_numpy()
+    retornos = precos[1:] / precos[:-1] - 1
+    retornos[0] -= 10 / 10_000  # custo da única troca (entrada), CUSTO_BPS
+    esperado = np.prod(1 + retornos) - 1
+    assert sempre['n_trocas'] == 1
+    assert sempre['retorno'] == pytest.approx(esperado)
+
+
+def test_embargo_em_linhas_com_ticks():
+    # Ticks a cada 10 min: 24 linhas à frente são 4h, não 24h
+    rng = np.random.default_rng(1)
+    partes = []
+    for i in range(2):
+        tempos = pd.date_range('2026-01-01', periods=3000, freq='10min') + pd.Timedelta(seconds=7 * i)
+        partes.append(pd.DataFrame({'coin_id': f'moeda_{i}', 'fetched_at': tempos,
+                                    'target': rng.integers(0, 2, len(tempos))}))
+    df = pd.concat(partes, ignore_index=True)
+
+    tarefas = janelas_walk_forward(df, janela_treino_dias=5, passo_dias=2, horizonte=24)
+    assert tarefas
+    for teste, treino in tarefas:
+        inicio = df['fetched_at'].iloc[teste].min()
+        for coin_id, grupo in df.groupby('coin_id'):
+            linhas = np.flatnonzero(grupo.index.isin(treino))
+            # O target de toda linha de treino termina antes do teste
+            assert (grupo['fetched_at'].iloc[linhas + 24] < inicio).all()
+            # e nada além do embargo é descartado
+            assert grupo['fetched_at'].iloc[linhas.max() + 25] >= inicio
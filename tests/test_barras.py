@@ -0,0 +1,44 @@
+# tests/test_barras.py
+import pandas as pd
+import numpy as np
+
+from pessoa1_data.backends import BackendParquet
+from pessoa1_data.barras import materializar_barras
+
+
+def _ticks(inicio, fim, seed):
+    """Ticks a cada ~20 min de duas moedas, com horas sem tick perto de `DESDE`."""
+    rng = np.random.default_rng(seed)
+    partes = []
+    for coin in ('bitcoin', 'ethereum'):
+        horarios = pd.date_range(inicio, fim, freq='20min', inclusive='left')
+        horarios = horarios + pd.to_timedelta(rng.integers(0, 600, len(horarios)), unit='s')
+        precos = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(horarios))))
+        partes.append(pd.DataFrame({
+            'coin_id': coin, 'price_usd': precos, 'price_brl': precos * 5, 'fetched_at': horarios
+        }))
+    return pd.concat(partes, ignore_index=True)
+
+
+DESDE = pd.Timestamp('2026-01-02 00:00')
+
+
+def test_incremental_igual_reconstrucao_completa(tmp_path):
+    antes = _ticks('2026-01-01 00:00', '2026-01-01 22:00', seed=1)
+    # Lacuna: nenhum tick de 22:00 até 03:00, atravessando `DESDE`
+    depois = _ticks('2026-01-02 03:00', '2026-01-02 12:00', seed=2)
+
+    incremental = BackendParquet(str(tmp_path / 'inc' / 'ticks'))
+    incremental.escrever_precos(antes)
+    materializar_barras(incremental)
+    incremental.escrever_precos(depois)
+    materializar_barras(incremental, desde=DESDE)
+
+    completo = BackendParquet(str(tmp_path / 'completo' / 'ticks'))
+    completo.escrever_precos(pd.concat([antes, depois], ignore_index=True))
+    materializar_barras(completo)
+
+    esperado = completo.ler_barras()
+    obtido = incremental.ler_barras()
+    assert obtido[obtido['fetched_at'] >= DESDE]['preenchido'].head(3).all()
+    pd.testing.assert_frame_equal(obtido, esperado)
@@ -0,0 +1,23 @@
+# tests/test_coletor.py
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from pessoa1_data.coletor import _retry_after, ESPERA_429
+
+
+def test_retry_after_em_segundos():
+    assert _retry_after('120') == 120.0
+
+
+def test_retry_after_data_http():
+    quando = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert _retry_after(format_datetime(quando, usegmt=True)) == pytest.approx(90, abs=2)
+    # Data no passado: pode repetir já
+    assert _retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+@pytest.mark.parametrize('valor', [None, '', 'amanhã'])
+def test_retry_after_invalido_usa_padrao(valor):
+    assert _retry_after(valor) == ESPERA_429
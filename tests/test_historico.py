@@ -0,0 +1,39 @@
+# tests/test_historico.py
+import numpy as np
+import pandas as pd
+
+from pessoa2_ml.historico import HistoricoPrecos
+
+
+class _Backend:
+    def ler_precos(self, coin_ids=None, inicio=None, fim=None):
+        instantes = pd.date_range('2025-01-01', periods=100, freq='h')
+        precos = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 100)))
+        return pd.DataFrame({'coin_id': 'bitcoin', 'price_usd': precos,
+                             'fetched_at': instantes})
+
+
+class _Modelo:
+    feature_columns = ['price_usd']
+    classes = np.array([0, 1])
+
+    def __init__(self, versao, p):
+        self.versao = versao
+        self.p = p
+
+    def prever_proba(self, X):
+        return np.tile([1 - self.p, self.p], (len(X), 1))
+
+
+def test_cache_separado_por_versao_do_modelo():
+    modelos = [_Modelo('aaa', 0.2)]
+    historico = HistoricoPrecos(_Backend(), lambda coin_id: modelos[0])
+    inicio, fim = '2025-01-03', '2025-01-04'
+    assert historico.consultar('bitcoin', inicio, fim, fonte='ticks')['probabilidade'][-1] == 0.2
+
+    # Modelo promovido no mesmo endereço do antigo (id() reaproveitado)
+    modelos[0].__init__('bbb', 0.7)
+    resposta = historico.consultar('bitcoin', inicio, fim, fonte='ticks')
+    assert resposta['cache'] == 'miss'
+    assert resposta['probabilidade'][-1] == 0.7
+    assert historico.consultar('bitcoin', inicio, fim, fonte='ticks')['cache'] == 'hit'
@@ -0,0 +1,66 @@
+# tests/test_inferencia.py
+import pickle
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from pessoa2_ml.inferencia import (
+    ModeloLeve, carregar_modelo_leve, gravar_manifesto, versao_origem, versao_arquivo,
+    MODELO_NPZ, MODELO_PKL, MODELO_COMPRIMIDO
+)
+
+
+def _salvar_treino(pasta, seed=0, npz=True):
+    """Artefatos como os de `treino.salvar_modelo` (pkl + npz com o hash do pkl)."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(200, 3))
+    y = (X[:, 0] > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    modelo = RandomForestClassifier(n_estimators=8, max_depth=6, random_state=seed).fit(scaler.transform(X), y)
+    features = ['a', 'b', 'c']
+    for nome, objeto in ((MODELO_PKL, modelo), ('scaler.pkl', scaler), ('feature_columns.pkl', features)):
+        with open(os.path.join(pasta, nome), 'wb') as f:
+            pickle.dump(objeto, f)
+    leve = ModeloLeve.de_sklearn(modelo, scaler, features)
+    leve.versao_pkl = versao_arquivo(os.path.join(pasta, MODELO_PKL))
+    if npz:
+        leve.salvar(os.path.join(pasta, MODELO_NPZ))
+    return leve
+
+
+def test_manifesto_serve_a_variante_comprimida(tmp_path):
+    pasta = str(tmp_path)
+    original = _salvar_treino(pasta)
+    original.podar(n_arvores=2).salvar(os.path.join(pasta, MODELO_COMPRIMIDO))
+    gravar_manifesto(pasta, MODELO_COMPRIMIDO, 'poda_2a_6p', versao_origem(pasta))
+
+    assert carregar_modelo_leve(pasta).n_arvores == 2
+    # A compressão parte sempre do modelo do treino
+    assert carregar_modelo_leve(pasta, comprimido=False).n_arvores == 8
+
+
+def test_manifesto_de_outro_modelo_e_ignorado(tmp_path):
+    pasta = str(tmp_path)
+    original = _salvar_treino(pasta)
+    original.podar(n_arvores=2).salvar(os.path.join(pasta, MODELO_COMPRIMIDO))
+    gravar_manifesto(pasta, MODELO_COMPRIMIDO, 'poda_2a_6p', versao_origem(pasta))
+
+    # Retreino na mesma pasta: a variante é do modelo antigo
+    _salvar_treino(pasta, seed=1)
+    assert carregar_modelo_leve(pasta).n_arvores == 8
+
+
+def test_npz_escolhido_pelo_hash_do_pkl_e_nao_pela_data(tmp_path):
+    pasta = str(tmp_path)
+    npz, pkl = os.path.join(pasta, MODELO_NPZ), os.path.join(pasta, MODELO_PKL)
+    _salvar_treino(pasta)
+    # Cópia/checkout deixou o .npz "mais antigo" que o .pkl: continua valendo
+    os.utime(npz, (1, 1))
+    assert carregar_modelo_leve(pasta).versao == versao_arquivo(npz)
+
+    # Retreino regravou só o .pkl; o .npz antigo ficou "mais novo"
+    _salvar_treino(pasta, seed=1, npz=False)
+    os.utime(pkl, (1, 1))
+    assert carregar_modelo_leve(pasta).versao == versao_arquivo(pkl)
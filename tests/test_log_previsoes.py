@@ -0,0 +1,33 @@
+# tests/test_log_previsoes.py
+import time
+import os
+
+from pessoa2_ml.log_previsoes import LogPrevisoes, ler_log_previsoes, SUFIXO_ABERTO
+
+
+def _esperar(condicao, timeout=5):
+    limite = time.monotonic() + timeout
+    while not condicao() and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert condicao()
+
+
+def test_erro_de_escrita_fecha_o_arquivo(tmp_path):
+    pasta = str(tmp_path)
+    log = LogPrevisoes(pasta=pasta, colunas_features=['x'], linhas_lote=1, intervalo=0.01, rotacao=3600)
+    resultado = {'tendencia': 1, 'probabilidade': 0.6, 'modelo': 'global'}
+    log.registrar({'x': 1.0}, resultado, coin_id='bitcoin')
+    _esperar(lambda: log.gravados == 1)
+
+    # Disco cheio no próximo row group
+    def falhar(tabela):
+        raise OSError('No space left on device')
+    log._arquivo[1].write_table = falhar
+    log.registrar({'x': 2.0}, resultado, coin_id='bitcoin')
+    _esperar(lambda: log.erros == 1)
+    log.encerrar()
+
+    assert not [nome for nome in os.listdir(pasta) if nome.endswith(SUFIXO_ABERTO)]
+    df = ler_log_previsoes(pasta)
+    assert df['x'].tolist() == [1.0]
+    assert log.estatisticas()['arquivos_fechados'] == 1
@@ -0,0 +1,52 @@
+# tests/test_painel.py
+import pandas as pd
+import numpy as np
+
+from pessoa2_ml.painel import features_cruzadas, adicionar_features_cruzadas, FEATURES_CRUZADAS
+
+
+def test_menos_linhas_que_a_janela():
+    df = pd.DataFrame({
+        'coin_id': np.repeat(['bitcoin', 'ethereum'], 5),
+        'price_usd': np.arange(1.0, 11.0),
+        'fetched_at': np.tile(pd.date_range('2026-01-01', periods=5, freq='h'), 2)
+    })
+    cruzadas = features_cruzadas(df, janela=24)
+    assert len(cruzadas) == 10
+    assert cruzadas[FEATURES_CRUZADAS].isna().all().all()
+
+
+def _ticks(horas=40):
+    """bitcoin e ethereum com ticks a cada 10 min, o ethereum 3 s depois."""
+    rng = np.random.default_rng(0)
+    instantes = pd.date_range('2026-01-01', periods=horas * 6, freq='10min')
+    return pd.DataFrame({
+        'coin_id': np.repeat(['bitcoin', 'ethereum'], len(instantes)),
+        'price_usd': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2 * len(instantes)))),
+        'fetched_at': np.concatenate([instantes, instantes + pd.Timedelta(seconds=3)])
+    })
+
+
+def test_ticks_desalinhados_caem_na_mesma_hora():
+    cruzadas = features_cruzadas(_ticks(), janela=24)
+    assert len(cruzadas) == 80
+    ultimas = cruzadas.groupby('coin_id').tail(1)
+    assert ultimas[['corr_btc_24h', 'rank_retorno_24h', 'zscore_retorno_24h']].notna().all().all()
+
+
+def test_adicionar_sem_olhar_o_futuro():
+    df = _ticks().sample(frac=1, random_state=1)
+    juntos = adicionar_features_cruzadas(df, janela=24)
+    # Mesma ordem e linhas da entrada
+    assert juntos.index.equals(df.index)
+    cruzadas = features_cruzadas(df, janela=24).set_index(['coin_id', 'fetched_at'])
+
+    # Último tick da hora (o do ethereum completa a linha): features da própria hora
+    hora = pd.Timestamp('2026-01-02 06:00')
+    linha = juntos[(juntos['coin_id'] == 'ethereum') & (juntos['fetched_at'] == hora + pd.Timedelta(minutes=50, seconds=3))]
+    assert np.isclose(linha['zscore_retorno_24h'].iloc[0], cruzadas.loc[('ethereum', hora), 'zscore_retorno_24h'])
+
+    # No meio da hora: ainda a hora anterior
+    linha = juntos[(juntos['coin_id'] == 'ethereum') & (juntos['fetched_at'] == hora + pd.Timedelta(minutes=20, seconds=3))]
+    anterior = hora - pd.Timedelta(hours=1)
+    assert np.isclose(linha['zscore_retorno_24h'].iloc[0], cruzadas.loc[('ethereum', anterior), 'zscore_retorno_24h'])
@@ -0,0 +1,40 @@
+# tests/test_perfil_cpu.py
+import os
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from pessoa2_ml.perfil_cpu import PerfilRequisicoes, LimitePerfis, PERFIL_DIR
+from pessoa2_ml.inferencia import BASE_DIR
+
+
+def _cliente(diretorio, token):
+    async def home(request):
+        return JSONResponse({'ok': True})
+
+    app = Starlette(routes=[Route('/', home)])
+    app.add_middleware(PerfilRequisicoes, diretorio=diretorio, token=token, limite=LimitePerfis(intervalo_min=0))
+    return TestClient(app)
+
+
+def test_sem_token_nao_perfila(tmp_path):
+    cliente = _cliente(str(tmp_path), token='')
+    resposta = cliente.get('/', headers={'X-Perfil': '1'})
+    assert resposta.status_code == 200
+    assert 'x-perfil' not in resposta.headers
+    assert not os.listdir(tmp_path)
+
+
+def test_token_certo_perfila(tmp_path):
+    cliente = _cliente(str(tmp_path), token='segredo')
+    assert 'x-perfil' not in cliente.get('/', headers={'X-Perfil': 'errado'}).headers
+
+    resposta = cliente.get('/', headers={'X-Perfil': 'segredo'})
+    assert os.listdir(tmp_path) == [resposta.headers['x-perfil']]
+
+
+def test_pasta_padrao_na_raiz_do_projeto():
+    if 'PERFIL_DIR' not in os.environ:
+        assert PERFIL_DIR == os.path.join(BASE_DIR, 'perfis')
@@ -0,0 +1,63 @@
+# tests/test_registro_modelos.py
+import numpy as np
+
+from pessoa2_ml.registro_modelos import _treinar_moeda, _arquivo_moeda
+from pessoa2_ml.inferencia import ModeloLeve
+
+
+def _dados(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = np.column_stack([(X[:, i] > 0).astype(int) for i in range(3)])
+    return X, y
+
+
+def test_moeda_com_os_horizontes_do_global():
+    X, y = _dados()
+    _, modelo, scaler, acuracia = _treinar_moeda('bitcoin', X, y, horizontes=[1, 6, 24])
+    leve = ModeloLeve.de_sklearn(modelo, scaler, ['a', 'b', 'c', 'd'])
+    assert leve.horizontes == [1, 6, 24]
+    _, _, probabilidades = leve.prever_dict_horizontes(dict(zip('abcd', X[0])))
+    assert set(probabilidades) == {'1h', '6h', '24h'}
+    assert 0 <= acuracia <= 1
+
+
+def test_moeda_uma_saida():
+    X, y = _dados()
+    _, modelo, scaler, _ = _treinar_moeda('bitcoin', X, y[:, 2])
+    leve = ModeloLeve.de_sklearn(modelo, scaler, ['a', 'b', 'c', 'd'])
+    _, _, probabilidades = leve.prever_dict_horizontes(dict(zip('abcd', X[0])))
+    assert set(probabilidades) == {'24h'}
+
+
+def test_arquivos_de_moedas_nao_colidem():
+    assert _arquivo_moeda('a.b') != _arquivo_moeda('a_b')
+    assert _arquivo_moeda('a.b') == _arquivo_moeda('a.b')
+    assert _arquivo_moeda('../x').startswith('modelo_')
+    assert '/' not in _arquivo_moeda('../x')
+
+
+class _Modelo:
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.nbytes = 10
+
+
+def test_troca_de_indice_durante_a_carga(monkeypatch):
+    import pessoa2_ml.registro_modelos as registro
+
+    indices = [{'bitcoin': {'arquivo': 'antigo.npz'}}, {'bitcoin': {'arquivo': 'novo.npz'}}]
+    monkeypatch.setattr(registro, 'carregar_indice', lambda: indices[0])
+    cache = registro.CacheModelos(max_bytes=100)
+
+    def carregar(caminho):
+        # Um novo treino troca o índice enquanto o modelo antigo é lido
+        if caminho.endswith('antigo.npz'):
+            indices.pop(0)
+            cache.recarregar_indice()
+        return _Modelo(caminho)
+
+    monkeypatch.setattr(registro, '_carregar_modelo_moeda', carregar)
+    assert cache.obter('bitcoin').arquivo.endswith('novo.npz')
+    assert cache.obter('bitcoin').arquivo.endswith('novo.npz')
+    assert cache.hits == 1
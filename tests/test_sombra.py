@@ -0,0 +1,67 @@
+# tests/test_sombra.py
+import os
+
+from pessoa2_ml.sombra import ModeloSombra, promover_arquivos, ARQUIVOS_MODELO
+from pessoa2_ml.inferencia import pasta_modelo, nova_versao, publicar_versao
+
+
+class _Candidato:
+    n_arvores = 1
+
+    def prever_dict(self, dados):
+        return 1, 0.6
+
+
+def test_enviar_depois_de_encerrar_nao_falha():
+    # Requisição que pegou a sombra antes de uma promoção
+    sombra = ModeloSombra(_Candidato())
+    sombra.encerrar()
+    assert sombra.enviar({'x': 1.0}, 1, 0.5) is False
+    assert sombra.estatisticas()['pendentes'] == 0
+
+
+def test_pool_encerrado_devolve_pendente():
+    sombra = ModeloSombra(_Candidato())
+    # Pool parado entre o lock e o submit
+    sombra._executor.shutdown()
+    assert sombra.enviar({'x': 1.0}, 1, 0.5) is False
+    estatisticas = sombra.estatisticas()
+    assert estatisticas['pendentes'] == 0
+    assert estatisticas['descartadas'] == 1
+
+
+def _gravar(pasta, conteudo):
+    os.makedirs(pasta, exist_ok=True)
+    for nome in ARQUIVOS_MODELO:
+        with open(os.path.join(pasta, nome), 'w') as f:
+            f.write(conteudo)
+
+
+def _ler(pasta):
+    return {nome: open(os.path.join(pasta, nome)).read() for nome in ARQUIVOS_MODELO}
+
+
+def test_promocao_troca_todos_os_arquivos_de_uma_vez(tmp_path):
+    models, candidato = str(tmp_path / 'models'), str(tmp_path / 'candidato')
+    # Layout antigo: artefatos direto em models/
+    _gravar(models, 'antigo')
+    assert pasta_modelo(models) == models
+
+    _gravar(candidato, 'novo')
+    versao, arquivos = promover_arquivos(candidato, models)
+    assert arquivos == ARQUIVOS_MODELO
+    assert pasta_modelo(models) == os.path.join(models, 'versoes', versao)
+    assert set(_ler(pasta_modelo(models)).values()) == {'novo'}
+    # Os arquivos antigos não são tocados: um leitor sem o ponteiro ainda os vê inteiros
+    assert set(_ler(models).values()) == {'antigo'}
+
+
+def test_versoes_antigas_sao_apagadas(tmp_path):
+    models = str(tmp_path / 'models')
+    versoes = []
+    for i in range(5):
+        pasta = nova_versao(models)
+        _gravar(pasta, str(i))
+        versoes.append(publicar_versao(pasta, models, mantidas=2))
+    assert sorted(os.listdir(os.path.join(models, 'versoes'))) == versoes[-3:]
+    assert set(_ler(pasta_modelo(models)).values()) == {'4'}
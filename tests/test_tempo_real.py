@@ -0,0 +1,47 @@
+# tests/test_tempo_real.py
+from datetime import datetime, timedelta
+import pytest
+
+from pessoa2_ml.tempo_real import FluxoPrecos, DifusorPrevisoes, validar_coin_id, JANELA_PRECOS
+
+
+def _instante(k):
+    return datetime(2026, 1, 1) + timedelta(minutes=k)
+
+
+class _Modelo:
+    def prever_dict_horizontes(self, features):
+        return 1, 0.6, {'24h': 0.6}
+
+
+def test_moedas_limitadas():
+    difusor = DifusorPrevisoes(max_moedas=3)
+    fluxo = FluxoPrecos(lambda coin_id: _Modelo(), difusor, max_moedas=3)
+    for i in range(10):
+        for k in range(JANELA_PRECOS):
+            fluxo.receber(f'moeda-{i}', 100.0 + (k % 5), _instante(k))
+    assert list(fluxo.ultimos()) == ['moeda-7', 'moeda-8', 'moeda-9']
+    assert list(difusor.ultimas) == ['moeda-7', 'moeda-8', 'moeda-9']
+    assert fluxo.estatisticas()['moedas_descartadas'] == 7
+
+
+def test_previsao_antiga_nao_substitui_a_nova():
+    difusor = DifusorPrevisoes()
+    fluxo = FluxoPrecos(lambda coin_id: _Modelo(), difusor)
+    pendentes = []
+    for k in range(JANELA_PRECOS + 1):
+        pendentes.append(fluxo.registrar('bitcoin', 100.0 + (k % 5), _instante(k)))
+    # Dois lotes concorrentes: o mais novo publica primeiro
+    assert len(fluxo.publicar(fluxo.prever([pendentes[-1]]))) == 1
+    assert fluxo.publicar(fluxo.prever([pendentes[-2]])) == []
+
+
+def _instante(k):
+    from datetime import datetime, timedelta
+    return datetime(2026, 1, 1) + timedelta(minutes=k)
+
+
+@pytest.mark.parametrize('coin_id', ['<img src=x onerror=alert(1)>', 'Bitcoin', '', 'a' * 65])
+def test_coin_id_invalido(coin_id):
+    with pytest.raises(ValueError):
+        validar_coin_id(coin_id)